@@ -3,9 +3,15 @@
 Smart GPS Data Cleaner - Entfernt fehlerhafte GPS-Punkte statt künstlicher Limits
 """
 
+import sys
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
 
+sys.path.append(str(Path(__file__).parent / "scripts"))
+from GPSSpeedFilter import isolated_flags
+
 def clean_gps_data():
     """Intelligente GPS-Daten-Bereinigung basierend auf Plausibilitätsprüfungen."""
     
@@ -74,17 +80,8 @@ def clean_gps_data():
         # 5. KONTEXT-BASIERTE FILTERUNG
         # Einzelne Ausreißer entfernen, aber nicht ganze Bergab-Passagen
         
-        # Isolierte Ausreißer finden (umgeben von normalen Werten)
-        isolated_errors = pd.Series(False, index=df.index)
-        
-        for i in range(1, len(df) - 1):
-            if gps_error_flags.iloc[i]:
-                # Prüfe ob vorheriger und nächster Punkt normal sind
-                prev_normal = not gps_error_flags.iloc[i-1]
-                next_normal = not gps_error_flags.iloc[i+1]
-                
-                if prev_normal and next_normal:
-                    isolated_errors.iloc[i] = True
+        # Isolierte Ausreißer finden (vorheriger und nächster Punkt sind normal)
+        isolated_errors = pd.Series(isolated_flags(gps_error_flags), index=df.index)
         
         print(f"Isolated GPS errors to remove: {isolated_errors.sum()}")
         
@@ -10,6 +10,12 @@ import getpass
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 
+try:
+    # Metadaten-Index für Schritt 11 (scripts/StageMetadataIndex.py, liegt neben den aufrufenden Scripts)
+    from StageMetadataIndex import record_header_lines
+except ImportError:
+    record_header_lines = None
+
 def create_csv_metadata_header(
     script_name: str,
     script_version: str,
@@ -149,6 +155,9 @@ def write_csv_with_metadata(
         print(f"[Fehler] Konnte CSV nicht schreiben: {output_path} - {e}")
         raise
 
+    if record_header_lines is not None:
+        record_header_lines(output_path, header_lines, script_name)
+
 def read_csv_metadata(csv_path: str) -> Dict[str, str]:
     """
     Liest Metadaten aus einem CSV-Header.
@@ -5,13 +5,15 @@
 ------------------------------------
 CRITICAL FIX VERSION - Corrected duplicate trace bug that was overwriting track segments
 Enhanced with comprehensive performance tracking embedded in HTML output.
+v2.1.0: Track als EINE WebGL-Linie mit Oberflächenfarbe je Vertex, gespeist aus
+einer LTTB-reduzierten Detailstufe (PlotDownsampling.py, Oberflächenwechsel bleiben erhalten).
 """
 
 # === SCRIPT METADATA ===
 SCRIPT_NAME = "06b_generate_3d_plotly_map.py"
-SCRIPT_VERSION = "2.0.0"
+SCRIPT_VERSION = "2.1.0"
 SCRIPT_DESCRIPTION = "Interactive 3D Plotly visualization with comprehensive performance tracking"
-LAST_UPDATED = "2025-06-09"
+LAST_UPDATED = "2026-10-19"
 AUTHOR = "Markus"
 CONFIG_COMPATIBILITY = "2.1"
 
@@ -26,9 +28,11 @@ import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import time
-from typing import Optional
+from typing import Optional, Tuple
 from datetime import datetime
 
+from PlotDownsampling import select_plot_indices
+
 print(f"[INFO] Starting {SCRIPT_NAME} v{SCRIPT_VERSION} - Enhanced with performance tracking", file=sys.stderr)
 
 # === PERFORMANCE TRACKING GLOBALS ===
@@ -42,6 +46,7 @@ visualization_stats = {
     'pois_processed': 0,
     'places_processed': 0,
     'surface_segments': 0,
+    'lod_points': 0,
     'plotly_traces_created': 0,
     'html_file_size_kb': 0,
     'data_quality_issues': 0,
@@ -57,6 +62,10 @@ DEFAULT_SURFACE_COLOR_MAP: dict[str, str] = {
     "grass": "#7CB342", "wood": "#BCAAA4", "unknown": "#E0E0E0", "default": "#D32F2F"
 }
 
+# WebGL-Detailstufe: mehr Vertices bringen bei 300 km keinen sichtbaren Gewinn
+DEFAULT_MAX_3D_POINTS = 20000
+EARTH_RADIUS_KM = 6371.0
+
 # POI styles
 POI_STYLES: dict[str, dict[str, any]] = {
     "peak": {"color": "saddlebrown", "symbol": "diamond", "size": 8, "name": "Peaks"},
@@ -92,6 +101,7 @@ def embed_metadata_in_html(html_content: str, metadata: dict) -> str:
 <!-- - POIs Processed: {visualization_stats['pois_processed']} -->
 <!-- - Places Processed: {visualization_stats['places_processed']} -->
 <!-- - Surface Segments: {visualization_stats['surface_segments']} -->
+<!-- - LOD Points (WebGL): {visualization_stats['lod_points']} -->
 <!-- - Plotly Traces Created: {visualization_stats['plotly_traces_created']} -->
 <!-- - Visualization Efficiency: {visualization_efficiency} points/second -->
 
@@ -148,6 +158,55 @@ def load_surface_colors_from_yaml(yaml_path: Optional[str]) -> dict[str, str]:
             print(f"[WARNING] Error loading YAML: {e}. Using defaults.", file=sys.stderr)
     return DEFAULT_SURFACE_COLOR_MAP
 
+def track_distance_km(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Kumulierte Haversine-Distanz in km (Basis für die LTTB-Auswahl)."""
+    lat, lon = np.radians(np.asarray(lat, dtype=float)), np.radians(np.asarray(lon, dtype=float))
+    a = (np.sin(np.diff(lat) / 2) ** 2
+         + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lon) / 2) ** 2)
+    steps = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+    return np.concatenate(([0.0], np.cumsum(steps)))
+
+
+def build_lod_track(df_track: pd.DataFrame, max_points: int) -> pd.DataFrame:
+    """
+    Reduziert den Track auf höchstens max_points Vertices (LTTB über Lat/Lon/Höhe).
+    Der erste Punkt jedes Oberflächenblocks bleibt erhalten, solange alle Wechsel
+    ins Budget passen; sonst werden sie gleichmäßig ausgedünnt (Budget hat Vorrang).
+    """
+    if len(df_track) <= max_points:
+        return df_track
+    surface = df_track['Surface'].to_numpy(dtype=object)
+    surface_change = np.r_[True, surface[1:] != surface[:-1]]
+    selected, stats = select_plot_indices(
+        track_distance_km(df_track['Latitude'], df_track['Longitude']),
+        df_track[['Latitude', 'Longitude', 'Elevation (m)']].to_numpy(dtype=float),
+        max_points, keep=surface_change
+    )
+    if stats['forced_points_dropped']:
+        print(f"[WARNING] LOD: {stats['forced_points_dropped']} Oberflächenwechsel passen nicht ins Budget "
+              f"von {max_points} Vertices und wurden ausgedünnt", file=sys.stderr)
+    return df_track.iloc[selected]
+
+
+def surface_vertex_arrays(df_lod: pd.DataFrame, surface_order: list) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vertex-Indizes und Farbcodes für eine einzige Linie.
+
+    WebGL interpoliert Farben zwischen Vertices; der erste Punkt eines neuen
+    Oberflächenblocks wird daher doppelt ausgegeben (alter und neuer Code),
+    der Farbwechsel liegt so auf einem Segment der Länge 0.
+    """
+    code_of = {surface: code for code, surface in enumerate(surface_order)}
+    codes = df_lod['Surface'].map(code_of).to_numpy(dtype=int)
+    is_boundary = np.r_[False, codes[1:] != codes[:-1]]
+    counts = 1 + is_boundary.astype(int)
+    vertex_idx = np.repeat(np.arange(len(codes)), counts)
+    vertex_codes = codes[vertex_idx]
+    first_copy = (np.cumsum(counts) - counts)[is_boundary]
+    vertex_codes[first_copy] = codes[np.flatnonzero(is_boundary) - 1]
+    return vertex_idx, vertex_codes
+
+
 def create_3d_plotly_track_with_pois(
     track_csv_path: str,
     pois_csv_path: str,
@@ -156,7 +215,8 @@ def create_3d_plotly_track_with_pois(
     vertical_exaggeration: float = 1.0,
     plot_title_prefix: str = "Interaktive 3D GPX-Strecke",
     default_line_width: int = 4,
-    surface_colors_yaml_path: Optional[str] = None
+    surface_colors_yaml_path: Optional[str] = None,
+    max_points: int = DEFAULT_MAX_3D_POINTS
 ):
     """Main function to create 3D Plotly visualization with performance tracking."""
     
@@ -174,6 +234,7 @@ def create_3d_plotly_track_with_pois(
         'places_file': os.path.basename(places_csv_path) if places_csv_path else '',
         'vertical_exaggeration': vertical_exaggeration,
         'line_width': default_line_width,
+        'max_points': max_points,
         'camera_position': 'isometric',
         'plotly_cdn': 'enabled',
         'track_data_integrity': 'good',
@@ -228,28 +289,43 @@ def create_3d_plotly_track_with_pois(
 
     fig = go.Figure()
 
-    # Track segments with surface colors (simplified)
-    legend_added_surfaces = set()
-    df_track['surface_block'] = (df_track['Surface'] != df_track['Surface'].shift()).cumsum()
-    
-    for block_id, segment_data in df_track.groupby('surface_block'):
-        if len(segment_data) < 2:
-            continue
-            
-        surface_type = segment_data['Surface'].iloc[0]
-        segment_color = active_surface_color_map.get(surface_type, '#D32F2F')
-        
+    # Track als eine Linie: Oberflächenfarbe je Vertex über eine gestufte Farbskala
+    visualization_stats['surface_segments'] = int((df_track['Surface'] != df_track['Surface'].shift()).sum())
+    df_lod = build_lod_track(df_track, max_points)
+    visualization_stats['lod_points'] = len(df_lod)
+    print(f"[INFO] LOD: {len(df_track)} -> {len(df_lod)} Vertices", file=sys.stderr)
+
+    surface_order = list(dict.fromkeys(df_lod['Surface']))
+    surface_colors = [active_surface_color_map.get(surface, '#D32F2F') for surface in surface_order]
+    n_surfaces = len(surface_order)
+    colorscale = []
+    for code, color in enumerate(surface_colors):
+        colorscale += [[code / n_surfaces, color], [(code + 1) / n_surfaces, color]]
+
+    vertex_idx, vertex_codes = surface_vertex_arrays(df_lod, surface_order)
+    vertices = df_lod.iloc[vertex_idx]
+    # float32 reicht für WebGL (~0,3 m bei 48° Breite) und halbiert die eingebetteten Daten
+    fig.add_trace(go.Scatter3d(
+        x=vertices['Longitude'].to_numpy(dtype=np.float32),
+        y=vertices['Latitude'].to_numpy(dtype=np.float32),
+        z=vertices['Elevation_Exaggerated'].to_numpy(dtype=np.float32),
+        mode='lines',
+        line=dict(color=vertex_codes, colorscale=colorscale, cmin=-0.5, cmax=n_surfaces - 0.5,
+                  showscale=False, width=default_line_width),
+        text=[surface_order[code].capitalize() for code in vertex_codes],
+        hoverinfo='text+x+y+z',
+        name='Track',
+        showlegend=False
+    ))
+    visualization_stats['plotly_traces_created'] += 1
+
+    # Legende: ein leerer Eintrag je Oberfläche (keine Daten)
+    for surface_type, color in zip(surface_order, surface_colors):
         fig.add_trace(go.Scatter3d(
-            x=segment_data['Longitude'],
-            y=segment_data['Latitude'],
-            z=segment_data['Elevation_Exaggerated'],
-            mode='lines',
-            line=dict(color=segment_color, width=default_line_width),
-            name=surface_type.capitalize() if surface_type not in legend_added_surfaces else '',
-            showlegend=(surface_type not in legend_added_surfaces)
+            x=[None], y=[None], z=[None], mode='lines',
+            line=dict(color=color, width=default_line_width),
+            name=surface_type.capitalize(), hoverinfo='skip'
         ))
-        
-        legend_added_surfaces.add(surface_type)
         visualization_stats['plotly_traces_created'] += 1
 
     # Configure layout
@@ -311,6 +387,7 @@ def main():
     parser.add_argument("--title-prefix", default="Interaktive 3D Ansicht", help="Plot title prefix")
     parser.add_argument("--line-width", type=int, default=4, help="Track line width")
     parser.add_argument("--surface-colors-yaml", help="Optional: Path to config.yaml")
+    parser.add_argument("--max-points", type=int, default=DEFAULT_MAX_3D_POINTS, help="Maximum track vertices sent to WebGL (LTTB level of detail)")
 
     args = parser.parse_args()
     
@@ -327,7 +404,8 @@ def main():
         args.exaggeration,
         args.title_prefix,
         args.line_width,
-        args.surface_colors_yaml
+        args.surface_colors_yaml,
+        args.max_points
     )
     
     print("[DEBUG] Script completed successfully", file=sys.stderr)
@@ -3,16 +3,23 @@
 """
 10_generate_map_screenshot.py
 -----------------------------
-Generates PNG screenshots from interactive HTML maps using Selenium.
-Opens HTML map files in a headless Chrome browser and captures screenshots
-with detailed performance tracking and browser automation metrics.
+Generates the PNG route map for the stage summary.
+Default renderer 'selenium': opens the HTML map in headless Chrome and captures
+a screenshot (needs network tiles). Waits for a page-side tile readiness check
+instead of a fixed delay (--delay is the upper bound).
+Renderer 'static': composites basemap tiles from a local tile cache and draws
+track, surface-colored route and POIs directly (StaticMapRenderer.py), no
+browser, no network, no fixed delays. Without cached tiles it falls back to
+selenium (or exits with an error if no --input-html is given).
+With --batch-html several maps are captured by a pool of warm browsers
+(BrowserScreenshotPool.py); a failed map only lacks its own PNG.
 """
 
 # === SCRIPT METADATA ===
 SCRIPT_NAME = "10_generate_map_screenshot.py"
-SCRIPT_VERSION = "2.0.0"
-SCRIPT_DESCRIPTION = "Automated screenshot generation from interactive HTML maps using Selenium WebDriver with performance tracking"
-LAST_UPDATED = "2025-06-07"
+SCRIPT_VERSION = "2.2.2"
+SCRIPT_DESCRIPTION = "Selenium screenshots of interactive HTML maps (default) or static route map rendering from a local tile cache, with performance tracking"
+LAST_UPDATED = "2026-10-19"
 AUTHOR = "Markus"
 CONFIG_COMPATIBILITY = "2.1"
 
@@ -21,6 +28,13 @@ CHANGELOG = """
 v1.0.0 (pre-2025): Initial version with basic screenshot functionality
 v1.1.0 (2025-06-07): Standardized header, improved error handling and documentation
 v2.0.0 (2025-06-07): Enhanced metadata system with browser automation performance tracking and screenshot quality metrics
+v2.1.0 (2026-10-19): Offline static renderer (tile cache + vectorized route/POI drawing) as default,
+Selenium kept as --renderer selenium with lazy imports
+v2.2.0 (2026-10-19): Selenium waits for Leaflet tile readiness (--delay = max wait),
+batch mode --batch-html with a pool of warm browsers (--browsers)
+v2.2.1 (2026-10-19): Default renderer back to selenium; --renderer static checks the tile cache
+and falls back to selenium instead of writing a background-only map
+v2.2.2 (2026-10-19): --batch-html skips failed maps (no PNG) instead of failing the whole batch
 """
 
 # === SCRIPT CONFIGURATION ===
@@ -31,9 +45,13 @@ OUTPUT_FILE_PATTERN = "*_map_screenshot.png"
 # === DEPENDENCIES ===
 PYTHON_VERSION_MIN = "3.8"
 REQUIRED_PACKAGES = [
+    "pandas>=1.3.0",
+    "matplotlib>=3.3.0",
+    "Pillow>=8.0.0"
+]
+OPTIONAL_PACKAGES = [  # nur für --renderer selenium
     "selenium>=4.0.0",
-    "webdriver-manager>=3.8.0",
-    "pandas>=1.3.0"
+    "webdriver-manager>=3.8.0"
 ]
 
 # === BROWSER CONFIGURATION ===
@@ -43,6 +61,24 @@ DEFAULT_MAP_LOAD_DELAY = 5
 WEBDRIVER_TIMEOUT = 30
 CHROME_HEADLESS_MODE = "new"
 BROWSER_LOG_LEVEL = 3  # Suppress most browser logs
+DEFAULT_BROWSER_POOL_SIZE = 3
+
+# === STATIC RENDERER CONFIGURATION ===
+DEFAULT_RENDERER = "selenium"
+DEFAULT_TILE_CACHE_DIR = "tile_cache/osm"
+
+# POI-Symbole wie in der interaktiven Karte (Schritt 6)
+POI_MARKER_STYLES = {
+    "drinking_water": {"color": "blue", "marker": "o", "size": 40},
+    "supermarket": {"color": "orange", "marker": "s", "size": 45},
+    "bicycle": {"color": "darkblue", "marker": "D", "size": 40},
+    "bakery": {"color": "lightcoral", "marker": "p", "size": 45},
+    "restaurant": {"color": "red", "marker": "p", "size": 45},
+    "cafe": {"color": "purple", "marker": "p", "size": 45},
+    "peak": {"color": "saddlebrown", "marker": "^", "size": 60},
+    "viewpoint": {"color": "cadetblue", "marker": "*", "size": 80},
+    "default": {"color": "gray", "marker": "o", "size": 30}
+}
 
 # === PERFORMANCE TRACKING ===
 TRACK_SCREENSHOT_PERFORMANCE = True
@@ -56,16 +92,9 @@ import time
 from pathlib import Path
 from datetime import datetime
 import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.chrome.service import Service as ChromeService
 
-# Use webdriver_manager to automatically handle chromedriver download/updates
-try:
-    from webdriver_manager.chrome import ChromeDriverManager
-except ImportError:
-    print("Fehler: webdriver-manager nicht gefunden. Bitte installieren: pip install webdriver-manager")
-    sys.exit(1)
+from BrowserScreenshotPool import ScreenshotJob, ScreenshotPool, chrome_driver_factory, wait_until_ready
+from StaticMapRenderer import DEFAULT_MAX_ZOOM, available_zooms, render_static_map
 
 # === PERFORMANCE TRACKING GLOBALS ===
 screenshot_stats = {
@@ -76,6 +105,8 @@ screenshot_stats = {
     'browser_automation_errors': 0,
     'file_validation_time': 0,
     'total_wait_time': 0,
+    'tiles_found': 0,
+    'tiles_missing': 0,
     'processing_stages': {}
 }
 
@@ -87,7 +118,7 @@ def print_script_info():
     print(f"Description: {SCRIPT_DESCRIPTION}")
     print(f"Last Updated: {LAST_UPDATED}")
     print(f"Config Compatibility: {CONFIG_COMPATIBILITY}")
-    print(f"Browser: Chrome (headless)")
+    print(f"Renderer: {DEFAULT_RENDERER} (alternativ: static / lokaler Kachel-Cache)")
     print(f"Default Resolution: {DEFAULT_BROWSER_WIDTH}x{DEFAULT_BROWSER_HEIGHT}")
     print(f"Performance Tracking: {TRACK_SCREENSHOT_PERFORMANCE}")
     print("=" * 50)
@@ -141,8 +172,12 @@ def save_performance_metadata(png_output_path: str, metadata: dict):
         'html_file_valid': metadata.get('html_file_valid', False),
         'screenshot_successful': metadata.get('screenshot_successful', False),
         'chrome_driver_version': metadata.get('chrome_driver_version', 'unknown'),
-        'automation_platform': 'selenium_chrome',
-        'performance_optimization_level': 'standard'
+        'renderer': metadata.get('renderer', 'selenium'),
+        'map_zoom': metadata.get('zoom', ''),
+        'tiles_found': screenshot_stats['tiles_found'],
+        'tiles_missing': screenshot_stats['tiles_missing'],
+        'automation_platform': 'static_tiles' if metadata.get('renderer') == 'static' else 'selenium_chrome',
+        'performance_optimization_level': metadata.get('optimization_level', 'standard')
     }
     
     # Convert to DataFrame and save
@@ -157,8 +192,120 @@ def get_file_size(file_path: str) -> int:
     except (OSError, FileNotFoundError):
         return 0
 
+def load_poi_layers(pois_csv_path: str) -> list:
+    """POIs (5c) nach Typ gruppiert als Zeichenebenen für StaticMapRenderer."""
+    if not pois_csv_path or not os.path.exists(pois_csv_path):
+        return []
+    try:
+        pois_df = pd.read_csv(pois_csv_path, comment='#')
+    except Exception as e:
+        print(f"[Warnung] POI-CSV konnte nicht gelesen werden ({e}), Karte ohne POIs.")
+        return []
+    if pois_df.empty or not {'Latitude', 'Longitude'}.issubset(pois_df.columns):
+        return []
+
+    pois_df = pois_df.dropna(subset=['Latitude', 'Longitude'])
+    poi_types = pois_df['Typ'].astype(str).str.lower() if 'Typ' in pois_df.columns else pd.Series('', index=pois_df.index)
+    # Wie in Schritt 6: Teilstring-Treffer (z. B. 'bicycle_rental' -> bicycle)
+    style_keys = pd.Series('default', index=pois_df.index)
+    for key in reversed([k for k in POI_MARKER_STYLES if k != 'default']):
+        style_keys[poi_types.str.contains(key, regex=False)] = key
+
+    layers = []
+    for key, group in pois_df.groupby(style_keys):
+        layers.append(dict(POI_MARKER_STYLES[key], lon=group['Longitude'].to_numpy(), lat=group['Latitude'].to_numpy()))
+    return layers
+
+
+def render_map_png(track_csv_path: str, png_output_path: str, width: int = 1200, height: int = 800,
+                   surface_csv_path: str = None, pois_csv_path: str = None,
+                   tile_dir: str = DEFAULT_TILE_CACHE_DIR, max_zoom: int = DEFAULT_MAX_ZOOM):
+    """Rendert die Routenkarte offline aus Track-, Oberflächen- und POI-Daten."""
+    screenshot_stats['start_time'] = time.time()
+    print(f"[Info] Rendere statische Karte aus: {track_csv_path}")
+    metadata = {
+        'input_file': os.path.basename(track_csv_path),
+        'renderer': 'static',
+        'width': width,
+        'height': height,
+        'delay': 0,
+        'screenshot_successful': False,
+        'html_file_valid': False
+    }
+
+    validation_start = time.time()
+    try:
+        track_df = pd.read_csv(track_csv_path, comment='#')
+        track_df = track_df.dropna(subset=['Latitude', 'Longitude'])
+        if track_df.empty:
+            raise ValueError("Track enthält keine Koordinaten")
+    except Exception as e:
+        print(f"[Fehler] Track-CSV ungültig: {e}")
+        screenshot_stats['browser_automation_errors'] += 1
+        save_performance_metadata(png_output_path, metadata)
+        sys.exit(1)
+    metadata['input_file_size'] = get_file_size(track_csv_path)
+
+    surface_route = None
+    if surface_csv_path and os.path.exists(surface_csv_path):
+        try:
+            surface_df = pd.read_csv(surface_csv_path, comment='#')
+            if {'Latitude', 'Longitude', 'Surface'}.issubset(surface_df.columns) and not surface_df.empty:
+                surface_df = surface_df.dropna(subset=['Latitude', 'Longitude'])
+                surface_route = (surface_df['Longitude'], surface_df['Latitude'], surface_df['Surface'])
+        except Exception as e:
+            print(f"[Warnung] Oberflächendatei konnte nicht gelesen werden ({e}), Route ohne Oberflächenfarben.")
+    poi_layers = load_poi_layers(pois_csv_path)
+    screenshot_stats['file_validation_time'] = time.time() - validation_start
+    log_stage("input_loading", screenshot_stats['file_validation_time'], {
+        'track_points': len(track_df),
+        'has_surface_route': surface_route is not None,
+        'poi_layers': len(poi_layers)
+    })
+
+    if not os.path.isdir(tile_dir):
+        print(f"[Warnung] Kachel-Cache nicht gefunden: {tile_dir} - Karte ohne Basiskarte.")
+
+    capture_start = time.time()
+    try:
+        render_stats = render_static_map(
+            png_output_path, tile_dir, track_df['Longitude'], track_df['Latitude'], width, height,
+            surface_route=surface_route, poi_layers=poi_layers, max_zoom=max_zoom
+        )
+    except Exception as e:
+        screenshot_stats['browser_automation_errors'] += 1
+        print(f"[Fehler] Statische Karte konnte nicht gerendert werden: {e}")
+        save_performance_metadata(png_output_path, metadata)
+        sys.exit(1)
+    screenshot_stats['screenshot_capture_time'] = time.time() - capture_start
+    screenshot_stats['tiles_found'] = render_stats['tiles_found']
+    screenshot_stats['tiles_missing'] = render_stats['tiles_missing']
+
+    metadata.update({'screenshot_successful': True, 'zoom': render_stats['zoom'],
+                     'output_file_size': get_file_size(png_output_path)})
+    if render_stats['tiles_missing']:
+        print(f"[Warnung] {render_stats['tiles_missing']} Kacheln fehlen im Cache (Zoom {render_stats['zoom']}).")
+    print(f"[OK] Karte gespeichert: {png_output_path} (Zoom {render_stats['zoom']}, Kacheln aus Zoom {render_stats['tile_zoom']}: "
+          f"{render_stats['tiles_found']} Kacheln, {render_stats['route_blocks']} Oberflächenblöcke, "
+          f"{render_stats['pois_drawn']} POIs, {screenshot_stats['screenshot_capture_time']:.2f}s)")
+    log_stage("static_render", screenshot_stats['screenshot_capture_time'], render_stats)
+    save_performance_metadata(png_output_path, metadata)
+
+
 def capture_screenshot(html_input_path: str, png_output_path: str, width: int = 1200, height: int = 800, delay: int = 5):
     """Captures a screenshot of the HTML map."""
+    # Selenium nur für diesen Renderer laden
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options as ChromeOptions
+    from selenium.webdriver.chrome.service import Service as ChromeService
+
+    # Use webdriver_manager to automatically handle chromedriver download/updates
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+    except ImportError:
+        print("Fehler: webdriver-manager nicht gefunden. Bitte installieren: pip install webdriver-manager")
+        sys.exit(1)
+
     screenshot_stats['start_time'] = time.time()
     print(f"[Info] Generating screenshot for: {html_input_path}")
 
@@ -250,14 +397,16 @@ def capture_screenshot(html_input_path: str, png_output_path: str, width: int =
         })
 
         # --- Wait for Map to Load ---
-        wait_start = time.time()
-        print(f"[Info] Warte {delay} Sekunden, damit die Karte laden kann...")
-        time.sleep(delay)
-        screenshot_stats['total_wait_time'] = time.time() - wait_start
+        print(f"[Info] Warte auf geladene Kartenkacheln (max. {delay} Sekunden)...")
+        tiles_ready, screenshot_stats['total_wait_time'] = wait_until_ready(driver, delay)
+        if not tiles_ready:
+            print(f"[Warnung] Kacheln nach {delay} Sekunden nicht vollständig geladen, Screenshot trotzdem.")
 
         log_stage("map_loading_wait", screenshot_stats['total_wait_time'], {
-            'wait_duration_seconds': delay,
-            'wait_strategy': 'fixed_delay'
+            'wait_duration_seconds': round(screenshot_stats['total_wait_time'], 2),
+            'max_wait_seconds': delay,
+            'tiles_ready': tiles_ready,
+            'wait_strategy': 'tile_readiness'
         })
 
         # --- Capture Screenshot ---
@@ -310,15 +459,110 @@ def capture_screenshot(html_input_path: str, png_output_path: str, width: int =
                 'cleanup_successful': True
             })
 
+def capture_screenshot_batch(html_input_paths: list, png_output_paths: list, width: int = 1200, height: int = 800,
+                             delay: int = 5, browsers: int = DEFAULT_BROWSER_POOL_SIZE):
+    """Screenshots mehrerer HTML-Karten mit einem Pool vorgewärmter Browser."""
+    screenshot_stats['start_time'] = time.time()
+    jobs = [ScreenshotJob(html, png, width, height) for html, png in zip(html_input_paths, png_output_paths)]
+    missing = [job.html_path for job in jobs if not os.path.exists(job.html_path)]
+    if missing:
+        print(f"[Fehler] HTML-Inputdateien nicht gefunden: {', '.join(missing)}")
+        sys.exit(1)
+
+    pool_size = max(1, min(browsers, len(jobs)))
+    print(f"[Info] Starte {pool_size} Browser für {len(jobs)} Karten...")
+    try:
+        with ScreenshotPool(chrome_driver_factory(CHROME_HEADLESS_MODE, BROWSER_LOG_LEVEL, WEBDRIVER_TIMEOUT),
+                            pool_size) as pool:
+            print(f"[Info] {len(pool.drivers)} Browser bereit ({pool.init_seconds:.2f}s).")
+            log_stage("webdriver_initialization", pool.init_seconds, {'browsers': len(pool.drivers)})
+            results = pool.capture_all(jobs, delay)
+            init_seconds = pool.init_seconds
+    except Exception as e:
+        print(f"[Fehler] Browser-Pool konnte nicht gestartet werden: {e}")
+        sys.exit(1)
+
+    failed = 0
+    for result in results:
+        # Metadaten je Karte; Init-Zeit des Pools wird allen Karten zugeordnet
+        screenshot_stats.update({
+            'webdriver_init_time': init_seconds,
+            'page_load_time': result.page_load_s,
+            'total_wait_time': result.wait_s,
+            'screenshot_capture_time': result.capture_s,
+            'browser_automation_errors': 0 if result.success else 1
+        })
+        save_performance_metadata(result.job.png_path, {
+            'input_file': os.path.basename(result.job.html_path),
+            'width': width,
+            'height': height,
+            'delay': delay,
+            'renderer': 'selenium',
+            'html_file_valid': True,
+            'input_file_size': get_file_size(result.job.html_path),
+            'output_file_size': get_file_size(result.job.png_path),
+            'screenshot_successful': result.success,
+            'optimization_level': 'browser_pool'
+        })
+        if result.success:
+            state = "Kacheln geladen" if result.ready_signal else f"Timeout {delay}s"
+            print(f"[OK] {result.job.png_path} ({state}, Warten {result.wait_s:.2f}s, Laden {result.page_load_s:.2f}s)")
+        else:
+            failed += 1
+            # Nur diese Karte überspringen; ein halb geschriebenes PNG nicht liegen lassen
+            if os.path.exists(result.job.png_path):
+                os.remove(result.job.png_path)
+            print(f"[Fehler] {result.job.html_path}: {result.error} - ohne PNG übersprungen")
+
+    print(f"[Info] Batch fertig: {len(results) - failed}/{len(results)} Screenshots in "
+          f"{time.time() - screenshot_stats['start_time']:.2f}s")
+
+
 if __name__ == "__main__":
     print_script_info()
     
-    parser = argparse.ArgumentParser(description="Generate a PNG screenshot from a Folium HTML map.")
-    parser.add_argument("--input-html", required=True, help="Path to the input HTML map file.")
-    parser.add_argument("--output-png", required=True, help="Path to save the output PNG screenshot file.")
+    parser = argparse.ArgumentParser(description="Generate a PNG route map (static tile renderer or Selenium screenshot of a Folium HTML map).")
+    parser.add_argument("--renderer", choices=["static", "selenium"], default=DEFAULT_RENDERER, help="static: offline tile cache renderer, selenium: headless Chrome screenshot.")
+    parser.add_argument("--input-html", help="Path to the input HTML map file (selenium renderer).")
+    parser.add_argument("--track-csv", help="Track CSV with Latitude/Longitude (static renderer).")
+    parser.add_argument("--surface-data-csv", help="Optional: Track with surface data (4b) for the colored route (static renderer).")
+    parser.add_argument("--pois-csv", help="Optional: Relevant POIs (5c) (static renderer).")
+    parser.add_argument("--tile-cache-dir", default=DEFAULT_TILE_CACHE_DIR, help="Local tile cache directory with {z}/{x}/{y}.png tiles (static renderer).")
+    parser.add_argument("--max-zoom", type=int, default=DEFAULT_MAX_ZOOM, help="Maximum tile zoom level (static renderer).")
+    parser.add_argument("--output-png", help="Path to save the output PNG screenshot file.")
+    parser.add_argument("--batch-html", nargs="+", help="Several HTML maps captured by a warm browser pool (selenium renderer); PNGs are written next to them unless --batch-png is given.")
+    parser.add_argument("--batch-png", nargs="+", help="Output PNGs for --batch-html (same order).")
+    parser.add_argument("--browsers", type=int, default=DEFAULT_BROWSER_POOL_SIZE, help="Number of warm browsers for --batch-html.")
     parser.add_argument("--width", type=int, default=1200, help="Width of the browser window for screenshot.")
     parser.add_argument("--height", type=int, default=800, help="Height of the browser window for screenshot.")
-    parser.add_argument("--delay", type=int, default=5, help="Delay in seconds to wait for the map to load.")
+    parser.add_argument("--delay", type=int, default=5, help="Maximum seconds to wait for the map tiles to load (selenium renderer).")
     args = parser.parse_args()
 
-    capture_screenshot(args.input_html, args.output_png, args.width, args.height, args.delay)
+    if args.batch_html:
+        if args.renderer != "selenium":
+            parser.error("--batch-html requires --renderer selenium")
+        batch_png = args.batch_png or [os.path.splitext(path)[0] + ".png" for path in args.batch_html]
+        if len(batch_png) != len(args.batch_html):
+            parser.error("--batch-png needs one PNG per --batch-html file")
+        capture_screenshot_batch(args.batch_html, batch_png, args.width, args.height, args.delay, args.browsers)
+        sys.exit(0)
+    if not args.output_png:
+        parser.error("--output-png is required")
+
+    if args.renderer == "static" and not available_zooms(args.tile_cache_dir):
+        # Ohne Kacheln entstünde nur eine graue Fläche mit Route
+        if not args.input_html:
+            print(f"[Fehler] Kachel-Cache '{args.tile_cache_dir}' ist leer und kein --input-html für selenium angegeben.")
+            sys.exit(1)
+        print(f"[Warnung] Kachel-Cache '{args.tile_cache_dir}' ist leer, weiche auf --renderer selenium aus.")
+        args.renderer = "selenium"
+
+    if args.renderer == "static":
+        if not args.track_csv:
+            parser.error("--track-csv is required for the static renderer")
+        render_map_png(args.track_csv, args.output_png, args.width, args.height,
+                       args.surface_data_csv, args.pois_csv, args.tile_cache_dir, args.max_zoom)
+    else:
+        if not args.input_html:
+            parser.error("--input-html is required for the selenium renderer")
+        capture_screenshot(args.input_html, args.output_png, args.width, args.height, args.delay)
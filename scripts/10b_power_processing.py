@@ -8,24 +8,24 @@ Calculates or simulates cycling power and speed based on a physics model.
 Modes:
 - 'analysis': Calculates power based on actual speed data from a GPX track.
 - 'simulation': Simulates speed and time based on a target power output.
+- 'sweep': Simulates finish and climb times for a grid of power, mass, position and Crr scaling.
 """
 
 # === SCRIPT METADATA ===
 SCRIPT_NAME = "10b_power_processing.py"
-SCRIPT_VERSION = "2.0.0"
-SCRIPT_DESCRIPTION = "Dual-mode cycling power analysis and speed simulation."
-LAST_UPDATED = "2025-06-09"
+SCRIPT_VERSION = "2.5.0"
+SCRIPT_DESCRIPTION = "Cycling power analysis, speed simulation and pacing sweeps."
+LAST_UPDATED = "2026-10-18"
 AUTHOR = "Markus"
 CONFIG_COMPATIBILITY = "2.2"
 
 # === IMPORTS ===
 import argparse
-import math
+import itertools
 import os
 import sys
 import pandas as pd
 import numpy as np
-from tqdm import tqdm
 from datetime import datetime
 from pathlib import Path
 
@@ -34,87 +34,14 @@ sys.path.append(str(Path(__file__).parent.parent / "project_management"))
 from CSV_METADATA_TEMPLATE import write_csv_with_metadata
 
 # === PHYSICAL CONSTANTS & MODEL PARAMETERS ===
-G = 9.81  # Gravity in m/s^2
-RHO = 1.225  # Air density in kg/m^3
-
-# Aerodynamic drag parameters (CdA in m^2) based on bike type and posture
-# This is the most practical way to model aerodynamic drag.
-CDA_PARAMS = {
-    # Hollandrad / City-Bike
-    'city_upright': 0.70,
-    # Mountainbike
-    'mtb_upright': 0.60,
-    # Touring / Trekkingrad
-    'touring_normal': 0.50,
-    # Gravel-Bike
-    'gravel_hoods': 0.42,
-    'gravel_drops': 0.35,
-    # Rennrad
-    'road_hoods': 0.36,
-    'road_drops': 0.30,
-    # Zeitfahrrad
-    'tt_aero': 0.22
-}
-
-# Rolling resistance coefficients (Cr) based on OSM tags
-ROLL_RESISTANCE_MAP = {
-    'asphalt': 0.003, 'concrete': 0.0035, 'chipseal': 0.004,
-    'gravel': 0.008, 'fine_gravel': 0.007, 'compacted': 0.006,
-    'ground': 0.012, 'earth': 0.015, 'dirt': 0.018,
-    'sand': 0.025, 'grass_paver': 0.020, 'unpaved': 0.022,
-    'grass': 0.035, 'mud': 0.050, 'sand_loose': 0.040,
-    'cobblestone': 0.012, 'sett': 0.010, 'paving_stones': 0.005,
-    'wood': 0.008, 'metal': 0.004,
-    'unknown': 0.015
-}
-
-# === CORE PHYSICS FUNCTIONS ===
-
-def calculate_power_from_speed(speed_ms, gradient, Cr, mass_kg, cda_value, wind_ms=0):
-    """Calculates the required power to maintain a given speed."""
-    v = speed_ms
-    v_wind = v + wind_ms
-    slope_angle = math.atan(gradient)
-    
-    # Forces
-    F_air = 0.5 * RHO * cda_value * v_wind**2 * np.sign(v_wind)
-    F_roll = Cr * mass_kg * G * math.cos(slope_angle)
-    F_climb = mass_kg * G * math.sin(slope_angle)
-    
-    # Power components
-    P_total = (F_air + F_roll + F_climb) * v
-    P_air = F_air * v
-    P_roll = F_roll * v
-    P_climb = F_climb * v
-
-    return {
-        'Power_W': P_total if P_total > 0 else 0, # Power cannot be negative when moving
-        'Power_Air_W': P_air,
-        'Power_Roll_W': P_roll,
-        'Power_Climb_W': P_climb
-    }
-
-def solve_for_speed_from_power(target_power_w, gradient, Cr, mass_kg, cda_value, wind_ms=0):
-    """Numerically solves for speed given a constant power output."""
-    v_low, v_high = 0.0, 30.0  # 0 to 108 km/h search range
-
-    for _ in range(30): # Bisection method for 30 iterations
-        v_mid = (v_low + v_high) / 2.0
-        if v_mid < 1e-6:
-             # If power is negative (downhill), speed is not zero. We just need a guess.
-             # The solver will find the correct equilibrium speed.
-             power_at_v_mid = -1
-        else:
-             power_at_v_mid = calculate_power_from_speed(
-                v_mid, gradient, Cr, mass_kg, cda_value, wind_ms
-             )['Power_W']
-
-        if power_at_v_mid < target_power_w:
-            v_low = v_mid
-        else:
-            v_high = v_mid
-            
-    return (v_low + v_high) / 2.0
+# Konstanten, CdA-/Crr-Tabellen und der vektorisierte Kernel liegen in PowerPhysics.py
+from PowerPhysics import (
+    G, RHO, CDA_PARAMS, crr_for_surfaces, power_components, solve_speed_for_power, sweep_pacing
+)
+from DistanceGrid import gradient_via_grid, resample_to_grid
+from GPSSpeedFilter import (
+    MAX_REALISTIC_SPEED, HARD_LIMIT_SPEED, MAX_ACCELERATION, MIN_REALISTIC_SPEED, filter_speed_outliers
+)
 
 # === HELPER FUNCTIONS ===
 
@@ -183,15 +110,38 @@ def load_and_merge_data(track_csv, surface_csv, metadata=None):
     
     return df_merged
 
-def calculate_gradient(df, metadata=None):
-    """Calculates point-to-point gradient."""
-    print("Calculating gradient for each track segment...")
-    elevation_diff = df['Elevation (m)'].diff()
-    distance_diff = df['Distanz (km)'].diff() * 1000  # convert to meters
-    # Avoid division by zero for identical points
-    df['Gradient'] = (elevation_diff / distance_diff.where(distance_diff != 0)).fillna(0)
+def calculate_gradient(df, metadata=None, grid_spacing_m=0.0):
+    """
+    Calculates the gradient per track point.
+
+    grid_spacing_m > 0: gradient on a uniform distance grid (DistanceGrid.py),
+    interpolated back to the points. 0: point-to-point as before.
+    """
+    if grid_spacing_m and grid_spacing_m > 0:
+        print(f"Calculating gradient on a {grid_spacing_m:g} m distance grid...")
+        df['Gradient'] = gradient_via_grid(df['Distanz (km)'] * 1000, df['Elevation (m)'], grid_spacing_m)
+        method = f'distance_grid_{grid_spacing_m:g}m'
+    else:
+        print("Calculating gradient for each track segment...")
+        elevation_diff = df['Elevation (m)'].diff()
+        distance_diff = df['Distanz (km)'].diff() * 1000  # convert to meters
+        # Avoid division by zero for identical points
+        df['Gradient'] = (elevation_diff / distance_diff.where(distance_diff != 0)).fillna(0)
+        method = 'point_to_point'
+    if metadata is not None:
+        metadata['gradient_method'] = method
     return df
 
+def build_grid_track(df, grid_spacing_m):
+    """Track reduced to the uniform distance grid (distance, elevation, gradient, surface) for the sweep."""
+    grid = resample_to_grid(df['Distanz (km)'] * 1000, {'Elevation (m)': df['Elevation (m)']}, grid_spacing_m)
+    return pd.DataFrame({
+        'Distanz (km)': grid.distance_m / 1000,
+        'Elevation (m)': grid.values['Elevation (m)'],
+        'Gradient': grid.gradient(),
+        'Surface': grid.take_labels(df['Surface'])
+    })
+
 def run_power_analysis(df, mass_kg, cda_value, metadata=None):
     """Mode 1: Analyzes power based on existing speed data with GPS validation."""
     print("Running in 'analysis' mode...")
@@ -207,74 +157,32 @@ def run_power_analysis(df, mass_kg, cda_value, metadata=None):
     speed_col = 'Geschwindigkeit (km/h)'
     original_speed = df[speed_col].copy()
     
-    # Geschwindigkeits-Plausibilitätsprüfung - VERSCHÄRFT
-    MAX_REALISTIC_SPEED = 65  # km/h - Verschärft für normale Radfahrer
-    MAX_ACCELERATION = 10     # km/h pro GPS-Punkt (realistischere Beschleunigung)
-    MIN_REALISTIC_SPEED = 2   # km/h - Minimum für fahrende Bewegung
-    
+    # Geschwindigkeits-Plausibilitätsprüfung - Grenzwerte siehe GPSSpeedFilter.py
     print(f"Original speed range: {df[speed_col].min():.1f} - {df[speed_col].max():.1f} km/h")
-    
-    # 1. Extreme Geschwindigkeiten identifizieren
-    extreme_speeds = df[speed_col] > MAX_REALISTIC_SPEED
-    very_extreme = df[speed_col] > 80  # Völlig unrealistische Werte
-    print(f"Extreme speeds (>{MAX_REALISTIC_SPEED} km/h): {extreme_speeds.sum()} points")
-    print(f"Very extreme speeds (>80 km/h): {very_extreme.sum()} points")
-    
-    # 2. AGGRESSIVE Geschwindigkeits-Glättung
-    df['speed_smoothed'] = df[speed_col].copy()
-    
-    # Erste Runde: Harte Begrenzung für völlig unrealistische Werte
-    df.loc[very_extreme, 'speed_smoothed'] = MAX_REALISTIC_SPEED
-    
-    # Zweite Runde: Geschwindigkeits-Sprünge glätten
-    for i in range(1, len(df)):
-        speed_diff = abs(df['speed_smoothed'].iloc[i] - df['speed_smoothed'].iloc[i-1])
-        
-        if speed_diff > MAX_ACCELERATION:
-            # Aggressivere Glättung: Verwende gewichteten Durchschnitt
-            prev_speed = df['speed_smoothed'].iloc[i-1]
-            if i < len(df) - 1:
-                next_speed = df['speed_smoothed'].iloc[i+1]
-                # Gewichteter Durchschnitt: 70% vorheriger, 30% nächster Wert
-                df.loc[df.index[i], 'speed_smoothed'] = prev_speed * 0.7 + next_speed * 0.3
-            else:
-                # Am Ende: verwende vorherigen Wert
-                df.loc[df.index[i], 'speed_smoothed'] = prev_speed
-    
-    # Vierte Runde: Rolling median für weitere Glättung
-    df['speed_smoothed'] = df['speed_smoothed'].rolling(window=5, center=True, min_periods=1).median()
-    
-    # Fünfte Runde: Zusätzliche Power-orientierte Glättung
-    # Entferne extreme Geschwindigkeits-Oszillationen die unrealistische Power-Spitzen verursachen
-    df['speed_smoothed'] = df['speed_smoothed'].rolling(window=3, center=True, min_periods=1).mean()
-    
-    # Vierte Runde: Finale Begrenzung basierend auf realistischen Percentilen
-    percentile_95 = df['speed_smoothed'].quantile(0.95)
-    realistic_max = min(MAX_REALISTIC_SPEED, percentile_95 * 1.1)  # Max 10% über 95. Percentile
-    
-    extreme_after_smoothing = df['speed_smoothed'] > realistic_max
-    df.loc[extreme_after_smoothing, 'speed_smoothed'] = realistic_max
-    
-    # Minimum speed check
-    too_slow = df['speed_smoothed'] < MIN_REALISTIC_SPEED
-    df.loc[too_slow, 'speed_smoothed'] = MIN_REALISTIC_SPEED
-    
-    changes_made = (df['speed_smoothed'] != original_speed).sum()
-    print(f"GPS speed corrections made: {changes_made} points")
-    print(f"Corrected speed range: {df['speed_smoothed'].min():.1f} - {df['speed_smoothed'].max():.1f} km/h")
-    
-    # Verwende die korrigierte Geschwindigkeit für Power-Berechnung
-    power_results = []
-    for _, row in tqdm(df.iterrows(), total=len(df), desc="Analyzing Power"):
-        speed_ms = row['speed_smoothed'] / 3.6  # Verwende korrigierte Geschwindigkeit
-        surface_type = str(row['Surface']).lower()
-        Cr = ROLL_RESISTANCE_MAP.get(surface_type, ROLL_RESISTANCE_MAP['unknown'])
-        gradient = row['Gradient']
+    print(f"Extreme speeds (>{MAX_REALISTIC_SPEED} km/h): {(df[speed_col] > MAX_REALISTIC_SPEED).sum()} points")
+    print(f"Very extreme speeds (>{HARD_LIMIT_SPEED} km/h): {(df[speed_col] > HARD_LIMIT_SPEED).sum()} points")
+
+    # Begrenzung, Sprung-Glättung (> MAX_ACCELERATION km/h pro Punkt), Median/Mean-Glättung
+    # und finale Perzentil-/Minimum-Grenzen in einem Durchlauf
+    speed_filter = filter_speed_outliers(
+        df[speed_col], max_realistic=MAX_REALISTIC_SPEED, hard_limit=HARD_LIMIT_SPEED,
+        max_jump=MAX_ACCELERATION, min_speed=MIN_REALISTIC_SPEED
+    )
+    df['speed_smoothed'] = speed_filter.speed
+    if metadata is not None:
+        metadata['speed_validation'] = speed_filter.stats
 
-        power_dict = calculate_power_from_speed(speed_ms, gradient, Cr, mass_kg, cda_value)
-        power_results.append(power_dict)
+    print(f"GPS speed corrections made: {speed_filter.corrections_made} points "
+          f"({speed_filter.stats['jump_corrections']} jumps limited)")
+    print(f"Corrected speed range: {df['speed_smoothed'].min():.1f} - {df['speed_smoothed'].max():.1f} km/h")
     
-    df_power = pd.DataFrame(power_results)
+    # Verwende die korrigierte Geschwindigkeit für Power-Berechnung (vektorisiert über den ganzen Track)
+    speed_ms = df['speed_smoothed'].to_numpy(dtype=float) / 3.6
+    crr = crr_for_surfaces(df['Surface'])
+    df_power = pd.DataFrame(
+        power_components(speed_ms, df['Gradient'].to_numpy(dtype=float), crr, mass_kg, cda_value),
+        index=df.index
+    )
     
     # POST-PROCESSING: Power-Glättung für realistischere Kurven
     # Ähnlich dem professionellen Tool glätten wir die Power-Werte
@@ -320,16 +228,11 @@ def run_speed_simulation(df, mass_kg, cda_value, target_power, metadata):
     metadata['processing_mode'] = 'simulation'
     metadata['target_power_w'] = target_power
 
-    simulated_speeds_ms = []
-    for _, row in tqdm(df.iterrows(), total=len(df), desc="Simulating Speed"):
-        surface_type = str(row['Surface']).lower()
-        Cr = ROLL_RESISTANCE_MAP.get(surface_type, ROLL_RESISTANCE_MAP['unknown'])
-        gradient = row['Gradient']
-
-        speed_ms = solve_for_speed_from_power(target_power, gradient, Cr, mass_kg, cda_value)
-        simulated_speeds_ms.append(speed_ms)
-
-    df['Simulated_Speed_ms'] = simulated_speeds_ms
+    # Kubische Leistungsbilanz für alle Punkte auf einmal lösen
+    crr = crr_for_surfaces(df['Surface'])
+    df['Simulated_Speed_ms'] = solve_speed_for_power(
+        target_power, df['Gradient'].to_numpy(dtype=float), crr, mass_kg, cda_value
+    )
     df['Simulated_Speed_kmh'] = df['Simulated_Speed_ms'] * 3.6
 
     # Calculate simulated time based on the new speed profile
@@ -356,6 +259,92 @@ def run_speed_simulation(df, mass_kg, cda_value, target_power, metadata):
     
     return df
 
+def load_climb_segments(peak_csv, distances_km):
+    """
+    Liest die Anstiege aus der Peak/Segment-CSV von Schritt 3.
+
+    Anstiege sind die 'Valid Segment'-Zeilen mit Richtung 'backward' (Auffahrt
+    zum Peak in Fahrtrichtung). Start/Ende werden auf Trackindizes abgebildet.
+    """
+    if not peak_csv or not os.path.exists(peak_csv):
+        print("[Info] No peak/segment CSV available - sweep without climb times.")
+        return []
+
+    df_peaks = pd.read_csv(peak_csv, comment='#')
+    if 'item_type' not in df_peaks.columns:
+        return []
+    climbs_df = df_peaks[(df_peaks['item_type'] == 'Valid Segment') &
+                         (df_peaks['segment_direction'] == 'backward')]
+    climbs_df = climbs_df.dropna(subset=['segment_start_km', 'segment_end_km']).sort_values('segment_start_km')
+
+    distances_km = np.asarray(distances_km, dtype=float)
+    last_idx = len(distances_km) - 1
+    climbs = []
+    for number, (_, row) in enumerate(climbs_df.iterrows(), start=1):
+        start_idx = min(int(np.searchsorted(distances_km, row['segment_start_km'])), last_idx)
+        end_idx = min(int(np.searchsorted(distances_km, row['segment_end_km'])), last_idx)
+        if end_idx <= start_idx:
+            continue
+        climbs.append({
+            'label': f"Climb_{number}_km{row['segment_start_km']:.1f}",
+            'start_km': row['segment_start_km'],
+            'end_km': row['segment_end_km'],
+            'gain_m': row.get('segment_gain_m'),
+            'start_idx': start_idx,
+            'end_idx': end_idx
+        })
+    return climbs
+
+def run_pacing_sweep(df, powers, masses, positions, crr_scales, climbs, metadata):
+    """Mode 3: Simulates finish and climb times for every combination of the parameter grids."""
+    print(f"Running in 'sweep' mode: {len(powers)} powers x {len(masses)} masses x "
+          f"{len(positions)} positions x {len(crr_scales)} Crr scales...")
+
+    sweep_start_time = datetime.now()
+    metadata['processing_mode'] = 'sweep'
+
+    scenarios = list(itertools.product(powers, masses, positions, crr_scales))
+    segment_length_m = df['Distanz (km)'].diff().fillna(0).to_numpy(dtype=float) * 1000
+    crr = crr_for_surfaces(df['Surface'])
+
+    results = sweep_pacing(
+        segment_length_m, df['Gradient'].to_numpy(dtype=float), crr,
+        target_powers=[s[0] for s in scenarios],
+        masses_kg=[s[1] for s in scenarios],
+        cda_values=[CDA_PARAMS[s[2]] for s in scenarios],
+        crr_scales=[s[3] for s in scenarios],
+        climb_bounds=[(c['start_idx'], c['end_idx']) for c in climbs]
+    )
+
+    df_sweep = pd.DataFrame(scenarios, columns=['Target_Power_W', 'Mass_kg', 'Position', 'Crr_Scale'])
+    df_sweep.insert(3, 'CdA_m2', df_sweep['Position'].map(CDA_PARAMS))
+    df_sweep['Finish_Time_s'] = results['finish_time_s']
+    df_sweep['Finish_Time_h'] = results['finish_time_s'] / 3600
+    df_sweep['Avg_Speed_kmh'] = results['avg_speed_kmh']
+    for i, climb in enumerate(climbs):
+        df_sweep[f"{climb['label']}_Time_s"] = results['climb_time_s'][:, i]
+
+    metadata['sweep_analysis'] = {
+        'scenario_count': len(df_sweep),
+        'climb_count': len(climbs),
+        'fastest_finish_time_hours': round(df_sweep['Finish_Time_h'].min(), 2),
+        'slowest_finish_time_hours': round(df_sweep['Finish_Time_h'].max(), 2),
+        'total_distance_km': round(df['Distanz (km)'].iloc[-1], 2)
+    }
+    metadata['sweep_processing_time_sec'] = round((datetime.now() - sweep_start_time).total_seconds(), 3)
+
+    return df_sweep
+
+def parse_grid(value, cast, name):
+    """Parses a comma-separated CLI grid like '150,180,210'."""
+    try:
+        items = [cast(item.strip()) for item in str(value).split(',') if item.strip()]
+    except ValueError as e:
+        raise ValueError(f"Invalid value in --{name}: {value}") from e
+    if not items:
+        raise ValueError(f"--{name} must contain at least one value.")
+    return items
+
 # === MAIN EXECUTION BLOCK ===
 
 def main():
@@ -386,6 +375,25 @@ def main():
     # --- Physics Parameters ---
     parser.add_argument("--mass", type=float, required=True, help="Total mass (rider + bike + gear) in kg.")
     parser.add_argument("--position", required=True, choices=list(CDA_PARAMS.keys()), help="Rider's aerodynamic position key.")
+    parser.add_argument(
+        "--gradient-grid-m",
+        type=float,
+        default=0.0,
+        help="Spacing in meters of the uniform distance grid for gradients (0 = point-to-point).\n"
+             "In 'sweep' mode the simulation itself runs on this grid."
+    )
+
+    # --- Pacing Sweep ---
+    parser.add_argument(
+        "--sweep-powers",
+        default=None,
+        help="Comma-separated target powers in Watts, e.g. '150,180,210'. If provided, the script runs\n"
+             "in 'sweep' mode and writes one row per parameter combination to --output-csv."
+    )
+    parser.add_argument("--sweep-masses", default=None, help="Comma-separated total masses in kg (default: --mass).")
+    parser.add_argument("--sweep-positions", default=None, help="Comma-separated position keys (default: --position).")
+    parser.add_argument("--sweep-crr-scales", default="1.0", help="Comma-separated factors applied to the surface Crr (default: 1.0).")
+    parser.add_argument("--peak-csv", default=None, help="Peak/segment CSV from step 3 for per-climb times in 'sweep' mode.")
     
     args = parser.parse_args()
 
@@ -402,7 +410,8 @@ def main():
     }
 
     # --- Determine Mode and Validate ---
-    is_simulation_mode = args.target_power is not None
+    is_sweep_mode = args.sweep_powers is not None
+    is_simulation_mode = args.target_power is not None and not is_sweep_mode
     
     print(f"--- {SCRIPT_NAME} v{SCRIPT_VERSION} ---")
     
@@ -415,17 +424,49 @@ def main():
             'target_power_w': args.target_power if is_simulation_mode else None,
             'physics_model': 'advanced_cycling_power_model',
             'air_density_kg_m3': RHO,
-            'gravity_ms2': G
+            'gravity_ms2': G,
+            'gradient_grid_m': args.gradient_grid_m
         }
+
+        if is_sweep_mode:
+            sweep_powers = parse_grid(args.sweep_powers, float, 'sweep-powers')
+            sweep_masses = parse_grid(args.sweep_masses, float, 'sweep-masses') if args.sweep_masses else [args.mass]
+            sweep_positions = parse_grid(args.sweep_positions, str, 'sweep-positions') if args.sweep_positions else [args.position]
+            sweep_crr_scales = parse_grid(args.sweep_crr_scales, float, 'sweep-crr-scales')
+            unknown_positions = [p for p in sweep_positions if p not in CDA_PARAMS]
+            if unknown_positions:
+                raise ValueError(f"Unknown position keys in --sweep-positions: {unknown_positions}")
+            if min(sweep_powers) <= 0 or min(sweep_masses) <= 0 or min(sweep_crr_scales) < 0:
+                raise ValueError("Sweep powers and masses must be positive, Crr scales non-negative.")
+            processing_parameters.update({
+                'sweep_powers_w': sweep_powers,
+                'sweep_masses_kg': sweep_masses,
+                'sweep_positions': sweep_positions,
+                'sweep_crr_scales': sweep_crr_scales
+            })
         
         # Load and prepare data
         df = load_and_merge_data(args.track_csv, args.surface_csv, metadata)
-        df = calculate_gradient(df, metadata)
+        df = calculate_gradient(df, metadata, args.gradient_grid_m)
         
         cda_value = CDA_PARAMS[args.position]
         
         # Execute the chosen mode
-        if is_simulation_mode:
+        if is_sweep_mode:
+            if args.gradient_grid_m > 0:
+                df = build_grid_track(df, args.gradient_grid_m)
+                print(f"Sweep runs on {len(df)} grid points ({args.gradient_grid_m:g} m spacing).")
+            climbs = load_climb_segments(args.peak_csv, df['Distanz (km)'])
+            df_final = run_pacing_sweep(df, sweep_powers, sweep_masses, sweep_positions,
+                                        sweep_crr_scales, climbs, metadata)
+
+            fastest = df_final.loc[df_final['Finish_Time_s'].idxmin()]
+            print("\n--- Sweep Summary ---")
+            print(f"Scenarios: {len(df_final)} | Climbs: {len(climbs)}")
+            print(f"Fastest: {fastest['Target_Power_W']:.0f} W, {fastest['Mass_kg']:.0f} kg, "
+                  f"{fastest['Position']} -> {fastest['Finish_Time_h']:.2f} h")
+
+        elif is_simulation_mode:
             df_final = run_speed_simulation(df, args.mass, cda_value, args.target_power, metadata)
             
             # Summary for simulation
@@ -470,7 +511,8 @@ def main():
         quality_factors.append(surface_diversity)
         
         # Data completeness contributes 25%
-        completeness = min(len(df_final), metadata.get('track_points_loaded', 1)) / metadata.get('track_points_loaded', 1) * 25
+        processed_points = len(df) if is_sweep_mode else len(df_final)
+        completeness = min(processed_points, metadata.get('track_points_loaded', 1)) / metadata.get('track_points_loaded', 1) * 25
         quality_factors.append(completeness)
         
         metadata['data_quality_score'] = round(sum(quality_factors), 1)
@@ -484,13 +526,15 @@ def main():
         
         # Prepare input files list
         input_files = [args.track_csv, args.surface_csv]
+        if is_sweep_mode and args.peak_csv:
+            input_files.append(args.peak_csv)
         
         # API metadata (none used, but structure maintained)
         api_metadata = {
             'physics_model_used': 'cycling_power_equations',
             'aerodynamic_model': 'fixed_cda_by_position',
             'rolling_resistance_model': 'surface_based_coefficients',
-            'numerical_solver': 'bisection_method_30_iterations'
+            'numerical_solver': 'vectorized_cubic_root_newton_polish'
         }
         
         # Additional metadata with all tracking info
@@ -510,6 +554,8 @@ def main():
             additional_metadata.update({f'power_{k}': v for k, v in metadata['power_analysis'].items()})
         if 'simulation_analysis' in metadata:
             additional_metadata.update({f'simulation_{k}': v for k, v in metadata['simulation_analysis'].items()})
+        if 'sweep_analysis' in metadata:
+            additional_metadata.update({f'sweep_{k}': v for k, v in metadata['sweep_analysis'].items()})
         if 'gradient_stats' in metadata:
             additional_metadata.update({f'gradient_{k}': v for k, v in metadata['gradient_stats'].items()})
         
@@ -554,7 +600,12 @@ def main():
         print(f"Track Points: {metadata.get('track_points_loaded', 0)}")
         print(f"Surface Merge Rate: {metadata.get('merge_success_rate', 0)}%")
         
-        if is_simulation_mode:
+        if is_sweep_mode:
+            sweep_stats = metadata.get('sweep_analysis', {})
+            print(f"Scenarios: {sweep_stats.get('scenario_count', 0)}")
+            print(f"Finish Time Range: {sweep_stats.get('fastest_finish_time_hours', 0):.2f} - "
+                  f"{sweep_stats.get('slowest_finish_time_hours', 0):.2f}h")
+        elif is_simulation_mode:
             sim_stats = metadata.get('simulation_analysis', {})
             print(f"Target Power: {args.target_power}W")
             print(f"Avg Simulated Speed: {sim_stats.get('mean_simulated_speed_kmh', 0):.1f} km/h")
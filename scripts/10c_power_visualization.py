@@ -3,14 +3,14 @@
 """
 10c_power_visualization.py
 ---------------------------
-Static power visualization with metadata tracking (v2.0.0)
+Static power visualization with metadata tracking (v2.1.0)
 Creates clean 3-segment power profile PNG (like speed profile)
 """
 
 SCRIPT_NAME = "10c_power_visualization.py"
-SCRIPT_VERSION = "2.0.0"
+SCRIPT_VERSION = "2.3.0"
 SCRIPT_DESCRIPTION = "Static power visualization with performance tracking - creates 3-segment power profile PNG"
-LAST_UPDATED = "2025-06-12"
+LAST_UPDATED = "2026-10-19"
 AUTHOR = "Markus"
 CONFIG_COMPATIBILITY = "2.1"
 
@@ -21,6 +21,12 @@ v2.0.0 (2025-06-12): Static power visualization with v2.0.0 metadata tracking
 - Gradient-adaptive data reduction for performance
 - Comprehensive metadata tracking compatible with v2.0.0 template system
 - PNG output with text header metadata for Script 11 integration
+v2.1.0 (2026-10-18): LTTB downsampling (PlotDownsampling.py) replaces gradient-adaptive reduction
+- Strict point budget (--target-points), surface changes are always kept
+- Plot size and rendering time no longer grow with ride length
+- --gradient-threshold is accepted for compatibility but no longer used
+v2.2.0 (2026-10-18): Optional gradient on a uniform distance grid (DistanceGrid.py, --gradient-grid-m)
+v2.3.0 (2026-10-19): Companion metadata is also recorded in the stage metadata index (StageMetadataIndex.py)
 """
 
 DEFAULT_CONFIG_SECTION = "power_visualization"
@@ -48,6 +54,10 @@ from datetime import datetime
 import yaml
 import csv
 
+from DistanceGrid import gradient_via_grid
+from PlotDownsampling import downsample_for_plot
+from StageMetadataIndex import record_header_lines
+
 def print_script_info():
     """Print script metadata for logging purposes."""
     print(f"=== {SCRIPT_NAME} v{SCRIPT_VERSION} ===")
@@ -83,6 +93,7 @@ def save_metadata_as_text_header(png_path: str, metadata: dict):
         metadata_file = png_path.replace('.png', '_metadata.txt')
         with open(metadata_file, 'w', encoding='utf-8') as f:
             f.write(metadata_text)
+        record_header_lines(png_path, metadata_text.splitlines(), SCRIPT_NAME)
             
         print(f"[Info] Metadata saved: {metadata_file}")
         
@@ -99,92 +110,25 @@ def load_config():
         print(f"[WARNING] Could not load config.yaml: {e}")
         return {}
 
-def gradient_adaptive_reduction(df, target_points=4000, gradient_threshold=2.0):
-    """Gradient-adaptive data reduction with metadata tracking."""
-    reduction_start = time.time()
+def reduce_for_plot(df, target_points=4000):
+    """Shape-preserving LTTB reduction (power + elevation) that always keeps surface changes."""
     original_points = len(df)
-    
     if original_points <= target_points:
         print(f"[REDUCTION] No reduction needed: {original_points} <= {target_points} points")
-        return df, {
-            'reduction_performed': False,
-            'original_points': original_points,
-            'final_points': original_points,
-            'reduction_time_sec': time.time() - reduction_start,
-            'reduction_ratio': 1.0
-        }
-    
-    print(f"[REDUCTION] GRADIENT-ADAPTIVE reduction from {original_points} to ~{target_points} points...")
-    
-    df = df.copy()
-    
-    # Calculate gradient importance
-    abs_gradient = df['Gradient_Percent'].abs()
-    
-    # Classify points by gradient importance
-    steep_mask = abs_gradient > 5.0
-    moderate_mask = (abs_gradient > gradient_threshold) & (abs_gradient <= 5.0)
-    flat_mask = abs_gradient <= gradient_threshold
-    
-    # Mark other important features
-    power_change = df['Power_W'].diff().abs()
-    surface_change = (df['Surface'] != df['Surface'].shift())
-    
-    selected_indices = set()
-    
-    # 1. KEEP ALL STEEP AREAS + critical points
-    critical_mask = (
-        steep_mask |
-        surface_change |
-        (power_change > 30) |
-        (df.index == 0) |
-        (df.index == len(df)-1)
+    else:
+        print(f"[REDUCTION] LTTB reduction from {original_points} to max. {target_points} points...")
+
+    surface_change = (df['Surface'] != df['Surface'].shift()).to_numpy()
+    result, metadata = downsample_for_plot(
+        df, 'Distanz (km)', ['Power_W', 'Elevation (m)'], target_points, keep_mask=surface_change
     )
-    
-    critical_indices = df[critical_mask].index
-    selected_indices.update(critical_indices)
-    
-    # 2. MODERATE AREAS - adaptive sampling
-    moderate_indices = df[moderate_mask & ~critical_mask].index
-    if len(moderate_indices) > 0:
-        moderate_step = max(1, 2)
-        moderate_selected = moderate_indices[::moderate_step]
-        selected_indices.update(moderate_selected)
-    
-    # 3. FLAT AREAS - heavy reduction
-    flat_indices = df[flat_mask & ~critical_mask].index
-    remaining_budget = target_points - len(selected_indices)
-    
-    if len(flat_indices) > 0 and remaining_budget > 0:
-        flat_step = max(1, len(flat_indices) // remaining_budget)
-        flat_selected = flat_indices[::flat_step]
-        selected_indices.update(flat_selected)
-    
-    # Create final selection
-    all_selected = sorted(selected_indices)
-    result = df.loc[all_selected].copy()
-    
-    reduction_time = time.time() - reduction_start
-    final_points = len(result)
-    reduction_ratio = final_points / original_points
-    
-    metadata = {
-        'reduction_performed': True,
-        'original_points': original_points,
-        'final_points': final_points,
-        'reduction_time_sec': round(reduction_time, 3),
-        'reduction_ratio': round(reduction_ratio, 3),
-        'steep_points_kept': len(df[steep_mask]),
-        'moderate_points_selected': len([i for i in moderate_indices if i in selected_indices]),
-        'flat_points_selected': len([i for i in flat_indices if i in selected_indices]),
-        'critical_points_kept': len(critical_indices)
-    }
-    
-    print(f"[REDUCTION] Final selection: {final_points:,} points ({reduction_ratio*100:.1f}% of original)")
-    
+    if metadata['reduction_performed']:
+        metadata['surface_change_points'] = int(surface_change.sum())
+        print(f"[REDUCTION] Final selection: {len(result):,} points ({metadata['reduction_ratio']*100:.1f}% of original)")
     return result, metadata
 
-def create_power_visualization(power_csv, surface_csv, output_png, target_points=4000, gradient_threshold=2.0, smooth_window=20):
+def create_power_visualization(power_csv, surface_csv, output_png, target_points=4000, gradient_threshold=2.0, smooth_window=20,
+                               gradient_grid_m=0.0):
     """Create static power visualization with comprehensive metadata tracking."""
     
     run_start_time = datetime.now()
@@ -271,17 +215,23 @@ def create_power_visualization(power_csv, surface_csv, output_png, target_points
         gradient_start = time.time()
         print("[GRADIENT] Calculating gradients...")
         
-        elevation_diff = df_merged['Elevation (m)'].diff()
-        distance_diff = df_merged['Distanz (km)'].diff() * 1000  # to meters
-        df_merged['Gradient_Percent'] = (elevation_diff / distance_diff.where(distance_diff != 0)).fillna(0)
+        if gradient_grid_m > 0:
+            df_merged['Gradient_Percent'] = gradient_via_grid(
+                df_merged['Distanz (km)'] * 1000, df_merged['Elevation (m)'], gradient_grid_m
+            )
+        else:
+            elevation_diff = df_merged['Elevation (m)'].diff()
+            distance_diff = df_merged['Distanz (km)'].diff() * 1000  # to meters
+            df_merged['Gradient_Percent'] = (elevation_diff / distance_diff.where(distance_diff != 0)).fillna(0)
         
         metadata['processing_phases']['gradient_calculation_time'] = time.time() - gradient_start
+        metadata['data_quality']['gradient_grid_m'] = gradient_grid_m
         metadata['data_quality']['gradient_data_complete'] = not df_merged['Gradient_Percent'].isna().any()
         metadata['data_quality']['max_gradient_percent'] = float(df_merged['Gradient_Percent'].abs().max())
         
         # === DATA REDUCTION PHASE ===
-        print("[REDUCTION] Applying GRADIENT-ADAPTIVE reduction...")
-        df_reduced, reduction_metadata = gradient_adaptive_reduction(df_merged, target_points, gradient_threshold)
+        print("[REDUCTION] Applying LTTB reduction...")
+        df_reduced, reduction_metadata = reduce_for_plot(df_merged, target_points)
         
         metadata['data_reduction'] = reduction_metadata
         
@@ -588,8 +538,9 @@ def main():
     parser.add_argument("surface_csv", help="Path to surface data CSV")
     parser.add_argument("output_png", help="Path for PNG output")
     parser.add_argument("--target-points", type=int, default=4000, help="Target number of data points after reduction")
-    parser.add_argument("--gradient-threshold", type=float, default=2.0, help="Gradient threshold for adaptive reduction")
+    parser.add_argument("--gradient-threshold", type=float, default=2.0, help="Deprecated since v2.1.0 (LTTB reduction), kept for compatibility")
     parser.add_argument("--smooth-window", type=int, default=20, help="Smoothing window size")
+    parser.add_argument("--gradient-grid-m", type=float, default=0.0, help="Distance grid spacing in meters for gradients (0 = point-to-point)")
     
     args = parser.parse_args()
     
@@ -602,7 +553,8 @@ def main():
         args.output_png,
         args.target_points,
         args.gradient_threshold,
-        args.smooth_window
+        args.smooth_window,
+        args.gradient_grid_m
     )
     
     if not success:
@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-10d_detailed_power_analysis.py v2.0.0
+10d_detailed_power_analysis.py v2.1.0
 --------------------------------------
 Enhanced power analysis with Markdown output, peak analysis, and comprehensive metrics.
 Includes rider configuration, position data, and detailed component peak analysis.
+Power curve, NP, energy and zone times are computed on a 1 Hz time grid (PowerCurve.py).
 """
 
 import pandas as pd
@@ -15,6 +16,10 @@ import yaml
 from datetime import timedelta
 from pathlib import Path
 
+from PowerCurve import (
+    STANDARD_DURATIONS, mean_maximal_power, normalized_power, power_timeline, time_in_zones
+)
+
 def analyze_component_peaks(df):
     """Analyze peaks for each power component with detailed context."""
     components = {
@@ -65,8 +70,14 @@ def analyze_component_peaks(df):
     
     return peak_analysis
 
-def analyze_power_zones(df, ftp_watts=None):
-    """Analyze power distribution across training zones."""
+def shared_power_timeline(df):
+    """1-Hz-Leistung einmal je Datei; Statistik, Zonen und Performance verwenden dasselbe Array."""
+    if 'Power_W' not in df.columns:
+        return np.zeros(0)
+    return power_timeline(df)
+
+def analyze_power_zones(df, power_1hz, ftp_watts=None):
+    """Analyze power distribution across training zones (power_1hz: shared 1 Hz timeline)."""
     
     if 'Power_W' not in df.columns:
         print("[ERROR] No Power_W column found for zone analysis")
@@ -96,19 +107,13 @@ def analyze_power_zones(df, ftp_watts=None):
     }
     
     zone_analysis = []
-    total_time = len(power_data)
+    # Zeit in Zonen in echten Sekunden (1-Hz-Raster statt Zeilen)
+    zone_times = time_in_zones(power_1hz, [zone_info["min"] for zone_info in zones.values()])
+    total_time = len(power_1hz)
     
-    for zone_num, zone_info in zones.items():
-        zone_mask = (power_data >= zone_info["min"]) & (power_data <= zone_info["max"])
-        time_in_zone = zone_mask.sum()
-        percentage = (time_in_zone / total_time) * 100
-        
-        if time_in_zone > 0:
-            avg_power_in_zone = power_data[zone_mask].mean()
-            max_power_in_zone = power_data[zone_mask].max()
-        else:
-            avg_power_in_zone = 0
-            max_power_in_zone = 0
+    for (zone_num, zone_info), zone_time in zip(zones.items(), zone_times):
+        time_in_zone = zone_time['seconds']
+        percentage = (time_in_zone / total_time) * 100 if total_time > 0 else 0
         
         zone_analysis.append({
             "Zone": zone_num,
@@ -116,14 +121,14 @@ def analyze_power_zones(df, ftp_watts=None):
             "Range": f"{zone_info['min']}-{zone_info['max']}W",
             "Time (min)": round(time_in_zone / 60, 1),
             "Percentage": round(percentage, 1),
-            "Avg Power": round(avg_power_in_zone, 0),
-            "Max Power": round(max_power_in_zone, 0)
+            "Avg Power": round(zone_time['avg_power'], 0),
+            "Max Power": round(zone_time['max_power'], 0)
         })
     
     return pd.DataFrame(zone_analysis), ftp_watts
 
-def calculate_power_statistics(df):
-    """Calculate comprehensive power statistics."""
+def calculate_power_statistics(df, power_1hz):
+    """Calculate comprehensive power statistics (power_1hz: shared 1 Hz timeline)."""
     
     if 'Power_W' not in df.columns:
         return None, None
@@ -132,7 +137,7 @@ def calculate_power_statistics(df):
     
     stats = {
         "Total Data Points": len(power_data),
-        "Duration (min)": round(len(power_data) / 60, 1),
+        "Duration (min)": round(len(power_1hz) / 60, 1),
         "Average Power": round(power_data.mean(), 1),
         "Median Power": round(power_data.median(), 1),
         "Maximum Power": round(power_data.max(), 1),
@@ -143,15 +148,11 @@ def calculate_power_statistics(df):
         "25th Percentile": round(power_data.quantile(0.25), 1),
     }
     
-    # Power curve analysis
-    power_curve = {}
-    durations = [5, 10, 20, 30, 60, 300, 600, 1200, 3600]
-    
-    for duration in durations:
-        if len(power_data) >= duration:
-            rolling_avg = power_data.rolling(window=duration, min_periods=duration).mean()
-            best_effort = rolling_avg.max()
-            power_curve[f"Best {duration}s"] = round(best_effort, 1) if not pd.isna(best_effort) else 0
+    # Power curve analysis (mean-maximal power über die echte Zeit)
+    power_curve = {
+        f"Best {duration}s": round(best_effort, 1)
+        for duration, best_effort in mean_maximal_power(power_1hz, STANDARD_DURATIONS).items()
+    }
     
     return stats, power_curve
 
@@ -184,8 +185,8 @@ def analyze_power_components(df):
     
     return component_stats
 
-def calculate_performance_metrics(df, rider_weight_kg=None):
-    """Calculate performance metrics."""
+def calculate_performance_metrics(df, power_1hz, rider_weight_kg=None):
+    """Calculate performance metrics (power_1hz: shared 1 Hz timeline)."""
     
     if 'Power_W' not in df.columns:
         return None
@@ -211,19 +212,16 @@ def calculate_performance_metrics(df, rider_weight_kg=None):
             metrics["Power Efficiency"] = f"{efficiency:.1f} W per km/h"
             metrics["Average Speed"] = f"{avg_speed:.1f} km/h"
     
-    duration_hours = len(power_data) / 3600
-    total_energy_kj = (power_data.sum() / 1000)
+    duration_hours = len(power_1hz) / 3600
+    total_energy_kj = (power_1hz.sum() / 1000)
     avg_energy_rate = total_energy_kj / duration_hours if duration_hours > 0 else 0
     
     metrics["Total Energy"] = f"{total_energy_kj:.1f} kJ"
     metrics["Energy Rate"] = f"{avg_energy_rate:.1f} kJ/h"
     
-    if len(power_data) > 30:
-        rolling_30s = power_data.rolling(window=30, min_periods=30).mean()
-        fourth_power = rolling_30s ** 4
-        avg_fourth_power = fourth_power.mean()
-        normalized_power = avg_fourth_power ** 0.25
-        metrics["Normalized Power"] = f"{normalized_power:.1f} W"
+    np_watts = normalized_power(power_1hz) if len(power_1hz) > 30 else None
+    if np_watts is not None:
+        metrics["Normalized Power"] = f"{np_watts:.1f} W"
     
     return metrics
 
@@ -270,11 +268,12 @@ def generate_markdown_version(power_csv, ftp_watts=None, rider_weight_kg=None):
         md_content.append(f"| **FTP** | {ftp_watts} W | Functional Threshold Power |")
     md_content.append("")
     
-    # Get analysis data
-    stats, power_curve = calculate_power_statistics(df)
-    zone_df, estimated_ftp = analyze_power_zones(df, ftp_watts)
+    # Get analysis data (ein gemeinsames 1-Hz-Raster für Statistik, Zonen und Performance)
+    power_1hz = shared_power_timeline(df)
+    stats, power_curve = calculate_power_statistics(df, power_1hz)
+    zone_df, estimated_ftp = analyze_power_zones(df, power_1hz, ftp_watts)
     components = analyze_power_components(df)
-    performance = calculate_performance_metrics(df, rider_weight_kg)
+    performance = calculate_performance_metrics(df, power_1hz, rider_weight_kg)
     
     # Basic Statistics
     if stats:
@@ -441,12 +440,15 @@ def print_detailed_analysis(power_csv, ftp_watts=None, rider_weight_kg=None):
         print(f"[ERROR] Could not load {power_csv}: {e}")
         return
     
+    # Ein gemeinsames 1-Hz-Raster für Statistik, Zonen und Performance
+    power_1hz = shared_power_timeline(df)
+    
     # 1. GRUNDSTATISTIKEN
     print("\n" + "="*40)
     print("GRUNDSTATISTIKEN")
     print("="*40)
     
-    stats, power_curve = calculate_power_statistics(df)
+    stats, power_curve = calculate_power_statistics(df, power_1hz)
     if stats:
         for key, value in stats.items():
             print(f"{key:.<30} {value}")
@@ -461,7 +463,7 @@ def print_detailed_analysis(power_csv, ftp_watts=None, rider_weight_kg=None):
     print("POWER ZONEN VERTEILUNG")
     print("="*40)
     
-    zone_df, estimated_ftp = analyze_power_zones(df, ftp_watts)
+    zone_df, estimated_ftp = analyze_power_zones(df, power_1hz, ftp_watts)
     if zone_df is not None:
         print(f"FTP (Functional Threshold Power): {estimated_ftp}W\n")
         print(zone_df.to_string(index=False))
@@ -485,7 +487,7 @@ def print_detailed_analysis(power_csv, ftp_watts=None, rider_weight_kg=None):
     print("PERFORMANCE BEWERTUNG")
     print("="*40)
     
-    performance = calculate_performance_metrics(df, rider_weight_kg)
+    performance = calculate_performance_metrics(df, power_1hz, rider_weight_kg)
     if performance:
         for metric, value in performance.items():
             print(f"{metric:.<30} {value}")
@@ -4,12 +4,22 @@
 11_generate_stage_summary.py
 ------------------------------------
 Aggregates results into a final HTML summary report and PDF.
+Images are written once as compressed, content-hashed assets shared across
+reports and referenced with loading="lazy" (ReportAssets.py); only the PDF
+path gets them inlined as data URIs. --asset-mode inline restores the
+previous fully self-contained HTML.
+The page layout is a precompiled template (StageSummaryTemplate.py); each
+input file is read once per track. --batch-basenames renders the summaries
+of several tracks on a process pool.
+The processing history comes from the stage metadata index
+(StageMetadataIndex.py) in one query; file headers are only scanned for
+outputs without a current index entry.
 """
 
 SCRIPT_NAME = "11_generate_stage_summary.py"
-SCRIPT_VERSION = "2.0.0" # v2.0.0 (2025-06-08): Vollständiges Performance-Tracking System für Report-Generation
+SCRIPT_VERSION = "2.4.0" # v2.4.0 (2026-10-19): Phasenzeiten in den zentralen Pipeline-Metriken
 SCRIPT_DESCRIPTION = "Comprehensive report generation - aggregates all analysis results into HTML/PDF with metadata tracking"
-LAST_UPDATED = "2025-06-07"
+LAST_UPDATED = "2026-10-19"
 AUTHOR = "Markus"
 CONFIG_COMPATIBILITY = "2.1"
 
@@ -24,6 +34,17 @@ v2.0.0 (2025-06-08): Vollständiges Performance-Tracking System für Report-Gene
 - Error-Handling mit detaillierter Metadaten-Erfassung
 - Output-File-Size-Tracking + Processing-Phase-Breakdown
 - Compatible mit universellem v2.0.0 Metadaten-Template-System
+v2.1.0 (2026-10-19): Bilder als WebP/PNG-Assets mit Inhalts-Hash in gemeinsamem Asset-Verzeichnis,
+loading="lazy" im HTML, base64 nur noch für die PDF-Erzeugung (pdfkit.from_string);
+jedes Bild wird nur einmal gelesen/kodiert (--asset-mode, --asset-dir, --asset-format)
+v2.2.0 (2026-10-19): HTML-Layout als vorkompiliertes Template (StageSummaryTemplate.py) statt f-String,
+Abschnitte in eigenen Funktionen, jede Input-Datei nur einmal gelesen (ReportInputs),
+geodätische Punktabstände einmal je Track für Straßenliste und Oberflächenverteilung,
+--batch-basenames/--workers: alle Zusammenfassungen parallel auf einem Prozess-Pool
+v2.3.0 (2026-10-19): Metadaten der Verarbeitungs-Historie mit einer Abfrage aus dem Metadaten-Index
+(StageMetadataIndex.py); Header/Begleitdateien werden nur noch bei fehlendem oder veraltetem Eintrag gelesen
+v2.4.0 (2026-10-19): Phasenzeiten und Zähler je Track in den zentralen Pipeline-Metriken (PipelineMetrics.py),
+im Batch-Modus eine Messung je Track
 """
 
 # === SCRIPT CONFIGURATION ===
@@ -38,25 +59,44 @@ REQUIRED_PACKAGES = [
     "markdown>=3.3.0",
     "pdfkit>=1.0.0",
     "geopy>=2.2.0",
-    "PyYAML>=5.4.0"
+    "PyYAML>=5.4.0",
+    "Pillow>=8.0.0"
 ]
 
 import sys
 import os
+import io
 import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 from markdown import markdown
 import pdfkit
-import base64
 from pathlib import Path
-from typing import Optional, Dict # Dict hinzugefügt
+from typing import Optional, Dict, List # Dict hinzugefügt
 from datetime import datetime
-from geopy.distance import distance as geopy_distance
+from geopy.distance import ELLIPSOIDS
+from geographiclib.geodesic import Geodesic  # Abhängigkeit von geopy
 import json
 import yaml # Für das Laden der Config
 import csv
 import time 
 
+from StageMetadataIndex import load_latest_metadata
+from PipelineMetrics import add_spans, count as count_metric, stage as metrics_stage
+from ReportAssets import (ASSET_FORMATS, ASSET_TOKEN, DEFAULT_ASSET_FORMAT, DEFAULT_MAX_WIDTH, DEFAULT_QUALITY,
+                          data_uri, publish_image, relative_src, resolve_tokens)
+
+ASSET_MODES = ('external', 'inline')
+DEFAULT_ASSET_MODE = 'external'
+DEFAULT_ASSET_DIR_NAME = 'report_assets'  # neben dem HTML, von allen Berichten geteilt
+
+from StageSummaryTemplate import STAGE_SUMMARY, load_bootstrap_css, surface_css
+
+# Wie geopy.distance.distance (geodesic, WGS-84, km), ohne dessen Overhead je Punktpaar
+_GEODESIC = Geodesic(ELLIPSOIDS['WGS-84'][0], ELLIPSOIDS['WGS-84'][2])
+
 try:
     from tqdm import tqdm
 except ImportError:
@@ -150,7 +190,11 @@ def write_csv_with_metadata(filepath: str, data_dict: dict, script_info: dict):
                             'pdf_generation_time': 'Time spent generating PDF from HTML',
                             'profile_plot_base64_size': 'Size of base64-encoded profile plot',
                             'map_screenshot_base64_size': 'Size of base64-encoded map screenshot',
-                            'speed_profile_base64_size': 'Size of base64-encoded speed profile'
+                            'speed_profile_base64_size': 'Size of base64-encoded speed profile',
+                            'assets_source_size_bytes': 'Total size of the source images',
+                            'assets_written_size_bytes': 'Total size of the published (compressed) image assets',
+                            'assets_reused_count': 'Number of image assets already present in the shared asset directory',
+                            'pdf_inline_html_size': 'Size of the HTML passed to wkhtmltopdf with inlined images'
                         }
                         description = desc_map.get(metric_name, f'{category.replace("_", " ").title()} metric')
                         
@@ -203,36 +247,59 @@ def read_file_content(path: str, default: str = "") -> str:
         except Exception as e: print(f"[Warnung] Fehler Lesen {path}: {e}"); return default
     return default
 
+_base64_cache: Dict[str, Optional[str]] = {}
+
 def image_to_base64(img_path: str) -> Optional[str]:
-    if not img_path or not os.path.exists(img_path): return None
     try:
-        ext = Path(img_path).suffix.lower().strip('.'); mime = f"image/{ext}"
-        if ext == 'svg': mime = 'image/svg+xml'
-        with open(img_path, "rb") as img_file:
-            return f"data:{mime};base64,{base64.b64encode(img_file.read()).decode('utf-8')}"
+        return data_uri(img_path, _base64_cache)
     except Exception as e: print(f"[Warnung] Fehler Base64 {img_path}: {e}"); return None
 
-def calculate_distance_for_group(group: pd.DataFrame) -> float:
-    dist_km = 0.0
-    group_copy = group.copy() # Auf Kopie arbeiten
-    group_copy['Latitude'] = pd.to_numeric(group_copy['Latitude'], errors='coerce')
-    group_copy['Longitude'] = pd.to_numeric(group_copy['Longitude'], errors='coerce')
-    group_copy = group_copy.dropna(subset=['Latitude', 'Longitude'])
-    if len(group_copy) < 2: return 0.0
-    coords = list(zip(group_copy['Latitude'], group_copy['Longitude']))
-    for i in range(len(coords) - 1):
-        try: dist_km += geopy_distance(coords[i], coords[i+1]).km
-        except ValueError: continue
-    return dist_km
-
-def parse_metadata_from_csv_header(filepath: str) -> Dict[str, str]:
-    """Liest Kommentarzeilen am Anfang einer CSV und parst sie als Metadaten."""
+def geodesic_steps_km(lat, lon) -> np.ndarray:
+    """
+    Geodätische Distanz (km) jedes Punkts zum vorherigen gültigen Punkt, einmal je Track berechnet.
+    Gleiche Werte wie geopy.distance.distance (WGS-84); ungültige und erster Punkt: 0.
+    """
+    lat = pd.to_numeric(pd.Series(lat), errors='coerce').to_numpy(dtype=float)
+    lon = pd.to_numeric(pd.Series(lon), errors='coerce').to_numpy(dtype=float)
+    steps = np.zeros(len(lat))
+    previous = None
+    for i in np.flatnonzero(~(np.isnan(lat) | np.isnan(lon))):
+        if previous is not None and abs(lat[previous]) <= 90 and abs(lat[i]) <= 90:
+            steps[i] = _GEODESIC.Inverse(lat[previous], lon[previous], lat[i], lon[i], Geodesic.DISTANCE)['s12']
+        previous = i
+    return steps
+
+class ReportInputs:
+    """
+    Liest jede Input-Datei eines Tracks höchstens einmal.
+    CSV-Daten und Header-Metadaten werden aus demselben Text geparst.
+    """
+    def __init__(self):
+        self._texts: Dict[str, Optional[str]] = {}
+
+    def text(self, path: str) -> Optional[str]:
+        if path not in self._texts:
+            self._texts[path] = read_file_content(path, None) if path and os.path.exists(path) else None
+        return self._texts[path]
+
+    def csv(self, path: str, **kwargs) -> pd.DataFrame:
+        content = self.text(path)
+        if content is None:
+            raise FileNotFoundError(path)
+        return pd.read_csv(io.StringIO(content), comment='#', **kwargs)
+
+    def header_metadata(self, path: str) -> Dict[str, str]:
+        # Bereits geladene Dateien nicht erneut lesen; sonst nur den Kommentar-Header streamen
+        return parse_metadata_from_csv_header(path, self._texts.get(path))
+
+def parse_metadata_from_csv_header(filepath: str, text: Optional[str] = None) -> Dict[str, str]:
+    """Liest Kommentarzeilen am Anfang einer CSV und parst sie als Metadaten (text: bereits gelesener Inhalt)."""
     metadata = {}
     if not filepath or not os.path.exists(filepath):
         return {"Error": f"Datei nicht gefunden: {filepath}"}
     
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
+        with (io.StringIO(text) if text is not None else open(filepath, 'r', encoding='utf-8')) as f:
             for line in f:
                 if line.startswith("#"):
                     line_content = line.lstrip('# ').strip()
@@ -286,85 +353,30 @@ def parse_metadata_from_png_companion(png_path: str) -> Dict[str, str]:
     
     return metadata
 
-# --- Main Generation Function ---
-def generate_summary(args, surface_color_config: Dict[str, str]):
-    print(f"[Info] Erstelle Zusammenfassung für: {args.basename}")
-    
-    # === PERFORMANCE-TRACKING INITIALISIERUNG ===
-    run_start_time_report = datetime.now()
-    performance_data = {
-        'processing_phases': {},
-        'input_files': {},
-        'asset_processing': {},
-        'template_rendering': {},
-        'output_generation': {},
-        'data_quality': {},
-        'html_components': {},
-        'metadata_collection': {},
-        'error_handling': {}
-    }
-    
-    start_phase_time = time.time()
-    
-    print(f"[Performance] Report generation started at {run_start_time_report.strftime('%H:%M:%S')}")
-
-    # Emojis (könnten auch aus Config kommen)
-    WORLD_MAP_EMOJI = "\N{WORLD MAP}" # 🗺️
-    STATS_EMOJI = "\N{BAR CHART}" # 📊
-    SURFACE_DIST_EMOJI = "\N{RAILWAY TRACK}" # 🛤️
-    PROFILE_EMOJI = "\N{CHART WITH UPWARDS TREND}" # 📈
-    SPEED_EMOJI = "\N{STOPWATCH}" # ⏱️
-    PEAK_EMOJI = "\N{MOUNTAIN}" # ⛰️
-    STREET_LIST_EMOJI = "\N{MOTORWAY}" # 🛣️
-    DESCRIPTION_EMOJI = "\N{MEMO}" # 📝
-    POWER_EMOJI = "\N{HIGH VOLTAGE SIGN}" # ⚡
-    METADATA_EMOJI = "\N{SCROLL}" #
-    
-    # === INPUT FILES PERFORMANCE TRACKING ===
-    input_files_to_track = [
-        ('stats_csv', args.stats_csv),
-        ('peak_csv', args.peak_csv),
-        ('geocoded_opt_csv', args.geocoded_opt_csv),
-        ('surface_data', args.surface_data),
-        ('markdown_text', args.markdown_text),
-        ('map_html', args.map_html),
-        ('plotly_3d_html', args.plotly_3d_html)
-    ]
-    
-    for file_type, file_path in input_files_to_track:
-        if file_path and os.path.exists(file_path):
-            file_size = os.path.getsize(file_path)
-            file_mtime = os.path.getmtime(file_path)
-            performance_data['input_files'][file_type] = {
-                'file_size_bytes': file_size,
-                'file_size_mb': round(file_size / (1024 * 1024), 2),
-                'last_modified': datetime.fromtimestamp(file_mtime).strftime('%Y-%m-%d %H:%M:%S'),
-                'exists': True
-            }
-        else:
-            performance_data['input_files'][file_type] = {'exists': False}
-    
-    performance_data['processing_phases']['input_analysis_time'] = time.time() - start_phase_time
-    performance_data['input_files']['total_input_files_analyzed'] = len(input_files_to_track)
-    performance_data['input_files']['existing_files_count'] = sum(1 for _, data in performance_data['input_files'].items() if isinstance(data, dict) and data.get('exists', False))    
-
-    # --- 1. Lade Basis-Daten ---
-    print("[Info] Lade Basis-Daten...")
-    data_loading_start = time.time()
+# --- Abschnitte der Etappenübersicht (Datenschicht) ---
+def build_stats_rows(inputs: ReportInputs, stats_csv: str):
+    """Tabellenzeilen der Statistik; Returns: (html, Anzahl Zeilen)."""
     stats_html = "<tr><td colspan='2'>Statistiken nicht verfügbar.</td></tr>"
-    if args.stats_csv and os.path.exists(args.stats_csv):
+    rows = 0
+    if stats_csv and os.path.exists(stats_csv):
         try:
-            stats_df = pd.read_csv(args.stats_csv, comment='#')
+            stats_df = inputs.csv(stats_csv)
+            rows = stats_df.shape[0]
             if not stats_df.empty:
                 stats_html = "\n".join([f"<tr><td>{r['Statistik']}</td><td>{r.get('Wert', 'N/A')}</td></tr>"
                                        for _, r in stats_df.iterrows()]) # .get('Wert') für Sicherheit
             if not stats_html.strip(): stats_html = "<tr><td colspan='2'>Keine gültigen Statistiken.</td></tr>"
         except Exception as e: stats_html = f"<tr><td colspan='2'>Fehler Statistik-CSV: {e}</td></tr>"
+    return stats_html, rows
 
+def build_peak_segments(inputs: ReportInputs, peak_csv: str):
+    """Peak-Liste und Anstiegstabelle; Returns: (html, Anzahl Zeilen)."""
     peak_segment_html = "<p>Keine Peak/Segment Daten.</p>"
-    if args.peak_csv and os.path.exists(args.peak_csv):
+    rows = 0
+    if peak_csv and os.path.exists(peak_csv):
         try:
-            peak_df = pd.read_csv(args.peak_csv, comment='#')
+            peak_df = inputs.csv(peak_csv)
+            rows = peak_df.shape[0]
             if not peak_df.empty:
                 parts = []
                 peaks = peak_df[peak_df['item_type'] == 'Peak']
@@ -382,19 +394,10 @@ def generate_summary(args, surface_color_config: Dict[str, str]):
                     parts.append(segments_display[cols].to_html(index=False, classes="table table-sm table-striped table-hover", border=0, float_format='%.1f'))
                 if parts: peak_segment_html = "\n".join(parts)
         except Exception as e: print(f"[Warnung] Fehler Peak-CSV: {e}")
+    return peak_segment_html, rows
 
-    markdown_content = read_file_content(args.markdown_text, "<p>Keine Beschreibungen verfügbar.</p>")
-    descriptions_html = markdown(markdown_content, extensions=['tables', 'fenced_code'])
-    
-    performance_data['processing_phases']['data_loading_time'] = time.time() - data_loading_start
-    performance_data['data_quality']['markdown_content_length'] = len(markdown_content)
-    performance_data['data_quality']['descriptions_html_length'] = len(descriptions_html)
-    performance_data['data_quality']['stats_rows_processed'] = stats_df.shape[0] if 'stats_df' in locals() and not stats_df.empty else 0
-    performance_data['data_quality']['peak_data_rows'] = peak_df.shape[0] if 'peak_df' in locals() and not peak_df.empty else 0
-
-    # --- NEU: Metadaten aus verschiedenen Quellen sammeln ---
-    print("[Info] Lese Metadaten aus den Input-Dateien...", file=sys.stderr)
-    metadata_collection_start = time.time()
+def build_metadata_html(inputs: ReportInputs, args, run_start_time_report: datetime):
+    """Verarbeitungs-Historie aus den Metadaten der Input-Dateien; Returns: (html, Quellen, gefundene Dateien)."""
     all_metadata_html = "<h4>Verarbeitungs-Historie & Datenquellen:</h4><dl class='metadata-list'>"
 
     # Struktur: (Titel für den Report, Dateipfad-Argument, Präfix für Keys aus dem Header)
@@ -415,14 +418,20 @@ def generate_summary(args, surface_color_config: Dict[str, str]):
         ("Power-Visualisierung (10c)", args.power_visualization_png, "PowerVisualization")
     ]
 
+    # Eine Abfrage für alle Quellen; nur Dateien ohne aktuellen Eintrag werden gelesen
+    indexed_metadata = load_latest_metadata([filepath_arg for _, filepath_arg, _ in metadata_sources if filepath_arg])
+    print(f"[Info] Metadaten-Index: {len(indexed_metadata)} von {len(metadata_sources)} Quellen")
+
     for title, filepath_arg, key_prefix in metadata_sources:
         if filepath_arg and os.path.exists(filepath_arg):
             all_metadata_html += f"<dt>{title}</dt><dd><ul>"
             
-            if filepath_arg.endswith(".json"): # Spezielle Behandlung für JSON Metadaten
+            # Wie beim Header-Parsen: Einträge mit höchstens einem Schlüssel gelten als unvollständig
+            if len(indexed_metadata.get(filepath_arg, {})) > 1:
+                meta_dict = indexed_metadata[filepath_arg]
+            elif filepath_arg.endswith(".json"): # Spezielle Behandlung für JSON Metadaten
                 try:
-                    with open(filepath_arg, 'r', encoding='utf-8') as f_json:
-                        json_data = json.load(f_json)
+                    json_data = json.loads(inputs.text(filepath_arg))
                     meta_dict = json_data.get("metadata", {}) # Annahme: Metadaten sind unter "metadata"
                     if not meta_dict: 
                         # Fallback: Zeige JSON-Struktur Info
@@ -442,21 +451,20 @@ def generate_summary(args, surface_color_config: Dict[str, str]):
                 }
             elif filepath_arg.endswith(".md"): # Markdown-Dateien
                 file_stats = os.stat(filepath_arg)
-                try:
-                    with open(filepath_arg, 'r', encoding='utf-8') as f_md:
-                        content = f_md.read()
+                content = inputs.text(filepath_arg)
+                if content is not None:
                     meta_dict = {
                         "Generated": datetime.fromtimestamp(file_stats.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
                         "Content Length": f"{len(content)} characters",
                         "Sections Count": content.count('##'),
                         "Type": "AI-generated content"
                     }
-                except:
+                else:
                     meta_dict = {"Status": "Markdown-Datei vorhanden"}
             elif filepath_arg.endswith(".png"): # PNG-Dateien (Power-Visualisierung)
                 meta_dict = parse_metadata_from_png_companion(filepath_arg)
             else: # Für CSVs und andere Dateien
-                meta_dict = parse_metadata_from_csv_header(filepath_arg)
+                meta_dict = inputs.header_metadata(filepath_arg)
 
             for key, value in meta_dict.items():
                 # Zeige nur relevante Metadaten oder filtere sie hier
@@ -472,22 +480,18 @@ def generate_summary(args, surface_color_config: Dict[str, str]):
     all_metadata_html += f"<dt>Report Erstellung ({SCRIPT_NAME})</dt>"
     all_metadata_html += f"<dd><ul><li>Version: {SCRIPT_VERSION}</li><li>Generiert am: {run_start_time_report.strftime('%Y-%m-%d %H:%M:%S')}</li></ul></dd>"
     all_metadata_html += "</dl>"
-    
-    performance_data['metadata_collection']['metadata_collection_time'] = time.time() - metadata_collection_start
-    performance_data['metadata_collection']['metadata_html_length'] = len(all_metadata_html)
-    performance_data['metadata_collection']['metadata_sources_analyzed'] = len(metadata_sources)
-    performance_data['metadata_collection']['metadata_files_found'] = sum(1 for _, filepath_arg, _ in metadata_sources if filepath_arg and os.path.exists(filepath_arg))
-    # --- ENDE METADATEN ---
- 
-    # --- 2. Lade und bereite Daten für Straßenliste und Oberflächenverteilung vor ---
-    data_processing_start = time.time()
+    files_found = sum(1 for _, filepath_arg, _ in metadata_sources if filepath_arg and os.path.exists(filepath_arg))
+    return all_metadata_html, len(metadata_sources), files_found
+
+def load_report_dataframe(inputs: ReportInputs, args) -> pd.DataFrame:
+    """Geocodierte Route (4) mit Oberflächendaten (4b) zusammengeführt, fehlende Spalten aufgefüllt."""
     df_report_data = pd.DataFrame() # Haupt-DataFrame für den Report
     
     if args.geocoded_opt_csv and os.path.exists(args.geocoded_opt_csv):
         try:
-            df_report_data = pd.read_csv(args.geocoded_opt_csv,
-                                         dtype={'Street': str, 'City': str, 'PostalCode': str, 'original_index': 'Int64'},
-                                         keep_default_na=False, comment='#')
+            df_report_data = inputs.csv(args.geocoded_opt_csv,
+                                        dtype={'Street': str, 'City': str, 'PostalCode': str, 'original_index': 'Int64'},
+                                        keep_default_na=False)
             for col in ['Street', 'City', 'PostalCode']:
                 if col in df_report_data.columns:
                     df_report_data[col] = df_report_data[col].replace('', f'{col}_(Leer)')
@@ -496,7 +500,7 @@ def generate_summary(args, surface_color_config: Dict[str, str]):
 
     if args.surface_data and os.path.exists(args.surface_data):
         try:
-            df_surface_raw = pd.read_csv(args.surface_data, dtype=str, keep_default_na=False, comment='#')
+            df_surface_raw = inputs.csv(args.surface_data, dtype=str, keep_default_na=False)
             if 'original_index' in df_surface_raw.columns:
                  df_surface_raw['original_index'] = pd.to_numeric(df_surface_raw['original_index'], errors='coerce').astype('Int64')
                  
@@ -531,16 +535,9 @@ def generate_summary(args, surface_color_config: Dict[str, str]):
     for expected_col in ['Surface', 'Tracktype', 'Highway', 'Smoothness', args.dist_col_name_from_config, 'Latitude', 'Longitude', 'Street', 'City', 'PostalCode']:
         if expected_col not in df_report_data.columns:
             df_report_data[expected_col] = 'N/A' if expected_col in ['Surface', 'Tracktype', 'Highway', 'Smoothness', 'Street', 'City', 'PostalCode'] else 0.0
-    
-    performance_data['processing_phases']['data_processing_time'] = time.time() - data_processing_start
-    performance_data['data_quality']['main_dataframe_rows'] = len(df_report_data)
-    performance_data['data_quality']['main_dataframe_columns'] = len(df_report_data.columns)
-    performance_data['data_quality']['valid_coordinates_count'] = len(df_report_data.dropna(subset=['Latitude', 'Longitude'])) if not df_report_data.empty else 0
-    performance_data['data_quality']['surface_data_coverage'] = (df_report_data['Surface'] != 'N/A').sum() if 'Surface' in df_report_data.columns else 0
+    return df_report_data
 
-
-    # --- 3. Erstelle HTML-Komponenten ---
-    html_generation_start = time.time()
+def build_surface_legend(df_report_data: pd.DataFrame, surface_color_config: Dict[str, str]) -> str:
     surface_legend_html_report = "<p>Keine Oberflächendaten für Legende.</p>"
     if 'Surface' in df_report_data.columns and not df_report_data.empty:
         unique_s = df_report_data['Surface'].astype(str).str.lower().unique()
@@ -559,118 +556,232 @@ def generate_summary(args, surface_color_config: Dict[str, str]):
             items_list.append(f'<li><span style="background-color:{color};"></span><span>{name}</span></li>')
         if items_list:
             surface_legend_html_report = f"""<div class="surface-legend-box"><h3>Legende Oberflächen</h3><ul>{''.join(items_list)}</ul></div>"""
+    return surface_legend_html_report
 
+def build_street_list(df_report_data: pd.DataFrame, steps_km: np.ndarray) -> str:
+    """Straßenliste je Ort; Blockdistanzen aus den einmal berechneten Punktabständen."""
     street_list_html = "<li>Straßenliste nicht erstellt.</li>"
-    if not df_report_data.empty and all(c in df_report_data.columns for c in ['Street', 'City', 'Latitude', 'Longitude', 'Surface']):
-        print("[Info] Erstelle Straßenliste...")
-        # ... (Logik für street_list_html mit <details> und der neuen HTML-Struktur,
-        #      verwendet df_report_data, das jetzt alle Spalten hat)
-        #      Die Block-ID Erstellung und Iteration muss hier rein.
-        #      (Code von deiner letzten Version hier einfügen und an df_report_data anpassen)
-        # --- (Beginn Logik für Straßenliste, angepasst) ---
-        block_def_cols_sl = ['Street', 'City', 'Surface', 'Tracktype', 'Highway', 'Smoothness']
-        actual_block_def_cols_sl = [col for col in block_def_cols_sl if col in df_report_data.columns]
-        
-        if actual_block_def_cols_sl:
-            group_key_series_sl = pd.Series(zip(*(df_report_data[col].astype(str) for col in actual_block_def_cols_sl)))
-            is_new_block_sl = group_key_series_sl.ne(group_key_series_sl.shift())
-            if not df_report_data.empty: is_new_block_sl.iloc[0] = True
-            df_report_data['block_id_report_sl'] = is_new_block_sl.cumsum()
-        else:
-            if not df_report_data.empty: df_report_data['block_id_report_sl'] = 1
-
-        html_parts_sl = []
-        current_city_h_sl = None
-        city_order_sl = df_report_data.drop_duplicates(subset=['City'], keep='first')['City'].tolist()
-        ignore_cities_h_sl = ["Unbekannter Ort", "City_(Leer)", "N/A", "OrtUnbekanntFürBlock"]
-
-        for city_val_sl in tqdm(city_order_sl, desc="Generiere Straßenliste"):
-            if city_val_sl in ignore_cities_h_sl: continue
-            city_df_grp_sl = df_report_data[df_report_data['City'] == city_val_sl]
-            if city_df_grp_sl.empty: continue
-
-            city_street_items_html_sl = []
-            for _, block_df_grp_sl in city_df_grp_sl.groupby('block_id_report_sl'):
-                if block_df_grp_sl.empty: continue
-                first_sl = block_df_grp_sl.iloc[0]
-                s_name_sl = first_sl.get('Street', 'N/A')
-                s_postal_sl = first_sl.get('PostalCode', 'N/A')
-                s_surf_sl = str(first_sl.get('Surface', 'Unbekannt')).lower()
-                s_tracktype_sl = first_sl.get('Tracktype', 'N/A')
-                s_highway_sl = first_sl.get('Highway', 'N/A')
-                s_smooth_sl = first_sl.get('Smoothness', 'N/A')
-                dist_block_sl = calculate_distance_for_group(block_df_grp_sl)
-
-                s_display_sl = s_name_sl if s_name_sl not in ['N/A', 'Street_(Leer)', 'StraßeUnbekanntFürBlock'] else "Unbenannte Straße"
-                p_display_sl = f", {s_postal_sl}" if s_postal_sl not in ['N/A', 'Keine PLZ', 'PostalCode_(Leer)'] else ""
-                
-                surface_text_parts_sl = []
-                main_surf_class_sl = f"surface-{s_surf_sl.replace(' ', '_').replace('/', '_')}" # Ersetze Leerzeichen/Slashes für CSS
-                if s_surf_sl not in ['unknown', 'n/a', '']: surface_text_parts_sl.append(f'<span class="main-surface {main_surf_class_sl}">{s_surf_sl.capitalize()}</span>')
-                
-                extra_info_sl = []
-                if s_highway_sl not in ['N/A', 'none_found_in_radius', 'none_selected_from_candidates', 'api_query_failed', '']: extra_info_sl.append(f"Typ: {s_highway_sl}")
-                if s_tracktype_sl not in ['N/A', '']: extra_info_sl.append(f"Güte: {s_tracktype_sl}")
-                if s_smooth_sl not in ['N/A', '']: extra_info_sl.append(f"Belag: {s_smooth_sl}")
-                
-                details_surf_str_sl = "".join(surface_text_parts_sl)
-                if extra_info_sl: details_surf_str_sl += f" <span class='extra-info'>({', '.join(extra_info_sl)})</span>"
-
-                city_street_items_html_sl.append(f'<li><div class="street-name-km"><span class="street-name">{s_display_sl}{p_display_sl}</span><span class="street-km">- ca. {dist_block_sl:.2f} km</span></div><div class="surface-details">{details_surf_str_sl if details_surf_str_sl else " "}</div></li>')
+    if df_report_data.empty or not all(c in df_report_data.columns for c in ['Street', 'City', 'Latitude', 'Longitude', 'Surface']):
+        return street_list_html
+    print("[Info] Erstelle Straßenliste...")
+    block_def_cols_sl = ['Street', 'City', 'Surface', 'Tracktype', 'Highway', 'Smoothness']
+    actual_block_def_cols_sl = [col for col in block_def_cols_sl if col in df_report_data.columns]
+    
+    group_key_series_sl = pd.Series(zip(*(df_report_data[col].astype(str) for col in actual_block_def_cols_sl)))
+    is_new_block_sl = group_key_series_sl.ne(group_key_series_sl.shift())
+    is_new_block_sl.iloc[0] = True
+    block_ids = is_new_block_sl.cumsum().to_numpy()
+
+    # Blockdistanz = Abstände innerhalb des Blocks (ohne den Schritt auf seinen ersten gültigen Punkt)
+    valid = (pd.to_numeric(df_report_data['Latitude'], errors='coerce').notna()
+             & pd.to_numeric(df_report_data['Longitude'], errors='coerce').notna()).to_numpy()
+    first_valid_in_block = valid & (pd.Series(valid).groupby(block_ids).cumsum().to_numpy() == 1)
+    block_km = pd.Series(np.where(first_valid_in_block, 0.0, steps_km)).groupby(block_ids).sum()
+
+    # Ein Block ist ein zusammenhängender Abschnitt mit gleichem Ort: erste Zeile beschreibt ihn
+    blocks = df_report_data.assign(block_id_report_sl=block_ids).drop_duplicates(subset=['block_id_report_sl'], keep='first')
+    blocks_by_city = {city: group for city, group in blocks.groupby('City', sort=False)}
+
+    html_parts_sl = []
+    city_order_sl = df_report_data.drop_duplicates(subset=['City'], keep='first')['City'].tolist()
+    ignore_cities_h_sl = ["Unbekannter Ort", "City_(Leer)", "N/A", "OrtUnbekanntFürBlock"]
+
+    for city_val_sl in tqdm(city_order_sl, desc="Generiere Straßenliste"):
+        if city_val_sl in ignore_cities_h_sl or city_val_sl not in blocks_by_city: continue
+
+        city_street_items_html_sl = []
+        for _, first_sl in blocks_by_city[city_val_sl].iterrows():
+            s_name_sl = first_sl.get('Street', 'N/A')
+            s_postal_sl = first_sl.get('PostalCode', 'N/A')
+            s_surf_sl = str(first_sl.get('Surface', 'Unbekannt')).lower()
+            s_tracktype_sl = first_sl.get('Tracktype', 'N/A')
+            s_highway_sl = first_sl.get('Highway', 'N/A')
+            s_smooth_sl = first_sl.get('Smoothness', 'N/A')
+            dist_block_sl = block_km[first_sl['block_id_report_sl']]
+
+            s_display_sl = s_name_sl if s_name_sl not in ['N/A', 'Street_(Leer)', 'StraßeUnbekanntFürBlock'] else "Unbenannte Straße"
+            p_display_sl = f", {s_postal_sl}" if s_postal_sl not in ['N/A', 'Keine PLZ', 'PostalCode_(Leer)'] else ""
             
-            if city_street_items_html_sl:
-                html_parts_sl.append(f"<details><summary>{city_val_sl}</summary><ul>{''.join(city_street_items_html_sl)}</ul></details>")
-        
-        if html_parts_sl: street_list_html = "\n".join(html_parts_sl)
-        else: street_list_html = "<p>Keine relevanten Straßenabschnitte gefunden.</p>"
-        # --- (Ende Logik für Straßenliste) ---
+            surface_text_parts_sl = []
+            main_surf_class_sl = f"surface-{s_surf_sl.replace(' ', '_').replace('/', '_')}" # Ersetze Leerzeichen/Slashes für CSS
+            if s_surf_sl not in ['unknown', 'n/a', '']: surface_text_parts_sl.append(f'<span class="main-surface {main_surf_class_sl}">{s_surf_sl.capitalize()}</span>')
+            
+            extra_info_sl = []
+            if s_highway_sl not in ['N/A', 'none_found_in_radius', 'none_selected_from_candidates', 'api_query_failed', '']: extra_info_sl.append(f"Typ: {s_highway_sl}")
+            if s_tracktype_sl not in ['N/A', '']: extra_info_sl.append(f"Güte: {s_tracktype_sl}")
+            if s_smooth_sl not in ['N/A', '']: extra_info_sl.append(f"Belag: {s_smooth_sl}")
+            
+            details_surf_str_sl = "".join(surface_text_parts_sl)
+            if extra_info_sl: details_surf_str_sl += f" <span class='extra-info'>({', '.join(extra_info_sl)})</span>"
 
+            city_street_items_html_sl.append(f'<li><div class="street-name-km"><span class="street-name">{s_display_sl}{p_display_sl}</span><span class="street-km">- ca. {dist_block_sl:.2f} km</span></div><div class="surface-details">{details_surf_str_sl if details_surf_str_sl else " "}</div></li>')
+        
+        if city_street_items_html_sl:
+            html_parts_sl.append(f"<details><summary>{city_val_sl}</summary><ul>{''.join(city_street_items_html_sl)}</ul></details>")
+    
+    if html_parts_sl: street_list_html = "\n".join(html_parts_sl)
+    else: street_list_html = "<p>Keine relevanten Straßenabschnitte gefunden.</p>"
+    return street_list_html
 
+def build_surface_distribution(df_report_data: pd.DataFrame, dist_col: str, steps_km: np.ndarray) -> str:
+    """Distanz und Anteil je Oberfläche (Route in original_index-Reihenfolge)."""
     surface_distribution_table_html = "<p>Keine Daten für Oberflächenverteilung.</p>"
-    if not df_report_data.empty and 'Surface' in df_report_data.columns and args.dist_col_name_from_config in df_report_data.columns:
-        try:
-            # ... (Logik für surface_distribution_table_html mit Segment_Laenge_km_Report, wie zuletzt besprochen) ...
-            # (Code von deiner letzten Version hier einfügen und an df_report_data anpassen)
-            # --- (Beginn Logik für Oberflächentabelle, angepasst) ---
-            df_for_summary_dist = df_report_data.copy()
-            if 'original_index' in df_for_summary_dist.columns: df_for_summary_dist.sort_values(by='original_index', inplace=True)
-            df_for_summary_dist['Latitude'] = pd.to_numeric(df_for_summary_dist['Latitude'], errors='coerce')
-            df_for_summary_dist['Longitude'] = pd.to_numeric(df_for_summary_dist['Longitude'], errors='coerce')
-            df_for_summary_dist.dropna(subset=['Latitude', 'Longitude'], inplace=True)
-            df_for_summary_dist.reset_index(drop=True, inplace=True)
-
-            s_lengths = []
-            if len(df_for_summary_dist) > 1:
-                for i in range(len(df_for_summary_dist)):
-                    if i == 0: s_lengths.append(0.0)
-                    else:
-                        p1 = (df_for_summary_dist.loc[i-1, 'Latitude'], df_for_summary_dist.loc[i-1, 'Longitude'])
-                        p2 = (df_for_summary_dist.loc[i, 'Latitude'], df_for_summary_dist.loc[i, 'Longitude'])
-                        try: s_lengths.append(geopy_distance(p1, p2).km)
-                        except ValueError: s_lengths.append(0.0)
-            elif not df_for_summary_dist.empty: s_lengths.append(0.0)
-
-            if len(s_lengths) == len(df_for_summary_dist): df_for_summary_dist['Segment_Length_Calc'] = s_lengths
-            else: df_for_summary_dist['Segment_Length_Calc'] = 0.0
-            
-            if 'Segment_Length_Calc' in df_for_summary_dist.columns:
-                summary_surf_dist = df_for_summary_dist.groupby('Surface')['Segment_Length_Calc'].sum().reset_index()
-                summary_surf_dist.rename(columns={'Segment_Length_Calc': 'Distanz (km)'}, inplace=True)
-            else: summary_surf_dist = pd.DataFrame(columns=['Surface', 'Distanz (km)'])
-
-            total_d_val = summary_surf_dist['Distanz (km)'].sum()
-            if total_d_val > 0: summary_surf_dist['Anteil (%)'] = (summary_surf_dist['Distanz (km)'] / total_d_val) * 100
-            else: summary_surf_dist['Anteil (%)'] = 0.0
-            summary_surf_dist = summary_surf_dist.sort_values(by='Distanz (km)', ascending=False)
-            
-            if summary_surf_dist['Distanz (km)'].sum() < 0.01:
-                surface_distribution_table_html = "<p>Keine signifikanten Distanzen für Oberflächenverteilung.</p>"
-            else:
-                surface_distribution_table_html = summary_surf_dist.to_html(index=False, classes="table table-sm table-striped", border=0, float_format='%.2f')
-        except Exception as e_s_sum_final:
-            print(f"[Warnung] Fehler Erstellung Oberflächenverteilungstabelle: {e_s_sum_final}")
-            surface_distribution_table_html = f"<p>Fehler bei Oberflächenverteilung: {e_s_sum_final}</p>"
-        # --- (Ende Logik für Oberflächentabelle) ---
+    if df_report_data.empty or 'Surface' not in df_report_data.columns or dist_col not in df_report_data.columns:
+        return surface_distribution_table_html
+    try:
+        df_for_summary_dist = df_report_data[['Surface', 'Latitude', 'Longitude']].copy()
+        df_for_summary_dist['Segment_Length_Calc'] = steps_km
+        if 'original_index' in df_report_data.columns:
+            order = df_report_data['original_index']
+            if not (order.is_monotonic_increasing and order.is_unique):
+                # Andere Reihenfolge als die Straßenliste: Abstände in Routenreihenfolge neu berechnen
+                df_for_summary_dist['original_index'] = order
+                df_for_summary_dist.sort_values(by='original_index', inplace=True)
+                df_for_summary_dist['Segment_Length_Calc'] = geodesic_steps_km(df_for_summary_dist['Latitude'], df_for_summary_dist['Longitude'])
+        df_for_summary_dist['Latitude'] = pd.to_numeric(df_for_summary_dist['Latitude'], errors='coerce')
+        df_for_summary_dist['Longitude'] = pd.to_numeric(df_for_summary_dist['Longitude'], errors='coerce')
+        df_for_summary_dist.dropna(subset=['Latitude', 'Longitude'], inplace=True)
+
+        summary_surf_dist = df_for_summary_dist.groupby('Surface')['Segment_Length_Calc'].sum().reset_index()
+        summary_surf_dist.rename(columns={'Segment_Length_Calc': 'Distanz (km)'}, inplace=True)
+
+        total_d_val = summary_surf_dist['Distanz (km)'].sum()
+        if total_d_val > 0: summary_surf_dist['Anteil (%)'] = (summary_surf_dist['Distanz (km)'] / total_d_val) * 100
+        else: summary_surf_dist['Anteil (%)'] = 0.0
+        summary_surf_dist = summary_surf_dist.sort_values(by='Distanz (km)', ascending=False)
+        
+        if summary_surf_dist['Distanz (km)'].sum() < 0.01:
+            surface_distribution_table_html = "<p>Keine signifikanten Distanzen für Oberflächenverteilung.</p>"
+        else:
+            surface_distribution_table_html = summary_surf_dist.to_html(index=False, classes="table table-sm table-striped", border=0, float_format='%.2f')
+    except Exception as e_s_sum_final:
+        print(f"[Warnung] Fehler Erstellung Oberflächenverteilungstabelle: {e_s_sum_final}")
+        surface_distribution_table_html = f"<p>Fehler bei Oberflächenverteilung: {e_s_sum_final}</p>"
+    return surface_distribution_table_html
+
+def build_image_sections(args, image_srcs: Dict[str, Optional[str]], plotly_3d_map_filename: Optional[str],
+                         map_html_filename: Optional[str]) -> Dict[str, str]:
+    """Template-Werte der Bild-, Karten- und 3D-Abschnitte (Bilder als ASSET_TOKEN-Platzhalter)."""
+    overview_map_src = image_srcs.get('overview_map')
+    map_screenshot_src = image_srcs.get('map_screenshot')
+    profile_plot_src = image_srcs.get('profile_plot')
+    speed_profile_src = image_srcs.get('speed_profile')
+    power_visualization_src = image_srcs.get('power_visualization')
+    html_only_map_content = f"""
+    <div class="html-only">
+        {f"<div><img src='{overview_map_src}' alt='Übersichtskarte' class='overview-map-image' loading='lazy' decoding='async'></div><hr>" if overview_map_src else '<p>Kein Karten-Screenshot verfügbar.</p>'}
+        <div class="mobile-only">
+            <button class="toggle-map-button" onclick="toggleInteractiveMap()">Interaktive Karte anzeigen/ausblenden</button>
+        </div>
+        <div id="interactiveMapContainer" class="interactive-map-container desktop-only">
+            {f"<iframe src='{map_html_filename}' class='interactive-map-iframe' title='Interaktive Streckenkarte'></iframe>" if map_html_filename else "<p>Keine interaktive Karte verfügbar.</p>"}
+        </div>
+    </div>"""
+    pdf_only_map_content = f"""
+    <div class="pdf-only">
+        {f"<img src='{map_screenshot_src}' alt='Karten-Screenshot' class='overview-map-image' loading='lazy'>" if map_screenshot_src else '<p>Kein Karten-Screenshot für PDF verfügbar.</p>'}
+    </div>"""
+    return {
+        'map_html_only': html_only_map_content,
+        'map_pdf_only': pdf_only_map_content,
+        'profile_image': f"<img src='{profile_plot_src}' alt='Höhenprofil der Etappe' class='overview-map-image' loading='lazy' decoding='async'>" if profile_plot_src else '<p>Kein Höhenprofil verfügbar.</p>',
+        'plotly_3d_heading': f"<h3>Interaktive 3D-Streckenansicht</h3>" if plotly_3d_map_filename else "<p>Keine interaktive 3D-Ansicht verfügbar.</p>",
+        'plotly_3d_iframe': f"<iframe src='{plotly_3d_map_filename}' class='interactive-map-iframe' style='height: 600px;' title='Interaktive 3D-Streckenansicht'></iframe>" if plotly_3d_map_filename else "<p>Keine interaktive 3D-Ansicht verfügbar.</p>",
+        'speed_profile_image': f"<img src='{speed_profile_src}' alt='Geschwindigkeitsprofil der Etappe' class='overview-map-image' loading='lazy' decoding='async'>" if speed_profile_src else '<p>Kein Geschwindigkeitsprofil verfügbar.</p>',
+        'power_image': f"<img src='{power_visualization_src}' alt='Power Performance Visualisierung' class='overview-map-image' loading='lazy' decoding='async'>" if power_visualization_src else '<p>Keine Power-Visualisierung verfügbar.</p>'
+    }
+
+# --- Main Generation Function ---
+def generate_summary(args, surface_color_config: Dict[str, str]):
+    print(f"[Info] Erstelle Zusammenfassung für: {args.basename}")
+    
+    # === PERFORMANCE-TRACKING INITIALISIERUNG ===
+    run_start_time_report = datetime.now()
+    performance_data = {
+        'processing_phases': {},
+        'input_files': {},
+        'asset_processing': {},
+        'template_rendering': {},
+        'output_generation': {},
+        'data_quality': {},
+        'html_components': {},
+        'metadata_collection': {},
+        'error_handling': {}
+    }
+    
+    start_phase_time = time.time()
+    inputs = ReportInputs()
+    
+    print(f"[Performance] Report generation started at {run_start_time_report.strftime('%H:%M:%S')}")
+
+    # === INPUT FILES PERFORMANCE TRACKING ===
+    input_files_to_track = [
+        ('stats_csv', args.stats_csv),
+        ('peak_csv', args.peak_csv),
+        ('geocoded_opt_csv', args.geocoded_opt_csv),
+        ('surface_data', args.surface_data),
+        ('markdown_text', args.markdown_text),
+        ('map_html', args.map_html),
+        ('plotly_3d_html', args.plotly_3d_html)
+    ]
+    
+    for file_type, file_path in input_files_to_track:
+        if file_path and os.path.exists(file_path):
+            file_size = os.path.getsize(file_path)
+            file_mtime = os.path.getmtime(file_path)
+            performance_data['input_files'][file_type] = {
+                'file_size_bytes': file_size,
+                'file_size_mb': round(file_size / (1024 * 1024), 2),
+                'last_modified': datetime.fromtimestamp(file_mtime).strftime('%Y-%m-%d %H:%M:%S'),
+                'exists': True
+            }
+        else:
+            performance_data['input_files'][file_type] = {'exists': False}
+    
+    performance_data['processing_phases']['input_analysis_time'] = time.time() - start_phase_time
+    performance_data['input_files']['total_input_files_analyzed'] = len(input_files_to_track)
+    performance_data['input_files']['existing_files_count'] = sum(1 for _, data in performance_data['input_files'].items() if isinstance(data, dict) and data.get('exists', False))    
+
+    # --- 1. Lade Basis-Daten ---
+    print("[Info] Lade Basis-Daten...")
+    data_loading_start = time.time()
+    stats_html, stats_rows = build_stats_rows(inputs, args.stats_csv)
+    peak_segment_html, peak_rows = build_peak_segments(inputs, args.peak_csv)
+
+    markdown_content = inputs.text(args.markdown_text)
+    if markdown_content is None: markdown_content = "<p>Keine Beschreibungen verfügbar.</p>"
+    descriptions_html = markdown(markdown_content, extensions=['tables', 'fenced_code'])
+    
+    performance_data['processing_phases']['data_loading_time'] = time.time() - data_loading_start
+    performance_data['data_quality']['markdown_content_length'] = len(markdown_content)
+    performance_data['data_quality']['descriptions_html_length'] = len(descriptions_html)
+    performance_data['data_quality']['stats_rows_processed'] = stats_rows
+    performance_data['data_quality']['peak_data_rows'] = peak_rows
+
+    # --- Metadaten aus verschiedenen Quellen sammeln ---
+    print("[Info] Lese Metadaten aus den Input-Dateien...", file=sys.stderr)
+    metadata_collection_start = time.time()
+    all_metadata_html, metadata_sources_count, metadata_files_found = build_metadata_html(inputs, args, run_start_time_report)
+    performance_data['metadata_collection']['metadata_collection_time'] = time.time() - metadata_collection_start
+    performance_data['metadata_collection']['metadata_html_length'] = len(all_metadata_html)
+    performance_data['metadata_collection']['metadata_sources_analyzed'] = metadata_sources_count
+    performance_data['metadata_collection']['metadata_files_found'] = metadata_files_found
+ 
+    # --- 2. Lade und bereite Daten für Straßenliste und Oberflächenverteilung vor ---
+    data_processing_start = time.time()
+    df_report_data = load_report_dataframe(inputs, args)
+    performance_data['processing_phases']['data_processing_time'] = time.time() - data_processing_start
+    performance_data['data_quality']['main_dataframe_rows'] = len(df_report_data)
+    performance_data['data_quality']['main_dataframe_columns'] = len(df_report_data.columns)
+    performance_data['data_quality']['valid_coordinates_count'] = len(df_report_data.dropna(subset=['Latitude', 'Longitude'])) if not df_report_data.empty else 0
+    performance_data['data_quality']['surface_data_coverage'] = (df_report_data['Surface'] != 'N/A').sum() if 'Surface' in df_report_data.columns else 0
+
+    # --- 3. Erstelle HTML-Komponenten ---
+    html_generation_start = time.time()
+    steps_km = geodesic_steps_km(df_report_data['Latitude'], df_report_data['Longitude']) if not df_report_data.empty else np.zeros(0)
+    surface_legend_html_report = build_surface_legend(df_report_data, surface_color_config)
+    street_list_html = build_street_list(df_report_data, steps_km)
+    surface_distribution_table_html = build_surface_distribution(df_report_data, args.dist_col_name_from_config, steps_km)
     
     performance_data['processing_phases']['html_components_generation_time'] = time.time() - html_generation_start
     performance_data['html_components']['street_list_html_length'] = len(street_list_html)
@@ -689,601 +800,88 @@ def generate_summary(args, surface_color_config: Dict[str, str]):
     else:
         print(f"[DEBUG] profile_png Datei NICHT gefunden oder Pfad leer: {args.profile_png}")
 
-    profile_plot_base64 = image_to_base64(args.profile_png)
-    print(f"[DEBUG] profile_plot_base64 ist None? {profile_plot_base64 is None}")
-    if profile_plot_base64 and len(profile_plot_base64) < 200: # Sehr kurze Base64 Strings sind verdächtig
-        print(f"[DEBUG] profile_plot_base64 (erste 100 Zeichen): {profile_plot_base64[:100]}")
-
     plotly_3d_map_filename = os.path.basename(args.plotly_3d_html) if args.plotly_3d_html and os.path.exists(args.plotly_3d_html) else None    
-    profile_plot_base64 = image_to_base64(args.profile_png)
-    map_screenshot_base64 = image_to_base64(args.map_png)
-    speed_profile_base64 = image_to_base64(args.speed_profile_png)
-    power_visualization_base64 = image_to_base64(args.power_visualization_png)
+
+    # Bilder im Template nur als Platzhalter; aufgelöst wird beim Schreiben (Asset-Pfad bzw. data:-URI)
+    image_paths = {
+        'profile_plot': args.profile_png,
+        'map_screenshot': args.map_png,
+        'speed_profile': args.speed_profile_png,
+        'power_visualization': args.power_visualization_png
+    }
+    image_paths = {key: path for key, path in image_paths.items() if path and os.path.exists(path)}
+    image_srcs = {key: ASSET_TOKEN.format(key=key) for key in image_paths}
+
+    asset_mode = getattr(args, 'asset_mode', DEFAULT_ASSET_MODE)
+    html_image_sources = {}
+    asset_sizes = {}
+    if asset_mode == 'external':
+        asset_dir = args.asset_dir or os.path.join(os.path.dirname(os.path.abspath(args.output_html)), DEFAULT_ASSET_DIR_NAME)
+        asset_sizes.update({'assets_source_size_bytes': 0, 'assets_written_size_bytes': 0, 'assets_reused_count': 0})
+        for key, path in image_paths.items():
+            try:
+                asset = publish_image(path, asset_dir, args.asset_format, args.asset_quality, args.asset_max_width)
+            except Exception as e:
+                print(f"[Warnung] Asset für {path} konnte nicht geschrieben werden ({e}), bette Bild ein.")
+                asset = None
+            if asset is None:
+                html_image_sources[key] = image_to_base64(path) or ''
+                continue
+            html_image_sources[key] = relative_src(asset.path, args.output_html)
+            asset_sizes['assets_source_size_bytes'] += asset.source_bytes
+            asset_sizes['assets_written_size_bytes'] += asset.asset_bytes
+            asset_sizes['assets_reused_count'] += int(asset.reused)
+        print(f"[Info] {len(image_paths)} Bild-Assets in {asset_dir} "
+              f"({asset_sizes['assets_source_size_bytes'] // 1024} KB -> {asset_sizes['assets_written_size_bytes'] // 1024} KB, "
+              f"{asset_sizes['assets_reused_count']} wiederverwendet)")
+    else:
+        for key, path in image_paths.items():
+            html_image_sources[key] = image_to_base64(path) or ''
+            asset_sizes[f'{key}_base64_size'] = len(html_image_sources[key])
+    # Übersichtskarte im Browser: Asset bzw. (inline) wie bisher das PNG neben dem HTML
+    if 'map_screenshot' in image_srcs:
+        image_srcs['overview_map'] = ASSET_TOKEN.format(key='overview_map')
+        html_image_sources['overview_map'] = (html_image_sources['map_screenshot'] if asset_mode == 'external'
+                                              else os.path.basename(args.map_png))
 
     # --- Inhalte für Karten-Sektion vorbereiten ---
-    map_png_filename = os.path.basename(args.map_png) if args.map_png and os.path.exists(args.map_png) else None
     map_html_filename = os.path.basename(args.map_html) if args.map_html and os.path.exists(args.map_html) else None
-    
-    # Asset-Performance tracking
-    asset_sizes = {}
-    if profile_plot_base64:
-        asset_sizes['profile_plot_base64_size'] = len(profile_plot_base64)
-    if map_screenshot_base64:
-        asset_sizes['map_screenshot_base64_size'] = len(map_screenshot_base64)
-    if speed_profile_base64:
-        asset_sizes['speed_profile_base64_size'] = len(speed_profile_base64)
-    if power_visualization_base64:
-        asset_sizes['power_visualization_base64_size'] = len(power_visualization_base64)
         
     performance_data['asset_processing'] = asset_sizes
     performance_data['processing_phases']['asset_processing_time'] = time.time() - asset_processing_start
     
-    html_only_map_content = f"""
-    <div class="html-only">
-        {f"<div><img src='{map_png_filename}' alt='Übersichtskarte' class='overview-map-image'></div><hr>" if map_png_filename else '<p>Kein Karten-Screenshot verfügbar.</p>'}
-        <div class="mobile-only">
-            <button class="toggle-map-button" onclick="toggleInteractiveMap()">Interaktive Karte anzeigen/ausblenden</button>
-        </div>
-        <div id="interactiveMapContainer" class="interactive-map-container desktop-only">
-            {f"<iframe src='{map_html_filename}' class='interactive-map-iframe' title='Interaktive Streckenkarte'></iframe>" if map_html_filename else "<p>Keine interaktive Karte verfügbar.</p>"}
-        </div>
-    </div>"""
-    pdf_only_map_content = f"""
-    <div class="pdf-only">
-        {f"<img src='{map_screenshot_base64}' alt='Karten-Screenshot' class='overview-map-image'>" if map_screenshot_base64 else '<p>Kein Karten-Screenshot für PDF verfügbar.</p>'}
-    </div>"""
-
-    # --- 5. HTML-Template ---
-    # (Laden von bootstrap_css wie zuletzt korrigiert)
-    # (HTML-Template mit ALLEN {{ und }} für CSS-Klammern und korrekten Emoji-Variablen)
-    # (Der JavaScript-Block für den Toggle-Button muss auch im Template sein)
-    # Der HTML-Template String aus deinem Beispiel-HTML ist hier die Vorlage.
-    # Wichtig: Alle Python-Variablen müssen mit einfachen {var} eingefügt werden.
-    # Alle literalen CSS-Klammern müssen {{ und }} sein.
-
-    # (Hier folgt der lange html_template String, der jetzt die CSS-Variablen aus der Config verwenden sollte
-    # und alle CSS-Klammern korrekt escaped hat, sowie die Emojis als Variablen einfügt)
-    # Ich kürze ihn hier ab, da er sehr lang ist, aber die Struktur ist wichtig.
-    
-    # Lade CSS-Variablen aus der Config (Beispiel)
-    # Dies sollte idealerweise einmal am Anfang von generate_summary geschehen
-    # und die Farbwerte dann im CSS-Teil des Templates verwendet werden.
-    # Für dieses Beispiel nehme ich an, die CSS-Variablen sind direkt im CSS-String unten.
-    
-    # Lade Bootstrap CSS
+    # --- 5. HTML-Template (vorkompiliert, StageSummaryTemplate.py) ---
     template_rendering_start = time.time()
-    bootstrap_css = ""
-    project_root = Path(__file__).resolve().parent.parent
-    bootstrap_css_path = project_root / "bootstrap.min.css"
-    print(f"[DEBUG] Suche nach bootstrap.min.css unter: {bootstrap_css_path}")
-    if bootstrap_css_path.exists():
-        try:
-            with open(bootstrap_css_path, "r", encoding="utf-8") as f_css: bootstrap_css = f_css.read()
-            print(f"[INFO] bootstrap.min.css lokal geladen von: {bootstrap_css_path}")
-            if not bootstrap_css.strip(): bootstrap_css = "/* BOOTSTRAP CSS WAR LEER */"
-        except Exception as e: bootstrap_css = f"/* FEHLER LADEN BOOTSTRAP: {e} */"
-    else: bootstrap_css = "/* BOOTSTRAP CSS NICHT GEFUNDEN */"
-    
+    bootstrap_css = load_bootstrap_css(str(Path(__file__).resolve().parent.parent / "bootstrap.min.css"))
     performance_data['template_rendering']['bootstrap_css_size'] = len(bootstrap_css)
 
-
-    html_template = f"""
-<!DOCTYPE html><html lang='de'><head><meta charset='UTF-8'><meta name="viewport" content="width=device-width, initial-scale=1.0">
-<title>Etappenübersicht – {args.basename}</title>
-    <style>
-        {bootstrap_css}
-    /* Custom Styles */
-    :root {{# CSS Variablen Definition #
-        --font-family-sans-serif: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, "Helvetica Neue", Arial, sans-serif;
-        
-        /* Farbpalette inspiriert vom Fahrradrahmen & Natur */
-        --frame-base-gray: #7A8B8B;  /* Ein neutraleres Grau, basierend auf deinem Rahmen */
-        --accent-green: #689F38;   /* Ein sattes, natürliches Grün */
-        --accent-orange: #FFA000;  /* Ein warmes Orange für Highlights */
-
-        --dark-text: #2c3e50;      /* Dunkles Blau/Grau für Text, gute Lesbarkeit */
-        --medium-gray-border: #bdc3c7; /* Helles Grau für Ränder */
-        --light-green-bg: #e8f5e9; /* Sehr helles, gedämpftes Grün für Seitenhintergrund */
-        --card-bg: #ffffff;
-        
-        --heading-color: var(--dark-text);
-        --text-color: var(--dark-text);
-        --link-color: var(--accent-green);
-        --link-hover-color: #558B2F; /* Dunkleres Grün für Hover */
-        --border-color: var(--medium-gray-border);
-        --table-header-bg: #f0f3f4; /* Sehr helles Grau für Tabellenköpfe */
-    }}
-
-    * {{
-        box-sizing: border-box;
-        margin: 0;
-        padding: 0;
-    }}
-
-    body {{
-        font-family: var(--font-family-sans-serif);
-        line-height: 1.6;
-        color: var(--text-color);
-        background-color: var(--light-green-bg); 
-        padding: 1rem 0;
-    }}
-
-    .container {{
-        max-width: 960px;
-        margin: 0 auto;
-        padding: 20px;
-        background-color: var(--card-bg);
-        border-radius: 8px;
-        box-shadow: 0 2px 10px rgba(0, 0, 0, 0.08);
-    }}
-
-    h1, h2, h3 {{
-        color: var(--heading-color);
-        margin-bottom: 0.75em;
-        margin-top: 1.5em;
-        padding-bottom: 0.3em;
-        border-bottom: 2px solid var(--border-color);
-    }}
-    h1:first-child, h2:first-child, h3:first-child {{ /* Beachte: CSS-Regeln ohne Deklarationen brauchen trotzdem die Klammern */
-        margin-top: 0;
-    }}
-
-    h1 {{
-        text-align: center;
-        font-size: 2rem;
-        margin-bottom: 1em;
-        color: var(--frame-base-gray); 
-    }}
-    h2 {{ font-size: 1.6rem; color: var(--accent-green); }}
-    h3 {{ font-size: 1.3rem; color: var(--heading-color); border-bottom-width: 1px; }}
-
-    img.overview-map-image {{
-        max-width: 100%;
-        height: auto;
-        display: block;
-        margin: 1em auto;
-        border: 1px solid var(--border-color);
-        border-radius: 4px;
-    }}
-
-    .interactive-map-container {{# CSS-Regeln ohne Deklarationen brauchen trotzdem die Klammern #
-        margin-top: 1em;
-        margin-bottom: 2em;
-    }}
-    
-    .interactive-map-iframe {{
-        width: 100%;
-        height: 500px;
-        border: 1px solid var(--border-color);
-        border-radius: 4px;
-    }}
-
-    .desktop-only {{ display: none; }}
-    .mobile-only {{ display: block; }}
-
-    .toggle-map-button {{
-        display: block;
-        width: 100%;
-        padding: 0.75em;
-        margin-bottom: 1em;
-        background-color: var(--accent-green);
-        color: white;
-        border: none;
-        border-radius: 4px;
-        cursor: pointer;
-        text-align: center;
-        font-size: 1em;
-        font-weight: bold;
-    }}
-    .toggle-map-button:hover {{
-        background-color: var(--link-hover-color);
-    }}
-
-    table {{
-        width: 100%;
-        border-collapse: collapse;
-        margin-bottom: 1.5em;
-        font-size: 0.9rem;
-    }}
-    th, td {{
-        padding: 0.6em 0.5em;
-        text-align: left;
-        border: 1px solid var(--border-color);
-    }}
-    th {{
-        background-color: var(--table-header-bg);
-        font-weight: bold;
-        color: var(--heading-color);
-    }}
-    tr:nth-child(even) {{
-        background-color: #f9f9f9; 
-    }}
-    .stats-table td:first-child {{
-        font-weight: bold;
-        width: 40%;
-        color: var(--heading-color); 
-    }}
-    .segment-summary table {{
-        font-size: 0.85em;
-    }}
-    .table-responsive-container {{
-        overflow-x: auto; 
-    }}
-
-    .surface-legend-box {{
-        padding: 15px;
-        border: 1px solid var(--border-color);
-        border-radius: 5px;
-        margin-top: 20px;
-        margin-bottom: 20px;
-        background-color: #fdfdfd; 
-    }}
-    .surface-legend-box h3 {{
-        margin-top: 0;
-        margin-bottom: 12px;
-        font-size: 1.2em;
-        color: var(--heading-color);
-        border-bottom: 1px solid var(--border-color);
-        padding-bottom: 8px;
-        text-align: left;
-    }}
-    .surface-legend-box ul {{
-        list-style-type: none;
-        padding-left: 0;
-        margin-bottom: 0;
-        display: flex;
-        flex-wrap: wrap;
-        gap: 10px;
-    }}
-    .surface-legend-box li {{
-        font-size: 0.85em;
-        display: flex;
-        align-items: center;
-        flex-basis: calc(33.333% - 10px);
-    }}
-    .surface-legend-box li span:first-child {{
-        display: inline-block;
-        width: 16px;
-        height: 16px;
-        border: 1px solid #888;
-        margin-right: 6px;
-        vertical-align: middle;
-    }}
-    /* Die folgenden :nth-child Regeln sind spezifisch für die Anzahl der Legenden-Items. */
-    /* Wenn die Anzahl dynamisch ist, ist es besser, Klassen zu verwenden oder die Styles inline zu setzen, */
-    /* wie du es im Python-Code für die Legende bereits tust. */
-    /* Ich lasse sie hier aus, da dein Python-Code die background-color inline setzt. */
-    /* .surface-legend-box li:nth-child(1) span:first-child {{ background-color: #5D4037; }} */
-    /* ... etc ... */
-
-
-    .street-list details {{
-        margin-bottom: 0.5em;
-        border: 1px solid var(--border-color);
-        border-radius: 4px;
-        background-color: #fdfdfd;
-    }}
-    .street-list summary {{
-        padding: 0.6em 0.85em;
-        background-color: var(--table-header-bg);
-        cursor: pointer;
-        font-weight: bold;
-        color: var(--heading-color);
-        list-style-type: "► "; 
-    }}
-    .street-list details[open] > summary {{
-        list-style-type: "▼ "; 
-        background-color: #dde3e7; 
-    }}
-    .street-list summary:hover {{
-        background-color: #d8dcdf;
-    }}
-    
-    .street-list ul {{
-        list-style-type: none;
-        padding: 0.5em 0.85em 0.85em 0.85em ;
-    }}
-    .street-list li {{
-        display: flex; 
-        justify-content: space-between; 
-        align-items: flex-start; 
-        border-bottom: 1px dotted #eee;
-        padding: 0.5em 0; 
-        font-size: 0.9em;
-        gap: 10px; 
-    }}
-    .street-list li:last-child {{
-        border-bottom: none;
-    }}
-
-    .street-name-km {{
-        flex-grow: 1; 
-    }}
-    .street-name-km .street-name {{
-        display: block; 
-    }}
-    .street-name-km .street-km {{
-        color: #555;
-        font-size: 0.9em;
-    }}
-
-    .surface-details {{
-        flex-shrink: 0; 
-        width: 220px;  
-        text-align: right;
-        font-size: 0.85em;
-        color: #444;
-    }}
-    .surface-details .main-surface {{
-        font-weight: bold;
-        padding: 0.1em 0.4em; 
-        border-radius: 3px; 
-        color: var(--card-bg); 
-    }}
-    .surface-details .extra-info {{
-        display: block; 
-        font-size: 0.9em;
-        color: #666;
-        margin-top: 0.2em;
-    }}
-    .surface-details small {{ 
-        color: #777;
-    }}
-
-    /* Klassen für Oberflächenfarben in der Straßenliste (dynamisch aus surface_color_config) */
-    /* Diese werden im Python-Code generiert und hier eingefügt, wenn du sie nicht inline setzt */
-    /* Beispiel: .surface-asphalt {{ background-color: #5D4037; }} */
-    { "".join([f".surface-{key.replace(' ', '_').replace('/', '_')} {{ background-color: {val}; }}" for key, val in surface_color_config.items() if key != "default"]) }
-    /* Spezifische Textfarben für helle Hintergründe, falls nötig */
-    .surface-fine_gravel {{ color: var(--dark-text) !important; }}
-    .surface-unknown {{ color: var(--dark-text) !important; }}
-    .surface-unpaved {{ color: var(--dark-text) !important; }} /* Wenn Orange als Hintergrund für Unpaved verwendet wird */
-    .surface-sand {{ color: var(--dark-text) !important; }} /* Wenn Sand sehr hell ist */
-
-
-    .markdown-content {{
-        line-height: 1.7;
-        margin-top: 1.5em;
-    }}
-    .markdown-content article {{
-        margin-bottom: 2em;
-        padding: 1em;
-        border-left: 3px solid var(--accent-green);
-        background-color: #fdfdfd;
-        border-radius: 0 4px 4px 0; 
-    }}
-    .markdown-content h2 {{ 
-        font-size: 1.4em; 
-        margin-top: 0;
-        color: var(--frame-base-gray);
-        border-bottom-width: 1px;
-    }}
-    .markdown-content h3 {{
-        font-size: 1.15em;
-        color: var(--dark-text);
-        border-bottom: none;
-        margin-top: 1em;
-    }}
-    .markdown-content p {{
-        margin-bottom: 1em;
-    }}
-    .markdown-content strong {{
-        color: var(--accent-green); 
-    }}
-    .markdown-content em, .markdown-content i {{
-        color: var(--accent-orange); 
-    }}
-    .markdown-content p > strong:first-child {{ 
-        font-size: 1.5em;
-        margin-right: 0.2em;
-    }}
-
-    hr {{
-        border: 0;
-        height: 1px;
-        background-color: var(--border-color);
-        margin: 2em 0;
-    }}
-
-    /* HTML/PDF spezifische Anzeige */
-    .pdf-only {{
-        display: none; /* Im Browser ausblenden */
-    }}
-    .html-only {{
-        display: block; /* Im Browser anzeigen (Standard, aber explizit) */
-    }}
-
-    @media print {{
-        .html-only {{
-            display: none !important; /* Im Druck/PDF ausblenden */
-        }}
-        .pdf-only {{
-            display: block !important; /* Im Druck/PDF anzeigen */
-        }}
-        /* Optional: Button für interaktive Karte im Druck ausblenden */
-        .toggle-map-button {{
-            display: none !important;
-        }}
-        /* Optional: Den interaktiven Karten-Container im Druck ausblenden */
-        #interactiveMapContainer.interactive-map-container {{
-            display: none !important;
-        }}
-        
-        /* NEUE REGELN FÜR <details> IM DRUCK/PDF */
-        .street-list details {{  /* CSS-Regel Block beginnt */
-            page-break-inside: avoid; /* Versucht, Umbrüche innerhalb eines Details-Blocks zu vermeiden */
-        }} /* CSS-Regel Block endet */
-        .street-list details[open] summary ~ * {{ /* CSS-Regel Block beginnt */
-            display: block; /* Inhalt anzeigen */
-        }} /* CSS-Regel Block endet */
-        .street-list details summary::before, /* Pfeile entfernen/ändern, falls sie stören */
-        .street-list details summary::-webkit-details-marker {{ /* CSS-Regel Block beginnt */
-            display: none !important; /* Standard-Pfeil ausblenden */
-        }} /* CSS-Regel Block endet */
-        .street-list details summary {{ /* CSS-Regel Block beginnt */
-            list-style-type: none !important; /* Standard-Pfeil auch hier entfernen */
-            cursor: default; /* Cursor im PDF nicht als klickbar anzeigen */
-            /* Optional: Füge einen statischen Indikator hinzu, wenn du möchtest */
-            /* content: "▼ "; /* oder einfach nichts */
-        }} /* CSS-Regel Block endet */
-        /* WICHTIGSTE REGEL: Alle <details> im Druck standardmäßig öffnen */
-        .street-list details {{ /* CSS-Regel Block beginnt */
-            display: block !important; /* Stellt sicher, dass der Block existiert */
-        }} /* CSS-Regel Block endet */
-        .street-list details > summary {{ /* CSS-Regel Block beginnt */
-            /* Optional: Aussehen der Zusammenfassung im PDF anpassen */
-            /* background-color: #f0f0f0 !important; */ /* Beispiel */
-        }} /* CSS-Regel Block endet */
-        .street-list details > *:not(summary) {{ /* CSS-Regel Block beginnt */
-            display: block !important; /* Macht den Inhalt sichtbar */
-        }} /* CSS-Regel Block endet */
-        /* Ende NEUE REGELN */
-        
-    }}
-
-    /* Desktop-spezifische Stile */
-    @media (min-width: 768px) {{
-        body {{
-            padding: 2rem;
-        }}
-        .container {{
-            padding: 30px;
-        }}
-        h1 {{font-size: 2.5rem; }}
-        h2 {{font-size: 1.8rem; }}
-        h3 {{font-size: 1.4rem; }}
-
-        .interactive-map-container {{
-            display: block !important; 
-        }}
-        .mobile-only {{ display: none; }}
-        .desktop-only {{ display: block; }}
-
-        .surface-legend-box ul {{
-            display: grid; /* Grid für Desktop ist eine gute Alternative zu column-count */
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); /* Spaltenbreite anpassen */
-            gap: 5px 15px;
-            column-count: auto; /* Deaktiviere column-count, wenn Grid verwendet wird */
-        }}
-         .surface-legend-box li {{
-            flex-basis: auto; /* Nicht mehr nötig bei Grid-Layout für ul */
-            /* display: flex; align-items: center; <-- bleibt gut für Inhalt des li */
-        }}
-    }}
-</style>
-</head>
-<body>
-    <div class="container">
-        <header>
-            <h1>Etappenübersicht: {args.basename}</h1>
-        </header>
-        <main>
-            <section>
-                <h2>{WORLD_MAP_EMOJI} Karte</h2>
-                {html_only_map_content}
-                {pdf_only_map_content}
-                {surface_legend_html_report}
-            </section>
-            <hr>
-            <section>
-                <h2>{STATS_EMOJI} Statistiken</h2>
-                <div class="table-responsive-container">
-                    <table class="stats-table">
-                        <thead><tr><th>Merkmal</th><th>Wert</th></tr></thead>
-                        <tbody>{stats_html}</tbody>
-                    </table>
-                </div>
-            </section>
-            <hr>
-            <section>
-                <h2>{SURFACE_DIST_EMOJI} Oberflächenverteilung</h2>
-                <div class="table-responsive-container">
-                    {surface_distribution_table_html}
-                </div>
-            </section>
-            <hr>
-            <section>
-                <h2>{PROFILE_EMOJI} Höhenprofil & 3D-Ansicht </h2>
-                {f"<img src='{profile_plot_base64}' alt='Höhenprofil der Etappe' class='overview-map-image'>" if profile_plot_base64 else '<p>Kein Höhenprofil verfügbar.</p>'}
-                {f"<h3>Interaktive 3D-Streckenansicht</h3>" if plotly_3d_map_filename else "<p>Keine interaktive 3D-Ansicht verfügbar.</p>"}
-                <div class="html-only interactive-map-container">
-                    {f"<iframe src='{plotly_3d_map_filename}' class='interactive-map-iframe' style='height: 600px;' title='Interaktive 3D-Streckenansicht'></iframe>" if plotly_3d_map_filename else "<p>Keine interaktive 3D-Ansicht verfügbar.</p>"}
-                </div>                
-            </section>
-            
-             <!-- NEUER ABSCHNITT FÜR GESCHWINDIGKEITSPROFIL -->
-            <hr>
-            <section>
-                <h2>{SPEED_EMOJI} Geschwindigkeitsprofil</h2>
-                {f"<img src='{speed_profile_base64}' alt='Geschwindigkeitsprofil der Etappe' class='overview-map-image'>" if speed_profile_base64 else '<p>Kein Geschwindigkeitsprofil verfügbar.</p>'}
-            </section>
-            <!-- ENDE NEUER ABSCHNITT -->
-            
-             <!-- NEUER ABSCHNITT FÜR POWER VISUALISIERUNG -->
-            <hr>
-            <section>
-                <h2>{POWER_EMOJI} Power Performance</h2>
-                {f"<img src='{power_visualization_base64}' alt='Power Performance Visualisierung' class='overview-map-image'>" if power_visualization_base64 else '<p>Keine Power-Visualisierung verfügbar.</p>'}
-            </section>
-            <!-- ENDE NEUER ABSCHNITT -->
-            
-            <hr>
-            <section class="segment-summary">
-                <h2>{PEAK_EMOJI} Peak & Anstiegs-Analyse</h2>
-                {peak_segment_html}
-            </section>
-            <hr>
-            <section class="street-list">
-                <h2>{STREET_LIST_EMOJI} Straßenverlauf mit Oberflächen</h2>
-                {street_list_html}
-            </section>
-            <hr>
-            <section>
-                <h2>{DESCRIPTION_EMOJI} Beschreibungen & Highlights</h2>
-                <div class="markdown-content">{descriptions_html}</div>
-            </section>
-            <section id="processing-metadata">
-                <h2>{METADATA_EMOJI} Verarbeitungsdetails & Datenquellen</h2>
-                {all_metadata_html}
-            </section>      
-        </main>
-    </div>
-    <script>
-        function toggleInteractiveMap() {{
-            const container = document.getElementById('interactiveMapContainer');
-            if (container.style.display === 'none' || container.style.display === '') {{
-                container.style.display = 'block';
-            }} else {{
-                container.style.display = 'none';
-            }}
-        }}
-        document.addEventListener('DOMContentLoaded', function() {{
-            const interactiveMapContainer = document.getElementById('interactiveMapContainer');
-            const toggleButton = document.querySelector('.toggle-map-button');
-            if (window.innerWidth < 768) {{ // Mobile Ansicht
-                 if(interactiveMapContainer) interactiveMapContainer.style.display = 'none';
-                 if(toggleButton) toggleButton.style.display = 'block';
-            }} else {{ // Desktop Ansicht
-                if(interactiveMapContainer) interactiveMapContainer.style.display = 'block';
-                if(toggleButton) toggleButton.style.display = 'none';
-            }}
-        }});
-    </script>
-</body>
-</html>
-"""
+    template_values = build_image_sections(args, image_srcs, plotly_3d_map_filename, map_html_filename)
+    template_values.update({
+        'basename': args.basename,
+        'bootstrap_css': bootstrap_css,
+        'surface_css': surface_css(surface_color_config),
+        'surface_legend': surface_legend_html_report,
+        'stats_rows': stats_html,
+        'surface_distribution': surface_distribution_table_html,
+        'peak_segments': peak_segment_html,
+        'street_list': street_list_html,
+        'descriptions': descriptions_html,
+        'metadata': all_metadata_html
+    })
+    html_template = STAGE_SUMMARY.render(template_values)
     
     performance_data['processing_phases']['template_rendering_time'] = time.time() - template_rendering_start
-    performance_data['template_rendering']['final_html_size'] = len(html_template)
+    html_output = resolve_tokens(html_template, html_image_sources)
+    performance_data['template_rendering']['final_html_size'] = len(html_output)
     performance_data['template_rendering']['css_variables_count'] = len(surface_color_config)
-    performance_data['template_rendering']['template_variables_substituted'] = html_template.count('{') // 2  # Rough estimate
+    performance_data['template_rendering']['template_variables_substituted'] = len(STAGE_SUMMARY.fields)
 
     # --- HTML und PDF speichern ---
     print(f"[Info] Speichere HTML: {args.output_html}")
     output_generation_start = time.time()
     try:
         Path(args.output_html).parent.mkdir(parents=True, exist_ok=True)
-        with open(args.output_html, "w", encoding="utf-8") as f: f.write(html_template)
+        with open(args.output_html, "w", encoding="utf-8") as f: f.write(html_output)
         print(f"[OK] HTML gespeichert: {args.output_html}")
         html_file_size = os.path.getsize(args.output_html)
         performance_data['output_generation']['html_file_size'] = html_file_size
@@ -1301,7 +899,16 @@ def generate_summary(args, surface_color_config: Dict[str, str]):
     try:
         options = {'page-size':'A4','margin-top':'10mm','margin-right':'10mm','margin-bottom':'10mm','margin-left':'10mm',
                    'encoding':"UTF-8",'enable-local-file-access':None,'quiet':'','load-error-handling':'ignore','load-media-error-handling':'ignore'}
-        pdfkit.from_file(args.output_html, args.output_pdf, options=options)
+        if asset_mode == 'external':
+            # wkhtmltopdf bekommt die Original-PNGs eingebettet (kein Nachladen relativer Pfade, kein WebP nötig)
+            pdf_image_sources = {key: image_to_base64(path) or '' for key, path in image_paths.items()}
+            if 'map_screenshot' in image_paths:  # .html-only, im Druck ausgeblendet: nicht ein zweites Mal einbetten
+                pdf_image_sources['overview_map'] = Path(image_paths['map_screenshot']).resolve().as_uri()
+            pdf_html = resolve_tokens(html_template, pdf_image_sources)
+            performance_data['output_generation']['pdf_inline_html_size'] = len(pdf_html)
+            pdfkit.from_string(pdf_html, args.output_pdf, options=options)
+        else:
+            pdfkit.from_file(args.output_html, args.output_pdf, options=options)
         print(f"[OK] PDF gespeichert: {args.output_pdf}")
         pdf_file_size = os.path.getsize(args.output_pdf)
         performance_data['output_generation']['pdf_file_size'] = pdf_file_size
@@ -1337,45 +944,131 @@ def generate_summary(args, surface_color_config: Dict[str, str]):
     print(f"[Performance] Total report generation time: {total_processing_time:.2f} seconds")
     print(f"[Performance] Input files analyzed: {performance_data['input_files']['total_input_files_analyzed']}")
     print(f"[Performance] Main dataframe: {performance_data['data_quality']['main_dataframe_rows']} rows, {performance_data['data_quality']['main_dataframe_columns']} columns")
+    add_spans(performance_data['processing_phases'])
+    count_metric('input_files', performance_data['input_files']['total_input_files_analyzed'])
+    count_metric('main_dataframe_rows', performance_data['data_quality']['main_dataframe_rows'])
     print(f"[Performance] Template size: {performance_data['template_rendering']['final_html_size'] // 1024:.1f} KB")
     
     # Speichere Metadaten
     save_metadata_csv(args.basename, performance_data)
 
 
+# --- Batch: Zusammenfassungen mehrerer Tracks in einem Prozess-Pool ---
+# Dateinamen wie in der Snakefile-Regel generate_stage_summary
+SUMMARY_PATH_PATTERNS = {
+    'stats_csv': "3_{basename}_overall_stats.csv",
+    'profile_png': "3_{basename}_peak_analysis_profile.png",
+    'speed_profile_png': "3b_{basename}_speed_profile.png",
+    'track_csv_with_speed': "2d_{basename}_track_data_full_with_speed.csv",
+    'plotly_3d_html': "extra_{basename}_track_3d_plotly_full.html",
+    'peak_csv': "3_{basename}_peak_segment_data.csv",
+    'geocoded_opt_csv': "4_{basename}_track_data_with_location_optimized.csv",
+    'surface_data': "4b_{basename}_surface_data.csv",
+    'map_html': "6_{basename}_map_full.html",
+    'map_png': "6_{basename}_map_full.png",
+    'markdown_text': "9_{basename}_day_preview_places.md",
+    'sorted_places': "8c_{basename}_places_relevant_enriched.csv",
+    'pois_csv': "5c_{basename}_pois_relevant.csv",
+    'track_csv_with_elevation': "2c_{basename}_track_data_full_with_elevation.csv",
+    'input_csv_step2': "2_{basename}_track_data_full.csv",
+    'service_pois_csv': "5a_{basename}_pois_service_raw.csv",
+    'peak_pois_json': "5b_{basename}_peaks_viewpoints_bbox.json",
+    'power_visualization_png': "10c_{basename}_power_visualization.png",
+    'output_html': "11_{basename}_stage_summary_final.html",
+    'output_pdf': "11_{basename}_stage_summary_final.pdf"
+}
+
+def track_args(base_args: argparse.Namespace, basename: str, output_dir: str) -> argparse.Namespace:
+    """Argumente eines Tracks aus den gemeinsamen Batch-Argumenten und den Standard-Dateinamen."""
+    values = vars(base_args).copy()
+    values.update({key: os.path.join(output_dir, pattern.format(basename=basename))
+                   for key, pattern in SUMMARY_PATH_PATTERNS.items()})
+    values['basename'] = basename
+    return argparse.Namespace(**values)
+
+def _summary_worker(args: argparse.Namespace, surface_color_config: Dict[str, str], log_path: Optional[str]):
+    """Läuft im Worker-Prozess; Ausgaben je Track in dessen Log. Returns: (basename, ok, Sekunden, Fehler)."""
+    start = time.time()
+    log_file = open(log_path, 'w', encoding='utf-8') if log_path else None
+    try:
+        with contextlib.redirect_stdout(log_file or sys.stdout), contextlib.redirect_stderr(log_file or sys.stderr), \
+                metrics_stage(SCRIPT_NAME[:-3], args.basename):
+            generate_summary(args, surface_color_config)
+        return args.basename, True, time.time() - start, ''
+    except SystemExit as e:
+        return args.basename, False, time.time() - start, f"exit code {e.code}"
+    except Exception as e:
+        return args.basename, False, time.time() - start, str(e)
+    finally:
+        if log_file:
+            log_file.close()
+
+def generate_summaries_batch(base_args: argparse.Namespace, basenames: List[str], surface_color_config: Dict[str, str],
+                             output_dir: str = "output", workers: Optional[int] = None, log_dir: Optional[str] = None) -> bool:
+    """HTML und PDF für alle Tracks parallel; Imports, Template und Bootstrap-CSS je Worker nur einmal."""
+    workers = max(1, min(workers or os.cpu_count() or 1, len(basenames)))
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+    print(f"[Info] Batch: {len(basenames)} Zusammenfassungen mit {workers} Prozessen")
+    batch_start = time.time()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_summary_worker, track_args(base_args, basename, output_dir), surface_color_config,
+                            os.path.join(log_dir, f"11_{basename}_generate_stage_summary_final.log") if log_dir else None)
+            for basename in basenames
+        ]
+        results = [future.result() for future in futures]
+
+    for basename, ok, seconds, error in results:
+        print(f"[{'OK' if ok else 'Fehler'}] {basename}: {seconds:.2f}s{f' ({error})' if error else ''}")
+    print(f"[Performance] Batch total: {time.time() - batch_start:.2f} seconds")
+    return all(ok for _, ok, _, _ in results)
+
+
 # --- Command Line Interface ---
 if __name__ == "__main__":
     print_script_info()
+    # Im Batch-Modus ergeben sich die Pfade je Track aus SUMMARY_PATH_PATTERNS
+    per_track = "--batch-basenames" not in sys.argv[1:]
     parser = argparse.ArgumentParser(description="Generate HTML and PDF summary reports.")
-    parser.add_argument("--basename", required=True)
-    parser.add_argument("--stats-csv", required=True)
-    parser.add_argument("--profile-png", required=True)
-    parser.add_argument("--plotly-3d-html", required=True, help="Path to the interactive 3D Plotly HTML file.")
-    parser.add_argument("--peak-csv", required=True)
-    parser.add_argument("--geocoded-opt-csv", required=True)
-    parser.add_argument("--surface-data", required=True)
-    parser.add_argument("--map-html", required=True)
-    parser.add_argument("--map-png", required=True)
-    parser.add_argument("--markdown-text", required=True)
-    parser.add_argument("--sorted-places", required=True)
-    parser.add_argument("--output-html", required=True)
-    parser.add_argument("--output-pdf", required=True)
+    parser.add_argument("--basename", required=per_track)
+    parser.add_argument("--stats-csv", required=per_track)
+    parser.add_argument("--profile-png", required=per_track)
+    parser.add_argument("--plotly-3d-html", required=per_track, help="Path to the interactive 3D Plotly HTML file.")
+    parser.add_argument("--peak-csv", required=per_track)
+    parser.add_argument("--geocoded-opt-csv", required=per_track)
+    parser.add_argument("--surface-data", required=per_track)
+    parser.add_argument("--map-html", required=per_track)
+    parser.add_argument("--map-png", required=per_track)
+    parser.add_argument("--markdown-text", required=per_track)
+    parser.add_argument("--sorted-places", required=per_track)
+    parser.add_argument("--output-html", required=per_track)
+    parser.add_argument("--output-pdf", required=per_track)
     parser.add_argument("--speed-profile", help="Optional path to speed profile PNG.")
-    parser.add_argument("--dist-col-name-from-config", required=True, help="Name of the original distance column...")
+    parser.add_argument("--dist-col-name-from-config", required=per_track, help="Name of the original distance column...")
 
     # NEU: Argument für die Config-Datei, um Farben zu laden
     parser.add_argument("--config-file", default="config.yaml", help="Path to the config.yaml file.")
     # NEU: Argument für die CSV, die die Metadaten der Höhenanreicherung enthält
-    parser.add_argument("--track-csv-with-elevation", required=True, help="Path to the track CSV with elevation and potentially API metadata (output of 2c).")
+    parser.add_argument("--track-csv-with-elevation", required=per_track, help="Path to the track CSV with elevation and potentially API metadata (output of 2c).")
 
     # START OF CRITICAL ADDITIONS FOR THE ERROR
-    parser.add_argument("--pois-csv", required=True, help="Path to relevant POIs CSV (output of 5c).")
-    parser.add_argument("--input-csv-step2", required=True, help="Path to full track data CSV (output of 2, used for metadata).")
-    parser.add_argument("--service-pois-csv", required=True, help="Path to raw service POIs CSV (output of 5a, used for metadata).")
-    parser.add_argument("--peak-pois-json", required=True, help="Path to raw peak/viewpoint POIs JSON (output of 5b, used for metadata).")
-    parser.add_argument("--speed-profile-png", required=True, help="Path to the speed profile PNG file.")
-    parser.add_argument("--power-visualization-png", required=True, help="Path to power visualization PNG file.")
-    parser.add_argument("--track-csv-with-speed", required=True, help="Path to the track CSV with speed data (output of 2d).")
+    parser.add_argument("--pois-csv", required=per_track, help="Path to relevant POIs CSV (output of 5c).")
+    parser.add_argument("--input-csv-step2", required=per_track, help="Path to full track data CSV (output of 2, used for metadata).")
+    parser.add_argument("--service-pois-csv", required=per_track, help="Path to raw service POIs CSV (output of 5a, used for metadata).")
+    parser.add_argument("--peak-pois-json", required=per_track, help="Path to raw peak/viewpoint POIs JSON (output of 5b, used for metadata).")
+    parser.add_argument("--speed-profile-png", required=per_track, help="Path to the speed profile PNG file.")
+    parser.add_argument("--power-visualization-png", required=per_track, help="Path to power visualization PNG file.")
+    parser.add_argument("--track-csv-with-speed", required=per_track, help="Path to the track CSV with speed data (output of 2d).")
+    parser.add_argument("--asset-mode", choices=ASSET_MODES, default=DEFAULT_ASSET_MODE, help="external: images as shared, content-hashed asset files (lazy-loaded); inline: base64 in the HTML.")
+    parser.add_argument("--asset-dir", help=f"Shared asset directory (default: '{DEFAULT_ASSET_DIR_NAME}' next to the output HTML).")
+    parser.add_argument("--asset-format", choices=ASSET_FORMATS, default=DEFAULT_ASSET_FORMAT, help="Encoding of the external image assets.")
+    parser.add_argument("--asset-quality", type=int, default=DEFAULT_QUALITY, help="WebP quality of the external image assets.")
+    parser.add_argument("--asset-max-width", type=int, default=DEFAULT_MAX_WIDTH, help="Downscale external image assets wider than this (0 = keep size).")
+    parser.add_argument("--batch-basenames", nargs="+", help="Render the summaries of several tracks on a process pool (paths derived from the standard output names).")
+    parser.add_argument("--batch-output-dir", default="output", help="Directory with the step outputs for --batch-basenames.")
+    parser.add_argument("--batch-log-dir", help="Write one log per track into this directory (--batch-basenames).")
+    parser.add_argument("--workers", type=int, help="Number of worker processes for --batch-basenames (default: CPU count).")
 
 
     args = parser.parse_args()
@@ -1408,4 +1101,10 @@ if __name__ == "__main__":
     
     print(f"[DEBUG] Verwendete Farbkarte für Template: {surface_colors_for_template}")    
     
-    generate_summary(args, surface_colors_for_template) # Übergebe die Farbkarte
\ No newline at end of file
+    if args.batch_basenames:
+        if not generate_summaries_batch(args, args.batch_basenames, surface_colors_for_template,
+                                        args.batch_output_dir, args.workers, args.batch_log_dir):
+            sys.exit(1)
+    else:
+        with metrics_stage(SCRIPT_NAME[:-3], args.basename):
+            generate_summary(args, surface_colors_for_template) # Übergebe die Farbkarte
\ No newline at end of file
@@ -10,9 +10,9 @@ detailed algorithm performance tracking and optimization metrics.
 
 # === SCRIPT METADATA ===
 SCRIPT_NAME = "2d_calculate_speed.py"
-SCRIPT_VERSION = "2.1.0"
+SCRIPT_VERSION = "2.2.0"
 SCRIPT_DESCRIPTION = "Speed calculation with integrated metadata system"
-LAST_UPDATED = "2025-06-15"
+LAST_UPDATED = "2026-10-18"
 AUTHOR = "Markus"
 CONFIG_COMPATIBILITY = "2.1"
 
@@ -25,6 +25,8 @@ v2.1.0 (2025-06-15): Integrated unified metadata system with CSV_METADATA_TEMPLA
 - Removed custom metadata header generation
 - Integrated with standardized CSV_METADATA_TEMPLATE system
 - Streamlined performance tracking and metadata collection
+v2.2.0 (2026-10-18): Optional GPS outlier filter (--outlier-filter) via shared GPSSpeedFilter module
+- Adds 'Geschwindigkeit gefiltert (km/h)' column and correction counts to metadata
 """
 
 # === SCRIPT CONFIGURATION ===
@@ -62,6 +64,7 @@ import time
 # Import Metadaten-System
 sys.path.append(str(Path(__file__).parent.parent / "project_management"))
 from CSV_METADATA_TEMPLATE import write_csv_with_metadata
+from GPSSpeedFilter import filter_speed_outliers
 
 # === PERFORMANCE TRACKING GLOBALS ===
 calculation_stats = {
@@ -74,6 +77,7 @@ calculation_stats = {
     'data_quality_issues': 0,
     'extreme_speeds_clipped': 0,
     'zero_time_deltas': 0,
+    'outlier_corrections': 0,
     'processing_stages': {}
 }
 
@@ -99,14 +103,16 @@ def log_stage(stage_name: str, duration: float = None, details: dict = None):
 
 
 
-def calculate_speed(input_csv_path: str, output_csv_path: str, rolling_window: int = 0):
+def calculate_speed(input_csv_path: str, output_csv_path: str, rolling_window: int = 0,
+                    outlier_filter: bool = False):
     calculation_stats['start_time'] = time.time()
     print(f"[Info] Calculating speed for: {input_csv_path}")
     
     metadata = {
         'input_file': os.path.basename(input_csv_path),
         'rolling_window': rolling_window,
-        'smoothing_enabled': rolling_window > 1
+        'smoothing_enabled': rolling_window > 1,
+        'outlier_filter_enabled': outlier_filter
     }
     
     # --- CSV Loading Stage ---
@@ -285,6 +291,16 @@ def calculate_speed(input_csv_path: str, output_csv_path: str, rolling_window: i
     
     calculation_stats['smoothing_duration'] = time.time() - smoothing_start
 
+    # --- GPS Outlier Filter Stage (optional) ---
+    if outlier_filter:
+        filter_start = time.time()
+        speed_filter = filter_speed_outliers(df['Geschwindigkeit (km/h)'])
+        df['Geschwindigkeit gefiltert (km/h)'] = speed_filter.speed
+        calculation_stats['outlier_corrections'] = speed_filter.corrections_made
+        print(f"[Debug] GPS-Ausreißerfilter: {speed_filter.corrections_made} Punkte korrigiert "
+              f"({speed_filter.stats['jump_corrections']} Sprünge begrenzt)")
+        log_stage("outlier_filter_applied", time.time() - filter_start, speed_filter.stats)
+
     # --- Output Stage ---
     output_start = time.time()
     try:
@@ -304,7 +320,8 @@ def calculate_speed(input_csv_path: str, output_csv_path: str, rolling_window: i
             'rolling_window_size': rolling_window,
             'max_speed_threshold_kmh': MAX_SPEED_THRESHOLD_KMH,
             'time_parsing_method': calculation_stats['time_parsing_method'],
-            'smoothing_enabled': rolling_window > 1
+            'smoothing_enabled': rolling_window > 1,
+            'outlier_filter_enabled': outlier_filter
         }
         
         # Prepare additional metadata
@@ -317,6 +334,7 @@ def calculate_speed(input_csv_path: str, output_csv_path: str, rolling_window: i
             'smoothing_duration_sec': round(calculation_stats['smoothing_duration'], 3),
             'zero_time_deltas_count': calculation_stats['zero_time_deltas'],
             'extreme_speeds_clipped_count': calculation_stats['extreme_speeds_clipped'],
+            'outlier_corrections_count': calculation_stats['outlier_corrections'],
             'total_quality_issues': calculation_stats['data_quality_issues'],
             'min_speed_kmh': metadata['min_speed'],
             'max_speed_kmh': metadata['max_speed'],
@@ -360,6 +378,7 @@ if __name__ == "__main__":
     parser.add_argument("input_csv", help="Path to the input track CSV (from 2c).")
     parser.add_argument("output_csv", help="Path to save the output CSV with speed data.")
     parser.add_argument("--rolling-window", type=int, default=0, help="Window size for rolling mean of speed (0 to disable).")
+    parser.add_argument("--outlier-filter", action="store_true", help="Add a GPS outlier filtered speed column (same filter as step 10b).")
     args = parser.parse_args()
 
-    calculate_speed(args.input_csv, args.output_csv, args.rolling_window)
+    calculate_speed(args.input_csv, args.output_csv, args.rolling_window, args.outlier_filter)
@@ -12,9 +12,9 @@ annotations. Saves results to separate files.
 
 # === SCRIPT METADATA ===
 SCRIPT_NAME = "3_analyze_peaks_plot.py"
-SCRIPT_VERSION = "3.0.0"
+SCRIPT_VERSION = "3.5.0"
 SCRIPT_DESCRIPTION = "Peak analysis and elevation profiling with place annotations, algorithm tracking and standardized metadata"
-LAST_UPDATED = "2025-06-07"
+LAST_UPDATED = "2026-10-19"
 AUTHOR = "Markus"
 CONFIG_COMPATIBILITY = "2.1"
 
@@ -23,6 +23,14 @@ CHANGELOG = """
 v1.0.0 (pre-2025): Comprehensive peak analysis with surface information overlay
 v2.0.0 (2025-06-07): Implemented full standardized metadata system with processing history
 v3.0.0 (2025-06-07): Enhanced with algorithm parameter tracking and performance optimization
+v3.1.0 (2026-10-18): Slope colors optionally from a uniform distance grid (DistanceGrid.py, --slope-grid-m)
+v3.2.0 (2026-10-19): Pause time via shared vectorized PauseDetection.py instead of an iloc loop
+v3.3.0 (2026-10-19): Batched rendering - surface overlay as one LineCollection, place/water markers as one
+artist each, one KDTree query for all POIs (render time independent of the number of surface blocks)
+v3.4.0 (2026-10-19): Place labels (optionally water POI labels) placed together by the sweep-line tier
+solver in LabelPlacement.py instead of distance-based offsets; overflowing labels are hidden
+v3.5.0 (2026-10-19): Profile line drawn LTTB-reduced (PlotDownsampling.py, max. profile_plot_points); slope
+classes still from all points, color changes kept as forced points
 """
 
 # === DEPENDENCIES ===
@@ -31,8 +39,7 @@ REQUIRED_PACKAGES = [
     "pandas>=1.3.0",
     "matplotlib>=3.3.0",
     "numpy>=1.20.0",
-    "scipy>=1.7.0",
-    "geopy>=2.2.0"
+    "scipy>=1.7.0"
 ]
 
 import sys
@@ -56,9 +63,13 @@ from matplotlib.patches import Patch
 import numpy as np
 import pandas as pd
 from scipy.signal import savgol_filter, find_peaks
-from geopy.distance import distance as geopy_distance
 from scipy.spatial import KDTree
 
+from DistanceGrid import gradient_via_grid
+from PauseDetection import elapsed_seconds, time_gap_pauses
+from LabelPlacement import DEFAULT_MAX_TIERS, place_labels, text_box_points
+from PlotDownsampling import select_plot_indices
+
 # === FUNCTIONS ===
 
 def print_script_info():
@@ -82,6 +93,7 @@ class Config:
     min_peak_prominence_m: float = 40.0
     peak_edge_km: float = 0.25
     plot_dpi: int = 150
+    profile_plot_points: int = 5000  # Punktbudget der Profillinie (LTTB), Analyse nutzt alle Punkte
     plot_x_tick_major: float = 5.0
     plot_x_tick_minor: float = 1.0
     min_length_draw_m: float = 100.0
@@ -101,6 +113,7 @@ class Config:
     slope_colors: List[str] = field(default_factory=lambda: ['#08306b', '#08519c', '#3182bd', '#9ecae1', '#deebf7','#d9d9d9','#e5f5e0', '#a1d99b', '#fed976', '#fd8d3c', '#e31a1c'])
     slope_labels: List[str] = field(default_factory=lambda: ["<-12%", "-12..-8%", "-8..-5%", "-5..-2%", "-2..-0.5%","Flat","0.5..2%", "2..5%", "5..8%", "8..12%", ">12%"])
     slope_linewidth: float = 2.0
+    slope_grid_m: float = 0.0  # >0: Steigung auf einheitlichem Distanzraster (DistanceGrid.py)
     pause_min_duration_s: float = 120.0
     pause_max_distance_m: float = 5.0
     place_marker_style: str = '^'
@@ -118,6 +131,10 @@ class Config:
     # Muss eine Liste mit len(bins)+1 Elementen sein (Wert für <bin[0], bin[0]-bin[1], ..., >bin[-1])
     place_offset_y_additions: List[float] = field(default_factory=lambda: [0, 8, 18, 30, 45, 60])
     # --------------------------------------------------------------------
+    # Label-Layout: 'sweep' = LabelPlacement.py (überlappungsfrei), 'offset' = Distanz-Offsets oben
+    place_label_layout: str = 'sweep'
+    place_label_max_tiers: int = DEFAULT_MAX_TIERS
+    water_poi_labels: bool = False  # Namen der Wasserstellen beschriften (nur mit 'sweep')
     # NEU für Oberflächen-Overlay im Plot
     surface_plot_enabled: bool = True # Um es einfach an/auszuschalten
     surface_plot_colors: Dict[str, str] = field(default_factory=lambda: { # Standardfarben, falls nicht aus Config geladen
@@ -369,19 +386,18 @@ def calculate_statistics(df: pd.DataFrame, config: Config) -> Dict[str, any]: #
                 total_duration_td = end_time - start_time
                 stats["Gesamtdauer"] = str(total_duration_td).split('.')[0]
 
-                pause_duration_s = 0.0
-                df_temp_pause = df[['Time', 'Strecke Delta (km)']].copy()
-                df_temp_pause['Time'] = pd.to_datetime(df_temp_pause['Time'], errors='coerce')
-                df_temp_pause.dropna(subset=['Time'], inplace=True)
+                df_temp_pause = df.loc[df_time_col.notna()]
 
                 if len(df_temp_pause) >=2: # Ebene 4 if
-                    df_temp_pause['TimeDelta (s)'] = df_temp_pause['Time'].diff().dt.total_seconds().fillna(0)
-                    df_temp_pause['DistDelta (m)'] = df_temp_pause['Strecke Delta (km)'] * 1000
-                    for i in range(1, len(df_temp_pause)):
-                        time_diff = df_temp_pause['TimeDelta (s)'].iloc[i]
-                        dist_diff = df_temp_pause['DistDelta (m)'].iloc[i]
-                        if time_diff >= config.pause_min_duration_s and dist_diff <= config.pause_max_distance_m:
-                            pause_duration_s += time_diff
+                    # Pausen = Zeitschritte >= pause_min_duration_s ohne Bewegung > pause_max_distance_m
+                    pauses = time_gap_pauses(
+                        elapsed_seconds(df_time_col[df_time_col.notna()]),
+                        df_temp_pause['Distanz (km)'] if 'Distanz (km)' in df_temp_pause.columns else np.zeros(len(df_temp_pause)),
+                        min_gap_s=config.pause_min_duration_s,
+                        max_distance_m=config.pause_max_distance_m,
+                        step_distance_m=df_temp_pause['Strecke Delta (km)'] * 1000
+                    )
+                    pause_duration_s = pauses.total_duration_s
 
                     moving_duration_s = max(0, total_duration_td.total_seconds() - pause_duration_s)
                     stats["Pausenzeit"] = str(pd.to_timedelta(pause_duration_s, unit='s')).split('.')[0]
@@ -429,14 +445,17 @@ def _calculate_slope_colors(dist_m: np.ndarray, elev_m: np.ndarray, config: Conf
     """Berechnet Steigungsprozente und weist Farben basierend auf Schwellen zu."""
     if len(dist_m) < 2: return np.array([]), ListedColormap([]), BoundaryNorm([], 0)
 
-    d_elev = np.gradient(elev_m)
-    d_dist = np.gradient(dist_m)
+    if config.slope_grid_m > 0:
+        slope_percent = gradient_via_grid(dist_m, elev_m, config.slope_grid_m) * 100
+    else:
+        d_elev = np.gradient(elev_m)
+        d_dist = np.gradient(dist_m)
 
-    slope_percent = np.zeros_like(d_dist)
-    min_dist_step = 1e-1
-    valid_dist_mask = d_dist > min_dist_step
+        slope_percent = np.zeros_like(d_dist)
+        min_dist_step = 1e-1
+        valid_dist_mask = d_dist > min_dist_step
 
-    slope_percent[valid_dist_mask] = (d_elev[valid_dist_mask] / d_dist[valid_dist_mask]) * 100
+        slope_percent[valid_dist_mask] = (d_elev[valid_dist_mask] / d_dist[valid_dist_mask]) * 100
     slope_percent = np.clip(slope_percent, config.slope_thresholds[0], config.slope_thresholds[-1])
 
     cmap = ListedColormap(config.slope_colors)
@@ -445,6 +464,13 @@ def _calculate_slope_colors(dist_m: np.ndarray, elev_m: np.ndarray, config: Conf
 
     return slope_indices, cmap, norm
 
+def _dominant_classes(segment_classes: np.ndarray, line_idx: np.ndarray) -> np.ndarray:
+    """Häufigste Klasse der Originalsegmente je reduziertem Segment line_idx[k]..line_idx[k+1]."""
+    if len(line_idx) == len(segment_classes) + 1:
+        return segment_classes
+    one_hot = np.eye(int(segment_classes.max()) + 1, dtype=np.int32)[segment_classes]
+    return np.add.reduceat(one_hot, line_idx[:-1], axis=0).argmax(axis=1)
+
 # _shade_segment (unverändert)
 def _shade_segment(ax, dist_km: np.ndarray, elev_m: np.ndarray, seg: Segment, config: Config):
     """
@@ -486,34 +512,79 @@ def _shade_segment(ax, dist_km: np.ndarray, elev_m: np.ndarray, seg: Segment, co
     pass # Funktion tut jetzt nichts mehr oder kann ganz entfernt werden
 
 
-# --- Nächsten Nachbarn finden (ERWEITERT: gibt Distanz zurück) ---
-def find_nearest_track_point_kdtree(track_lat_lon: np.ndarray, place_lat: float, place_lon: float) -> Tuple[int, float]:
+# --- Nächste Trackpunkte finden (ein KDTree für alle Orte/POIs) ---
+EARTH_RADIUS_M = 6371000.0
+
+def nearest_track_points(track_lat_lon: np.ndarray, lats: np.ndarray, lons: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Finds the index and approximate distance (in meters) of the nearest track point using KDTree.
-    Assumes track_lat_lon is an Nx2 array with [Latitude, Longitude].
-    Returns (index, distance_meters) or (-1, -1.0) on error.
+    Index und Haversine-Distanz (m) des nächsten Trackpunkts für viele Punkte auf einmal.
+    track_lat_lon ist ein Nx2-Array [Latitude, Longitude]. Ohne Track: leere Arrays.
     """
-    if track_lat_lon is None or track_lat_lon.shape[0] == 0:
-        return -1, -1.0
-    try:
-        tree = KDTree(track_lat_lon)
-        distance_deg, index = tree.query([place_lat, place_lon])
-
-        # Konvertiere Distanz von Grad zu Metern (Annäherung!)
-        # Genauere Methode: Geopy verwenden, nachdem der Index gefunden wurde.
-        nearest_track_point = track_lat_lon[index]
-        try:
-            # Verwende geopy für genauere Distanzberechnung
-            distance_m = geopy_distance((place_lat, place_lon), (nearest_track_point[0], nearest_track_point[1])).meters
-        except ValueError:
-             # Fallback auf Grad-Umrechnung bei geopy-Fehler
-             print("[Warnung] Geopy-Distanzberechnung fehlgeschlagen, nutze Grad-Approximation.")
-             distance_m = distance_deg * 111000 # Grobe Annäherung
-
-        return index, distance_m
-    except Exception as e:
-        print(f"[Warnung] KDTree Fehler: {e}")
-        return -1, -1.0
+    lats = np.asarray(lats, dtype=float); lons = np.asarray(lons, dtype=float)
+    if track_lat_lon is None or track_lat_lon.shape[0] == 0 or len(lats) == 0:
+        return np.zeros(0, dtype=int), np.zeros(0)
+
+    _, indices = KDTree(track_lat_lon).query(np.column_stack((lats, lons)))
+    nearest = np.radians(track_lat_lon[indices])
+    lat1, lon1 = np.radians(lats), np.radians(lons)
+    a = (np.sin((nearest[:, 0] - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(nearest[:, 0]) * np.sin((nearest[:, 1] - lon1) / 2) ** 2)
+    return indices, 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def surface_blocks(dist_km: np.ndarray, surfaces: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Zusammenhängende Oberflächenblöcke als (Start-km, End-km, Oberfläche); leere/ungültige Blöcke entfallen."""
+    dist_km = np.asarray(dist_km, dtype=float); surfaces = np.asarray(surfaces, dtype=object)
+    if len(dist_km) == 0:
+        return np.zeros(0), np.zeros(0), np.zeros(0, dtype=object)
+    starts = np.flatnonzero(np.r_[True, surfaces[1:] != surfaces[:-1]])
+    ends = np.r_[starts[1:] - 1, len(dist_km) - 1]
+    start_km, end_km = dist_km[starts], dist_km[ends]
+    valid = ~np.isnan(start_km) & ~np.isnan(end_km) & (start_km < end_km)
+    return start_km[valid], end_km[valid], surfaces[starts][valid]
+
+
+def _draw_placed_labels(ax, labels: pd.DataFrame, config: Config) -> int:
+    """
+    Platziert alle Labels (Spalten name, x, y, color, offset) gemeinsam mit
+    LabelPlacement.py und zeichnet sie.
+    Textgrößen werden über die aktuelle Achsengröße in Dateneinheiten umgerechnet,
+    daher erst nach tight_layout aufrufen. Reicht der Platz oben nicht, wird ylim
+    erweitert und neu platziert. Gibt die Anzahl ausgeblendeter Labels zurück.
+    """
+    if labels.empty:
+        return 0
+    widths_pt, height_pt = text_box_points(labels['name'], config.place_text_size)
+    for _ in range(3):
+        x_lo, x_hi = ax.get_xlim(); y_lo, y_hi = ax.get_ylim()
+        axes_box = ax.get_window_extent()
+        pt_per_px = 72.0 / ax.figure.dpi
+        x_per_pt = (x_hi - x_lo) / (axes_box.width * pt_per_px)
+        y_per_pt = (y_hi - y_lo) / (axes_box.height * pt_per_px)
+        tier_height = height_pt * y_per_pt
+        layout = place_labels(labels['x'], widths_pt * x_per_pt, labels['y'], tier_height,
+                              base_offset=labels['offset'].to_numpy(dtype=float), max_tiers=config.place_label_max_tiers,
+                              gap=2 * x_per_pt, x_min=x_lo, x_max=x_hi)
+        needed_top = layout.top + 1.05 * tier_height
+        if not needed_top > y_hi:
+            break
+        ax.set_ylim(y_lo, needed_top)
+
+    placed = layout.placed
+    for name, x, y, color in zip(labels['name'].to_numpy()[placed], layout.x[placed], layout.y[placed],
+                                 labels['color'].to_numpy()[placed]):
+        ax.text(x, y, name, color=color, fontsize=config.place_text_size, ha='center', va='bottom',
+                bbox=dict(boxstyle="round,pad=0.15", fc="white", ec=color, lw=0.5, alpha=config.place_text_bg_alpha),
+                zorder=6)
+
+    # Führungslinien für Labels, die nicht direkt über ihrem Marker stehen
+    moved = placed & ((layout.tier > 0) | ~np.isclose(layout.x, labels['x'].to_numpy()))
+    if moved.any():
+        leaders = np.stack((np.column_stack((labels['x'].to_numpy()[moved], labels['y'].to_numpy()[moved])),
+                            np.column_stack((layout.x[moved], layout.y[moved]))), axis=1)
+        ax.add_collection(LineCollection(leaders, colors=labels['color'].to_numpy()[moved], linewidths=0.4,
+                                         alpha=0.6, zorder=5))
+    return layout.hidden_count
 
 
 # --- plot_profile (ERWEITERT um dynamischen Orts-Offset) ---
@@ -553,18 +624,33 @@ def plot_profile(base_filename: str,
     print("[DEBUG] Zeichne Haupt-Höhenprofil mit Slope Colors...", file=sys.stderr)
     slope_indices, cmap, norm = _calculate_slope_colors(dist_m, elev_m, config)
 
+    # Linie formerhaltend reduziert (LTTB); Steigungsklassen stammen aus allen Punkten.
+    # Farbwechsel bleiben als Pflichtpunkte erhalten, solange sie höchstens das halbe Budget
+    # belegen (sonst zählt die Form; jedes Segment bekommt dann die häufigste Steigungsklasse)
+    color_change = np.zeros(n_points, dtype=bool)
+    if len(slope_indices) == n_points - 1:
+        color_change[1:-1] = slope_indices[1:] != slope_indices[:-1]
+    if n_points <= config.profile_plot_points:
+        line_idx = np.arange(n_points)
+    else:
+        keep_changes = color_change.sum() <= config.profile_plot_points // 2
+        line_idx, _ = select_plot_indices(dist_km, elev_m, config.profile_plot_points,
+                                          keep=color_change if keep_changes else None)
+        print(f"[Info] Profillinie: {len(line_idx)} von {n_points} Punkten gezeichnet "
+              f"(Farbwechsel {'erhalten' if keep_changes else 'nach häufigster Steigungsklasse'})")
+
     # Fallback, falls keine Slope-Indizes berechnet werden konnten oder zu wenig Punkte
     if len(slope_indices) == 0 or n_points < 2:
-        ax.plot(dist_km, elev_m, color='grey', linewidth=config.slope_linewidth, zorder=2, label='Höhenprofil')
+        ax.plot(dist_km[line_idx], elev_m[line_idx], color='grey', linewidth=config.slope_linewidth, zorder=2, label='Höhenprofil')
         print("[Warnung] Slope-Indizes nicht berechnet oder zu wenig Punkte, zeichne graues Profil.", file=sys.stderr)
     else:
         # Hauptpfad mit farbiger Linie
-        points = np.array([dist_km, elev_m]).T.reshape(-1, 1, 2)
+        points = np.array([dist_km[line_idx], elev_m[line_idx]]).T.reshape(-1, 1, 2)
         segments_lc = np.concatenate([points[:-1], points[1:]], axis=1)
 
         lc = LineCollection(segments_lc, cmap=cmap, norm=norm, linewidth=config.slope_linewidth, zorder=2)
         # !!! HIER IST DIE WICHTIGE ERGÄNZUNG !!!
-        lc.set_array(slope_indices) # Weise die Farbwerte den Segmenten zu
+        lc.set_array(_dominant_classes(slope_indices, line_idx)) # Weise die Farbwerte den Segmenten zu
         # ^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^^
 
         ax.add_collection(lc)
@@ -640,25 +726,26 @@ def plot_profile(base_filename: str,
 
         dist_col_to_use = config.surface_plot_dist_col
         if dist_col_to_use and dist_col_to_use in surface_data_for_plot.columns:
-            surface_data_for_plot['Surface_processed'] = surface_data_for_plot['Surface'].astype(str).str.lower()
-            surface_data_for_plot['Surface_Block_Plot'] = (surface_data_for_plot['Surface_processed'] != surface_data_for_plot['Surface_processed'].shift()).cumsum()
-            
-            for _, segment in surface_data_for_plot.groupby('Surface_Block_Plot'):
-                if segment.empty: continue
-                surface_name = segment['Surface_processed'].iloc[0]
-                start_dist_km = segment[dist_col_to_use].iloc[0]
-                end_dist_km = segment[dist_col_to_use].iloc[-1]
-                if pd.isna(start_dist_km) or pd.isna(end_dist_km) or start_dist_km >= end_dist_km: continue
-                
-                y_pos = surface_y_positions.get(surface_name)
-                if y_pos is None: 
-                    print(f"[Warnung] Keine Y-Position für Oberfläche '{surface_name}', überspringe Segment.", file=sys.stderr)
-                    continue
-
-                color = config.surface_plot_colors.get(surface_name, config.surface_plot_colors.get("default", "#888888"))
-                ax.plot([start_dist_km, end_dist_km], [y_pos, y_pos],
-                        color=color, linewidth=config.surface_plot_linewidth,
-                        alpha=config.surface_plot_alpha, zorder=1.8) 
+            start_km, end_km, block_surfaces = surface_blocks(
+                surface_data_for_plot[dist_col_to_use].to_numpy(dtype=float),
+                surface_data_for_plot['Surface'].astype(str).str.lower().to_numpy()
+            )
+            block_series = pd.Series(block_surfaces, dtype=object)
+            y_values = block_series.map(surface_y_positions).to_numpy(dtype=float)
+            default_color = config.surface_plot_colors.get("default", "#888888")
+            block_colors = block_series.map(config.surface_plot_colors).fillna(default_color).to_numpy()
+
+            drawable = ~np.isnan(y_values)
+            if not drawable.all():
+                print(f"[Warnung] Keine Y-Position für Oberflächen {sorted(set(block_surfaces[~drawable]))}, "
+                      f"überspringe {int((~drawable).sum())} Segmente.", file=sys.stderr)
+            # Alle Oberflächenblöcke als eine LineCollection statt einem Artist pro Block
+            surface_segments = np.stack((np.column_stack((start_km, y_values)),
+                                         np.column_stack((end_km, y_values))), axis=1)[drawable]
+            ax.add_collection(LineCollection(surface_segments, colors=list(block_colors[drawable]),
+                                             linewidths=config.surface_plot_linewidth,
+                                             alpha=config.surface_plot_alpha, zorder=1.8,
+                                             capstyle='projecting'))  # wie ax.plot-Linien
         else:
             print(f"[Warnung] Distanzspalte '{config.surface_plot_dist_col}' für Oberflächen-Overlay nicht in surface_data_for_plot gefunden.", file=sys.stderr)
         
@@ -707,141 +794,73 @@ def plot_profile(base_filename: str,
 
     # ***** 5. Orte annotieren (mit dynamischem Offset) *****
     place_annotations = [] # Liste zum Speichern der Annotationsdetails
-    plotted_place_names = set() # Um doppelte Labels zu vermeiden, falls Orte nah beieinander liegen
-    if places_coords_df is not None and not places_coords_df.empty:
+    track_coords_latlon = track_df[['Latitude', 'Longitude']].values
+    if places_coords_df is not None and not places_coords_df.empty and \
+       {'Latitude_Center', 'Longitude_Center'}.issubset(places_coords_df.columns):
         print("[Info] Füge Ortsmarker zum Plot hinzu...")
-        track_coords_latlon = track_df[['Latitude', 'Longitude']].values
-        if track_coords_latlon.shape[0] > 0:
-            # Bereite Bins und Offsets vor
+        places = places_coords_df.dropna(subset=['Latitude_Center', 'Longitude_Center'])
+        nearest_idx, distance_m = nearest_track_points(track_coords_latlon, places['Latitude_Center'], places['Longitude_Center'])
+
+        if len(nearest_idx) > 0:
+            # Zusätzlicher Y-Offset je Distanz-Bin (np.digitize: 0 = <bin[0], ..., N = >=bin[N-1])
             dist_bins = np.array(config.place_offset_dist_bins_m)
             y_offsets = np.array(config.place_offset_y_additions)
+            total_y_offset = np.full(len(nearest_idx), float(config.place_text_offset_y))
             if len(y_offsets) != len(dist_bins) + 1:
                  print("[Warnung] Länge von place_offset_y_additions passt nicht zu place_offset_dist_bins_m! Verwende Basis-Offset.")
-                 use_dynamic_offset = False
             else:
-                 use_dynamic_offset = True
-
-            for _, place_row in places_coords_df.iterrows():
-                place_name = place_row['Ort']
-                place_lat = place_row.get('Latitude_Center')
-                place_lon = place_row.get('Longitude_Center')
-
-                if pd.notna(place_lat) and pd.notna(place_lon):
-                    nearest_idx, distance_m = find_nearest_track_point_kdtree(track_coords_latlon, place_lat, place_lon) # Erhalte auch Distanz
-
-                    if nearest_idx != -1:
-                        track_point = track_df.iloc[nearest_idx]
-                        plot_dist_km = track_point['Distanz (km)']
-                        plot_elev_m = track_point['Elevation (m)']
-
-                        # Berechne zusätzlichen Y-Offset basierend auf Distanz-Binning
-                        additional_offset_y = 0
-                        if use_dynamic_offset:
-                            # Finde den Index des Bins, in den die Distanz fällt
-                            # np.digitize gibt Index des Bins zurück (beginnend bei 1)
-                            # Indices sind 0 (<=bin[0]), 1 (bin[0]<..<bin[1]), ..., N (>=bin[N-1])
-                            bin_index = np.digitize(distance_m, dist_bins)
-                            additional_offset_y = y_offsets[bin_index]
-
-                        total_y_offset = config.place_text_offset_y + additional_offset_y
-
-                        # Speichere für späteres Plotten
-                        place_annotations.append({
-                            'name': place_name,
-                            'x': plot_dist_km,
-                            'y': plot_elev_m,
-                            'y_offset': total_y_offset,
-                            'distance_m': distance_m # Für Debugging oder spätere Verwendung
-                        })
-                    # ... (Warnung, wenn Punkt nicht gefunden) ...
-                # ... (Warnung bei fehlenden Koordinaten) ...
-
-            # Zeichne Marker und Texte für Orte
-            # Sortiere Annotationen nach X-Position, um Überlappung besser handhaben zu können (optional)
-            place_annotations.sort(key=lambda p: p['x'])
-            last_label_x_end = -np.inf # Um Überlappung von Textboxen zu prüfen
-            label_height = 15 # Geschätzte Höhe einer Textbox in Plot-Koordinaten
-
-            for anno in place_annotations:
-                 # Marker zeichnen
-                 ax.plot(anno['x'], anno['y'],
-                        marker=config.place_marker_style, color=config.place_marker_color,
-                        markersize=config.place_marker_size, linestyle='None', zorder=5)
-
-                 # Text zeichnen (mit Überlappungsprüfung - einfach)
-                 # Wenn das neue Label horizontal mit dem alten überlappt, erhöhe Y weiter
-                 current_label_y = anno['y'] + anno['y_offset']
-                 # Einfache horizontale Überlappungsprüfung (könnte verfeinert werden)
-                 # if anno['x'] < last_label_x_end:
-                 #      current_label_y += label_height # Schiebe es weiter hoch
-
-                 ax.text(anno['x'], current_label_y, anno['name'],
-                        color=config.place_text_color, fontsize=config.place_text_size,
-                        ha='center', va='bottom',
-                        bbox=dict(boxstyle="round,pad=0.15", fc="white", ec=config.place_marker_color, lw=0.5, alpha=config.place_text_bg_alpha),
-                        zorder=6)
-                 # Aktualisiere die Position des letzten Labels (vereinfacht)
-                 # TODO: Präzisere BBox-Kollisionserkennung wäre komplexer
-                 # last_label_x_end = anno['x'] + (len(anno['name']) * 0.1) # Grobe Schätzung der Textbreite
-
-        # ... (Warnung KDTree nicht verfügbar) ...
+                 total_y_offset += y_offsets[np.digitize(distance_m, dist_bins)]
+
+            annotations = pd.DataFrame({
+                'name': places['Ort'].to_numpy(),
+                'x': dist_km[nearest_idx],
+                'y': elev_m[nearest_idx],
+                'y_offset': total_y_offset,
+                'distance_m': distance_m # Für Debugging oder spätere Verwendung
+            }).sort_values('x', kind='stable')
+            place_annotations = annotations.to_dict('records')
+
+            # Alle Ortsmarker als ein Artist; Labels brauchen je einen Text
+            ax.plot(annotations['x'], annotations['y'],
+                    marker=config.place_marker_style, color=config.place_marker_color,
+                    markersize=config.place_marker_size, linestyle='None', zorder=5)
+            # Im 'sweep'-Layout werden die Labels erst nach tight_layout gemeinsam platziert (Schritt 7b)
+            if config.place_label_layout != 'sweep':
+                label_bbox = dict(boxstyle="round,pad=0.15", fc="white", ec=config.place_marker_color, lw=0.5, alpha=config.place_text_bg_alpha)
+                for name, x, label_y in zip(annotations['name'], annotations['x'], annotations['y'] + annotations['y_offset']):
+                     ax.text(x, label_y, name,
+                            color=config.place_text_color, fontsize=config.place_text_size,
+                            ha='center', va='bottom', bbox=label_bbox, zorder=6)
+        else:
+            print("[Warnung Plot] Keine Track-Koordinaten oder Ortskoordinaten für KDTree vorhanden.")
 
     # ***** NEU: 5a Wasserstellen annotieren *****
     water_poi_annotations = []
-    if water_pois_to_plot_df is not None and not water_pois_to_plot_df.empty:
+    water_marker_color = 'deepskyblue'
+    water_marker_style = 'o' # runder Marker
+    water_marker_size = 3
+    if water_pois_to_plot_df is not None and not water_pois_to_plot_df.empty and \
+       {'Latitude', 'Longitude'}.issubset(water_pois_to_plot_df.columns):
         print("[Info] Füge Wasserstellen-Marker zum Plot hinzu...")
-        track_coords_latlon = track_df[['Latitude', 'Longitude']].values # Wiederverwenden oder neu holen
-        
-        if track_coords_latlon.shape[0] > 0:
-            for _, poi_row in water_pois_to_plot_df.iterrows():
-                poi_name = poi_row.get('Name', 'Wasser') # Fallback-Name
-                poi_lat = poi_row.get('Latitude')
-                poi_lon = poi_row.get('Longitude')
-
-                if pd.notna(poi_lat) and pd.notna(poi_lon):
-                    nearest_idx, distance_to_track_m = find_nearest_track_point_kdtree(
-                        track_coords_latlon, poi_lat, poi_lon
-                    )
-
-                    if nearest_idx != -1:
-                        track_point = track_df.iloc[nearest_idx]
-                        plot_dist_km = track_point['Distanz (km)']
-                        # Y-Position für Wasserstellen: kann auf Track-Höhe oder fest sein
-                        # plot_elev_m_poi = track_point['Elevation (m)'] # Auf Track-Höhe
-                        
-                        # Für eine konsistente Darstellung etwas unterhalb der Hauptlinie:
-                        min_elevation_on_plot = ax.get_ylim()[0]
-                        plot_elev_m_poi_fixed = min_elevation_on_plot + 10 # Knapp über dem unteren Rand (anpassen)
-                        
-                        water_poi_annotations.append({
-                            'name': poi_name,
-                            'x': plot_dist_km,
-                            'y_marker': plot_elev_m_poi_fixed, # Y für den Marker
-                            # 'y_text': plot_elev_m_poi_fixed - 5, # Y für Text (optional, falls benötigt)
-                            'distance_to_track_m': distance_to_track_m
-                        })
-                    else:
-                        print(f"[Warnung Plot] Nächster Trackpunkt für Wasserstelle '{poi_name}' nicht gefunden.")
-                else:
-                    print(f"[Warnung Plot] Fehlende Koordinaten für Wasserstelle '{poi_name}'.")
-        else:
-            print("[Warnung Plot] Keine Track-Koordinaten für KDTree vorhanden (Wasserstellen).")
-
-    # NEU: Wasserstellen plotten
-    if water_poi_annotations:
-        water_marker_color = 'deepskyblue'
-        water_marker_style = 'o' # runder Marker
-        water_marker_size = 3
-        
-        for anno in water_poi_annotations:
-            ax.plot(anno['x'], anno['y_marker'],
+        water_pois = water_pois_to_plot_df.dropna(subset=['Latitude', 'Longitude'])
+        if len(water_pois) < len(water_pois_to_plot_df):
+            print(f"[Warnung Plot] {len(water_pois_to_plot_df) - len(water_pois)} Wasserstellen ohne Koordinaten.")
+        nearest_idx, distance_to_track_m = nearest_track_points(track_coords_latlon, water_pois['Latitude'], water_pois['Longitude'])
+
+        if len(nearest_idx) > 0:
+            # Konsistente Darstellung knapp über dem unteren Rand statt auf Track-Höhe
+            plot_elev_m_poi_fixed = ax.get_ylim()[0] + 10
+            names = water_pois['Name'].fillna('Wasser') if 'Name' in water_pois.columns else ['Wasser'] * len(water_pois)
+            water_poi_annotations = [
+                {'name': name, 'x': x, 'y_marker': plot_elev_m_poi_fixed, 'distance_to_track_m': d}
+                for name, x, d in zip(names, dist_km[nearest_idx], distance_to_track_m)
+            ]
+            ax.plot(dist_km[nearest_idx], np.full(len(nearest_idx), plot_elev_m_poi_fixed),
                     marker=water_marker_style, color=water_marker_color,
                     markersize=water_marker_size, linestyle='None', zorder=5,
                     markeredgecolor=None, mew=0.5)
-            # Optional: Text für Wasserstellen (kann schnell unübersichtlich werden)
-            # ax.text(anno['x'], anno['y_marker'] - 8, "💧", # oder anno['name']
-            #         color=water_marker_color, fontsize=7,
-            #         ha='center', va='top', zorder=6)
+        else:
+            print("[Warnung Plot] Keine Track-Koordinaten für KDTree vorhanden (Wasserstellen).")
 
     # ... (Achsen, Ticks, Titel, Grid, Legende wie vorher, aber Legende anpassen) ...
     # 6. FINALE ACHSEN-SETUP, TITEL, GRID (wird NACH allen Zeichenoperationen aufgerufen)
@@ -923,6 +942,17 @@ def plot_profile(base_filename: str,
     # oben würde Platz beanspruchen, was hier nicht der Fall ist.
     fig.tight_layout(rect=[0, 0.10, 1, 0.96]) # Evtl. 0.08 oder 0.12 für bottom anpassen
 
+    # 7b. Labels gemeinsam platzieren (braucht die finale Achsengröße)
+    if config.place_label_layout == 'sweep':
+        label_frames = [pd.DataFrame(place_annotations, columns=['name', 'x', 'y']).assign(
+            color=config.place_text_color, offset=float(config.place_text_offset_y))]
+        if config.water_poi_labels and water_poi_annotations:
+            water_labels = pd.DataFrame(water_poi_annotations).rename(columns={'y_marker': 'y'})
+            label_frames.append(water_labels[['name', 'x', 'y']].assign(color=water_marker_color, offset=5.0))
+        hidden = _draw_placed_labels(ax, pd.concat(label_frames, ignore_index=True), config)
+        if hidden:
+            print(f"[Info] {hidden} Labels ohne freien Platz ausgeblendet (max. {config.place_label_max_tiers} Ebenen).")
+
     # 8. Save plot
     # ... (Speichern wie vorher) ...
     try:
@@ -966,9 +996,12 @@ def main(args, config: Config):
         plot_dpi=args.plot_dpi, plot_x_tick_major=args.plot_x_tick_major,
         plot_x_tick_minor=args.plot_x_tick_minor,
         pause_min_duration_s=args.pause_min_duration,
-        pause_max_distance_m=args.pause_max_distance
-        # Die neuen Offset-Parameter werden aktuell aus den Defaults der Klasse genommen.
-        # Sie könnten auch über argparse / config.yaml konfigurierbar gemacht werden.
+        pause_max_distance_m=args.pause_max_distance,
+        slope_grid_m=args.slope_grid_m,
+        place_label_layout=args.label_layout,
+        place_label_max_tiers=args.label_max_tiers,
+        water_poi_labels=args.water_labels
+        # Die Offset-Bins für das 'offset'-Layout werden aus den Defaults der Klasse genommen.
     )
     
     # Speichere wichtige Parameter für Metadaten
@@ -1239,13 +1272,18 @@ if __name__ == "__main__":
     parser.add_argument("--prominence", type=float, default=40.0); parser.add_argument("--peak-edge-km", type=float, default=0.25)
     parser.add_argument("--plot-dpi", type=int, default=150); parser.add_argument("--plot-x-tick-major", type=float, default=5.0); parser.add_argument("--plot-x-tick-minor", type=float, default=1.0)
     parser.add_argument("--pause-min-duration", type=float, default=120.0); parser.add_argument("--pause-max-distance", type=float, default=5.0)
+    parser.add_argument("--slope-grid-m", type=float, default=0.0, help="Distance grid spacing in meters for slope colors (0 = point-based).")
+    parser.add_argument("--label-layout", choices=['sweep', 'offset'], default='sweep', help="Place label layout: sweep-line tiers without overlaps or legacy distance offsets.")
+    parser.add_argument("--label-max-tiers", type=int, default=DEFAULT_MAX_TIERS, help="Maximum label tiers above a marker (sweep layout).")
+    parser.add_argument("--water-labels", action="store_true", help="Also label water POIs with their names (sweep layout).")
     # TODO: Optional: Argumente für die Offset-Bins/Werte hinzufügen
     args = parser.parse_args()
 
     config = Config(
         smooth_window=args.smooth_window, 
         # ... (alle anderen config Zuweisungen aus args) ...
-        pause_max_distance_m=args.pause_max_distance
+        pause_max_distance_m=args.pause_max_distance,
+        slope_grid_m=args.slope_grid_m
         # surface_plot_colors=surface_colors_to_use # Wenn du aus YAML lädst
     )
 
@@ -9,9 +9,9 @@ and elevation overlay. Includes comprehensive pause analysis and statistics.
 
 # === SCRIPT METADATA ===
 SCRIPT_NAME = "3b_plot_speed_profile.py"
-SCRIPT_VERSION = "2.3.0" # Vollständiges Metadaten-System + Speed-Profile-Performance-Tracking
+SCRIPT_VERSION = "2.5.0" # Vektorisierte Pausenerkennung (PauseDetection.py)
 SCRIPT_DESCRIPTION = "3-segment speed profile with pause detection and elevation overlay"
-LAST_UPDATED = "2025-06-08"
+LAST_UPDATED = "2026-10-19"
 AUTHOR = "Markus"
 CONFIG_COMPATIBILITY = "2.1"
 
@@ -25,6 +25,10 @@ v2.3.0 (2025-06-08): Vollständiges Metadaten-System + Speed-Profile-Performance
 - Plot-Generation-Performance-Metriken für Matplotlib-Rendering und DPI-Optimization
 - Data-Quality-Analysis für Speed-Outlier-Detection und Data-Smoothing
 - Segment-Analysis-Performance mit Statistical-Computing-Metriken
+v2.4.0 (2026-10-18): Geschwindigkeits-/Höhenlinien pro Segment per LTTB (PlotDownsampling.py)
+auf max. PLOT_POINTS_PER_SEGMENT Punkte reduziert; Statistiken weiterhin auf allen Punkten
+v2.5.0 (2026-10-19): Zeitlücken und Geschwindigkeits-Pausen über PauseDetection.py (Lauflängen statt
+Schleifen); Mindest-Zeitlücke per --gap-min-duration, im Workflow = profile_analysis.pause_min_duration_s
 """
 
 # === SCRIPT CONFIGURATION ===
@@ -32,6 +36,9 @@ DEFAULT_CONFIG_SECTION = "speed_profile"
 INPUT_FILE_PATTERN = "*_track_data_full_with_speed.csv"
 OUTPUT_FILE_PATTERN = "*_speed_profile.png"
 
+# === PLOT CONFIGURATION ===
+PLOT_POINTS_PER_SEGMENT = 2500  # Punktbudget je Segment-Plot (Renderzeit unabhängig von Tourlänge)
+
 # === DEPENDENCIES ===
 PYTHON_VERSION_MIN = "3.8"
 REQUIRED_PACKAGES = [
@@ -52,6 +59,12 @@ import time
 from pathlib import Path
 from datetime import datetime
 
+from PauseDetection import (
+    FALLBACK_INTERVAL_S, GAP_MEDIAN_MULTIPLIER, GAP_MIN_DURATION_S, MIN_PAUSE_DURATION_S, MIN_PAUSE_POINTS,
+    PAUSE_TYPE_GAP, PAUSE_TYPE_SPEED, SPEED_PAUSE_THRESHOLD_KMH, PauseIntervals, elapsed_seconds, speed_pauses, time_gap_pauses
+)
+from PlotDownsampling import downsample_for_plot
+
 def save_metadata_as_text_header(output_png_path: str, metadata: dict):
     """Save speed profile visualization metadata as text file with the PNG."""
     # Create text metadata file path (parallel to PNG)
@@ -131,7 +144,8 @@ def print_script_info():
     print(f"Config Compatibility: {CONFIG_COMPATIBILITY}")
     print("=" * 50)
 
-def plot_speed_profile(input_csv_path: str, output_png_path: str, smooth_window_name: str = ""):
+def plot_speed_profile(input_csv_path: str, output_png_path: str, smooth_window_name: str = "",
+                       gap_min_duration: float = GAP_MIN_DURATION_S):
     """Generates 3-segment speed profile plot with comprehensive performance tracking."""
     run_start_time = datetime.now()
     print_script_info()
@@ -251,97 +265,45 @@ def plot_speed_profile(input_csv_path: str, output_png_path: str, smooth_window_
         pause_detection_start = time.time()
         df_raw = df.copy()
         
-        # === KONFIGURATION PAUSENERKENNUNG ===
-        pause_threshold_speed = 2.0        # km/h - Geschwindigkeit unter der als "Pause" gilt
-        min_pause_points = 3               # Mindestanzahl GPS-Punkte für gültige Pause
-        min_pause_duration = 10            # Sekunden - Mindestdauer für relevante Pausen
-        gap_threshold_multiplier = 5       # Faktor für Zeitlücken-Erkennung (5x normales Intervall)
-        min_gap_duration = 60              # Sekunden - Mindest-Zeitlücke
-        duplicate_tolerance_km = 0.1       # km - Toleranz für Duplikat-Erkennung (100m)
+        # === KONFIGURATION PAUSENERKENNUNG (Standardwerte in PauseDetection.py) ===
+        pause_threshold_speed = SPEED_PAUSE_THRESHOLD_KMH  # km/h - Geschwindigkeit unter der als "Pause" gilt
         
         metadata['pause_detection_method'] = 'speed_and_time_based'
         
-        speed_pause_mask = df_raw[speed_col_to_plot] <= pause_threshold_speed
-        
         # === ZEIT-BASIERTE PAUSEN ERKENNEN ===
-        time_based_pauses = []
-        time_col = None
-        avg_interval_seconds = 5  # Fallback GPS-Intervall wenn keine Zeitstempel
+        time_based_pauses = PauseIntervals.empty()
+        elapsed = None
         
         if 'Time' in df_raw.columns or 'Timestamp' in df_raw.columns:
             time_col = 'Time' if 'Time' in df_raw.columns else 'Timestamp'
-            try:
-                df_raw[time_col] = pd.to_datetime(df_raw[time_col])
-                time_diffs = df_raw[time_col].diff().dt.total_seconds()
-                median_interval = time_diffs.median()
-                
-                # Zeitlücken-Schwellwert: Größer als Mindest-Gap UND 5x normales Intervall
-                gap_threshold = max(min_gap_duration, median_interval * gap_threshold_multiplier)
-                large_gaps = time_diffs > gap_threshold
-                
-                print(f"[Info] Normales GPS-Intervall: {median_interval:.1f}s, Erkenne Lücken > {gap_threshold:.0f}s")
-                
-                for i, is_gap in enumerate(large_gaps):
-                    if is_gap and i > 0:
-                        gap_duration = time_diffs.iloc[i]
-                        gap_km = df_raw.iloc[i-1]['Distanz (km)']
-                        
-                        # Filter: Nur Zeitlücken >= Mindestdauer
-                        if gap_duration >= min_pause_duration:
-                            time_based_pauses.append((i-1, i, gap_km, gap_duration, 'Zeitlücke'))
-                            print(f"[Info] Zeitlücke gefunden bei {gap_km:.1f} km: {gap_duration:.0f}s")
-                        else:
-                            print(f"[Debug] Kurze Zeitlücke ignoriert bei {gap_km:.1f} km: {gap_duration:.0f}s")
-            except Exception as e:
-                print(f"[Info] Zeitstempel-Verarbeitung fehlgeschlagen: {e}")
-                time_col = None
+            elapsed = elapsed_seconds(df_raw[time_col])
+            if np.isnan(elapsed).all():
+                print("[Info] Zeitstempel-Verarbeitung fehlgeschlagen, verwende geschätzte Intervalle")
+                elapsed = None
+            else:
+                # Zeitlücken-Schwellwert: Mindest-Gap UND 5x normales Intervall
+                time_based_pauses = time_gap_pauses(
+                    elapsed, df_raw['Distanz (km)'],
+                    min_gap_s=max(gap_min_duration, MIN_PAUSE_DURATION_S),
+                    median_multiplier=GAP_MEDIAN_MULTIPLIER
+                )
+                for gap_km, gap_duration in zip(time_based_pauses.start_km, time_based_pauses.duration_s):
+                    print(f"[Info] Zeitlücke gefunden bei {gap_km:.1f} km: {gap_duration:.0f}s")
         else:
             print("[Info] Keine Zeitstempel gefunden, verwende geschätzte Intervalle")
         
         # === GESCHWINDIGKEITS-BASIERTE PAUSEN SAMMELN ===
-        pause_blocks = []
-        in_pause = False
-        pause_start = None
-        
-        for i, is_pause in enumerate(speed_pause_mask):
-            if is_pause and not in_pause:
-                pause_start = i
-                in_pause = True
-            elif not is_pause and in_pause:
-                if i - pause_start >= min_pause_points:
-                    # Berechne Pausendauer
-                    if time_col and not df_raw.iloc[pause_start:i][time_col].isna().any():
-                        duration_seconds = (df_raw.iloc[i-1][time_col] - df_raw.iloc[pause_start][time_col]).total_seconds()
-                    else:
-                        duration_seconds = (i - pause_start) * avg_interval_seconds
-                    
-                    # Filter: Nur Pausen >= Mindestdauer
-                    if duration_seconds >= min_pause_duration:
-                        pause_km = df_raw.iloc[pause_start]['Distanz (km)']
-                        pause_blocks.append((pause_start, i-1, pause_km, duration_seconds, 'Geschwindigkeit'))
-                        print(f"[Debug] Geschwindigkeits-Pause bei {pause_km:.1f} km: {duration_seconds:.0f}s")
-                    else:
-                        print(f"[Debug] Kurze Geschwindigkeits-Pause ignoriert: {duration_seconds:.0f}s")
-                in_pause = False
-                
-        # Letzte Pause falls am Ende
-        if in_pause and len(df_raw) - pause_start >= min_pause_points:
-            if time_col and not df_raw.iloc[pause_start:][time_col].isna().any():
-                duration_seconds = (df_raw.iloc[-1][time_col] - df_raw.iloc[pause_start][time_col]).total_seconds()
-            else:
-                duration_seconds = (len(df_raw) - pause_start) * avg_interval_seconds
-            
-            # Filter: Nur Pausen >= Mindestdauer
-            if duration_seconds >= min_pause_duration:
-                pause_km = df_raw.iloc[pause_start]['Distanz (km)']
-                pause_blocks.append((pause_start, len(df_raw)-1, pause_km, duration_seconds, 'Geschwindigkeit'))
-                print(f"[Debug] End-Pause bei {pause_km:.1f} km: {duration_seconds:.0f}s")
-            else:
-                print(f"[Debug] Kurze End-Pause ignoriert: {duration_seconds:.0f}s")
-        
-        # ALLE PAUSEN KOMBINIEREN - HIER IST DER FIX!
-        all_pauses = pause_blocks + time_based_pauses
-        all_pauses.sort(key=lambda x: x[2])  # Sortiere nach km-Position
+        pause_blocks = speed_pauses(
+            df_raw[speed_col_to_plot], df_raw['Distanz (km)'], elapsed,
+            threshold_kmh=pause_threshold_speed, min_points=MIN_PAUSE_POINTS,
+            min_duration_s=MIN_PAUSE_DURATION_S, fallback_interval_s=FALLBACK_INTERVAL_S
+        )
+        for pause_km, duration_seconds in zip(pause_blocks.start_km, pause_blocks.duration_s):
+            print(f"[Debug] Geschwindigkeits-Pause bei {pause_km:.1f} km: {duration_seconds:.0f}s")
+        
+        # ALLE PAUSEN KOMBINIEREN (nach km-Position sortiert)
+        pause_intervals = pause_blocks.combine(time_based_pauses)
+        all_pauses = pause_intervals.to_records()
         
         # Pause-Detection-Performance-Metriken
         metadata['pause_detection_time_sec'] = round(time.time() - pause_detection_start, 3)
@@ -350,7 +312,7 @@ def plot_speed_profile(input_csv_path: str, output_png_path: str, smooth_window_
         metadata['total_pauses_detected'] = len(all_pauses)
         
         if all_pauses:
-            total_pause_time = sum(p[3] for p in all_pauses)
+            total_pause_time = pause_intervals.total_duration_s
             metadata['total_pause_time_sec'] = round(total_pause_time, 1)
             metadata['avg_pause_duration_sec'] = round(total_pause_time / len(all_pauses), 1)
         
@@ -409,10 +371,14 @@ def plot_speed_profile(input_csv_path: str, output_png_path: str, smooth_window_
             avg_speed = segment_df[speed_col_to_plot].mean()
             max_speed_segment = segment_df[speed_col_to_plot].max()
             segment_stats.append((i+1, start_km, end_km, avg_speed, max_speed_segment))
+
+            # Formerhaltend reduzierte Punkte nur für die Linien
+            plot_cols = [speed_col_to_plot] + (['Elevation (m)'] if 'Elevation (m)' in segment_df.columns else [])
+            plot_df, _ = downsample_for_plot(segment_df, 'Distanz (km)', plot_cols, PLOT_POINTS_PER_SEGMENT)
             
             # === GESCHWINDIGKEIT PLOTTEN ===
             color_speed = 'tab:red'  # Farbe für Geschwindigkeitslinie
-            axes[i].plot(segment_df['Distanz (km)'], segment_df[speed_col_to_plot], 
+            axes[i].plot(plot_df['Distanz (km)'], plot_df[speed_col_to_plot], 
                         color=color_speed, alpha=0.8, linewidth=1.5, label='Geschwindigkeit')
             
             # === PAUSEN MARKIEREN - NUR ZEITANGABEN MIT FARBEN ===
@@ -450,7 +416,7 @@ def plot_speed_profile(input_csv_path: str, output_png_path: str, smooth_window_
                 if '+' in pause_type:  # Kombinierte Pause (Geschwindigkeit + Zeitlücke)
                     color = 'purple'
                     segment_combined += 1
-                elif pause_type == 'Geschwindigkeit':
+                elif pause_type == PAUSE_TYPE_SPEED:
                     color = 'red'      # Geschwindigkeits-Pausen (≤ 2 km/h)
                     segment_pause_count += 1
                 else:  # Zeitlücke
@@ -520,9 +486,9 @@ def plot_speed_profile(input_csv_path: str, output_png_path: str, smooth_window_
                 y_min_elevation = segment_min_elevation - elevation_buffer
                 y_max_elevation = segment_max_elevation + elevation_buffer
                 
-                ax2.plot(segment_df['Distanz (km)'], segment_df['Elevation (m)'], 
+                ax2.plot(plot_df['Distanz (km)'], plot_df['Elevation (m)'], 
                         color=color_elevation, alpha=0.3, linewidth=1.0, linestyle='-')
-                ax2.fill_between(segment_df['Distanz (km)'], segment_df['Elevation (m)'], 
+                ax2.fill_between(plot_df['Distanz (km)'], plot_df['Elevation (m)'], 
                                 color=color_elevation, alpha=0.1)
                 
                 # CRITICAL: Set proper Y-axis limits for elevation
@@ -555,17 +521,17 @@ def plot_speed_profile(input_csv_path: str, output_png_path: str, smooth_window_
         # Berechne Gesamtstatistiken
         overall_avg = df_clean[speed_col_to_plot].mean()
         overall_max = df_clean[speed_col_to_plot].max()
-        speed_pauses = len([p for p in all_pauses if p[4] == 'Geschwindigkeit'])
-        time_gaps = len([p for p in all_pauses if p[4] == 'Zeitlücke'])
+        speed_pause_count = pause_intervals.count(PAUSE_TYPE_SPEED)
+        time_gaps = pause_intervals.count(PAUSE_TYPE_GAP)
         combined_pauses = len([p for p in all_pauses if '+' in p[4]])
         
         # Erstelle Statistik-Text basierend auf verfügbaren Pausentypen
         if combined_pauses > 0:
-            stats_text = f'Gesamtstrecke: {total_distance:.1f} km | Ø Geschwindigkeit: {overall_avg:.1f} km/h | Max: {overall_max:.1f} km/h | Pausen: {speed_pauses}P + {time_gaps}T + {combined_pauses}P+T'
+            stats_text = f'Gesamtstrecke: {total_distance:.1f} km | Ø Geschwindigkeit: {overall_avg:.1f} km/h | Max: {overall_max:.1f} km/h | Pausen: {speed_pause_count}P + {time_gaps}T + {combined_pauses}P+T'
         elif time_gaps > 0:
-            stats_text = f'Gesamtstrecke: {total_distance:.1f} km | Ø Geschwindigkeit: {overall_avg:.1f} km/h | Max: {overall_max:.1f} km/h | Pausen: {speed_pauses}P + {time_gaps}T'
+            stats_text = f'Gesamtstrecke: {total_distance:.1f} km | Ø Geschwindigkeit: {overall_avg:.1f} km/h | Max: {overall_max:.1f} km/h | Pausen: {speed_pause_count}P + {time_gaps}T'
         else:
-            stats_text = f'Gesamtstrecke: {total_distance:.1f} km | Ø Geschwindigkeit: {overall_avg:.1f} km/h | Max: {overall_max:.1f} km/h | Pausen: {speed_pauses}P'
+            stats_text = f'Gesamtstrecke: {total_distance:.1f} km | Ø Geschwindigkeit: {overall_avg:.1f} km/h | Max: {overall_max:.1f} km/h | Pausen: {speed_pause_count}P'
         
         # Layout-Parameter
         top_margin = 0.94      # Oberer Rand für Titel
@@ -666,6 +632,7 @@ if __name__ == "__main__":
     parser.add_argument("input_csv", help="Path to input CSV with speed data (from 2d).")
     parser.add_argument("output_png", help="Path to save the output PNG plot.")
     parser.add_argument("--smooth-col-name", default="", help="Name of the smoothed speed column to use (e.g., 'Geschwindigkeit geglättet (km/h, W5)'). Optional.")
+    parser.add_argument("--gap-min-duration", type=float, default=GAP_MIN_DURATION_S, help="Minimum time gap in seconds counted as a pause (default: 60).")
     args = parser.parse_args()
     
-    plot_speed_profile(args.input_csv, args.output_png, args.smooth_col_name)
+    plot_speed_profile(args.input_csv, args.output_png, args.smooth_col_name, args.gap_min_duration)
@@ -9,9 +9,9 @@ Uses Overpass API to query OSM data with significant performance improvements.
 
 # === SCRIPT METADATA ===
 SCRIPT_NAME = "4b_fetch_surface_grouped_SQLiteCache.py"
-SCRIPT_VERSION = "3.0.1"  # Fixed version
+SCRIPT_VERSION = "3.1.0"
 SCRIPT_DESCRIPTION = "SQLite-cached surface data fetching with Overpass API integration and standardized metadata"
-LAST_UPDATED = "2025-06-08"
+LAST_UPDATED = "2026-10-19"
 AUTHOR = "Markus"
 CONFIG_COMPATIBILITY = "2.1"
 
@@ -21,6 +21,7 @@ v2.0.0 (pre-2025): SQLite cache integration for performance optimization
 v2.1.0 (2025-06-07): Standardized header, improved error handling and logging
 v3.0.0 (2025-06-07): Implemented full standardized metadata system with processing history
 v3.0.1 (2025-06-08): Fixed import issues and restored missing functionality
+v3.1.0 (2026-10-19): Overpass pacing shared across parallel jobs via ApiRateBroker.py (replaces fixed sleep), identical in-flight queries deduplicated
 """
 
 # === SCRIPT CONFIGURATION ===
@@ -52,6 +53,8 @@ from datetime import datetime
 import logging
 from pathlib import Path
 
+from ApiRateBroker import api_request, claim, release_claim, throttled
+
 # SQLite Cache System imports
 try:
     from SQLiteSurfaceCache import SQLiteSurfaceCache, SurfaceResult
@@ -92,7 +95,6 @@ except ImportError:
 # --- Konfiguration ---
 OVERPASS_API_URL = "https://overpass-api.de/api/interpreter"
 REQUEST_TIMEOUT = 60
-SLEEP_BETWEEN_REQUESTS = 1.1
 RETRY_DELAY = 5
 MAX_RETRIES = 3
 RELEVANT_HIGHWAY_TYPES = ["primary", "secondary", "tertiary", "unclassified", "residential", "living_street", "service", "track", "cycleway", "path", "bridleway", "footway"]
@@ -357,6 +359,17 @@ def fetch_surface_data_with_sqlite_cache(
                 tolerance_km=cache_tolerance_km
             )
 
+        # Gleiche Abfrage gerade in einem parallelen Job? Dann abwarten und Cache erneut lesen
+        claim_key = None
+        if not cached_result and not force_api:
+            claim_key = f"surface:{lat_query:.5f},{lon_query:.5f},{query_radius_m}"
+            if not claim("overpass", claim_key):
+                claim_key = None
+                cached_result = cache.find_cached_surface(
+                    lat_query, lon_query, query_radius_m,
+                    tolerance_km=cache_tolerance_km
+                )
+
         if cached_result:
             # Cache-Hit
             surface_data_for_blocks[current_block_id] = {
@@ -379,7 +392,8 @@ def fetch_surface_data_with_sqlite_cache(
             query_successful = False
             for attempt_num in range(MAX_RETRIES):
                 try:
-                    api_result = api.query(overpass_query_str)
+                    with api_request("overpass"):  # Takt und Slots gelten für alle parallelen Jobs
+                        api_result = api.query(overpass_query_str)
                     query_successful = True
 
                     if not api_result.ways:
@@ -413,14 +427,12 @@ def fetch_surface_data_with_sqlite_cache(
                     surface_data_for_blocks[current_block_id] = result_dict
                     
                     logger.debug(f"API success for block {current_block_id}: {result_dict.get('surface')}")
-                    
-                    time.sleep(SLEEP_BETWEEN_REQUESTS)
                     break
 
                 except overpy.exception.OverpassTooManyRequests:
                     wait = RETRY_DELAY * (attempt_num + 2)
                     logger.warning(f"Rate Limit für Block {current_block_id} (Versuch {attempt_num + 1}/{MAX_RETRIES}). Warte {wait}s...")
-                    time.sleep(wait)
+                    throttled("overpass", wait)  # Pause gilt für alle Jobs; der nächste api_request wartet sie ab
                 except Exception as e:
                     logger.error(f"Fehler bei Block {current_block_id} (Versuch {attempt_num + 1}/{MAX_RETRIES}): {e}")
                     time.sleep(RETRY_DELAY)
@@ -428,6 +440,8 @@ def fetch_surface_data_with_sqlite_cache(
             if not query_successful:
                 api_query_errors += 1
                 surface_data_for_blocks[current_block_id] = {"surface": DEFAULT_SURFACE, "highway": "api_query_failed"}
+            if claim_key:
+                release_claim("overpass", claim_key)
 
         # Track-Point in Datenbank speichern
         try:
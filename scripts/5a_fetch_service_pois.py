@@ -9,9 +9,9 @@ from the Overpass API based on points from a simplified track CSV.
 
 # === SCRIPT METADATA ===
 SCRIPT_NAME = "5a_fetch_service_pois.py"
-SCRIPT_VERSION = "2.0.0"
+SCRIPT_VERSION = "2.1.0"
 SCRIPT_DESCRIPTION = "Service POI fetching from Overpass API with sampling, error handling and standardized metadata"
-LAST_UPDATED = "2025-06-07"
+LAST_UPDATED = "2026-10-19"
 AUTHOR = "Markus"
 CONFIG_COMPATIBILITY = "2.1"
 
@@ -20,6 +20,7 @@ CHANGELOG = """
 v1.0.0 (pre-2025): Initial version with basic POI fetching functionality
 v1.1.0 (2025-06-07): Standardized header, improved error handling and elevation parsing
 v2.0.0 (2025-06-07): Implemented full standardized metadata system with processing history
+v2.1.0 (2026-10-19): Overpass pacing shared across parallel jobs via ApiRateBroker.py (replaces fixed sleep)
 """
 
 # === SCRIPT CONFIGURATION ===
@@ -47,6 +48,8 @@ from datetime import datetime
 from pathlib import Path
 from geopy.distance import geodesic # For sampling distance calculation
 
+from ApiRateBroker import api_request, throttled
+
 # Import Metadaten-System
 sys.path.append(str(Path(__file__).parent.parent / "project_management"))
 from CSV_METADATA_TEMPLATE import write_csv_with_metadata
@@ -153,7 +156,8 @@ def fetch_service_pois(input_csv_path: str, output_csv_path: str, radius_m: int,
             while attempts < max_attempts and not success:
                 try:
                     # print(f"DEBUG Query:\n{query}") # Optional Debug
-                    result = api.query(query) # Verwende die formatierte Query
+                    with api_request("overpass"):  # Takt und Slots gelten für alle parallelen Jobs
+                        result = api.query(query) # Verwende die formatierte Query
                     success = True
                     api_metadata["api_successful_queries"] += 1
 
@@ -189,12 +193,11 @@ def fetch_service_pois(input_csv_path: str, output_csv_path: str, radius_m: int,
                         })
 
                     last_query_coord = current_coord
-                    time.sleep(1) # Be nice to the API
 
                 except overpy.exception.OverpassTooManyRequests:
                     wait_time = 5 * (attempts + 1)
                     print(f" Rate Limit erreicht bei Punkt {idx}. Warte {wait_time}s...")
-                    time.sleep(wait_time)
+                    throttled("overpass", wait_time)  # Pause gilt für alle Jobs
                     attempts += 1
                 except overpy.exception.OverpassGatewayTimeout:
                      wait_time = 5 * (attempts + 1)
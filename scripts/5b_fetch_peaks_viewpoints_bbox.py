@@ -10,9 +10,9 @@ Saves results to a JSON file with detailed performance tracking.
 
 # === SCRIPT METADATA ===
 SCRIPT_NAME = "5b_fetch_peaks_viewpoints_bbox.py"
-SCRIPT_VERSION = "2.0.0"
+SCRIPT_VERSION = "2.2.0"
 SCRIPT_DESCRIPTION = "Bbox-based peaks and viewpoints fetching from Overpass API with performance tracking"
-LAST_UPDATED = "2025-06-07"
+LAST_UPDATED = "2026-10-19"
 AUTHOR = "Markus"
 CONFIG_COMPATIBILITY = "2.1"
 
@@ -21,6 +21,8 @@ CHANGELOG = """
 v1.0.0 (pre-2025): Initial version with basic bbox querying functionality
 v1.1.0 (2025-06-07): Standardized header, improved error handling and coordinate validation
 v2.0.0 (2025-06-07): Enhanced metadata system with API performance tracking and detailed processing metrics
+v2.1.0 (2026-10-19): "metadata" also in the regular JSON output and recorded in the stage metadata index (StageMetadataIndex.py)
+v2.2.0 (2026-10-19): Overpass request paced across parallel jobs via ApiRateBroker.py, wait time tracked separately
 """
 
 # === SCRIPT CONFIGURATION ===
@@ -61,6 +63,9 @@ import time
 import pandas as pd
 from datetime import datetime
 
+from ApiRateBroker import api_request, throttled
+from StageMetadataIndex import record_output_metadata
+
 OVERPASS_URL = "http://overpass-api.de/api/interpreter"
 
 # === PERFORMANCE TRACKING GLOBALS ===
@@ -72,6 +77,7 @@ processing_stats = {
     'elements_found': 0,
     'bbox_calculation_time': 0,
     'api_response_time': 0,
+    'api_wait_time': 0,
     'processing_stages': {}
 }
 
@@ -118,6 +124,7 @@ def save_performance_metadata(output_json_path: str, metadata: dict):
         'api_requests_successful': processing_stats['api_success'],
         'api_requests_failed': processing_stats['api_errors'],
         'api_response_time_seconds': round(processing_stats['api_response_time'], 2),
+        'api_wait_time_seconds': round(processing_stats['api_wait_time'], 2),
         'bbox_calculation_time_seconds': round(processing_stats['bbox_calculation_time'], 2),
         'elements_found': processing_stats['elements_found'],
         'bbox_buffer_degrees': metadata.get('buffer_degrees', DEFAULT_BUFFER_DEGREES),
@@ -195,6 +202,7 @@ def fetch_peaks_viewpoints(input_gpx_path: str, output_json_path: str, buffer_de
                 os.makedirs(output_dir, exist_ok=True)
             with open(output_json_path, 'w', encoding='utf-8') as f:
                 json.dump(output_data, f, indent=2)
+            record_output_metadata(output_json_path, metadata, SCRIPT_NAME)
             print(f"[OK] Leere JSON gespeichert: {output_json_path}")
             save_performance_metadata(output_json_path, metadata)
         except Exception as e:
@@ -245,7 +253,19 @@ def fetch_peaks_viewpoints(input_gpx_path: str, output_json_path: str, buffer_de
     processing_stats['api_requests'] += 1
     
     try:
-        response = requests.post(OVERPASS_URL, data={'data': query}, timeout=API_TIMEOUT)
+        # Takt und Slots gelten für alle parallelen Jobs; die Wartezeit zählt nicht zur Antwortzeit
+        for attempt in range(2):
+            with api_request("overpass") as waited:
+                processing_stats['api_wait_time'] += waited
+                api_start += waited
+                response = requests.post(OVERPASS_URL, data={'data': query}, timeout=API_TIMEOUT)
+            if response.status_code != 429 or attempt:
+                break
+            # Pause gilt für alle Jobs; danach genau ein zweiter Versuch
+            retry_after = response.headers.get('Retry-After', '')
+            pause_s = int(retry_after) if retry_after.isdigit() else 30
+            print(f"[Warnung] Overpass Rate Limit (429), neuer Versuch in {pause_s}s")
+            throttled("overpass", pause_s)
         response.raise_for_status()
         data = response.json()
         elements = data.get("elements", [])
@@ -277,7 +297,8 @@ def fetch_peaks_viewpoints(input_gpx_path: str, output_json_path: str, buffer_de
     stage_start = time.time()
     output_data = {
         "bbox_used": list(bbox),
-        "elements": []
+        "elements": [],
+        "metadata": metadata
     }
     
     peaks_count = 0
@@ -326,6 +347,7 @@ def fetch_peaks_viewpoints(input_gpx_path: str, output_json_path: str, buffer_de
             os.makedirs(output_dir, exist_ok=True)
         with open(output_json_path, 'w', encoding='utf-8') as f:
             json.dump(output_data, f, indent=2, ensure_ascii=False)
+        record_output_metadata(output_json_path, metadata, SCRIPT_NAME)
         print(f"[OK] {len(output_data['elements'])} Peaks/Viewpoints gespeichert: {output_json_path}")
         
         # Save performance metadata
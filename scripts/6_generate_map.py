@@ -11,9 +11,9 @@ Generates an interactive Folium map displaying:
 
 # === SCRIPT METADATA ===
 SCRIPT_NAME = "6_generate_map.py"
-SCRIPT_VERSION = "3.1.0"
+SCRIPT_VERSION = "3.2.0"
 SCRIPT_DESCRIPTION = "Interactive Folium map generation with integrated metadata system"
-LAST_UPDATED = "2025-06-15"
+LAST_UPDATED = "2026-10-19"
 AUTHOR = "Markus"
 CONFIG_COMPATIBILITY = "2.1"
 
@@ -27,6 +27,8 @@ v3.1.0 (2025-06-15): Integrated unified metadata system - no more external metad
 - Removed separate metadata CSV file creation
 - Unified with CSV_METADATA_TEMPLATE system
 - Embedded metadata directly into HTML as comments
+v3.2.0 (2026-10-19): Surface route as one GeoJSON layer (one MultiLineString per surface, RouteGeoJSON.py),
+reduced points as one canvas-rendered GeoJSON layer instead of one Leaflet layer per block/point
 """
 
 # === SCRIPT CONFIGURATION ===
@@ -56,6 +58,7 @@ from pathlib import Path
 # Import Metadaten-System
 sys.path.append(str(Path(__file__).parent.parent / "project_management"))
 from CSV_METADATA_TEMPLATE import write_csv_with_metadata
+from RouteGeoJSON import SURFACE_COLOR_MAP, normalize_surfaces, points_geojson, surface_route_geojson
 
 # === FUNCTIONS ===
 
@@ -67,26 +70,7 @@ def print_script_info():
     print(f"Config Compatibility: {CONFIG_COMPATIBILITY}")
     print("=" * 50)
 
-# Farbschema für Oberflächen
-SURFACE_COLOR_MAP = {
-    "asphalt": "black",
-    "paved": "#555555", # Dunkelgrau für generisches Paved
-    "concrete": "dimgray",
-    "compacted": "#A0522D",  # Sienna (Verdichtet)
-    "fine_gravel": "#D2B48C",  # Tan (Feiner Schotter)
-    "gravel": "#BC8F8F",  # RosyBrown (Schotter)
-    "unpaved": "#8B4513",  # SaddleBrown (Unbefestigt)
-    "ground": "#556B2F",  # DarkOliveGreen (Erdboden)
-    "dirt": "#9B7653", # Helleres Braun für Dirt
-    "sand": "#F4A460",  # SandyBrown
-    "grass": "#228B22",  # ForestGreen
-    "wood": "#DEB887",  # BurlyWood
-    "paving_stones": "#483D8B", # DarkSlateBlue
-    "sett": "#6A5ACD", # SlateBlue
-    "cobblestone": "#708090", # SlateGray
-    "unknown": "lightgray", # Fallback für Unbekannt
-    "default": "red" # Fallback für nicht gemappte Oberflächen
-}
+# Farbschema für Oberflächen: SURFACE_COLOR_MAP aus RouteGeoJSON.py (gemeinsam mit Schritt 10)
 
 def save_metadata_to_html(html_path: str, metadata: dict, input_files: list):
     """Embed metadata as HTML comments in the generated map file."""
@@ -286,71 +270,45 @@ def generate_map(track_csv_path: str, pois_csv_path: str,
 
     center_lat = track_df['Latitude'].mean()
     center_lon = track_df['Longitude'].mean()
-    m = folium.Map(location=[center_lat, center_lon], zoom_start=12, tiles="OpenStreetMap")
+    # prefer_canvas: Linien und Kreis-Marker landen in einem Canvas statt in tausenden SVG-Elementen
+    m = folium.Map(location=[center_lat, center_lon], zoom_start=12, tiles="OpenStreetMap", prefer_canvas=True)
 
     # Add Track PolyLine
-    track_coords = track_df[['Latitude', 'Longitude']].values.tolist()
+    track_coords = track_df[['Latitude', 'Longitude']].round(6).values.tolist()
     folium.PolyLine(locations=track_coords, color='blue', weight=3, opacity=0.7, tooltip="Route").add_to(m)
 
-    # --- NEU: Farbkodierte OPTIMIERTE Route basierend auf Oberfläche ---
+    # --- Farbkodierte OPTIMIERTE Route: eine GeoJSON-Ebene, ein MultiLineString je Oberfläche ---
     if not df_surface_route.empty:
         surface_route_group = folium.FeatureGroup(name="Route nach Oberfläche (optimiert)", show=True).add_to(m)
-        
-        current_segment_coords = []
-        last_surface_val = None
-        # Wichtig: df_surface_route muss nach 'original_index' oder einer anderen Sequenz sortiert sein!
-        # Der Output von 4b sollte bereits in der korrekten Reihenfolge der optimierten Route sein.
-        
-        # Bereinige NaN in Surface, falls vorhanden
-        df_surface_route['Surface'].fillna('unknown', inplace=True)
-
-        for _, row in df_surface_route.iterrows():
-            current_latlon = [row["Latitude"], row["Longitude"]]
-            current_surface_val = str(row.get("Surface", "unknown")).lower()
-
-            if last_surface_val is None: # Erster Punkt des Tracks
-                last_surface_val = current_surface_val
-                current_segment_coords.append(current_latlon)
-            elif current_surface_val == last_surface_val: # Gleiche Oberfläche
-                current_segment_coords.append(current_latlon)
-            else: # Oberflächenwechsel
-                if len(current_segment_coords) >= 2:
-                    color = SURFACE_COLOR_MAP.get(last_surface_val, SURFACE_COLOR_MAP['default'])
-                    folium.PolyLine(
-                        locations=current_segment_coords,
-                        color=color,
-                        weight=5, # Etwas dicker, um sie gut zu sehen
-                        opacity=0.9,
-                        tooltip=f"Oberfläche: {last_surface_val}"
-                    ).add_to(surface_route_group)
-                
-                # Neues Segment starten
-                # Wichtig: Der letzte Punkt des alten Segments ist der erste des neuen
-                current_segment_coords = [current_segment_coords[-1], current_latlon] 
-                last_surface_val = current_surface_val
-        
-        # Das letzte Segment zeichnen
-        if len(current_segment_coords) >= 2:
-            color = SURFACE_COLOR_MAP.get(last_surface_val, SURFACE_COLOR_MAP['default'])
-            folium.PolyLine(
-                locations=current_segment_coords,
-                color=color,
-                weight=5,
-                opacity=0.9,
-                tooltip=f"Oberfläche: {last_surface_val}"
-            ).add_to(surface_route_group)
-
-    # --- NEU: Add Markers for Reduced Track Points ---
+        # Wichtig: Der Output von 4b ist bereits in der Reihenfolge der optimierten Route.
+        # Blöcke enden am ersten Punkt des nächsten Blocks, damit die Linie lückenlos bleibt.
+        df_surface_route['Surface'] = normalize_surfaces(df_surface_route['Surface'])
+        surface_geojson = surface_route_geojson(
+            df_surface_route['Latitude'], df_surface_route['Longitude'], df_surface_route['Surface'],
+            SURFACE_COLOR_MAP, SURFACE_COLOR_MAP['default']
+        )
+        map_metadata["surface_segments"] = sum(f['properties']['segments'] for f in surface_geojson['features'])
+        folium.GeoJson(
+            surface_geojson,
+            name="Oberflächen",
+            style_function=lambda feature: {
+                'color': feature['properties']['color'], 'weight': 5, 'opacity': 0.9
+            },
+            tooltip=folium.GeoJsonTooltip(fields=['surface'], aliases=['Oberfläche:'])
+        ).add_to(surface_route_group)
+
+    # --- Reduzierte Track-Punkte als eine Canvas-Punktebene ---
     if not reduced_points_df.empty:
         reduced_points_group = folium.FeatureGroup(name="Reduzierte Punkte (API-Optimierung)", show=True).add_to(m)
         print(f"[Info] Füge {len(reduced_points_df)} Marker für reduzierte Punkte hinzu...")
-        for idx, row in reduced_points_df.iterrows():
-            folium.CircleMarker(
-                location=[row["Latitude"], row["Longitude"]],
-                radius=2, color='orange', fill=True, fill_color='yellow',
-                stroke=True, weight=1,
-                fill_opacity=0.8, tooltip=f"Reduzierter Punkt {idx}"
-            ).add_to(reduced_points_group)
+        folium.GeoJson(
+            points_geojson(reduced_points_df["Latitude"], reduced_points_df["Longitude"],
+                           {'punkt': reduced_points_df.index}),
+            name="Reduzierte Punkte",
+            marker=folium.CircleMarker(radius=2, color='orange', fill=True, fill_color='yellow',
+                                       stroke=True, weight=1, fill_opacity=0.8),
+            tooltip=folium.GeoJsonTooltip(fields=['punkt'], aliases=['Reduzierter Punkt'])
+        ).add_to(reduced_points_group)
     # -----------------------------------------------
 
     # Add POIs with specific styling
@@ -422,13 +380,14 @@ def generate_map(track_csv_path: str, pois_csv_path: str,
             'track_points_count': len(track_df),
             'pois_count': len(pois_df) if not pois_df.empty else 0,
             'reduced_points_count': len(reduced_points_df) if not reduced_points_df.empty else 0,
-            'surface_segments_count': len(df_surface_route) if not df_surface_route.empty else 0,
+            'surface_segments_count': map_metadata["surface_segments"],
+            'surface_points_count': len(df_surface_route) if not df_surface_route.empty else 0,
             'has_surface_visualization': not df_surface_route.empty,
             'surface_types_count': df_surface_route['Surface'].nunique() if not df_surface_route.empty else 0,
             'output_html_file': os.path.basename(output_html_path),
             'output_html_size_kb': os.path.getsize(output_html_path) / 1024 if os.path.exists(output_html_path) else 0,
             'processing_duration_seconds': (datetime.now() - run_start_time).total_seconds(),
-            'folium_features_used': 'PolyLine, MarkerCluster, CircleMarker, LayerControl',
+            'folium_features_used': 'PolyLine, GeoJson (surface MultiLineStrings, canvas points), MarkerCluster, CircleMarker, LayerControl',
             'map_tile_provider': 'OpenStreetMap',
             'poi_clustering_enabled': True,
             'data_quality': 'high' if not track_df.empty and len(track_df) > 10 else 'low'
@@ -4,16 +4,19 @@
 8b_geocode_places.py
 --------------------
 Reads a CSV file with a sorted list of place names (output of step 8).
-Performs forward geocoding for each place name using Nominatim to find
-its coordinates (latitude, longitude). Handles API rate limits and errors.
+Performs forward geocoding for each place name to find its coordinates
+(latitude, longitude). Place names are first looked up in a SQLite place
+cache that is pre-seeded with the centroids of the reverse geocoding hits
+from step 4; only unseen names are sent to Nominatim (rate limited, with
+retries). New Nominatim answers are written back to the cache.
 Saves the results with detailed performance tracking and metadata.
 """
 
 # === SCRIPT METADATA ===
 SCRIPT_NAME = "8b_geocode_places.py"
-SCRIPT_VERSION = "2.0.1"
-SCRIPT_DESCRIPTION = "Forward geocoding of place names with Nominatim API, rate limiting and performance tracking"
-LAST_UPDATED = "2025-06-08"
+SCRIPT_VERSION = "2.2.0"
+SCRIPT_DESCRIPTION = "Forward geocoding of place names with SQLite place cache, Nominatim fallback and performance tracking"
+LAST_UPDATED = "2026-10-19"
 AUTHOR = "Markus"
 CONFIG_COMPATIBILITY = "2.1"
 
@@ -23,12 +26,15 @@ v1.0.0 (pre-2025): Initial version with basic forward geocoding functionality
 v1.1.0 (2025-06-07): Standardized header, improved error handling and retry logic
 v2.0.0 (2025-06-07): Enhanced metadata system with comprehensive API performance tracking and success rate monitoring
 v2.0.1 (2025-06-08): Fixed CSV reading to handle metadata headers with comment='#'
+v2.1.0 (2026-10-18): SQLite place cache keyed by normalized name + country context, seeded from step 4 reverse geocoding cache
+v2.2.0 (2026-10-19): Nominatim pacing shared across parallel jobs via ApiRateBroker.py (replaces sleep after each request), identical in-flight lookups deduplicated
 """
 
 # === SCRIPT CONFIGURATION ===
 DEFAULT_CONFIG_SECTION = "place_geocoding"
 INPUT_FILE_PATTERN = "*_significant_places.csv"
 OUTPUT_FILE_PATTERN = "*_places_geocoded.csv"
+DEFAULT_CACHE_DB = "output/SQLliteDB/geocoding_cache.db"
 
 # === DEPENDENCIES ===
 PYTHON_VERSION_MIN = "3.8"
@@ -42,7 +48,7 @@ REQUIRED_PACKAGES = [
 API_SERVICE = "Nominatim"
 API_USER_AGENT = "gpx_workflow_v2_place_geocoder"
 API_TIMEOUT = 15
-RATE_LIMIT_DELAY = 1.1  # Nominatim Policy: max 1 req/sec
+RATE_LIMIT_DELAY = 1.1  # Nominatim Policy: max 1 req/sec (durchgesetzt von ApiRateBroker.py, api_broker.services)
 RETRY_DELAY = 5
 MAX_RETRIES = 3
 
@@ -60,6 +66,8 @@ from geopy.exc import GeocoderTimedOut, GeocoderServiceError, GeocoderQuotaExcee
 import time
 from tqdm import tqdm
 from datetime import datetime
+from SQLitePlaceCache import SQLitePlaceCache
+from ApiRateBroker import api_request, claim, release_claim, throttled
 
 # === PERFORMANCE TRACKING GLOBALS ===
 geocoding_stats = {
@@ -73,6 +81,9 @@ geocoding_stats = {
     'api_service_errors': 0,
     'total_retry_attempts': 0,
     'context_queries': 0,
+    'cache_hits': 0,
+    'cache_misses': 0,
+    'cache_seeded_places': 0,
     'processing_stages': {}
 }
 
@@ -136,6 +147,10 @@ def save_performance_metadata(output_csv_path: str, metadata: dict):
         'max_retries_per_place': MAX_RETRIES,
         'context_added': metadata.get('context_added', False),
         'context_queries': geocoding_stats['context_queries'],
+        'cache_db': metadata.get('cache_db', ''),
+        'cache_hits': geocoding_stats['cache_hits'],
+        'cache_misses': geocoding_stats['cache_misses'],
+        'cache_seeded_places': geocoding_stats['cache_seeded_places'],
         'unique_places_input': metadata.get('unique_places', 0),
         'duplicate_places_skipped': metadata.get('duplicates_skipped', 0),
         'invalid_places_filtered': metadata.get('invalid_places', 0),
@@ -148,7 +163,8 @@ def save_performance_metadata(output_csv_path: str, metadata: dict):
     df.to_csv(base_path, index=False, encoding='utf-8', float_format='%.3f')
     print(f"[Metadata] Geocoding performance data saved: {base_path}")
 
-def geocode_places(input_csv_path: str, output_csv_path: str, context: str = None):
+def geocode_places(input_csv_path: str, output_csv_path: str, context: str = None,
+                   cache_db_path: str = DEFAULT_CACHE_DB, force_api: bool = False):
     """
     Performs forward geocoding for places listed in the input CSV.
 
@@ -157,6 +173,8 @@ def geocode_places(input_csv_path: str, output_csv_path: str, context: str = Non
         output_csv_path: Path to save the output CSV with coordinates.
         context: Optional context string (e.g., ", Country Name") to add
                  to the query for better results.
+        cache_db_path: SQLite database shared with the reverse geocoding cache (step 4).
+        force_api: Ignore cached places and query Nominatim for every name.
     """
     geocoding_stats['start_time'] = time.time()
     print(f"[Info] Geocoding places from: {input_csv_path}")
@@ -166,7 +184,8 @@ def geocode_places(input_csv_path: str, output_csv_path: str, context: str = Non
         'context_added': bool(context),
         'unique_places': 0,
         'duplicates_skipped': 0,
-        'invalid_places': 0
+        'invalid_places': 0,
+        'cache_db': cache_db_path
     }
 
     # --- Lade Input-CSV ---
@@ -223,19 +242,52 @@ def geocode_places(input_csv_path: str, output_csv_path: str, context: str = Non
         'invalid_filtered': metadata['invalid_places']
     })
 
+    # --- Initialisiere Place-Cache (vorbefüllt aus Schritt 4) ---
+    stage_start = time.time()
+    place_cache = SQLitePlaceCache(cache_db_path)
+    geocoding_stats['cache_seeded_places'] = place_cache.seed_from_reverse_geocoding()
+    print(f"[Info] Place-Cache: {cache_db_path} ({geocoding_stats['cache_seeded_places']} Orte aus Reverse-Geocoding-Cache übernommen)")
+    log_stage("place_cache_seeding", time.time() - stage_start, place_cache.get_cache_statistics())
+
     # --- Initialisiere Geocoder ---
     geolocator = Nominatim(user_agent=API_USER_AGENT)
 
     # --- Geocoding durchführen ---
     results = []
-    print("[Info] Starte Forward Geocoding (beachte API Limits!)...")
+    print("[Info] Starte Forward Geocoding (Cache zuerst, dann Nominatim - beachte API Limits!)...")
     
     geocoding_start = time.time()
     for place_name in tqdm(valid_places, desc="Geocoding Places"):
         geocoding_stats['places_processed'] += 1
         lat, lon = None, None
         place_start_time = time.time()
-        
+
+        cached_place = None if force_api else place_cache.find_place(place_name, context)
+        # Gleicher Ort gerade in einem parallelen Job angefragt? Dann abwarten und Cache erneut lesen
+        claim_key = None
+        if cached_place is None and not force_api:
+            claim_key = f"geocode:{place_name}|{context or ''}"
+            if not claim("nominatim", claim_key):
+                claim_key = None
+                cached_place = place_cache.find_place(place_name, context)
+        if cached_place is not None:
+            geocoding_stats['cache_hits'] += 1
+            if cached_place.found:
+                lat, lon = cached_place.latitude, cached_place.longitude
+                geocoding_stats['places_successful'] += 1
+                print(f"  -> Cache ({cached_place.source}): {place_name} -> ({lat:.4f}, {lon:.4f})")
+            else:
+                geocoding_stats['places_failed'] += 1
+                print(f"  -> Cache: {place_name} war bereits zuvor nicht auffindbar")
+            results.append({
+                "Ort": place_name,
+                "Latitude_Center": lat,
+                "Longitude_Center": lon
+            })
+            continue
+
+        geocoding_stats['cache_misses'] += 1
+        api_answered = False
         full_query = f"{place_name}{context if context else ''}"
         if context:
             geocoding_stats['context_queries'] += 1
@@ -245,7 +297,9 @@ def geocode_places(input_csv_path: str, output_csv_path: str, context: str = Non
             location = None
             
             try:
-                location = geolocator.geocode(full_query, timeout=API_TIMEOUT)
+                with api_request("nominatim"):  # Takt gilt für alle parallelen Jobs
+                    location = geolocator.geocode(full_query, timeout=API_TIMEOUT)
+                api_answered = True
                 if location:
                     lat = location.latitude
                     lon = location.longitude
@@ -256,9 +310,6 @@ def geocode_places(input_csv_path: str, output_csv_path: str, context: str = Non
                     if attempt == MAX_RETRIES - 1:
                         geocoding_stats['places_failed'] += 1
                         print(f"  -> !! Nicht gefunden: {place_name} (nach {MAX_RETRIES} Versuchen)")
-                
-                # Warte nach JEDER Anfrage
-                time.sleep(RATE_LIMIT_DELAY)
 
             except GeocoderTimedOut:
                 geocoding_stats['api_timeouts'] += 1
@@ -269,7 +320,7 @@ def geocode_places(input_csv_path: str, output_csv_path: str, context: str = Non
                 geocoding_stats['api_quota_exceeded'] += 1
                 geocoding_stats['total_retry_attempts'] += 1
                 print(f"  -> !! Quota überschritten für {place_name} (Versuch {attempt+1}/{MAX_RETRIES}). Warte länger...")
-                time.sleep(RETRY_DELAY * 5)
+                throttled("nominatim", RETRY_DELAY * 5)  # Pause gilt für alle Jobs
             except GeocoderServiceError as e:
                 geocoding_stats['api_service_errors'] += 1
                 geocoding_stats['total_retry_attempts'] += 1
@@ -280,6 +331,12 @@ def geocode_places(input_csv_path: str, output_csv_path: str, context: str = Non
                 print(f"  -> !! Unerwarteter Fehler für {place_name} (Versuch {attempt+1}/{MAX_RETRIES}): {e}. Warte {RETRY_DELAY}s...")
                 time.sleep(RETRY_DELAY)
 
+        # Nur echte API-Antworten cachen (Netzwerkfehler sollen erneut versucht werden)
+        if api_answered:
+            place_cache.cache_place(place_name, lat, lon, context=context)
+        if claim_key:
+            release_claim("nominatim", claim_key)
+
         # Speichere Ergebnis (auch wenn Lat/Lon None sind)
         results.append({
             "Ort": place_name,
@@ -290,8 +347,12 @@ def geocode_places(input_csv_path: str, output_csv_path: str, context: str = Non
     log_stage("geocoding_process", time.time() - geocoding_start, {
         'places_processed': geocoding_stats['places_processed'],
         'successful': geocoding_stats['places_successful'],
-        'failed': geocoding_stats['places_failed']
+        'failed': geocoding_stats['places_failed'],
+        'cache_hits': geocoding_stats['cache_hits'],
+        'cache_misses': geocoding_stats['cache_misses']
     })
+    print(f"[Info] Place-Cache: {geocoding_stats['cache_hits']} Treffer, {geocoding_stats['cache_misses']} Nominatim-Abfragen")
+    place_cache.close()
 
     # --- Ergebnisse speichern ---
     save_start = time.time()
@@ -327,6 +388,9 @@ if __name__ == "__main__":
     parser.add_argument("--input-csv", required=True, help="Path to the sorted places CSV file (output of step 8).")
     parser.add_argument("--output-csv", required=True, help="Path to save the output CSV file with coordinates.")
     parser.add_argument("--context", default="", help="Optional context (e.g., ', Country') to add to geocoding query.")
+    parser.add_argument("--cache-db", default=DEFAULT_CACHE_DB, help="Path to SQLite cache database (shared with step 4 reverse geocoding).")
+    parser.add_argument("--force-api", action="store_true", help="Force API calls, ignore cached places.")
     args = parser.parse_args()
 
-    geocode_places(args.input_csv, args.output_csv, args.context)
+    geocode_places(args.input_csv, args.output_csv, args.context,
+                   cache_db_path=args.cache_db, force_api=args.force_api)
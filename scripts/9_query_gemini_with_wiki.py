@@ -7,6 +7,11 @@ Liest die sortierte Ortsliste (CSV aus Schritt 8).
 Optional: Sucht passende Wikipedia-Artikel.
 Fragt die Gemini API für jeden Ort an, um eine radfahrerspezifische
 Beschreibung zu generieren (optional unter Verwendung von Wiki-Infos).
+Wiki- und Gemini-Abrufe laufen nebenläufig mit Ratenlimit je Dienst
+(AsyncDescriptionFetcher) und werden persistent gecacht
+(SQLiteDescriptionCache), sodass Reruns keine API-Aufrufe mehr brauchen.
+Optional (--batch-size > 1) werden mehrere Orte in einem Prompt mit
+JSON-Antwort gebündelt.
 Speichert das Ergebnis als Markdown-Datei.
 """
 
@@ -14,9 +19,9 @@ from __future__ import annotations  # Wichtig für Type Annotations
 
 # === SCRIPT METADATA ===
 SCRIPT_NAME = "9_query_gemini_with_wiki.py"
-SCRIPT_VERSION = "3.0.0"
+SCRIPT_VERSION = "3.2.0"
 SCRIPT_DESCRIPTION = "AI-powered place descriptions using Gemini API with Wikipedia integration, token tracking and standardized metadata"
-LAST_UPDATED = "2025-06-07"
+LAST_UPDATED = "2026-10-18"
 AUTHOR = "Markus"
 CONFIG_COMPATIBILITY = "2.1"
 
@@ -26,12 +31,15 @@ v1.0.0 (pre-2025): Initial version with Gemini API and Wikipedia integration
 v1.1.0 (2025-06-07): Standardized header, improved error handling and retry logic
 v2.0.0 (2025-06-07): Implemented full standardized metadata system with processing history
 v3.0.0 (2025-06-07): Enhanced with token counting, performance tracking and improved error handling
+v3.1.0 (2026-10-18): Concurrent, token-bucket rate-limited Wiki/Gemini fetching with exponential backoff and SQLite response cache
+v3.2.0 (2026-10-18): Batched multi-place prompts with JSON validation, per-place fallback and adaptive batch size
 """
 
 # === SCRIPT CONFIGURATION ===
 DEFAULT_CONFIG_SECTION = "ai_descriptions"
 INPUT_FILE_PATTERN = "*_places_sorted.csv"
 OUTPUT_FILE_PATTERN = "*_ai_descriptions.md"
+DEFAULT_CACHE_DB = "output/SQLliteDB/description_cache.db"
 
 # === DEPENDENCIES ===
 PYTHON_VERSION_MIN = "3.8"
@@ -39,19 +47,16 @@ REQUIRED_PACKAGES = [
     "pandas>=1.3.0",
     "requests>=2.25.0",
     "google-generativeai>=0.3.0",
-    "python-dotenv>=0.19.0",
-    "tqdm>=4.60.0"
+    "python-dotenv>=0.19.0"
 ]
 
 import argparse
 import os
 import sys
-import time
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Tuple # Expliziter Import für alle Type Hints
 from datetime import datetime
 
-import requests
 import pandas as pd # Import Pandas
 try:
     import google.generativeai as genai
@@ -62,14 +67,11 @@ except ImportError:
 sys.path.append(str(Path(__file__).parent.parent / "project_management"))
 from CSV_METADATA_TEMPLATE import write_csv_with_metadata
 
-try:
-    from tqdm import tqdm
-except ImportError:
-    print("[Warnung] tqdm nicht gefunden (pip install tqdm), Fortschrittsbalken wird nicht angezeigt.")
-    def tqdm(iterable, *args, **kwargs): return iterable
-
 from dotenv import load_dotenv # Import dotenv
 
+from SQLiteDescriptionCache import SQLiteDescriptionCache
+from AsyncDescriptionFetcher import AsyncDescriptionFetcher
+
 # === FUNCTIONS ===
 
 def print_script_info():
@@ -137,24 +139,6 @@ def setup_gemini() -> Optional[genai.GenerativeModel]:
         print(f"[Info] Gemini Model '{MODEL_NAME}' initialisiert."); return model
     except Exception as exc: print(f"[ERROR] Gemini Init fehlgeschlagen: {exc}", file=sys.stderr); return None
 
-#######################################################################
-# Wikipedia Helpers (Funktion unverändert)
-#######################################################################
-def fetch_wiki_extract(place: str, lang: str, max_chars: int = 500, api_metadata: Optional[Dict] = None) -> Optional[str]:
-    quoted_place = requests.utils.quote(place); url = WIKI_API.format(lang=lang, title=quoted_place)
-    if api_metadata: api_metadata["wikipedia_requests"] += 1
-    try:
-        r = requests.get(url, timeout=10, headers={'User-Agent': 'GPXWorkflow/1.0'}); r.raise_for_status()
-        data = r.json(); extract = data.get("extract", "").strip()[:max_chars]
-        if extract and api_metadata: api_metadata["wikipedia_hits"] += 1
-        return extract or None
-    except requests.exceptions.HTTPError as e: # Spezifischer auf 404 prüfen
-        if e.response.status_code == 404: return None # Kein Fehler, einfach kein Eintrag
-        else: print(f"  [Wiki Error] HTTP {e.response.status_code} für '{place}' ({lang}): {e}", file=sys.stderr); return None
-    except requests.exceptions.RequestException as e: print(f"  [Wiki Error] Netzwerkfehler für '{place}' ({lang}): {e}", file=sys.stderr); return None
-    except json.JSONDecodeError: print(f"  [Wiki Error] Ungültige JSON für '{place}' ({lang}).", file=sys.stderr); return None
-    except Exception as e: print(f"  [Wiki Error] Unerwarteter Fehler für '{place}' ({lang}): {e}", file=sys.stderr); return None
-
 #######################################################################
 # Gemini Prompt (Funktion unverändert)
 #######################################################################
@@ -163,41 +147,54 @@ def build_prompt(wiki: Optional[str], place: str) -> str:
     return PROMPT_TEMPLATE.format(facts=facts, place=place)
 
 #######################################################################
-# Gemini Retry Logic (Funktion unverändert)
+# Gemini Batch-Prompt (mehrere Orte, Antwort als JSON-Objekt)
 #######################################################################
-def query_gemini_with_retry(model: genai.GenerativeModel, prompt: str, max_retries: int = 3) -> Tuple[Optional[str], bool]:
-    """Fragt Gemini an, mit exponentiellem Backoff bei Fehlern."""
-    for attempt in range(max_retries):
-        try:
-            # print(f"    -> Sende Anfrage an Gemini (Versuch {attempt + 1})...") # Debug
-            response = model.generate_content(prompt)
-            # print(f"    -> Antwort von Gemini erhalten.") # Debug
-            response_text = None; generation_stopped = False; stop_reason = "N/A"
-            if hasattr(response, 'text'): response_text = response.text.strip()
-            elif hasattr(response, 'candidates') and response.candidates:
-                candidate = response.candidates[0]
-                if hasattr(candidate, 'content') and hasattr(candidate.content, 'parts') and candidate.content.parts: response_text = candidate.content.parts[0].text.strip()
-                if hasattr(candidate, 'finish_reason'): stop_reason = candidate.finish_reason.name; #... (Rest der Stop-Reason Logik wie vorher) ...
-            if response_text: return response_text, True
-            elif generation_stopped: return f"**Generierung blockiert ({stop_reason}).**", False
-            else:
-                 if attempt == max_retries - 1: return "**Fehler: Unerwartete leere Antwort von Gemini.**", False
-                 else: print("    -> Warnung: Leere Antwort, versuche erneut...") # Weniger verbose
-        except Exception as exc:
-            # --- KORREKTUR: Einrückung der Fehlerbehandlung ---
-            print(f"    -> Fehler bei Gemini API (Versuch {attempt + 1}/{max_retries}): {exc}", file=sys.stderr)
-            if attempt < max_retries - 1:
-                wait_time = 2 ** attempt # Exponential backoff
-                print(f"       Warte {wait_time}s vor Wiederholung...")
-                time.sleep(wait_time)
-                # Hier *kein* continue, die Schleife geht automatisch weiter
-            else: # Letzter Versuch fehlgeschlagen
-                print(f"    -> Endgültiger Fehler nach {max_retries} Versuchen.", file=sys.stderr)
-                return f"**Fehler bei der Beschreibungserstellung:** {exc}", False # Endgültiger Fehler
-            # --------------------------------------------------
-
-    # Fallback, falls Schleife unerwartet endet
-    return "**Fehler: Max Retries erreicht.**", False
+BATCH_PROMPT_TEMPLATE = """Du bist ein sportlicher, begeisterter und kenntnisreicher Gravel-Rad-Guide für Touren in Europa.
+Erstelle für JEDEN der folgenden Orte eine eigene Beschreibung für Radfahrer, die dort auf ihrer Tour durchkommen oder eine Pause machen.
+Jeder Ort hat eine ID und eigene Fakten. Verwende für jeden Ort nur seine eigenen Fakten.
+
+{places}
+
+Regeln für jede einzelne Beschreibung (Markdown, Schlüsselwörter verspielt fett und in unterschiedlichen Größen):
+
+WICHTIG: Wenn keine oder kaum Fakten vorhanden sind (nur der Ortsname):
+- Erstelle keinen fantasierten Bericht
+- Schreibe nur 1-2 kurze Sätze (kleiner Ort an der Route, evtl. Lage laut Name, mögliche kurze Erholungspause)
+- Verwende Formulierungen wie "Der kleine Ort..." oder "Dieser Punkt auf der Strecke..."
+
+Wenn Fakten vorhanden sind, drei inspirierende Absätze:
+Absatz 1: Ortsname, Einwohneranzahl, Fläche und Höhe.
+Absatz 2: Kultur, (Sport-) Geschichte oder landschaftliche Highlights.
+Absatz 3: Was macht diesen Ort besonders für eine Pause auf einer sportlichen Radtour?
+Sprich sportliche Leser ab und zu direkt an, sei motivierend und gern mit einem Augenzwinkern.
+Optional: Beginne mit einer Zeile mit einem passenden Emoji für den Ort (z.B. ⛰️, 🏘️, 🏰, 🍇, 🌊).
+
+ANTWORTFORMAT: Gib ausschließlich ein JSON-Objekt zurück, ohne weiteren Text.
+Schlüssel sind die IDs als Strings, Werte die Markdown-Beschreibungen, z.B. {{"1": "...", "2": "..."}}.
+Jede ID muss genau einmal vorkommen.
+"""
+
+def build_batch_prompt(items: List[Tuple[str, str, Optional[str]]]) -> str:
+    """Baut einen Prompt für mehrere Orte: items = [(id, place, wiki_text), ...]."""
+    blocks = []
+    for place_id, place, wiki in items:
+        facts = wiki if wiki else f"Keine zusätzlichen Wikipedia‑Informationen für {place} verfügbar."
+        blocks.append(f'<PLACE id="{place_id}" name="{place}">\n{facts}\n</PLACE>')
+    return BATCH_PROMPT_TEMPLATE.format(places="\n\n".join(blocks))
+
+#######################################################################
+# Gemini Aufruf (ein Versuch; Retry/Backoff übernimmt der Fetcher)
+#######################################################################
+def generate_gemini_text(model: genai.GenerativeModel, prompt: str) -> Optional[str]:
+    """Fragt Gemini einmal an und gibt den Antworttext zurück (None bei leerer Antwort)."""
+    response = model.generate_content(prompt)
+    if hasattr(response, 'text') and response.text:
+        return response.text.strip()
+    if hasattr(response, 'candidates') and response.candidates:
+        candidate = response.candidates[0]
+        if hasattr(candidate, 'content') and hasattr(candidate.content, 'parts') and candidate.content.parts:
+            return candidate.content.parts[0].text.strip()
+    return None
 
 #######################################################################
 # Hauptprogramm
@@ -229,7 +226,12 @@ def main() -> None:
         "total_input_tokens_estimated": 0,
         "total_output_tokens_estimated": 0,
         "wikipedia_requests": 0,
-        "wikipedia_hits": 0
+        "wikipedia_hits": 0,
+        "wikipedia_cache_hits": 0,
+        "ai_cache_hits": 0,
+        "retry_attempts": 0,
+        "batch_ai_requests": 0,
+        "batch_fallback_places": 0
     }
     
     parser = argparse.ArgumentParser(description="Gemini‑Ortsbeschreibungen mit Wikipedia‑Boost")
@@ -239,6 +241,13 @@ def main() -> None:
     parser.add_argument("--country-context", default="", help="ISO‑Ländercode (DE, IT, …) (optional, leer = auto)")
     parser.add_argument("--wiki-lang", default="AUTO", help="Wikipedia‑Sprachcode oder AUTO")
     parser.add_argument("--max-wiki-chars", type=int, default=500, help="Max. Zeichen für Wiki-Auszug")
+    parser.add_argument("--cache-db", default=DEFAULT_CACHE_DB, help="SQLite-Cache für Wiki-Auszüge und Gemini-Antworten")
+    parser.add_argument("--force-api", action="store_true", help="Cache ignorieren (keine Cache-Treffer, keine Speicherung)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Max. gleichzeitig bearbeitete Orte")
+    parser.add_argument("--llm-rate", type=float, default=1.0, help="Max. Gemini-Anfragen pro Sekunde")
+    parser.add_argument("--wiki-rate", type=float, default=5.0, help="Max. Wikipedia-Anfragen pro Sekunde")
+    parser.add_argument("--batch-size", type=int, default=1, help="Max. Orte pro Gemini-Anfrage (1 = ein Prompt je Ort)")
+    parser.add_argument("--batch-char-budget", type=int, default=0, help="Max. Prompt-Zeichen je Batch (0 = automatisch aus Batch-Größe und --max-wiki-chars)")
     args = parser.parse_args()
 
     # --- Initialisiere Gemini Model ---
@@ -287,63 +296,52 @@ def main() -> None:
             print(f"[Info] Verarbeite {len(places_df)} Orte...")
             api_metadata["api_query_start_time"] = datetime.now().isoformat()
 
-            # --- Iteriere durch DataFrame Zeilen ---
-            for index, row in tqdm(places_df.iterrows(), total=len(places_df), desc="Generiere Beschreibungen"):
-                place = str(row.get(place_col, "")).strip() # Hole Wert sicher
-
-                # --- Debug Ausgaben (optional, jetzt auskommentiert) ---
-                # print(f"\n--- Debug: Zeile {index} ---")
-                # print(f"  Rohwert für '{place_col}': {row.get(place_col)}")
-                # print(f"  Bereinigter Ort: '{place}'")
-                ignore_list = ["unbekannter ort", "fehler", "nan", "none"]
-                is_invalid = not place or place.lower() in ignore_list
-                # print(f"  Ist leer oder ungültig?: {is_invalid}")
-                # ----------------------------------------------------
-
-                if is_invalid:
-                     # print("  -> Überspringe leeren/ungültigen Ort.")
-                     continue
-
-                # 1. Hole Wiki-Text (optional)
-                wiki_text = fetch_wiki_extract(place, wiki_lang, args.max_wiki_chars, api_metadata)
-                # print(f"  Wiki-Text gefunden?: {'Ja' if wiki_text else 'Nein'}")
-
-                # 2. Erstelle Prompt
-                prompt = build_prompt(wiki_text, place)
-                
-                # Token-Schätzung für Input (grobe Approximation)
-                estimated_input_tokens = len(prompt.split()) * 1.3  # Schätzung
-                api_metadata["total_input_tokens_estimated"] += estimated_input_tokens
-
-                # 3. Frage Gemini an (mit Retry)
-                api_metadata["total_ai_requests"] += 1
-                # print("  Frage Gemini an...")
-                md, success = query_gemini_with_retry(model, prompt)
-                
-                # Token-Schätzung für Output
-                if md:
-                    estimated_output_tokens = len(md.split()) * 1.3
-                    api_metadata["total_output_tokens_estimated"] += estimated_output_tokens
-                # print(f"  Gemini Erfolg?: {success}")
-                # print(f"  Gemini Text (gekürzt)?: {md[:100] if md else 'Kein Text'}")
-
-                # 4. Füge Ergebnis hinzu
-                output_lines.append(f"## {place}\n")
+            # --- Gültige Orte sammeln (Reihenfolge der CSV bleibt erhalten) ---
+            ignore_list = ["unbekannter ort", "fehler", "nan", "none"]
+            places = [str(value).strip() for value in places_df[place_col]]
+            places = [place for place in places if place and place.lower() not in ignore_list]
+
+            # --- Wiki + Gemini nebenläufig, ratenbegrenzt und gecacht abrufen ---
+            cache = SQLiteDescriptionCache(":memory:" if args.force_api else args.cache_db)
+            fetcher = AsyncDescriptionFetcher(
+                generate_fn=lambda prompt: generate_gemini_text(model, prompt),
+                build_prompt_fn=build_prompt,
+                cache=cache,
+                lang=wiki_lang,
+                max_wiki_chars=args.max_wiki_chars,
+                model_name=MODEL_NAME,
+                wiki_api=WIKI_API,
+                concurrency=args.concurrency,
+                wiki_rate=args.wiki_rate,
+                llm_rate=args.llm_rate,
+                api_metadata=api_metadata,
+                build_batch_prompt_fn=build_batch_prompt,
+                batch_size=args.batch_size,
+                batch_char_budget=args.batch_char_budget
+            )
+            results = fetcher.run(places)
+            print(f"[Info] Cache: {cache.get_cache_statistics()}")
+            cache.close()
+
+            for result in results:
+                md = result.markdown
+                if not result.from_cache:
+                    # Token-Schätzung (grobe Approximation), nur für echte API-Anfragen
+                    prompt = build_prompt(result.wiki_extract, result.place)
+                    api_metadata["total_input_tokens_estimated"] += len(prompt.split()) * 1.3
+                    if md:
+                        api_metadata["total_output_tokens_estimated"] += len(md.split()) * 1.3
+
+                output_lines.append(f"## {result.place}\n")
                 if md:
                      output_lines.append(f"{md}\n")
-                     # print("  -> Ergebnis zu Output hinzugefügt.")
                 else:
                      output_lines.append("*(Fehler bei der Beschreibungserstellung)*\n")
-                     # print("  -> Fehlertext zu Output hinzugefügt.")
 
-                if success: 
+                if result.success:
                     places_processed += 1
-                    api_metadata["successful_ai_requests"] += 1
-                else: 
+                else:
                     places_failed += 1
-                    api_metadata["failed_ai_requests"] += 1
-
-                time.sleep(1.5) # Pause nach jeder Anfrage
         else:
              print("[Info] Keine Orte zum Verarbeiten in der CSV gefunden.")
 
@@ -369,6 +367,9 @@ def main() -> None:
             f"<!-- Successful AI Requests: {api_metadata['successful_ai_requests']} -->",
             f"<!-- Wikipedia Requests: {api_metadata['wikipedia_requests']} -->",
             f"<!-- Wikipedia Hits: {api_metadata['wikipedia_hits']} -->",
+            f"<!-- Wikipedia Cache Hits: {api_metadata['wikipedia_cache_hits']} -->",
+            f"<!-- AI Cache Hits: {api_metadata['ai_cache_hits']} -->",
+            f"<!-- Batch AI Requests: {api_metadata['batch_ai_requests']} (Fallback einzeln: {api_metadata['batch_fallback_places']}) -->",
             f"<!-- Estimated Input Tokens: {int(api_metadata['total_input_tokens_estimated'])} -->",
             f"<!-- Estimated Output Tokens: {int(api_metadata['total_output_tokens_estimated'])} -->",
             f"<!-- Processing Duration: {(datetime.now() - run_start_time).total_seconds():.1f}s -->",
@@ -403,12 +404,5 @@ def main() -> None:
 
 
 if __name__ == "__main__":
-    # Optionaler Wiki-Test kann hier bleiben oder entfernt werden
-    # test_place = "Fehmarnsund"; test_lang = "de"
-    # print(f"\n--- WIKI TEST für '{test_place}' ({test_lang}) ---")
-    # extract = fetch_wiki_extract(test_place, test_lang, 1500)
-    # if extract: print("[Wiki Test OK] Auszug gefunden:\n", extract)
-    # else: print("[Wiki Test FEHLSCHLAG] Kein Auszug gefunden.")
-    # print("--- ENDE WIKI TEST ---\n")
-
+    # Wiki-Auszüge und Gemini-Antworten laufen nebenläufig über AsyncDescriptionFetcher (Cache: SQLiteDescriptionCache)
     main()
\ No newline at end of file
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+ApiRateBroker.py - Prozessübergreifende Ratenbegrenzung für externe APIs (Nominatim, Overpass)
+
+Mit snakemake --cores N laufen die Schritte 4, 4b, 5a, 5b und 8b mehrerer
+Tracks gleichzeitig. Bisher schlief jeder Prozess für sich (sleep(1.1)),
+zusammen überschritten sie die Limits der Dienste und liefen in 429 und
+lange Backoffs. Alle API-Aufrufe gehen deshalb durch gemeinsame Tabellen
+in einer SQLite-Datei (kein eigener Broker-Prozess nötig):
+
+- Takt: je Dienst ein globaler Takt (min_interval_s, optional burst, GCRA).
+  Jede Anfrage reserviert den nächsten freien Zeitpunkt und schläft bis dahin.
+- Parallelität: höchstens max_concurrent laufende Anfragen je Dienst.
+- Fairness: Wartende ziehen Tickets und werden in Ankunftsreihenfolge bedient;
+  da jeder Job synchron fragt, wechseln sich parallele Jobs reihum ab.
+- Backoff: meldet ein Client ein Rate-Limit (throttled), pausiert der Dienst
+  für alle Prozesse statt nur für den betroffenen.
+- Dedup: claim/release_claim verhindert, dass zwei Jobs gleichzeitig dieselbe
+  Anfrage stellen; der zweite wartet und liest danach aus seinem Cache.
+
+Verwendung:
+  with api_request("overpass"):
+      result = api.query(query)
+
+Pfad: GPX_API_BROKER (leer = aus; der Takt gilt dann nur im eigenen Prozess),
+sonst DEFAULT_BROKER_PATH. Limits: GPX_API_BROKER_SERVICES (JSON, vom
+Snakefile aus config.yaml api_broker.services), ergänzt um DEFAULT_SERVICES.
+Fehler in der Broker-DB schalten auf den lokalen Takt um, brechen aber nie den Schritt ab.
+"""
+
+import contextlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, Iterator, Optional
+
+DEFAULT_BROKER_PATH = "output/SQLliteDB/api_rate_broker.db"
+BROKER_PATH_ENV = "GPX_API_BROKER"
+SERVICES_ENV = "GPX_API_BROKER_SERVICES"
+SQLITE_TIMEOUT_S = 30
+POLL_INTERVAL_S = 0.05
+QUEUE_STALE_S = 10.0   # Tickets ohne Heartbeat (Prozess beendet) verfallen
+DEFAULT_LEASE_S = 120.0  # laufende Anfrage/Claim gilt spätestens danach als beendet
+
+# Nominatim: max. 1 Anfrage/s (Usage Policy); Overpass: 2 Slots je IP
+DEFAULT_SERVICES = {
+    'nominatim': {'min_interval_s': 1.1, 'burst': 1, 'max_concurrent': 1},
+    'overpass': {'min_interval_s': 1.1, 'burst': 1, 'max_concurrent': 2},
+}
+FALLBACK_LIMITS = {'min_interval_s': 1.0, 'burst': 1, 'max_concurrent': 1}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS api_rate_state (
+    service TEXT PRIMARY KEY,
+    next_slot REAL NOT NULL            -- theoretischer Zeitpunkt der nächsten Anfrage (GCRA)
+);
+CREATE TABLE IF NOT EXISTS api_queue (
+    ticket INTEGER PRIMARY KEY AUTOINCREMENT,
+    service TEXT NOT NULL,
+    pid INTEGER,
+    heartbeat REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS api_active (
+    permit INTEGER PRIMARY KEY AUTOINCREMENT,
+    service TEXT NOT NULL,
+    pid INTEGER,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS api_inflight (
+    service TEXT NOT NULL,
+    request_key TEXT NOT NULL,
+    pid INTEGER,
+    expires REAL NOT NULL,
+    PRIMARY KEY (service, request_key)
+);
+CREATE INDEX IF NOT EXISTS idx_api_queue_service ON api_queue (service, ticket);
+"""
+
+_local = threading.local()
+_local_slots: Dict[str, float] = {}
+_local_lock = threading.Lock()
+_broker_failed = False
+
+
+def broker_path() -> Optional[str]:
+    """Aktiver Broker-Pfad; None, wenn abgeschaltet (GPX_API_BROKER="") oder nach einem DB-Fehler."""
+    if _broker_failed:
+        return None
+    return os.environ.get(BROKER_PATH_ENV, DEFAULT_BROKER_PATH) or None
+
+
+def service_limits(service: str) -> Dict[str, float]:
+    """Limits eines Dienstes: GPX_API_BROKER_SERVICES vor DEFAULT_SERVICES."""
+    limits = dict(FALLBACK_LIMITS, **DEFAULT_SERVICES.get(service, {}))
+    try:
+        configured = json.loads(os.environ.get(SERVICES_ENV) or "{}")
+    except ValueError:
+        configured = {}
+    limits.update(configured.get(service) or {})
+    return limits
+
+
+def _connection(db_path: str) -> sqlite3.Connection:
+    """Eine Verbindung je Thread und DB (sqlite3-Verbindungen sind nicht threadfest)."""
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    key = (db_path, os.getpid())
+    if key not in connections:
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(db_path, timeout=SQLITE_TIMEOUT_S, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(_SCHEMA)
+        connections[key] = connection
+    return connections[key]
+
+
+@contextlib.contextmanager
+def _transaction(connection: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """Schreibtransaktion, die andere Prozesse bis zum Commit ausschließt."""
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield connection
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("COMMIT")
+
+
+def _disable(error: Exception) -> None:
+    global _broker_failed
+    _broker_failed = True
+    print(f"[Warnung] API-Broker nicht verfügbar, Takt nur noch je Prozess: {error}", file=sys.stderr)
+
+
+def _next_start(next_slot: float, now: float, limits: Dict[str, float]) -> float:
+    """GCRA: Startzeit dieser Anfrage; bis zu 'burst' Anfragen dürfen direkt aufeinander folgen."""
+    interval = float(limits['min_interval_s'])
+    return max(now, max(next_slot, now) - (int(limits.get('burst', 1)) - 1) * interval)
+
+
+# === TAKT & PARALLELITÄT ===
+
+def _acquire_local(service: str, limits: Dict[str, float]) -> float:
+    with _local_lock:
+        now = time.time()
+        start_at = _next_start(_local_slots.get(service, 0.0), now, limits)
+        _local_slots[service] = max(_local_slots.get(service, 0.0), now) + float(limits['min_interval_s'])
+    return start_at
+
+
+def _acquire_shared(db_path: str, service: str, limits: Dict[str, float]):
+    """Ticket ziehen, warten bis es vorne ist und ein Slot frei ist, dann Startzeit reservieren."""
+    connection = _connection(db_path)
+    max_concurrent = int(limits.get('max_concurrent') or 0)
+    ticket = None
+    try:
+        while True:
+            now = time.time()
+            with _transaction(connection):
+                if ticket is None:
+                    ticket = connection.execute(
+                        "INSERT INTO api_queue (service, pid, heartbeat) VALUES (?, ?, ?)",
+                        (service, os.getpid(), now)).lastrowid
+                else:
+                    connection.execute("UPDATE api_queue SET heartbeat = ? WHERE ticket = ?", (now, ticket))
+                connection.execute("DELETE FROM api_queue WHERE service = ? AND heartbeat < ?",
+                                   (service, now - QUEUE_STALE_S))
+                connection.execute("DELETE FROM api_active WHERE service = ? AND expires < ?", (service, now))
+                head = connection.execute("SELECT MIN(ticket) FROM api_queue WHERE service = ?",
+                                          (service,)).fetchone()[0]
+                active = connection.execute("SELECT COUNT(*) FROM api_active WHERE service = ?",
+                                            (service,)).fetchone()[0]
+                if head == ticket and (not max_concurrent or active < max_concurrent):
+                    row = connection.execute("SELECT next_slot FROM api_rate_state WHERE service = ?",
+                                             (service,)).fetchone()
+                    next_slot = row[0] if row else 0.0
+                    start_at = _next_start(next_slot, now, limits)
+                    connection.execute(
+                        "INSERT OR REPLACE INTO api_rate_state (service, next_slot) VALUES (?, ?)",
+                        (service, max(next_slot, now) + float(limits['min_interval_s'])))
+                    permit = connection.execute(
+                        "INSERT INTO api_active (service, pid, expires) VALUES (?, ?, ?)",
+                        (service, os.getpid(), start_at + float(limits.get('lease_s', DEFAULT_LEASE_S)))).lastrowid
+                    connection.execute("DELETE FROM api_queue WHERE ticket = ?", (ticket,))
+                    return start_at, permit
+            time.sleep(POLL_INTERVAL_S)
+    except BaseException:
+        if ticket is not None:
+            with contextlib.suppress(sqlite3.Error):
+                connection.execute("DELETE FROM api_queue WHERE ticket = ?", (ticket,))
+        raise
+
+
+@contextlib.contextmanager
+def api_request(service: str) -> Iterator[float]:
+    """
+    Umschließt genau eine Anfrage an service: wartet auf Takt und freien Slot.
+    Yields: Wartezeit in Sekunden (für Statistiken).
+    """
+    limits = service_limits(service)
+    requested_at = time.time()
+    permit = None
+    db_path = broker_path()
+    start_at = None
+    if db_path:
+        try:
+            start_at, permit = _acquire_shared(db_path, service, limits)
+        except sqlite3.Error as e:
+            _disable(e)
+    if start_at is None:
+        start_at = _acquire_local(service, limits)
+    time.sleep(max(0.0, start_at - time.time()))
+    started_at = time.time()
+    try:
+        yield started_at - requested_at
+    finally:
+        # Startete die Anfrage verspätet (z. B. Prozess unter Last), gilt der Takt ab dem echten Start
+        earliest_next = started_at + float(limits['min_interval_s'])
+        if permit is None:
+            with _local_lock:
+                _local_slots[service] = max(_local_slots.get(service, 0.0), earliest_next)
+        else:
+            with contextlib.suppress(sqlite3.Error):
+                connection = _connection(db_path)
+                with _transaction(connection):
+                    connection.execute("DELETE FROM api_active WHERE permit = ?", (permit,))
+                    connection.execute("UPDATE api_rate_state SET next_slot = MAX(next_slot, ?) WHERE service = ?",
+                                       (earliest_next, service))
+
+
+def throttled(service: str, retry_after_s: float) -> None:
+    """Rate-Limit-Antwort (429/Quota) melden: der Dienst pausiert retry_after_s für alle Prozesse."""
+    resume_at = time.time() + max(0.0, float(retry_after_s))
+    with _local_lock:
+        _local_slots[service] = max(_local_slots.get(service, 0.0), resume_at)
+    db_path = broker_path()
+    if not db_path:
+        return
+    try:
+        connection = _connection(db_path)
+        with _transaction(connection):
+            connection.execute("INSERT OR IGNORE INTO api_rate_state (service, next_slot) VALUES (?, 0)", (service,))
+            connection.execute("UPDATE api_rate_state SET next_slot = MAX(next_slot, ?) WHERE service = ?",
+                               (resume_at, service))
+    except sqlite3.Error as e:
+        _disable(e)
+
+
+# === DEDUP ===
+
+def claim(service: str, request_key: str, lease_s: float = DEFAULT_LEASE_S) -> bool:
+    """
+    Laufende identische Anfrage anderer Prozesse abwarten.
+    Returns: True = dieser Prozess fragt an (danach release_claim);
+             False = ein paralleler Job hat dieselbe Anfrage gerade beendet -> Cache erneut lesen.
+    """
+    db_path = broker_path()
+    if not db_path:
+        return True
+    waited = False
+    try:
+        connection = _connection(db_path)
+        while True:
+            now = time.time()
+            with _transaction(connection):
+                connection.execute("DELETE FROM api_inflight WHERE expires < ?", (now,))
+                row = connection.execute("SELECT pid FROM api_inflight WHERE service = ? AND request_key = ?",
+                                         (service, request_key)).fetchone()
+                if row is None and waited:
+                    return False
+                if row is None:
+                    connection.execute(
+                        "INSERT INTO api_inflight (service, request_key, pid, expires) VALUES (?, ?, ?, ?)",
+                        (service, request_key, os.getpid(), now + lease_s))
+                    return True
+                if row[0] == os.getpid() and not waited:
+                    return True
+            waited = True
+            time.sleep(POLL_INTERVAL_S)
+    except sqlite3.Error as e:
+        _disable(e)
+        return True
+
+
+def release_claim(service: str, request_key: str) -> None:
+    """Eigenen Claim freigeben (nach dem Cachen des Ergebnisses); ohne Claim wirkungslos."""
+    db_path = broker_path()
+    if not db_path:
+        return
+    try:
+        _connection(db_path).execute(
+            "DELETE FROM api_inflight WHERE service = ? AND request_key = ? AND pid = ?",
+            (service, request_key, os.getpid()))
+    except sqlite3.Error as e:
+        _disable(e)
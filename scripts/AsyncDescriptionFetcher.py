@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+AsyncDescriptionFetcher.py - Nebenläufiger Wikipedia-/Gemini-Abruf für Schritt 9
+
+Holt Wiki-Auszüge und LLM-Beschreibungen für viele Orte gleichzeitig:
+- begrenzte Nebenläufigkeit (Semaphore + Thread-Pool für blockierende Clients)
+- Token-Bucket-Ratenlimit je Dienst (Wikipedia / LLM)
+- exponentielles Backoff bei Netzwerkfehlern, HTTP 429 und 5xx
+- persistenter Cache über SQLiteDescriptionCache (Reruns ohne API-Aufrufe)
+- optionaler Batch-Modus: mehrere Orte pro LLM-Anfrage mit JSON-Antwort;
+  fehlende oder ungültige Einträge werden einzeln nachgefragt
+
+Der LLM-Aufruf wird als einfache Funktion prompt -> Text übergeben, die
+Wikipedia-URL ist konfigurierbar. Damit lässt sich alles gegen einen lokalen
+Stub-Server testen.
+"""
+
+import asyncio
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import requests
+
+from SQLiteDescriptionCache import SQLiteDescriptionCache
+
+WIKI_API = "https://{lang}.wikipedia.org/api/rest_v1/page/summary/{title}"
+WIKI_USER_AGENT = "GPXWorkflow/1.0"
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# Geschätzter Prompt-Anteil je Ort im Batch (Überschrift, Anweisungen, JSON-Schlüssel)
+BATCH_PLACE_OVERHEAD_CHARS = 200
+
+
+class RetryableError(Exception):
+    """Vorübergehender Fehler (Rate-Limit, Serverfehler), der Backoff auslöst."""
+
+
+class TokenBucket:
+    """Asynchroner Token-Bucket: im Mittel `rate` Aufrufe pro Sekunde, Bursts bis `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError("rate muss > 0 sein")
+        self.rate = float(rate)
+        self.capacity = max(float(capacity), 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = None
+
+    async def acquire(self) -> None:
+        """Wartet, bis ein Token verfügbar ist, und verbraucht es."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self.tokens) / self.rate)
+
+
+@dataclass
+class PlaceDescription:
+    """Ergebnis für einen Ort"""
+    place: str
+    wiki_extract: Optional[str]
+    markdown: Optional[str]
+    success: bool
+    from_cache: bool = False
+
+
+def plan_batches(costs: Sequence[int], max_batch_size: int, char_budget: int) -> List[List[int]]:
+    """
+    Packt Orte der Reihe nach in Batches (Routenreihenfolge bleibt erhalten).
+
+    Ein Batch wird geschlossen, sobald er max_batch_size Orte enthält oder
+    der nächste Ort das Zeichenbudget überschreiten würde. Ein einzelner Ort
+    über Budget bekommt einen eigenen Batch.
+
+    Args:
+        costs: Geschätzte Prompt-Zeichen je Ort (Wiki-Auszug + Overhead)
+        max_batch_size: Maximale Orte pro Batch
+        char_budget: Maximale Prompt-Zeichen pro Batch
+
+    Returns:
+        Liste von Index-Listen in die Eingabe
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_chars = 0
+    for index, cost in enumerate(costs):
+        if current and (len(current) >= max_batch_size or current_chars + cost > char_budget):
+            batches.append(current)
+            current, current_chars = [], 0
+        current.append(index)
+        current_chars += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def parse_batch_response(text: Optional[str], expected_ids: Sequence[str]) -> Dict[str, str]:
+    """
+    Liest die JSON-Antwort eines Batch-Prompts ({"<id>": "<markdown>", ...}).
+
+    Code-Fences und Text um das JSON-Objekt werden toleriert. Zurückgegeben
+    werden nur erwartete IDs mit nicht-leerem Text; alles andere gilt als
+    ausgelassen und wird vom Aufrufer einzeln nachgefragt.
+    """
+    if not text:
+        return {}
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end <= start:
+        return {}
+    try:
+        data = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    parsed = {}
+    for key in expected_ids:
+        value = data.get(key)
+        if isinstance(value, str) and value.strip():
+            parsed[key] = value.strip()
+    return parsed
+
+
+class AsyncDescriptionFetcher:
+    """Holt Wiki-Auszüge und LLM-Beschreibungen nebenläufig, ratenbegrenzt und gecacht."""
+
+    def __init__(self,
+                 generate_fn: Callable[[str], Optional[str]],
+                 build_prompt_fn: Callable[[Optional[str], str], str],
+                 cache: SQLiteDescriptionCache,
+                 lang: str,
+                 max_wiki_chars: int = 500,
+                 model_name: str = "",
+                 wiki_api: str = WIKI_API,
+                 concurrency: int = 4,
+                 wiki_rate: float = 5.0,
+                 llm_rate: float = 1.0,
+                 max_retries: int = 3,
+                 backoff_base: float = 1.0,
+                 request_timeout: float = 10.0,
+                 api_metadata: Optional[Dict] = None,
+                 build_batch_prompt_fn: Optional[Callable[[List[Tuple[str, str, Optional[str]]]], str]] = None,
+                 batch_size: int = 1,
+                 batch_char_budget: int = 0):
+        """
+        Args:
+            generate_fn: Blockierender LLM-Aufruf (Prompt -> Markdown oder None), wirft bei Fehlern
+            build_prompt_fn: Prompt-Builder (wiki_text, place) -> Prompt
+            cache: Persistenter Cache für Wiki-Auszüge und LLM-Antworten
+            lang: Wikipedia-Sprachcode
+            max_wiki_chars: Maximale Länge des Wiki-Auszugs im Prompt
+            model_name: Modellname (geht in den Prompt-Hash ein)
+            wiki_api: URL-Template mit {lang} und {title}
+            concurrency: Maximale Anzahl gleichzeitig bearbeiteter Orte
+            wiki_rate / llm_rate: Erlaubte Aufrufe pro Sekunde je Dienst
+            max_retries: Versuche je Aufruf
+            backoff_base: Basis-Wartezeit [s] für exponentielles Backoff
+            request_timeout: HTTP-Timeout [s] für Wikipedia
+            api_metadata: Optionales Zähler-Dict aus Schritt 9 (wird fortgeschrieben)
+            build_batch_prompt_fn: Batch-Prompt-Builder [(id, place, wiki_text), ...] -> Prompt
+            batch_size: Maximale Orte pro LLM-Anfrage (<= 1 = ein Prompt je Ort)
+            batch_char_budget: Maximale Prompt-Zeichen je Batch (0 = aus batch_size und max_wiki_chars)
+        """
+        self.generate_fn = generate_fn
+        self.build_prompt_fn = build_prompt_fn
+        self.cache = cache
+        self.lang = lang
+        self.max_wiki_chars = max_wiki_chars
+        self.model_name = model_name
+        self.wiki_api = wiki_api
+        self.concurrency = max(int(concurrency), 1)
+        self.wiki_bucket = TokenBucket(wiki_rate, capacity=max(wiki_rate, 1.0))
+        self.llm_bucket = TokenBucket(llm_rate, capacity=1.0)
+        self.max_retries = max(int(max_retries), 1)
+        self.backoff_base = backoff_base
+        self.request_timeout = request_timeout
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': WIKI_USER_AGENT})
+        self.api_metadata = api_metadata if api_metadata is not None else {}
+        self.build_batch_prompt_fn = build_batch_prompt_fn
+        self.batch_size = max(int(batch_size), 1)
+        self.batch_char_budget = batch_char_budget or (
+            max(self.batch_size // 2, 1) * (max_wiki_chars + BATCH_PLACE_OVERHEAD_CHARS)
+        )
+        for key in ("wikipedia_requests", "wikipedia_hits", "wikipedia_cache_hits",
+                    "total_ai_requests", "successful_ai_requests", "failed_ai_requests",
+                    "ai_cache_hits", "retry_attempts", "batch_ai_requests", "batch_fallback_places"):
+            self.api_metadata.setdefault(key, 0)
+        self._executor = None
+        self._semaphore = None
+
+    # ------------------------------------------------------------------ #
+    # Öffentliche API
+    # ------------------------------------------------------------------ #
+    def run(self, places: List[str]) -> List[PlaceDescription]:
+        """Synchroner Einstiegspunkt: beschreibt alle Orte, Reihenfolge bleibt erhalten."""
+        return asyncio.run(self.describe_places(places))
+
+    async def describe_places(self, places: List[str]) -> List[PlaceDescription]:
+        """Beschreibt alle Orte nebenläufig (Ergebnis in Eingabereihenfolge)."""
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        try:
+            if self.batch_size > 1 and self.build_batch_prompt_fn is not None:
+                return await self._describe_batched(places)
+            return await asyncio.gather(*(self._bounded(self.describe_place(place)) for place in places))
+        finally:
+            self._executor.shutdown(wait=False)
+
+    # ------------------------------------------------------------------ #
+    # Interna
+    # ------------------------------------------------------------------ #
+    async def _bounded(self, coroutine):
+        async with self._semaphore:
+            return await coroutine
+
+    async def describe_place(self, place: str) -> PlaceDescription:
+        """Wiki-Auszug holen, Prompt bauen, LLM befragen (jeweils Cache zuerst)."""
+        wiki_text = await self.fetch_wiki_extract(place)
+        prompt = self.build_prompt_fn(wiki_text, place)
+
+        cached = self._cached_description(place, wiki_text, prompt)
+        if cached is not None:
+            return cached
+        return await self._describe_single(place, wiki_text, prompt)
+
+    def _cached_description(self, place: str, wiki_text: Optional[str], prompt: str) -> Optional[PlaceDescription]:
+        cached = self.cache.get_llm_response(place, self.lang, prompt, self.model_name)
+        if cached is None:
+            return None
+        self.api_metadata["ai_cache_hits"] += 1
+        print(f"  -> {place}: Beschreibung aus Cache")
+        return PlaceDescription(place, wiki_text, cached, True, from_cache=True)
+
+    async def _describe_single(self, place: str, wiki_text: Optional[str], prompt: str) -> PlaceDescription:
+        markdown, success = await self.query_llm(prompt, place)
+        if success:
+            self.cache.cache_llm_response(place, self.lang, prompt, markdown, self.model_name)
+        print(f"  -> {place}: {'Beschreibung erstellt' if success else 'Fehler'}")
+        return PlaceDescription(place, wiki_text, markdown, success)
+
+    async def _describe_batched(self, places: List[str]) -> List[PlaceDescription]:
+        """
+        Batch-Modus: Wiki-Auszüge nebenläufig holen, Cache prüfen, Rest in
+        Batches an das LLM schicken. Gecacht wird je Ort unter dem Hash des
+        Einzel-Prompts, damit Batch- und Einzelmodus denselben Cache teilen.
+        """
+        wiki_texts = await asyncio.gather(*(self._bounded(self.fetch_wiki_extract(place)) for place in places))
+
+        results: List[Optional[PlaceDescription]] = [None] * len(places)
+        pending = []
+        for index, (place, wiki_text) in enumerate(zip(places, wiki_texts)):
+            prompt = self.build_prompt_fn(wiki_text, place)
+            results[index] = self._cached_description(place, wiki_text, prompt)
+            if results[index] is None:
+                pending.append((index, place, wiki_text, prompt))
+
+        costs = [len(wiki_text or "") + BATCH_PLACE_OVERHEAD_CHARS for _, _, wiki_text, _ in pending]
+        batches = [[pending[i] for i in batch]
+                   for batch in plan_batches(costs, self.batch_size, self.batch_char_budget)]
+        for described in await asyncio.gather(*(self._bounded(self._describe_batch(batch)) for batch in batches)):
+            for index, description in described:
+                results[index] = description
+        return results
+
+    async def _describe_batch(self, batch) -> List[Tuple[int, PlaceDescription]]:
+        """Ein Batch = eine LLM-Anfrage; ausgelassene/ungültige Orte werden einzeln nachgefragt."""
+        if len(batch) == 1:
+            index, place, wiki_text, prompt = batch[0]
+            return [(index, await self._describe_single(place, wiki_text, prompt))]
+
+        ids = [str(n) for n in range(1, len(batch) + 1)]
+        batch_prompt = self.build_batch_prompt_fn(
+            [(place_id, place, wiki_text) for place_id, (_, place, wiki_text, _) in zip(ids, batch)]
+        )
+        self.api_metadata["batch_ai_requests"] += 1
+        self.api_metadata["total_ai_requests"] += 1
+        try:
+            text = await self._with_backoff(self.llm_bucket, self._generate_checked, batch_prompt,
+                                            label=f"LLM-Batch ({len(batch)} Orte)")
+            self.api_metadata["successful_ai_requests"] += 1
+        except Exception as e:
+            self.api_metadata["failed_ai_requests"] += 1
+            print(f"    -> Batch-Anfrage fehlgeschlagen, frage {len(batch)} Orte einzeln an: {e}",
+                  file=sys.stderr)
+            text = None
+        parsed = parse_batch_response(text, ids)
+
+        described = []
+        for place_id, (index, place, wiki_text, prompt) in zip(ids, batch):
+            markdown = parsed.get(place_id)
+            if markdown is None:
+                self.api_metadata["batch_fallback_places"] += 1
+                described.append((index, await self._describe_single(place, wiki_text, prompt)))
+                continue
+            self.cache.cache_llm_response(place, self.lang, prompt, markdown, self.model_name)
+            print(f"  -> {place}: Beschreibung erstellt (Batch)")
+            described.append((index, PlaceDescription(place, wiki_text, markdown, True)))
+        return described
+
+    async def fetch_wiki_extract(self, place: str) -> Optional[str]:
+        """Wiki-Auszug (gekürzt auf max_wiki_chars) aus Cache oder Wikipedia."""
+        found, extract = self.cache.get_wiki_extract(place, self.lang)
+        if found:
+            self.api_metadata["wikipedia_cache_hits"] += 1
+        else:
+            self.api_metadata["wikipedia_requests"] += 1
+            try:
+                extract = await self._with_backoff(self.wiki_bucket, self._get_wiki_summary, place,
+                                                   label=f"Wiki '{place}'")
+            except Exception as e:
+                print(f"  [Wiki Error] '{place}' ({self.lang}): {e}", file=sys.stderr)
+                return None
+            # Nur echte Antworten cachen (auch 404 = kein Artikel)
+            self.cache.cache_wiki_extract(place, self.lang, extract)
+
+        if extract:
+            if not found:
+                self.api_metadata["wikipedia_hits"] += 1
+            return extract[:self.max_wiki_chars]
+        return None
+
+    async def query_llm(self, prompt: str, place: str):
+        """LLM-Anfrage mit Ratenlimit und Backoff. Returns (markdown, success)."""
+        self.api_metadata["total_ai_requests"] += 1
+        try:
+            text = await self._with_backoff(self.llm_bucket, self._generate_checked, prompt,
+                                            label=f"LLM '{place}'")
+            self.api_metadata["successful_ai_requests"] += 1
+            return text, True
+        except Exception as e:
+            self.api_metadata["failed_ai_requests"] += 1
+            print(f"    -> Endgültiger Fehler nach {self.max_retries} Versuchen für '{place}': {e}",
+                  file=sys.stderr)
+            return f"**Fehler bei der Beschreibungserstellung:** {e}", False
+
+    def _get_wiki_summary(self, place: str) -> Optional[str]:
+        """Blockierender Wikipedia-Abruf (läuft im Thread-Pool)."""
+        url = self.wiki_api.format(lang=self.lang, title=requests.utils.quote(place))
+        response = self.session.get(url, timeout=self.request_timeout)
+        if response.status_code == 404:
+            return None
+        if response.status_code in RETRY_STATUS_CODES:
+            raise RetryableError(f"HTTP {response.status_code}")
+        response.raise_for_status()
+        extract = response.json().get("extract", "").strip()
+        return extract or None
+
+    def _generate_checked(self, prompt: str) -> str:
+        """Blockierender LLM-Aufruf; leere Antworten gelten als Fehler (-> Retry)."""
+        text = self.generate_fn(prompt)
+        if not text:
+            raise RetryableError("Leere Antwort vom LLM")
+        return text
+
+    async def _with_backoff(self, bucket: TokenBucket, fn, *args, label: str = ""):
+        """Führt fn im Thread-Pool aus: Token holen, bei Fehler exponentiell warten."""
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries):
+            await bucket.acquire()
+            try:
+                return await loop.run_in_executor(self._executor, fn, *args)
+            except requests.exceptions.HTTPError:
+                # Client-Fehler (4xx außer 404/429) sind nicht vorübergehend
+                raise
+            except Exception as e:
+                # Netzwerk, 429/5xx und SDK-Fehler (z.B. Gemini Quota) mit Backoff wiederholen
+                last_error = e
+            if attempt < self.max_retries - 1:
+                wait_time = self.backoff_base * (2 ** attempt)
+                self.api_metadata["retry_attempts"] += 1
+                print(f"    -> {label}: {last_error} (Versuch {attempt + 1}/{self.max_retries}), "
+                      f"warte {wait_time:.1f}s...", file=sys.stderr)
+                await asyncio.sleep(wait_time)
+        raise last_error
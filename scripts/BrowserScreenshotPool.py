@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+BrowserScreenshotPool.py - Pool vorgewärmter Headless-Browser für Karten-Screenshots (Schritt 10)
+
+Statt je HTML-Datei einen Chrome-WebDriver zu starten und fest --delay
+Sekunden zu warten, startet der Pool N Browser parallel (einmalige
+Init-Zeit) und verteilt eine Liste von Karten auf die freien Browser.
+Fertig ist eine Seite, sobald ein Readiness-Check im Browser meldet,
+dass das Dokument geladen ist und alle Leaflet-Kacheln fertig sind;
+--delay ist nur noch die Obergrenze.
+Selenium wird erst in chrome_driver_factory importiert.
+"""
+
+import os
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+
+DEFAULT_POOL_SIZE = 4
+POLL_INTERVAL_S = 0.1
+SETTLE_TIME_S = 0.2  # nach "ready" ein Frame Puffer für Canvas-Ebenen
+
+# Läuft im Browser: true, wenn Dokument geladen und keine Leaflet-Kachel mehr lädt.
+# Karten ohne Leaflet gelten mit document.readyState === 'complete' als fertig.
+READY_SCRIPT = """
+if (document.readyState !== 'complete') { return false; }
+if (!document.querySelector('.leaflet-container')) { return true; }
+var tiles = document.querySelectorAll('img.leaflet-tile');
+if (tiles.length === 0) { return false; }
+if (document.querySelector('.leaflet-tile-loading')) { return false; }
+for (var i = 0; i < tiles.length; i++) {
+    if (!tiles[i].complete) { return false; }
+}
+return true;
+"""
+
+
+@dataclass
+class ScreenshotJob:
+    html_path: str
+    png_path: str
+    width: int = 1200
+    height: int = 800
+
+
+@dataclass
+class ScreenshotResult:
+    job: ScreenshotJob
+    success: bool = False
+    page_load_s: float = 0.0
+    wait_s: float = 0.0
+    capture_s: float = 0.0
+    ready_signal: bool = False  # False: Obergrenze erreicht, Screenshot trotzdem erstellt
+    error: str = ''
+
+
+def file_url(path: str) -> str:
+    return f"file:///{os.path.abspath(path).replace(os.sep, '/').lstrip('/')}"
+
+
+def wait_until_ready(driver, max_wait_s: float, poll_s: float = POLL_INTERVAL_S,
+                     settle_s: float = SETTLE_TIME_S) -> Tuple[bool, float]:
+    """Pollt READY_SCRIPT bis true oder max_wait_s; gibt (ready, gewartete Sekunden) zurück."""
+    start = time.time()
+    while True:
+        try:
+            ready = bool(driver.execute_script(READY_SCRIPT))
+        except Exception:
+            ready = False
+        if ready:
+            time.sleep(settle_s)
+            return True, time.time() - start
+        if time.time() - start >= max_wait_s:
+            return False, time.time() - start
+        time.sleep(poll_s)
+
+
+def capture_with_driver(driver, job: ScreenshotJob, max_wait_s: float) -> ScreenshotResult:
+    """Eine Karte mit einem bereits laufenden Browser aufnehmen."""
+    result = ScreenshotResult(job)
+    try:
+        output_dir = os.path.dirname(job.png_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        driver.set_window_size(job.width, job.height)
+
+        load_start = time.time()
+        driver.get(file_url(job.html_path))
+        result.page_load_s = time.time() - load_start
+
+        result.ready_signal, result.wait_s = wait_until_ready(driver, max_wait_s)
+
+        capture_start = time.time()
+        result.success = bool(driver.save_screenshot(job.png_path))
+        result.capture_s = time.time() - capture_start
+        if not result.success:
+            result.error = 'save_screenshot returned False'
+    except Exception as e:
+        result.error = str(e)
+    return result
+
+
+class ScreenshotPool:
+    """
+    Pool von size Browsern; driver_factory() liefert einen gestarteten WebDriver.
+    Verwendung: with ScreenshotPool(factory, 3) as pool: pool.capture_all(jobs)
+    """
+
+    def __init__(self, driver_factory: Callable[[], object], size: int = DEFAULT_POOL_SIZE):
+        self.driver_factory = driver_factory
+        self.size = max(int(size), 1)
+        self.drivers: List[object] = []
+        self.init_seconds = 0.0
+
+    def __enter__(self) -> 'ScreenshotPool':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def start(self) -> None:
+        """Alle Browser parallel starten (Init-Zeit fällt einmal an, nicht size-mal)."""
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            futures = [executor.submit(self.driver_factory) for _ in range(self.size)]
+            errors = []
+            for future in futures:
+                try:
+                    self.drivers.append(future.result())
+                except Exception as e:
+                    errors.append(e)
+        self.init_seconds = time.time() - start
+        if not self.drivers:
+            raise RuntimeError(f"No browser could be started: {errors[0] if errors else 'unknown error'}")
+
+    def capture_all(self, jobs: Sequence[ScreenshotJob], max_wait_s: float) -> List[ScreenshotResult]:
+        """Jobs auf die freien Browser verteilen; Ergebnisse in Eingabereihenfolge."""
+        idle = queue.Queue()
+        for driver in self.drivers:
+            idle.put(driver)
+
+        def run(job: ScreenshotJob) -> ScreenshotResult:
+            driver = idle.get()
+            try:
+                return capture_with_driver(driver, job, max_wait_s)
+            finally:
+                try:
+                    driver.get('about:blank')  # Seite freigeben, Browser bleibt warm
+                except Exception:
+                    pass
+                idle.put(driver)
+
+        with ThreadPoolExecutor(max_workers=len(self.drivers)) as executor:
+            return list(executor.map(run, jobs))
+
+    def close(self) -> None:
+        for driver in self.drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        self.drivers = []
+
+
+def chrome_driver_factory(headless_mode: str = "new", log_level: int = 3,
+                          page_load_timeout: Optional[int] = 30) -> Callable[[], object]:
+    """Factory für Headless-Chrome; chromedriver wird nur einmal aufgelöst."""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options as ChromeOptions
+    from selenium.webdriver.chrome.service import Service as ChromeService
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    driver_path = ChromeDriverManager().install()
+
+    def create():
+        options = ChromeOptions()
+        options.add_argument(f"--headless={headless_mode}")
+        options.add_argument("--hide-scrollbars")
+        options.add_argument("--disable-gpu")
+        options.add_argument(f"--log-level={log_level}")
+        options.add_experimental_option('excludeSwitches', ['enable-logging'])
+        driver = webdriver.Chrome(service=ChromeService(driver_path), options=options)
+        if page_load_timeout:
+            driver.set_page_load_timeout(page_load_timeout)
+        return driver
+
+    return create
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+DistanceGrid.py - Einheitliches Distanzraster für Steigung, Power und Profil (Schritte 3, 10b, 10c)
+
+GPS-Punkte liegen unregelmäßig (Stillstand: 0 m, Abfahrt: 15 m pro Punkt).
+Punkt-zu-Punkt-Steigungen erzeugen dadurch Ausreißer, die jeder Schritt
+anders wegglättet. Hier wird der Track per np.interp auf ein festes
+Distanzraster (z. B. 10 m) gebracht; Steigung und Simulation rechnen auf
+dem kompakten Raster, Ergebnisse werden per Distanz auf die Originalpunkte
+zurückgelegt. Bei 1-Hz-Daten ist das Raster mehrfach kleiner als der Track.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_SPACING_M = 10.0
+
+
+@dataclass
+class DistanceGrid:
+    """Track auf äquidistantem Raster plus Zuordnung zu den Originalpunkten"""
+    distance_m: np.ndarray          # Rasterpositionen (letzter Punkt = Trackende)
+    source_distance_m: np.ndarray   # monotone Distanz der Originalpunkte
+    spacing_m: float
+    values: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.distance_m)
+
+    @property
+    def segment_length_m(self) -> np.ndarray:
+        """Länge des Abschnitts vor jedem Rasterpunkt (erster Punkt: 0 m)."""
+        return np.diff(self.distance_m, prepend=self.distance_m[:1])
+
+    def nearest_source_index(self) -> np.ndarray:
+        """Index des nächstgelegenen Originalpunkts für jeden Rasterpunkt."""
+        src = self.source_distance_m
+        if len(src) < 2:
+            return np.zeros(len(self.distance_m), dtype=int)
+        right = np.clip(np.searchsorted(src, self.distance_m), 1, len(src) - 1)
+        left = right - 1
+        take_left = (self.distance_m - src[left]) <= (src[right] - self.distance_m)
+        return np.where(take_left, left, right)
+
+    def cell_of_source(self) -> np.ndarray:
+        """Rasterzelle (Index des vorherigen Rasterpunkts) für jeden Originalpunkt."""
+        return np.clip(np.searchsorted(self.distance_m, self.source_distance_m, side='right') - 1,
+                       0, len(self.distance_m) - 1)
+
+    def to_source(self, grid_values: Iterable[float]) -> np.ndarray:
+        """Rasterwerte linear auf die Originalpunkte interpolieren."""
+        return np.interp(self.source_distance_m, self.distance_m, np.asarray(grid_values, dtype=float))
+
+    def take_labels(self, labels: Iterable) -> np.ndarray:
+        """Kategoriale Originalwerte (z. B. Surface) über den nächsten Originalpunkt übernehmen."""
+        return np.asarray(labels, dtype=object)[self.nearest_source_index()]
+
+    def gradient(self, key: str = 'Elevation (m)') -> np.ndarray:
+        """Steigung (Anteil, nicht Prozent) auf dem Raster, zentrale Differenzen."""
+        elevation = self.values[key]
+        if len(elevation) < 2:
+            return np.zeros(len(elevation))
+        return np.gradient(elevation, self.distance_m)
+
+
+def monotonic_distance(distance_m: Iterable[float]) -> np.ndarray:
+    """Distanz ohne NaN und ohne Rücksprünge (GPS-Rundung), Voraussetzung für np.interp."""
+    distance = pd.Series(np.asarray(distance_m, dtype=float)).ffill().fillna(0.0).to_numpy()
+    return np.maximum.accumulate(distance) if len(distance) else distance
+
+
+def resample_to_grid(distance_m: Iterable[float], columns: Optional[Mapping[str, Iterable[float]]] = None,
+                     spacing_m: float = DEFAULT_SPACING_M) -> DistanceGrid:
+    """
+    Interpoliert numerische Spalten (Höhe, Zeit, Geschwindigkeit, ...) auf ein Raster.
+
+    Das Raster beginnt am Trackstart, hat den Abstand spacing_m und endet
+    exakt am Trackende. NaN-Werte einer Spalte werden dabei übersprungen.
+    """
+    if spacing_m <= 0:
+        raise ValueError(f"spacing_m must be positive, got {spacing_m}")
+    source = monotonic_distance(distance_m)
+    if len(source) == 0:
+        return DistanceGrid(np.zeros(0), source, spacing_m, {key: np.zeros(0) for key in (columns or {})})
+
+    start, end = source[0], source[-1]
+    grid = np.arange(start, end, spacing_m)
+    if len(grid) == 0 or grid[-1] < end:
+        grid = np.append(grid, end)
+
+    values = {}
+    for key, column in (columns or {}).items():
+        column = np.asarray(column, dtype=float)
+        valid = ~np.isnan(column)
+        values[key] = np.interp(grid, source[valid], column[valid]) if valid.any() else np.full(len(grid), np.nan)
+
+    return DistanceGrid(distance_m=grid, source_distance_m=source, spacing_m=float(spacing_m), values=values)
+
+
+def gradient_via_grid(distance_m: Iterable[float], elevation_m: Iterable[float],
+                      spacing_m: float = DEFAULT_SPACING_M) -> np.ndarray:
+    """Steigung (Anteil) je Originalpunkt, berechnet auf dem Raster und zurückinterpoliert."""
+    grid = resample_to_grid(distance_m, {'Elevation (m)': elevation_m}, spacing_m)
+    if len(grid) == 0:
+        return np.zeros(0)
+    return grid.to_source(grid.gradient())
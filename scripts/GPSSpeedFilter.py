@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+GPSSpeedFilter.py - GPS-Geschwindigkeitsfilter (Schritt 10b, 2d, clean_gps.py)
+
+Begrenzt unrealistische Geschwindigkeiten und Sprünge zwischen GPS-Punkten,
+glättet anschließend (Rolling Median + Mean) und zählt die Korrekturen.
+Die Sprungbegrenzung ist eine Rekurrenz (jeder Punkt hängt vom bereits
+korrigierten Vorgänger ab). Abweichen kann der Vorgänger aber nur innerhalb
+eines Laufs korrigierter Punkte: Kandidaten werden deshalb vektorisiert
+gesucht, Python läuft nur noch über die korrigierten Läufe.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Standardwerte wie bisher in 10b_power_processing.py
+MAX_REALISTIC_SPEED = 65  # km/h - Obergrenze nach der Glättung
+HARD_LIMIT_SPEED = 80     # km/h - völlig unrealistische Werte werden sofort begrenzt
+MAX_ACCELERATION = 10     # km/h pro GPS-Punkt
+MIN_REALISTIC_SPEED = 2   # km/h - Minimum für fahrende Bewegung
+
+
+@dataclass
+class SpeedFilterResult:
+    """Gefilterte Geschwindigkeit plus Korrektur-Statistik"""
+    speed: pd.Series
+    corrected_mask: pd.Series
+    stats: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def corrections_made(self) -> int:
+        return int(self.corrected_mask.sum())
+
+
+def limit_speed_jumps(speeds: Iterable[float], max_jump: float = MAX_ACCELERATION,
+                      prev_weight: float = 0.7) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ersetzt Sprünge > max_jump durch prev_weight*Vorgänger + (1-prev_weight)*Nachfolger.
+
+    Der Vorgänger ist bereits korrigiert, der Nachfolger noch nicht; am Ende
+    wird der Vorgänger übernommen. NaN-Werte lösen keine Korrektur aus.
+
+    Ein Lauf beginnt nur dort, wo schon die Rohwerte springen (np.diff);
+    nach dem ersten nicht korrigierten Punkt stimmen Vorgänger und Rohwert
+    wieder überein. Aufwand in Python: O(Anzahl Korrekturen) statt O(n).
+
+    Returns:
+        (gefilterte Werte, Maske der ersetzten Punkte)
+    """
+    values = np.array(speeds, dtype=float)
+    n = len(values)
+    corrected = np.zeros(n, dtype=bool)
+    if n < 2:
+        return values, corrected
+    next_weight = 1.0 - prev_weight
+
+    with np.errstate(invalid='ignore'):
+        run_starts = np.flatnonzero(np.abs(np.diff(values)) > max_jump) + 1
+
+    raw = values.item  # liefert Python-Floats: schneller Einzelzugriff in den Läufen
+    fixed_index, fixed_value = [], []
+    settled = 0  # Punkte vor diesem Index sind endgültig
+    for i in run_starts.tolist():
+        if i < settled:
+            continue
+        prev = raw(i - 1)
+        while i < n and abs(raw(i) - prev) > max_jump:
+            prev = prev * prev_weight + raw(i + 1) * next_weight if i < n - 1 else prev
+            fixed_index.append(i)
+            fixed_value.append(prev)
+            i += 1
+        settled = i + 1
+
+    values[fixed_index] = fixed_value
+    corrected[fixed_index] = True
+    return values, corrected
+
+
+def filter_speed_outliers(speeds: Iterable[float], max_realistic: float = MAX_REALISTIC_SPEED,
+                          hard_limit: float = HARD_LIMIT_SPEED, max_jump: float = MAX_ACCELERATION,
+                          min_speed: float = MIN_REALISTIC_SPEED, median_window: int = 5,
+                          mean_window: int = 3) -> SpeedFilterResult:
+    """
+    Vollständige GPS-Geschwindigkeitsbereinigung in km/h.
+
+    1. Werte > hard_limit auf max_realistic setzen
+    2. Sprünge > max_jump begrenzen (limit_speed_jumps)
+    3. Rolling Median (median_window) und Rolling Mean (mean_window), zentriert
+    4. Obergrenze min(max_realistic, 1.1 * 95. Perzentil), Untergrenze min_speed
+    """
+    original = pd.Series(speeds, dtype=float)
+    index = original.index
+
+    speed = original.where(~(original > hard_limit), max_realistic)
+    jump_filtered, jump_mask = limit_speed_jumps(speed.to_numpy(), max_jump=max_jump)
+    speed = pd.Series(jump_filtered, index=index)
+
+    speed = speed.rolling(window=median_window, center=True, min_periods=1).median()
+    speed = speed.rolling(window=mean_window, center=True, min_periods=1).mean()
+
+    percentile_95 = speed.quantile(0.95)
+    realistic_max = min(max_realistic, percentile_95 * 1.1)
+    too_fast = speed > realistic_max
+    speed = speed.where(~too_fast, realistic_max)
+    too_slow = speed < min_speed
+    speed = speed.where(~too_slow, min_speed)
+
+    corrected_mask = speed != original
+    stats = {
+        'points_total': len(original),
+        'hard_limited': int((original > hard_limit).sum()),
+        'jump_corrections': int(jump_mask.sum()),
+        'capped_after_smoothing': int(too_fast.sum()),
+        'raised_to_minimum': int(too_slow.sum()),
+        'realistic_max_kmh': round(float(realistic_max), 2) if pd.notna(realistic_max) else None,
+        'corrections_made': int(corrected_mask.sum()),
+        'correction_rate_percent': round(corrected_mask.sum() / len(original) * 100, 1) if len(original) else 0.0
+    }
+    return SpeedFilterResult(speed=speed, corrected_mask=corrected_mask, stats=stats)
+
+
+def isolated_flags(flags: Iterable[bool]) -> np.ndarray:
+    """Markiert gesetzte Flags, deren beide Nachbarn nicht gesetzt sind (erster/letzter Punkt nie)."""
+    flags = np.asarray(flags, dtype=bool)
+    isolated = np.zeros(len(flags), dtype=bool)
+    if len(flags) > 2:
+        isolated[1:-1] = flags[1:-1] & ~flags[:-2] & ~flags[2:]
+    return isolated
@@ -5,12 +5,13 @@ Ersetzt das ursprüngliche 4_reverse_geocode.py mit SQLite-Cache
 """
 
 SCRIPT_NAME = "GPX_Workflow_SQLiteCaching.py"
-SCRIPT_VERSION = "1.0.0"  # Korrigierte Version für echten Workflow
+SCRIPT_VERSION = "1.2.0"  # v1.2.0 (2026-10-19): Nominatim-Takt prozessübergreifend über ApiRateBroker.py statt sleep(1.1)
 
 import sys
 import os
 import pandas as pd
 from geopy.geocoders import Nominatim
+from geopy.exc import GeocoderQuotaExceeded
 from tqdm import tqdm
 from time import sleep
 from geopy.distance import geodesic
@@ -26,6 +27,8 @@ from typing import Optional, Dict, List, Tuple
 from dataclasses import dataclass
 from pathlib import Path
 from SQLiteGeocodingCache import SQLiteGeocodingCache
+from StageMetadataIndex import record_header_lines
+from ApiRateBroker import api_request, claim, release_claim, throttled
 
 
 @dataclass
@@ -202,6 +205,17 @@ def main():
                     tolerance_km=cache_tolerance_km
                 )
 
+            # Gleicher Punkt gerade in einem parallelen Job angefragt? Dann abwarten und Cache erneut lesen
+            claim_key = None
+            if not cached_result and not force_api:
+                claim_key = f"reverse:{current_coord[0]:.4f},{current_coord[1]:.4f}"
+                if not claim("nominatim", claim_key):
+                    claim_key = None
+                    cached_result = cache.find_cached_geocoding(
+                        current_coord[0], current_coord[1],
+                        tolerance_km=cache_tolerance_km
+                    )
+
             if cached_result:
                 # Cache-Hit
                 api_metadata["cache_hits"] += 1
@@ -230,7 +244,8 @@ def main():
                 
                 while attempts < max_attempts and not success:
                     try:
-                        location = geolocator.reverse(current_coord, language='de', timeout=15)
+                        with api_request("nominatim"):  # Takt gilt für alle parallelen Jobs
+                            location = geolocator.reverse(current_coord, language='de', timeout=15)
                         success = True
                         api_metadata["api_successful_queries"] += 1
 
@@ -268,19 +283,24 @@ def main():
                         else:
                             logger.info(f"No address found for {current_coord}")
 
-                        sleep(1.1)  # Nominatim Rate Limit
-
                     except Exception as e:
                         attempts += 1
                         wait_time = 2 * attempts
                         logger.error(f"Geocoding error for {current_coord} (attempt {attempts}/{max_attempts}): {e}")
                         if attempts < max_attempts:
                             logger.info(f"Waiting {wait_time}s before retry...")
-                            sleep(wait_time)
+                            if isinstance(e, GeocoderQuotaExceeded):
+                                # Rate-Limit: Pause für alle Jobs, der nächste api_request wartet sie ab
+                                throttled("nominatim", getattr(e, 'retry_after', None) or wait_time)
+                            else:
+                                sleep(wait_time)
                         else:
                             api_metadata["api_failed_queries_after_retries"] += 1
                             logger.error(f"Geocoding failed after {max_attempts} attempts for {current_coord}")
 
+                if claim_key:
+                    release_claim("nominatim", claim_key)
+
         # Track-Point in Datenbank speichern
         cache.add_track_point(
             track_id=track_id,
@@ -333,6 +353,7 @@ def main():
         # DataFrame anhängen
         df_to_save.to_csv(output_csv_path, mode='a', index=False, encoding='utf-8', 
                          float_format='%.6f', header=True)
+        record_header_lines(output_csv_path, metadata_lines, SCRIPT_NAME)
         
         logger.info(f"Reverse Geocoding completed. Output saved: {output_csv_path}")
         
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+LabelPlacement.py - Überlappungsfreie Label-Platzierung für Profil-Plots (Schritt 3)
+
+Alle Labels werden gemeinsam platziert: nach linker Kante sortiert (O(n log n))
+und per Sweep-Line auf höchstens max_tiers Ebenen über ihrem Ankerpunkt
+verteilt. Ein Heap hält die Labels, die an der aktuellen x-Position noch
+aktiv sind; ein Label nimmt die unterste Ebene, deren Box keines dieser
+Labels schneidet. Passt ein Label in keine Ebene, wird es ausgeblendet
+(Marker bleiben sichtbar), statt andere Labels zu überdecken.
+"""
+
+import heapq
+from dataclasses import dataclass
+from typing import Iterable, Optional, Union
+
+import numpy as np
+
+DEFAULT_MAX_TIERS = 4
+CHAR_WIDTH_EM = 0.6      # mittlere Zeichenbreite relativ zur Schriftgröße
+LINE_HEIGHT_EM = 1.2     # Zeilenhöhe relativ zur Schriftgröße
+
+
+@dataclass
+class LabelLayout:
+    """Platzierte Labels in Eingabereihenfolge (tier = -1: ausgeblendet)"""
+    x: np.ndarray        # Label-Mitte (Datenkoordinaten)
+    y: np.ndarray        # Unterkante der Label-Box (Datenkoordinaten, NaN wenn ausgeblendet)
+    tier: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.tier)
+
+    @property
+    def placed(self) -> np.ndarray:
+        return self.tier >= 0
+
+    @property
+    def hidden_count(self) -> int:
+        return int((~self.placed).sum())
+
+    @property
+    def top(self) -> float:
+        """Höchste Unterkante aller platzierten Labels (NaN ohne Labels)."""
+        return float(np.nanmax(self.y)) if self.placed.any() else float('nan')
+
+
+def text_box_points(labels: Iterable[str], fontsize: float, pad_em: float = 0.15) -> tuple:
+    """Geschätzte Breite je Label und gemeinsame Höhe in Punkten (inkl. bbox-Padding)."""
+    lengths = np.array([len(str(label)) for label in labels], dtype=float)
+    pad = 2 * pad_em * fontsize
+    return lengths * CHAR_WIDTH_EM * fontsize + pad, LINE_HEIGHT_EM * fontsize + pad
+
+
+def place_labels(x: Iterable[float], width: Iterable[float], anchor_y: Iterable[float],
+                 tier_height: float, base_offset: Union[float, Iterable[float]] = 0.0,
+                 max_tiers: int = DEFAULT_MAX_TIERS, gap: float = 0.0,
+                 x_min: Optional[float] = None, x_max: Optional[float] = None) -> LabelLayout:
+    """
+    Platziert Labels (Breite in x-Dateneinheiten) auf Ebenen über anchor_y.
+
+    Ebene t liegt bei anchor_y + base_offset + t * tier_height (base_offset als
+    Skalar oder je Label). Zwei Labels kollidieren, wenn sich ihre x-Intervalle
+    (plus gap) überschneiden und ihre Unterkanten weniger als tier_height
+    auseinanderliegen. Mit x_min/x_max werden Labels am Rand nach innen
+    geschoben, damit sie nicht abgeschnitten werden.
+    """
+    width = np.asarray(width, dtype=float)
+    anchor_y = np.asarray(anchor_y, dtype=float)
+    centre = np.asarray(x, dtype=float).copy()
+    n = len(centre)
+    if x_min is not None:
+        centre = np.maximum(centre, x_min + width / 2)
+    if x_max is not None:
+        centre = np.minimum(centre, x_max - width / 2)
+
+    left, right = centre - width / 2, centre + width / 2
+    base = anchor_y + np.asarray(base_offset, dtype=float)
+    tier = np.full(n, -1, dtype=int)
+    y = np.full(n, np.nan)
+
+    active = []  # Heap (rechte Kante, Unterkante) bereits platzierter Labels
+    for i in np.argsort(left, kind='stable'):
+        while active and active[0][0] + gap <= left[i]:
+            heapq.heappop(active)
+        if not np.isfinite(base[i]):
+            continue
+        for t in range(max_tiers):
+            candidate = base[i] + t * tier_height
+            if all(abs(candidate - other_y) >= tier_height for _, other_y in active):
+                tier[i], y[i] = t, candidate
+                heapq.heappush(active, (right[i], candidate))
+                break
+
+    return LabelLayout(x=centre, y=y, tier=tier)
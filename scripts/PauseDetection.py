@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+PauseDetection.py - Gemeinsame Pausen- und Zeitlücken-Erkennung (Schritte 3, 3b)
+
+Pausen werden über Lauflängenkodierung boolescher Masken und kumulierte
+Zeit bestimmt, ohne Schleife über die Trackpunkte:
+- Zeitlücken: ein einzelner Zeitschritt >= Schwelle (optional ohne Bewegung)
+- Geschwindigkeits-Pausen: zusammenhängende Blöcke mit Geschwindigkeit <= Schwelle
+Ergebnis ist ein PauseIntervals-Objekt mit Arrays (Start-/Endindex, km, Dauer, Typ).
+"""
+
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+PAUSE_TYPE_SPEED = 'Geschwindigkeit'
+PAUSE_TYPE_GAP = 'Zeitlücke'
+
+SPEED_PAUSE_THRESHOLD_KMH = 2.0   # km/h - darunter gilt ein Punkt als Stillstand
+MIN_PAUSE_POINTS = 3              # Mindestanzahl GPS-Punkte für eine Geschwindigkeits-Pause
+MIN_PAUSE_DURATION_S = 10.0       # Sekunden - kürzere Pausen werden ignoriert
+GAP_MIN_DURATION_S = 60.0         # Sekunden - Mindest-Zeitlücke
+GAP_MEDIAN_MULTIPLIER = 5.0       # Zeitlücke erst ab 5x normalem GPS-Intervall
+FALLBACK_INTERVAL_S = 5.0         # geschätztes GPS-Intervall ohne Zeitstempel
+
+
+@dataclass
+class PauseIntervals:
+    """Erkannte Pausen als parallele Arrays (Endindex inklusiv)"""
+    start_idx: np.ndarray
+    end_idx: np.ndarray
+    start_km: np.ndarray
+    duration_s: np.ndarray
+    pause_type: np.ndarray
+
+    @classmethod
+    def empty(cls) -> 'PauseIntervals':
+        return cls(np.zeros(0, dtype=int), np.zeros(0, dtype=int), np.zeros(0), np.zeros(0),
+                   np.zeros(0, dtype=object))
+
+    def __len__(self) -> int:
+        return len(self.start_idx)
+
+    @property
+    def total_duration_s(self) -> float:
+        return float(self.duration_s.sum())
+
+    def count(self, pause_type: str) -> int:
+        return int((self.pause_type == pause_type).sum())
+
+    def combine(self, other: 'PauseIntervals') -> 'PauseIntervals':
+        """Beide Pausenlisten zusammenführen, stabil nach km sortiert."""
+        merged = [np.concatenate((getattr(self, name), getattr(other, name)))
+                  for name in ('start_idx', 'end_idx', 'start_km', 'duration_s', 'pause_type')]
+        order = np.argsort(merged[2], kind='stable')
+        return PauseIntervals(*(values[order] for values in merged))
+
+    def to_records(self) -> List[Tuple[int, int, float, float, str]]:
+        """(start_idx, end_idx, km, Dauer in s, Typ) je Pause für Plot-Schleifen."""
+        return list(zip(self.start_idx.tolist(), self.end_idx.tolist(), self.start_km.tolist(),
+                        self.duration_s.tolist(), self.pause_type.tolist()))
+
+
+def run_bounds(mask: Iterable[bool]) -> Tuple[np.ndarray, np.ndarray]:
+    """Start- und Endindex (inklusiv) aller True-Läufe einer booleschen Maske."""
+    mask = np.asarray(mask, dtype=bool)
+    padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+    edges = np.diff(padded)
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1
+
+
+def elapsed_seconds(times: Iterable) -> np.ndarray:
+    """Sekunden seit dem ersten gültigen Zeitstempel; ungültige Zeitstempel werden NaN."""
+    times = pd.to_datetime(pd.Series(times), errors='coerce')
+    if times.dt.tz is not None:
+        times = times.dt.tz_convert(None)
+    valid = times.notna()
+    if not valid.any():
+        return np.full(len(times), np.nan)
+    return (times - times[valid].iloc[0]).dt.total_seconds().to_numpy(dtype=float)
+
+
+def time_gap_pauses(elapsed_s: Iterable[float], distance_km: Iterable[float],
+                    min_gap_s: float = GAP_MIN_DURATION_S, median_multiplier: Optional[float] = None,
+                    max_distance_m: Optional[float] = None,
+                    step_distance_m: Optional[Iterable[float]] = None) -> PauseIntervals:
+    """
+    Zeitschritte >= Schwelle als Pause (Start = vorheriger Punkt, Ende = Punkt nach der Lücke).
+
+    median_multiplier: Schwelle mindestens median_multiplier x Median-Intervall.
+    max_distance_m: nur Lücken ohne nennenswerte Bewegung (Schritt 3); die
+    Schrittdistanz ist step_distance_m oder die Differenz von distance_km.
+    """
+    elapsed = np.asarray(elapsed_s, dtype=float)
+    distance_km = np.asarray(distance_km, dtype=float)
+    if len(elapsed) < 2:
+        return PauseIntervals.empty()
+
+    time_diffs = np.diff(elapsed)
+    threshold = min_gap_s
+    if median_multiplier is not None and np.isfinite(time_diffs).any():
+        threshold = max(min_gap_s, float(np.nanmedian(time_diffs)) * median_multiplier)
+
+    with np.errstate(invalid='ignore'):
+        is_gap = time_diffs >= threshold
+        if max_distance_m is not None:
+            step_m = (np.asarray(step_distance_m, dtype=float)[1:] if step_distance_m is not None
+                      else np.diff(distance_km) * 1000)
+            is_gap &= step_m <= max_distance_m
+
+    end = np.flatnonzero(is_gap) + 1
+    return PauseIntervals(end - 1, end, distance_km[end - 1], time_diffs[end - 1],
+                          np.full(len(end), PAUSE_TYPE_GAP, dtype=object))
+
+
+def speed_pauses(speed_kmh: Iterable[float], distance_km: Iterable[float],
+                 elapsed_s: Optional[Iterable[float]] = None,
+                 threshold_kmh: float = SPEED_PAUSE_THRESHOLD_KMH, min_points: int = MIN_PAUSE_POINTS,
+                 min_duration_s: float = MIN_PAUSE_DURATION_S,
+                 fallback_interval_s: float = FALLBACK_INTERVAL_S) -> PauseIntervals:
+    """
+    Blöcke mit Geschwindigkeit <= threshold_kmh und mindestens min_points Punkten.
+
+    Dauer = Zeit zwischen erstem und letztem Punkt des Blocks; ohne (vollständige)
+    Zeitstempel im Block Punktanzahl x fallback_interval_s.
+    """
+    speed = np.asarray(speed_kmh, dtype=float)
+    distance_km = np.asarray(distance_km, dtype=float)
+    with np.errstate(invalid='ignore'):
+        starts, ends = run_bounds(speed <= threshold_kmh)
+    points = ends - starts + 1
+    keep = points >= min_points
+    starts, ends, points = starts[keep], ends[keep], points[keep]
+
+    duration = points * float(fallback_interval_s)
+    if elapsed_s is not None and len(starts):
+        elapsed = np.asarray(elapsed_s, dtype=float)
+        missing = np.concatenate(([0], np.cumsum(np.isnan(elapsed))))
+        complete = (missing[ends + 1] - missing[starts]) == 0
+        duration = np.where(complete, elapsed[ends] - elapsed[starts], duration)
+
+    keep = duration >= min_duration_s
+    starts, ends = starts[keep], ends[keep]
+    return PauseIntervals(starts, ends, distance_km[starts], duration[keep],
+                          np.full(len(starts), PAUSE_TYPE_SPEED, dtype=object))
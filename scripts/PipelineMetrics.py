@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+PipelineMetrics.py - Zentrale Laufzeit-Metriken aller Pipeline-Schritte (pipeline_monitoring)
+
+Jeder Schritt landet mit Dauer, CPU-Zeit, Peak-RSS, Status sowie optionalen
+Spans (benannte Teilzeiten) und Zählern als eine Zeile in einer SQLite-
+Tabelle, gruppiert nach Pipeline-Lauf (GPX_PIPELINE_RUN_ID). Der Report
+vergleicht jeden Schritt eines Laufs mit dem Median seiner letzten Läufe
+(gleicher Schritt, gleicher Track) und markiert Ausreißer.
+
+Modi:
+- run:    Skript im selben Prozess ausführen und messen (Snakefile: {params.runner});
+          mit GPX_PROFILE zusätzlich profilieren (StageProfiler.py)
+- report: Bottleneck-Report eines Laufs (Standard: letzter Lauf), optional CSV-Export
+
+Instrumentierung im Skript (ohne Runner wird eine eigene Zeile geschrieben):
+  with PipelineMetrics.stage("11_generate_stage_summary", basename) as metrics:
+      with metrics.span("template_rendering"): ...
+      metrics.count("rows", len(df))
+
+Pfad: Umgebungsvariable GPX_PIPELINE_METRICS (setzt der Snakefile; nicht gesetzt oder leer = aus),
+Skripte von Hand oder in Tests schreiben also keine DB; report liest ohne Variable den Pfad aus config.yaml.
+Fehler beim Schreiben der Metriken brechen nie den Schritt ab.
+"""
+
+import argparse
+import contextlib
+import csv
+import json
+import os
+import runpy
+import sqlite3
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence
+
+try:
+    import resource  # nicht unter Windows
+except ImportError:
+    resource = None
+
+from StageProfiler import profiled
+
+DEFAULT_METRICS_PATH = "output/SQLliteDB/pipeline_metrics.db"
+DEFAULT_EXPORT_CSV = "output/pipeline_metrics.csv"
+METRICS_PATH_ENV = "GPX_PIPELINE_METRICS"
+RUN_ID_ENV = "GPX_PIPELINE_RUN_ID"
+DEFAULT_THRESHOLD_FACTOR = 2.0
+DEFAULT_TREND_WINDOW = 10
+DEFAULT_SLOW_THRESHOLD_S = 60.0
+SQLITE_TIMEOUT_S = 30
+
+# Lauf-ID für Aufrufe außerhalb von Snakemake (ein Prozess = ein Lauf)
+_PROCESS_RUN_ID = datetime.now().strftime("%Y%m%d-%H%M%S")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stage_metrics (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    track TEXT,
+    started_at TEXT NOT NULL,
+    duration_s REAL NOT NULL,
+    cpu_s REAL,
+    peak_rss_mb REAL,
+    status TEXT NOT NULL,
+    spans_json TEXT,
+    counters_json TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_stage_metrics_stage ON stage_metrics (stage, track, id);
+CREATE INDEX IF NOT EXISTS idx_stage_metrics_run ON stage_metrics (run_id);
+"""
+
+EXPORT_COLUMNS = ['id', 'run_id', 'stage', 'track', 'started_at', 'duration_s', 'cpu_s', 'peak_rss_mb',
+                  'status', 'spans_json', 'counters_json']
+
+
+def metrics_path() -> Optional[str]:
+    """Aktiver Pfad der Metriken-DB; None außerhalb der Pipeline oder wenn per GPX_PIPELINE_METRICS="" abgeschaltet."""
+    return os.environ.get(METRICS_PATH_ENV) or None
+
+
+def current_run_id() -> str:
+    return os.environ.get(RUN_ID_ENV) or _PROCESS_RUN_ID
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Höchster Speicherverbrauch dieses Prozesses (None ohne resource-Modul)."""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 * 1024) if sys.platform == 'darwin' else max_rss / 1024  # macOS: Bytes, Linux: KiB
+
+
+class StageMetrics:
+    """Messung eines Schritts; finish() schreibt die Zeile in die Metriken-DB."""
+
+    def __init__(self, stage: str, track: Optional[str] = None):
+        self.stage = stage
+        self.track = track
+        self.pid = os.getpid()
+        self.started_at = datetime.now().isoformat()
+        self.spans: Dict[str, float] = {}
+        self.counters: Dict[str, float] = {}
+        self.status = 'ok'
+        self._start = time.perf_counter()
+        self._cpu_start = time.process_time()
+
+    @contextlib.contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, time.perf_counter() - start)
+
+    def add_span(self, name: str, seconds: float) -> None:
+        self.spans[name] = self.spans.get(name, 0.0) + float(seconds)
+
+    def count(self, name: str, n: float = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def finish(self, db_path: Optional[str] = None) -> bool:
+        return record_stage(self.stage, self.track, self.started_at, time.perf_counter() - self._start,
+                            time.process_time() - self._cpu_start, peak_rss_mb(), self.status,
+                            self.spans, self.counters, db_path=db_path)
+
+
+_ACTIVE: Optional[StageMetrics] = None
+
+
+def active() -> Optional[StageMetrics]:
+    """Laufende Messung dieses Prozesses (geforkte Worker erben sie nicht)."""
+    return _ACTIVE if _ACTIVE is not None and _ACTIVE.pid == os.getpid() else None
+
+
+@contextlib.contextmanager
+def stage(name: str, track: Optional[str] = None, db_path: Optional[str] = None) -> Iterator[StageMetrics]:
+    """
+    Misst einen Schritt. Läuft bereits eine Messung (z.B. über 'run'),
+    fließen Spans/Zähler in diese ein statt eine zweite Zeile zu schreiben.
+    """
+    global _ACTIVE
+    running = active()
+    if running is not None:
+        yield running
+        return
+    metrics = StageMetrics(name, track)
+    _ACTIVE = metrics
+    try:
+        yield metrics
+    except SystemExit as e:
+        if e.code not in (0, None):
+            metrics.status = 'error'
+        raise
+    except BaseException:
+        metrics.status = 'error'
+        raise
+    finally:
+        _ACTIVE = None
+        metrics.finish(db_path)
+
+
+def span(name: str):
+    """Span der laufenden Messung; ohne Messung wirkungslos."""
+    metrics = active()
+    return metrics.span(name) if metrics is not None else contextlib.nullcontext()
+
+
+def count(name: str, n: float = 1) -> None:
+    metrics = active()
+    if metrics is not None:
+        metrics.count(name, n)
+
+
+def add_spans(timings: Mapping[str, float]) -> None:
+    """Bereits gemessene Phasenzeiten (z.B. performance_data eines Skripts) übernehmen."""
+    metrics = active()
+    if metrics is not None:
+        for name, seconds in timings.items():
+            if isinstance(seconds, (int, float)):
+                metrics.add_span(name, seconds)
+
+
+# === SPEICHER ===
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(db_path, timeout=SQLITE_TIMEOUT_S)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(_SCHEMA)
+    return connection
+
+
+def record_stage(stage_name: str, track: Optional[str], started_at: str, duration_s: float, cpu_s: Optional[float],
+                 rss_mb: Optional[float], status: str, spans: Optional[Mapping[str, float]] = None,
+                 counters: Optional[Mapping[str, float]] = None, run_id: Optional[str] = None,
+                 db_path: Optional[str] = None) -> bool:
+    db_path = db_path or metrics_path()
+    if not db_path:
+        return False
+    try:
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = _connect(db_path)
+        try:
+            with connection:
+                connection.execute(
+                    "INSERT INTO stage_metrics (run_id, stage, track, started_at, duration_s, cpu_s, peak_rss_mb, "
+                    "status, spans_json, counters_json) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (run_id or current_run_id(), stage_name, track, started_at, duration_s, cpu_s, rss_mb, status,
+                     json.dumps(dict(spans or {})), json.dumps(dict(counters or {}))))
+        finally:
+            connection.close()
+        return True
+    except (sqlite3.Error, OSError, TypeError, ValueError) as e:
+        print(f"[Warnung] Pipeline-Metriken nicht gespeichert ({stage_name}): {e}", file=sys.stderr)
+        return False
+
+
+def load_metrics(db_path: Optional[str] = None) -> List[Dict]:
+    """Alle Zeilen in Einfügereihenfolge."""
+    db_path = db_path or metrics_path()
+    if not db_path or not os.path.exists(db_path):
+        return []
+    connection = sqlite3.connect(db_path, timeout=SQLITE_TIMEOUT_S)
+    connection.row_factory = sqlite3.Row
+    try:
+        return [dict(row) for row in connection.execute("SELECT * FROM stage_metrics ORDER BY id")]
+    finally:
+        connection.close()
+
+
+# === BOTTLENECK-ANALYSE ===
+
+@dataclass
+class StageReport:
+    stage: str
+    track: Optional[str]
+    duration_s: float
+    peak_rss_mb: Optional[float]
+    status: str
+    median_s: Optional[float] = None   # Median der früheren Läufe (gleicher Schritt und Track)
+    runs_compared: int = 0
+    flags: List[str] = field(default_factory=list)
+
+    @property
+    def factor(self) -> Optional[float]:
+        return self.duration_s / self.median_s if self.median_s else None
+
+
+def analyze_run(rows: Sequence[Dict], run_id: Optional[str] = None, threshold_factor: float = DEFAULT_THRESHOLD_FACTOR,
+                window: int = DEFAULT_TREND_WINDOW, slow_threshold_s: Optional[float] = DEFAULT_SLOW_THRESHOLD_S,
+                detect_bottlenecks: bool = True) -> List[StageReport]:
+    """
+    Schritte eines Laufs (Standard: letzter Lauf) mit den window vorherigen Läufen vergleichen.
+    Flags: BOTTLENECK (> threshold_factor x Median), SLOW (> slow_threshold_s), FAILED.
+    """
+    if not rows:
+        return []
+    run_id = run_id or rows[-1]['run_id']
+    reports = []
+    for row in rows:
+        if row['run_id'] != run_id:
+            continue
+        history = [r['duration_s'] for r in rows
+                   if r['id'] < row['id'] and r['run_id'] != run_id and r['status'] == 'ok'
+                   and r['stage'] == row['stage'] and r['track'] == row['track']][-window:]
+        report = StageReport(row['stage'], row['track'], row['duration_s'], row['peak_rss_mb'], row['status'],
+                             statistics.median(history) if history else None, len(history))
+        if detect_bottlenecks and report.factor is not None and report.factor > threshold_factor:
+            report.flags.append('BOTTLENECK')
+        if slow_threshold_s and row['duration_s'] > slow_threshold_s:
+            report.flags.append('SLOW')
+        if row['status'] != 'ok':
+            report.flags.append('FAILED')
+        reports.append(report)
+    return reports
+
+
+def format_report(run_id: str, reports: Sequence[StageReport], threshold_factor: float, window: int) -> str:
+    lines = [f"Pipeline-Lauf {run_id}: {len(reports)} Schritte, Vergleich mit bis zu {window} früheren Läufen "
+             f"(Bottleneck ab {threshold_factor:.1f}x Median)",
+             f"{'Schritt':<42} {'Track':<20} {'Dauer s':>9} {'Median s':>9} {'Faktor':>7} {'RSS MB':>8}  Hinweis"]
+    for r in sorted(reports, key=lambda r: (-(r.factor or 0), -r.duration_s)):
+        lines.append(f"{r.stage:<42} {r.track or '-':<20} {r.duration_s:>9.2f} "
+                     f"{(f'{r.median_s:.2f}' if r.median_s is not None else '-'):>9} "
+                     f"{(f'{r.factor:.1f}x' if r.factor is not None else '-'):>7} "
+                     f"{(f'{r.peak_rss_mb:.0f}' if r.peak_rss_mb is not None else '-'):>8}  {' '.join(r.flags)}")
+    flagged = sum(1 for r in reports if r.flags)
+    lines.append(f"[Info] {flagged} von {len(reports)} Schritten auffällig")
+    return "\n".join(lines)
+
+
+def export_metrics_csv(rows: Sequence[Dict], csv_path: str) -> None:
+    directory = os.path.dirname(csv_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=EXPORT_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def load_monitoring_config(config_path: str) -> Dict:
+    """pipeline_monitoring-Block aus config.yaml ({} wenn nicht vorhanden)."""
+    if not config_path or not os.path.exists(config_path):
+        return {}
+    import yaml
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return (yaml.safe_load(f) or {}).get('pipeline_monitoring', {}) or {}
+
+
+# === RUNNER ===
+
+def stage_name_for(script: str, script_args: Sequence[str]) -> str:
+    """Schrittname = Skriptname; bei Wrappern (PlotRenderWorker submit -- x.py) das eigentliche Skript."""
+    name = Path(script).stem
+    for previous, token in zip(script_args, script_args[1:]):
+        if previous == '--' and token.endswith('.py'):
+            name = Path(token).stem
+    return name
+
+
+def run_script(script: str, script_args: Sequence[str], stage_name: Optional[str] = None,
+               track: Optional[str] = None, db_path: Optional[str] = None) -> int:
+    """Führt script im aktuellen Prozess aus (wie ein Direktaufruf), misst und ggf. profiliert es. Returns: Exit-Code."""
+    saved_argv, saved_path = list(sys.argv), list(sys.path)
+    returncode = 0
+    with stage(stage_name or stage_name_for(script, script_args), track, db_path) as metrics, \
+            profiled(metrics.stage, track, script=script):
+        sys.argv = [script] + list(script_args)
+        sys.path.insert(0, str(Path(script).resolve().parent))  # Geschwister-Module wie beim Direktaufruf
+        try:
+            runpy.run_path(script, run_name='__main__')
+        except SystemExit as e:
+            if e.code is not None and not isinstance(e.code, int):
+                print(e.code, file=sys.stderr)
+            returncode = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        finally:
+            sys.argv, sys.path[:] = saved_argv, saved_path
+        if returncode:
+            metrics.status = 'error'
+    return returncode
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Central pipeline run metrics and bottleneck report.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_run = sub.add_parser('run', help="Run a pipeline script in-process and record its metrics.")
+    p_run.add_argument('--stage', default=None, help="Stage name (default: script name).")
+    p_run.add_argument('--track', default=None, help="Track basename.")
+    p_run.add_argument('script')
+    p_run.add_argument('script_args', nargs=argparse.REMAINDER)
+
+    p_report = sub.add_parser('report', help="Flag stages slower than N x their historical median.")
+    p_report.add_argument('--run-id', default=None, help="Run to analyze (default: latest run).")
+    p_report.add_argument('--config', default="config.yaml", help="Read pipeline_monitoring defaults from this file.")
+    p_report.add_argument('--factor', type=float, default=None, help="Bottleneck threshold factor.")
+    p_report.add_argument('--window', type=int, default=None, help="Number of previous runs to compare with.")
+    p_report.add_argument('--slow-s', type=float, default=None, help="Flag stages slower than this (seconds).")
+    p_report.add_argument('--export-csv', default=None, help="Write all recorded metrics to this CSV.")
+
+    p_run.add_argument('--db', default=None, help=f"Metrics database (default: ${METRICS_PATH_ENV}; unset = not recorded).")
+    p_report.add_argument('--db', default=None, help=f"Metrics database (default: ${METRICS_PATH_ENV} or {DEFAULT_METRICS_PATH}).")
+
+    # 'run -- script.py ...' wie bei PlotRenderWorker submit
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv[:1] == ['run'] and '--' in argv:
+        split = argv.index('--')
+        args = parser.parse_args(argv[:split] + ['_'])
+        args.script, args.script_args = argv[split + 1], argv[split + 2:]
+    else:
+        args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        return run_script(args.script, args.script_args, args.stage, args.track, args.db)
+
+    monitoring = load_monitoring_config(args.config)
+    alerts, tracking = monitoring.get('alerts', {}), monitoring.get('tracking', {})
+    factor = args.factor or alerts.get('bottleneck_threshold_factor', DEFAULT_THRESHOLD_FACTOR)
+    window = args.window or tracking.get('trend_analysis_window', DEFAULT_TREND_WINDOW)
+    slow_s = args.slow_s if args.slow_s is not None else monitoring.get('dashboard', {}).get(
+        'performance_threshold_slow', DEFAULT_SLOW_THRESHOLD_S)
+
+    rows = load_metrics(args.db or metrics_path() or tracking.get('metrics_db_path', DEFAULT_METRICS_PATH))
+    if not rows:
+        print("[Info] Keine Pipeline-Metriken vorhanden.")
+        return 0
+    run_id = args.run_id or rows[-1]['run_id']
+    reports = analyze_run(rows, run_id, factor, window, slow_s, alerts.get('enable_bottleneck_detection', True))
+    print(format_report(run_id, reports, factor, window))
+
+    export_csv = args.export_csv or (DEFAULT_EXPORT_CSV if tracking.get('export_metrics_csv', False) else None)
+    if export_csv:
+        export_metrics_csv(rows, export_csv)
+        print(f"[Info] Metriken exportiert: {export_csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    # Über den importierten Modulnamen laufen, damit Skripte mit 'import PipelineMetrics' dieselbe Messung sehen
+    import PipelineMetrics
+    sys.exit(PipelineMetrics.main())
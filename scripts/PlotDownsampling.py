@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+PlotDownsampling.py - Formerhaltende Punktreduktion für Profil-Plots (Schritte 3, 3b, 10c)
+
+Largest-Triangle-Three-Buckets (LTTB), vollständig vektorisiert: je Bucket
+wird der Punkt mit der größten Dreiecksfläche zu den Mittelwerten des
+vorherigen und des nächsten Buckets gewählt (Varianten-LTTB ohne sequentielle
+Abhängigkeit). Pflichtpunkte (z. B. Oberflächenwechsel) bleiben erhalten,
+das Punktbudget wird nie überschritten.
+"""
+
+import time
+from typing import Dict, Iterable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+
+def lttb_indices(x: Iterable[float], y: Union[Iterable[float], np.ndarray], n_out: int) -> np.ndarray:
+    """
+    Indizes von höchstens n_out formgebenden Punkten (erster und letzter immer dabei).
+
+    y darf 1D oder 2D (Punkte x Serien) sein; mehrere Serien werden auf ihre
+    Spannweite normiert und die Dreiecksflächen addiert.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if y.ndim == 1:
+        y = y[:, None]
+    n = len(x)
+    if n_out >= n or n <= 2:
+        return np.arange(n)
+    if n_out <= 2:
+        return np.array([0, n - 1])[:max(n_out, 0)]
+
+    # Serien normieren, damit Watt und Höhenmeter gleich gewichtet werden
+    y = np.nan_to_num(y, nan=0.0)
+    spans = np.ptp(y, axis=0)
+    y = y / np.where(spans > 0, spans, 1.0)
+    x_span = np.ptp(x)
+    x = np.nan_to_num(x / (x_span if x_span > 0 else 1.0), nan=0.0)
+
+    # Innere Punkte 1..n-2 auf n_out-2 Buckets verteilen
+    n_buckets = n_out - 2
+    edges = np.unique(np.linspace(1, n - 1, n_buckets + 1).astype(int))
+    starts, counts = edges[:-1], np.diff(edges)
+    bucket_of_point = np.repeat(np.arange(len(starts)), counts)
+    inner = slice(1, n - 1)
+
+    bucket_x = np.add.reduceat(x[inner], starts - 1) / counts
+    bucket_y = np.add.reduceat(y[inner], starts - 1, axis=0) / counts[:, None]
+    prev_x = np.concatenate(([x[0]], bucket_x[:-1]))
+    prev_y = np.vstack((y[:1], bucket_y[:-1]))
+    next_x = np.concatenate((bucket_x[1:], [x[-1]]))
+    next_y = np.vstack((bucket_y[1:], y[-1:]))
+
+    ax, ay = prev_x[bucket_of_point], prev_y[bucket_of_point]
+    cx, cy = next_x[bucket_of_point], next_y[bucket_of_point]
+    area = np.abs((ax - cx)[:, None] * (y[inner] - ay) - (ax - x[inner])[:, None] * (cy - ay)).sum(axis=1)
+
+    # Erster Punkt mit maximaler Fläche je Bucket
+    bucket_max = np.maximum.reduceat(area, starts - 1)
+    is_max = area == bucket_max[bucket_of_point]
+    _, first = np.unique(bucket_of_point[is_max], return_index=True)
+    picked = np.flatnonzero(is_max)[first] + 1
+
+    return np.concatenate(([0], picked, [n - 1]))
+
+
+def select_plot_indices(x: Iterable[float], y: Union[Iterable[float], np.ndarray], target_points: int,
+                        keep: Optional[Iterable[bool]] = None) -> Tuple[np.ndarray, Dict[str, int]]:
+    """
+    LTTB-Auswahl mit Pflichtpunkten; Ergebnis hat höchstens target_points Punkte.
+
+    Passen die Pflichtpunkte nicht ins Budget, werden sie gleichmäßig ausgedünnt.
+    """
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+    forced = np.flatnonzero(np.asarray(keep, dtype=bool)) if keep is not None else np.zeros(0, dtype=int)
+    forced = np.union1d(forced, [0, n - 1]) if n else forced
+
+    forced_dropped = 0
+    if len(forced) > target_points:
+        forced_dropped = len(forced) - target_points
+        forced = forced[np.unique(np.linspace(0, len(forced) - 1, target_points).round().astype(int))]
+        selected = forced
+    else:
+        shape_budget = target_points - len(forced) + 2  # erster/letzter Punkt sind in beiden enthalten
+        selected = np.union1d(forced, lttb_indices(x, y, shape_budget))
+
+    return selected, {
+        'forced_points_kept': int(len(forced)),
+        'forced_points_dropped': int(forced_dropped)
+    }
+
+
+def downsample_for_plot(df: pd.DataFrame, x_col: str, y_cols: Union[str, Sequence[str]], target_points: int,
+                        keep_mask: Optional[Iterable[bool]] = None) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Reduziert einen DataFrame für Plots auf höchstens target_points Zeilen.
+
+    Returns:
+        (reduzierter DataFrame in Originalreihenfolge, Metadaten zur Reduktion)
+    """
+    reduction_start = time.time()
+    original_points = len(df)
+    y_cols = [y_cols] if isinstance(y_cols, str) else list(y_cols)
+
+    if original_points <= target_points:
+        return df, {
+            'reduction_performed': False,
+            'reduction_method': 'lttb',
+            'original_points': original_points,
+            'final_points': original_points,
+            'reduction_time_sec': round(time.time() - reduction_start, 3),
+            'reduction_ratio': 1.0
+        }
+
+    selected, forced_info = select_plot_indices(
+        df[x_col].to_numpy(dtype=float), df[y_cols].to_numpy(dtype=float), target_points, keep_mask
+    )
+    result = df.iloc[selected].copy()
+
+    metadata = {
+        'reduction_performed': True,
+        'reduction_method': 'lttb',
+        'original_points': original_points,
+        'final_points': len(result),
+        'reduction_time_sec': round(time.time() - reduction_start, 3),
+        'reduction_ratio': round(len(result) / original_points, 3)
+    }
+    metadata.update(forced_info)
+    return result, metadata
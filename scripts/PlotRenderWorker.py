@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+PlotRenderWorker.py - Langlebiger Plot-Worker für die Schritte 3, 3b und 10c
+
+Jeder Plot-Schritt startet sonst einen eigenen Python-Prozess, der pandas,
+scipy und matplotlib importiert und Schriften lädt, bevor überhaupt
+gezeichnet wird. Der Worker hält einen Prozess-Pool mit vorgewärmten
+Modulen (Agg-Backend, Font-Cache) und führt die unveränderten Plot-Skripte
+per runpy darin aus.
+
+Modi:
+- serve:  Worker starten; Jobs kommen als JSON-Dateien über ein Spool-Verzeichnis
+- submit: Job einreichen und auf das Ergebnis warten (Ausgabe/Exit-Code wie beim
+          direkten Aufruf). Läuft kein Worker, wird der Job lokal ausgeführt.
+- batch:  Jobliste (JSON) direkt auf einem Pool rendern
+- stop:   laufenden Worker nach Abschluss aller Jobs beenden
+
+Beispiel (Snakefile, plot_worker.enabled):
+  python scripts/PlotRenderWorker.py submit --spool .plot_worker -- \\
+      scripts/3b_plot_speed_profile.py IN.csv OUT.png
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import runpy
+import sys
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+DEFAULT_SPOOL_DIR = ".plot_worker"
+DEFAULT_WORKERS = 4
+POLL_INTERVAL_S = 0.1
+HEARTBEAT_TIMEOUT_S = 10.0
+IDLE_TIMEOUT_S = 1800.0  # Worker beendet sich ohne Jobs nach 30 min selbst
+
+# Plot-Typ -> Skript; Jobs dürfen auch direkt einen Skriptpfad angeben
+PLOT_SCRIPTS = {
+    'profile': '3_analyze_peaks_plot.py',
+    'speed_profile': '3b_plot_speed_profile.py',
+    'power': '10c_power_visualization.py',
+}
+
+HEARTBEAT_FILE = 'worker.json'
+STOP_FILE = 'stop'
+
+
+def warm_up() -> None:
+    """
+    Initializer der Pool-Prozesse: schwere Module und Schriften einmal laden.
+
+    Fehler hier dürfen den Pool nicht zerstören; die Skripte importieren
+    fehlende Module dann eben selbst.
+    """
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        import numpy  # noqa: F401
+        import pandas  # noqa: F401
+        import scipy.signal  # noqa: F401
+        import scipy.spatial  # noqa: F401
+
+        # Text einmal rendern lädt Font-Cache und Glyphen (normal/fett)
+        fig, ax = plt.subplots(figsize=(2, 1))
+        ax.plot([0, 1], [0, 1])
+        ax.text(0.5, 0.5, 'Höhe km/h Ø', fontsize=9, weight='bold')
+        ax.set_title('Profil')
+        fig.canvas.draw()
+        plt.close(fig)
+    except Exception as e:
+        print(f"[PlotWorker] Warm-up incomplete: {e}", file=sys.stderr)
+
+
+def _hold_process(seconds: float) -> int:
+    """Hilfsjob, damit beim Start jeder Pool-Prozess gestartet und vorgewärmt wird."""
+    time.sleep(seconds)
+    return os.getpid()
+
+
+def resolve_script(job: Dict) -> Path:
+    """Skriptpfad aus 'script' oder 'plot_type' eines Jobs."""
+    if job.get('script'):
+        script = Path(job['script'])
+        if not script.is_absolute():
+            script = Path(job.get('cwd') or os.getcwd()) / script
+        return script
+    plot_type = job.get('plot_type')
+    if plot_type not in PLOT_SCRIPTS:
+        raise ValueError(f"Unknown plot_type '{plot_type}', expected one of {sorted(PLOT_SCRIPTS)}")
+    return SCRIPT_DIR / PLOT_SCRIPTS[plot_type]
+
+
+def make_job(script_or_type: str, args: Iterable[str], track: Optional[str] = None,
+             cwd: Optional[str] = None) -> Dict:
+    """Job-Dict: Plot-Typ (oder Skriptpfad), Argumente, Track-ID, Arbeitsverzeichnis."""
+    job = {
+        'job_id': uuid.uuid4().hex,
+        'track': track,
+        'args': [str(arg) for arg in args],
+        'cwd': cwd or os.getcwd(),
+    }
+    if script_or_type in PLOT_SCRIPTS:
+        job['plot_type'] = script_or_type
+    else:
+        job['script'] = script_or_type
+        job['plot_type'] = next((key for key, name in PLOT_SCRIPTS.items()
+                                 if Path(script_or_type).name == name), None)
+    return job
+
+
+def run_job(job: Dict) -> Dict:
+    """
+    Führt ein Plot-Skript im aktuellen Prozess aus, als wäre es direkt gestartet.
+
+    Ausgabe (stdout/stderr) wird gesammelt und im Ergebnis zurückgegeben,
+    SystemExit wird zum Exit-Code. Offene Figuren werden danach geschlossen,
+    vom Skript angelegte Logging-Handler entfernt (sonst wäre logging.basicConfig
+    im nächsten Job wirkungslos und schriebe in den Puffer dieses Jobs).
+    """
+    start = time.time()
+    output = io.StringIO()
+    returncode = 0
+    saved_argv, saved_cwd, saved_path = list(sys.argv), os.getcwd(), list(sys.path)
+    saved_handlers = list(logging.root.handlers)
+
+    try:
+        script = resolve_script(job)
+        os.chdir(job.get('cwd') or saved_cwd)
+        sys.argv = [str(script)] + list(job.get('args', []))
+        sys.path.insert(0, str(script.parent))  # Geschwister-Module wie beim Direktaufruf
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            try:
+                runpy.run_path(str(script), run_name='__main__')
+            except SystemExit as e:
+                returncode = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+                if e.code is not None and not isinstance(e.code, int):
+                    print(e.code, file=sys.stderr)
+    except Exception:
+        output.write(traceback.format_exc())
+        returncode = 1
+    finally:
+        sys.argv, sys.path[:] = saved_argv, saved_path
+        os.chdir(saved_cwd)
+        for handler in [h for h in logging.root.handlers if h not in saved_handlers]:
+            logging.root.removeHandler(handler)
+            handler.close()
+        if 'matplotlib.pyplot' in sys.modules:
+            sys.modules['matplotlib.pyplot'].close('all')
+            sys.modules['matplotlib'].rc_file_defaults()  # rcParams-Änderungen nicht in den nächsten Job tragen
+
+    return {
+        'job_id': job.get('job_id'),
+        'track': job.get('track'),
+        'plot_type': job.get('plot_type'),
+        'script': job.get('script'),
+        'returncode': returncode,
+        'runtime_sec': round(time.time() - start, 3),
+        'output': output.getvalue()
+    }
+
+
+def run_batch(jobs: List[Dict], workers: int = DEFAULT_WORKERS) -> List[Dict]:
+    """Rendert alle Jobs parallel auf einem vorgewärmten Prozess-Pool (Ergebnisse in Jobreihenfolge)."""
+    with ProcessPoolExecutor(max_workers=max(1, workers), initializer=warm_up) as pool:
+        return list(pool.map(run_job, jobs))
+
+
+# === SPOOL-PROTOKOLL ===
+
+def _write_json_atomic(path: Path, data: Dict) -> None:
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(json.dumps(data), encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def worker_alive(spool_dir: str, max_age_s: float = HEARTBEAT_TIMEOUT_S) -> bool:
+    """True, wenn der Worker sein Heartbeat innerhalb von max_age_s aktualisiert hat."""
+    heartbeat = Path(spool_dir) / HEARTBEAT_FILE
+    try:
+        return time.time() - heartbeat.stat().st_mtime <= max_age_s
+    except OSError:
+        return False
+
+
+def serve(spool_dir: str = DEFAULT_SPOOL_DIR, workers: int = DEFAULT_WORKERS,
+          idle_timeout_s: Optional[float] = IDLE_TIMEOUT_S, pool=None) -> None:
+    """
+    Worker-Schleife: <id>.job.json -> <id>.running -> <id>.result.json.
+
+    Endet über die stop-Datei (nach Abschluss laufender Jobs) oder nach
+    idle_timeout_s ohne Jobs. pool: eigener Executor (submit/map), z.B. der
+    Track-Pool aus TrackRunner.py; Standard ist ein vorgewärmter Prozess-Pool.
+    """
+    spool = Path(spool_dir)
+    spool.mkdir(parents=True, exist_ok=True)
+    (spool / STOP_FILE).unlink(missing_ok=True)
+    heartbeat = spool / HEARTBEAT_FILE
+    pending = {}
+    last_activity = time.time()
+    print(f"[PlotWorker] Serving {spool.resolve()} with {workers} processes (pid {os.getpid()})")
+
+    with pool or ProcessPoolExecutor(max_workers=max(1, workers), initializer=warm_up) as pool:
+        # Prozesse starten sonst erst beim ersten Job; der erste Plot zahlt dann den Warm-up
+        list(pool.map(_hold_process, [0.2] * max(1, workers)))
+        print(f"[PlotWorker] Ready after {time.time() - last_activity:.1f}s")
+        while True:
+            _write_json_atomic(heartbeat, {'pid': os.getpid(), 'workers': workers, 'updated': time.time()})
+
+            for job_file in sorted(spool.glob('*.job.json')):
+                running_file = job_file.with_name(job_file.name.replace('.job.json', '.running'))
+                try:
+                    os.replace(job_file, running_file)
+                    job = json.loads(running_file.read_text(encoding='utf-8'))
+                except (OSError, ValueError):
+                    continue
+                pending[pool.submit(run_job, job)] = running_file
+                last_activity = time.time()
+
+            for future in [f for f in pending if f.done()]:
+                running_file = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:  # Pool-Prozess abgestürzt
+                    result = {'returncode': 1, 'output': f"[PlotWorker] Job failed: {e}\n"}
+                result_file = running_file.with_name(running_file.name.replace('.running', '.result.json'))
+                _write_json_atomic(result_file, result)
+                running_file.unlink(missing_ok=True)
+                label = result.get('plot_type') or Path(result.get('script') or '').stem
+                print(f"[PlotWorker] {label} {result.get('track') or ''} "
+                      f"-> rc={result['returncode']} in {result.get('runtime_sec', 0):.2f}s")
+                last_activity = time.time()
+
+            idle = not pending and idle_timeout_s is not None and time.time() - last_activity > idle_timeout_s
+            if ((spool / STOP_FILE).exists() and not pending) or idle:
+                break
+            time.sleep(POLL_INTERVAL_S)
+
+    heartbeat.unlink(missing_ok=True)
+    (spool / STOP_FILE).unlink(missing_ok=True)
+    print("[PlotWorker] Stopped")
+
+
+def submit(job: Dict, spool_dir: str = DEFAULT_SPOOL_DIR, timeout_s: Optional[float] = None) -> Dict:
+    """
+    Reicht einen Job beim Worker ein und wartet auf das Ergebnis.
+
+    Ohne lebenden Worker (oder wenn er während des Wartens verschwindet und
+    den Job noch nicht übernommen hat) wird der Job lokal ausgeführt.
+    """
+    spool = Path(spool_dir)
+    if not worker_alive(spool_dir):
+        return run_job(job)
+
+    job_file = spool / f"{job['job_id']}.job.json"
+    running_file = spool / f"{job['job_id']}.running"
+    result_file = spool / f"{job['job_id']}.result.json"
+    _write_json_atomic(job_file, job)
+    start = time.time()
+
+    while True:
+        if result_file.exists():
+            result = json.loads(result_file.read_text(encoding='utf-8'))
+            result_file.unlink(missing_ok=True)
+            return result
+        if not worker_alive(spool_dir):
+            try:
+                job_file.unlink()  # noch nicht übernommen -> lokal rendern
+            except FileNotFoundError:
+                running_file.unlink(missing_ok=True)
+            return run_job(job)
+        if timeout_s is not None and time.time() - start > timeout_s:
+            raise TimeoutError(f"Plot job {job['job_id']} not finished after {timeout_s}s")
+        time.sleep(POLL_INTERVAL_S)
+
+
+def request_stop(spool_dir: str = DEFAULT_SPOOL_DIR) -> None:
+    """Signalisiert dem Worker, nach den laufenden Jobs zu beenden."""
+    spool = Path(spool_dir)
+    if spool.exists():
+        (spool / STOP_FILE).touch()
+
+
+# === CLI ===
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Persistent plot rendering worker for steps 3, 3b and 10c.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_serve = sub.add_parser('serve', help="Run the worker (blocks).")
+    p_serve.add_argument('--spool', default=DEFAULT_SPOOL_DIR)
+    p_serve.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    p_serve.add_argument('--idle-timeout', type=float, default=IDLE_TIMEOUT_S)
+
+    p_submit = sub.add_parser('submit', help="Submit one plot job and wait for it.")
+    p_submit.add_argument('--spool', default=DEFAULT_SPOOL_DIR)
+    p_submit.add_argument('--track', default=None, help="Track id (for worker logs).")
+    p_submit.add_argument('--timeout', type=float, default=None)
+    p_submit.add_argument('script', help=f"Plot script path or plot type ({', '.join(PLOT_SCRIPTS)}).")
+    p_submit.add_argument('script_args', nargs=argparse.REMAINDER)
+
+    p_batch = sub.add_parser('batch', help="Render a JSON list of jobs on a process pool.")
+    p_batch.add_argument('jobs_json')
+    p_batch.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+
+    p_stop = sub.add_parser('stop', help="Stop a running worker after pending jobs.")
+    p_stop.add_argument('--spool', default=DEFAULT_SPOOL_DIR)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        serve(args.spool, args.workers, args.idle_timeout)
+        return 0
+    if args.command == 'stop':
+        request_stop(args.spool)
+        return 0
+    if args.command == 'submit':
+        script_args = args.script_args[1:] if args.script_args[:1] == ['--'] else args.script_args
+        result = submit(make_job(args.script, script_args, track=args.track), args.spool, args.timeout)
+        sys.stdout.write(result.get('output', ''))
+        return int(result['returncode'])
+
+    with open(args.jobs_json, encoding='utf-8') as f:
+        jobs = [dict(job, job_id=job.get('job_id') or uuid.uuid4().hex, cwd=job.get('cwd') or os.getcwd())
+                for job in json.load(f)]
+    start = time.time()
+    results = run_batch(jobs, args.workers)
+    for result in results:
+        print(f"{result.get('plot_type')} {result.get('track') or ''}: rc={result['returncode']} "
+              f"({result['runtime_sec']:.2f}s)")
+    print(f"[PlotWorker] {len(results)} jobs in {time.time() - start:.1f}s")
+    return max((result['returncode'] for result in results), default=0)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
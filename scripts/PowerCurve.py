@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+PowerCurve.py - Zeitbasierte Power-Kennzahlen (Schritt 10d)
+
+GPS-Punkte haben variable Aufzeichnungsintervalle, eine Zeile ist also keine
+Sekunde. Die Leistung wird deshalb flächentreu auf ein 1-Hz-Raster gebracht
+(kumulierte Energie an ganzen Sekunden interpoliert). Aus einer einzigen
+kumulierten Summe darüber ergeben sich Mean-Maximal-Power-Kurve,
+Normalized Power und Zeit in Zonen.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+STANDARD_DURATIONS = [5, 10, 20, 30, 60, 300, 600, 1200, 3600]
+NP_WINDOW_S = 30
+MAX_GAP_S = 30  # Längere Aufzeichnungslücken zählen als Stillstand (0 W)
+
+
+def power_timeline(df: pd.DataFrame, power_col: str = 'Power_W',
+                   max_gap_s: float = MAX_GAP_S) -> np.ndarray:
+    """
+    Leistung als 1-Hz-Array (Watt pro Sekunde) aus einer 10b-Power-CSV.
+
+    Zeitquelle: 'TimeDelta (s)' (Analyse-Modus), sonst 'Simulated_Time_s'
+    (Simulation, kumuliert), sonst wird wie bisher eine Zeile = 1 s angenommen.
+    Der Wert einer Zeile gilt für das Intervall seit dem vorherigen Punkt.
+    """
+    power = pd.to_numeric(df[power_col], errors='coerce').to_numpy(dtype=float)
+
+    if 'TimeDelta (s)' in df.columns:
+        intervals = pd.to_numeric(df['TimeDelta (s)'], errors='coerce').to_numpy(dtype=float)
+    elif 'Simulated_Time_s' in df.columns:
+        elapsed = pd.to_numeric(df['Simulated_Time_s'], errors='coerce').ffill().fillna(0).to_numpy(dtype=float)
+        intervals = np.diff(elapsed, prepend=0.0)
+    else:
+        return np.nan_to_num(power, nan=0.0)
+
+    return resample_to_1hz(power, intervals, max_gap_s=max_gap_s)
+
+
+def resample_to_1hz(power: Iterable[float], intervals_s: Iterable[float],
+                    max_gap_s: Optional[float] = MAX_GAP_S) -> np.ndarray:
+    """
+    Flächentreues Resampling auf 1 Hz.
+
+    Die kumulierte Energie ist stückweise linear in der Zeit; ihre Werte an
+    ganzen Sekunden werden per np.interp bestimmt, die Differenzen sind die
+    1-Hz-Leistungen. Ungültige/negative Intervalle zählen als 0 s, Intervalle
+    > max_gap_s als Stillstand mit 0 W. Die Gesamtenergie bleibt erhalten.
+    """
+    power = np.nan_to_num(np.asarray(power, dtype=float), nan=0.0)
+    intervals = np.nan_to_num(np.asarray(intervals_s, dtype=float), nan=0.0)
+    intervals = np.clip(intervals, 0.0, None)
+    if max_gap_s is not None:
+        power = np.where(intervals > max_gap_s, 0.0, power)
+
+    elapsed = np.concatenate(([0.0], np.cumsum(intervals)))
+    energy = np.concatenate(([0.0], np.cumsum(power * intervals)))
+    total_seconds = int(np.floor(elapsed[-1]))
+    if total_seconds <= 0:
+        return np.zeros(0)
+
+    grid = np.arange(total_seconds + 1, dtype=float)
+    return np.diff(np.interp(grid, elapsed, energy))
+
+
+def log_spaced_durations(max_duration: int, points_per_decade: int = 20,
+                         include: Sequence[int] = STANDARD_DURATIONS) -> np.ndarray:
+    """Logarithmisch verteilte Dauern 1..max_duration s (plus Standarddauern)."""
+    if max_duration < 1:
+        return np.zeros(0, dtype=int)
+    count = max(int(np.log10(max_duration) * points_per_decade) + 1, 1)
+    durations = np.unique(np.round(np.logspace(0, np.log10(max_duration), count)).astype(int))
+    extra = [d for d in include if d <= max_duration]
+    return np.unique(np.concatenate((durations, np.asarray(extra, dtype=int))))
+
+
+def mean_maximal_power(power_1hz: np.ndarray, durations: Optional[Iterable[int]] = None) -> Dict[int, float]:
+    """
+    Beste Durchschnittsleistung je Dauer (Sekunden) aus einer kumulierten Summe.
+
+    Ohne durations wird eine log-verteilte Kurve bis zur Gesamtdauer berechnet.
+    Dauern länger als die Aufzeichnung werden ausgelassen.
+    """
+    power_1hz = np.asarray(power_1hz, dtype=float)
+    n = len(power_1hz)
+    if durations is None:
+        durations = log_spaced_durations(n)
+    cumulative = np.concatenate(([0.0], np.cumsum(power_1hz)))
+
+    curve = {}
+    for duration in durations:
+        duration = int(duration)
+        if 1 <= duration <= n:
+            curve[duration] = float(np.max(cumulative[duration:] - cumulative[:-duration]) / duration)
+    return curve
+
+
+def normalized_power(power_1hz: np.ndarray, window_s: int = NP_WINDOW_S) -> Optional[float]:
+    """Normalized Power: 30-s-Mittel, 4. Potenz, Mittelwert, 4. Wurzel."""
+    power_1hz = np.asarray(power_1hz, dtype=float)
+    if len(power_1hz) < window_s:
+        return None
+    cumulative = np.concatenate(([0.0], np.cumsum(power_1hz)))
+    rolling = (cumulative[window_s:] - cumulative[:-window_s]) / window_s
+    return float(np.mean(rolling ** 4) ** 0.25)
+
+
+def time_in_zones(power_1hz: np.ndarray, zone_floors: Sequence[float]) -> List[Dict[str, float]]:
+    """
+    Sekunden, Ø- und Max-Leistung je Zone.
+
+    zone_floors sind die aufsteigenden Untergrenzen der Zonen; eine Sekunde
+    gehört zur höchsten Zone, deren Untergrenze sie erreicht (keine Lücken
+    zwischen ganzzahligen Zonengrenzen).
+    """
+    power_1hz = np.asarray(power_1hz, dtype=float)
+    zone_idx = np.clip(np.searchsorted(np.asarray(zone_floors, dtype=float), power_1hz, side='right') - 1,
+                       0, len(zone_floors) - 1)
+    seconds = np.bincount(zone_idx, minlength=len(zone_floors))
+    energy = np.bincount(zone_idx, weights=power_1hz, minlength=len(zone_floors))
+    maxima = np.zeros(len(zone_floors))
+    np.maximum.at(maxima, zone_idx, power_1hz)
+
+    return [
+        {
+            'seconds': int(seconds[i]),
+            'avg_power': float(energy[i] / seconds[i]) if seconds[i] else 0.0,
+            'max_power': float(maxima[i]) if seconds[i] else 0.0
+        }
+        for i in range(len(zone_floors))
+    ]
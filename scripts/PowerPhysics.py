@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+PowerPhysics.py - Vektorisiertes Radfahr-Leistungsmodell (Schritt 10b)
+
+Berechnet Luft-, Roll- und Steigungsleistung für komplette Tracks als
+NumPy-Ausdrücke statt zeilenweise über df.iterrows(). Die Formeln sind
+identisch zum bisherigen skalaren Modell in 10b_power_processing.py.
+"""
+
+from typing import Dict, Iterable, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+ArrayLike = Union[float, np.ndarray, pd.Series, Iterable[float]]
+
+# === PHYSICAL CONSTANTS & MODEL PARAMETERS ===
+G = 9.81  # Gravity in m/s^2
+RHO = 1.225  # Air density in kg/m^3
+
+# Aerodynamic drag parameters (CdA in m^2) based on bike type and posture
+# This is the most practical way to model aerodynamic drag.
+CDA_PARAMS = {
+    # Hollandrad / City-Bike
+    'city_upright': 0.70,
+    # Mountainbike
+    'mtb_upright': 0.60,
+    # Touring / Trekkingrad
+    'touring_normal': 0.50,
+    # Gravel-Bike
+    'gravel_hoods': 0.42,
+    'gravel_drops': 0.35,
+    # Rennrad
+    'road_hoods': 0.36,
+    'road_drops': 0.30,
+    # Zeitfahrrad
+    'tt_aero': 0.22
+}
+
+# Rolling resistance coefficients (Cr) based on OSM tags
+ROLL_RESISTANCE_MAP = {
+    'asphalt': 0.003, 'concrete': 0.0035, 'chipseal': 0.004,
+    'gravel': 0.008, 'fine_gravel': 0.007, 'compacted': 0.006,
+    'ground': 0.012, 'earth': 0.015, 'dirt': 0.018,
+    'sand': 0.025, 'grass_paver': 0.020, 'unpaved': 0.022,
+    'grass': 0.035, 'mud': 0.050, 'sand_loose': 0.040,
+    'cobblestone': 0.012, 'sett': 0.010, 'paving_stones': 0.005,
+    'wood': 0.008, 'metal': 0.004,
+    'unknown': 0.015
+}
+
+
+def crr_for_surfaces(surfaces: Iterable) -> np.ndarray:
+    """
+    Rollwiderstandsbeiwerte für eine Spalte von OSM-Surface-Tags.
+
+    Kategorischer Lookup: jeder Tag wird einmal in einen Code übersetzt,
+    unbekannte Tags bekommen den 'unknown'-Wert.
+    """
+    surface_series = pd.Series(surfaces, dtype=object).astype(str).str.lower()
+    codes = pd.Index(list(ROLL_RESISTANCE_MAP.keys())).get_indexer(surface_series)
+    crr_table = np.fromiter(ROLL_RESISTANCE_MAP.values(), dtype=float, count=len(ROLL_RESISTANCE_MAP))
+    return np.where(codes >= 0, crr_table[codes], ROLL_RESISTANCE_MAP['unknown'])
+
+
+def power_components(speed_ms: ArrayLike, gradient: ArrayLike, crr: ArrayLike,
+                     mass_kg: ArrayLike, cda_value: ArrayLike, wind_ms: ArrayLike = 0.0) -> Dict[str, np.ndarray]:
+    """
+    Benötigte Leistung, um die gegebene Geschwindigkeit zu halten (für alle Punkte auf einmal).
+
+    Alle Argumente werden per NumPy-Broadcasting kombiniert, es können also
+    Skalare, Track-Arrays oder Parameter-Gitter übergeben werden.
+
+    Returns:
+        Dict mit 'Power_W' (nicht negativ), 'Power_Air_W', 'Power_Roll_W', 'Power_Climb_W'
+    """
+    v = np.asarray(speed_ms, dtype=float)
+    v_wind = v + wind_ms
+    slope_angle = np.arctan(np.asarray(gradient, dtype=float))
+
+    # Forces
+    F_air = 0.5 * RHO * cda_value * v_wind**2 * np.sign(v_wind)
+    F_roll = crr * mass_kg * G * np.cos(slope_angle)
+    F_climb = mass_kg * G * np.sin(slope_angle)
+
+    # Power components
+    P_total = (F_air + F_roll + F_climb) * v
+
+    return {
+        'Power_W': np.where(P_total > 0, P_total, 0.0),  # Power cannot be negative when moving
+        'Power_Air_W': F_air * v,
+        'Power_Roll_W': F_roll * v,
+        'Power_Climb_W': F_climb * v
+    }
+
+
+def solve_speed_for_power(target_power_w: ArrayLike, gradient: ArrayLike, crr: ArrayLike,
+                          mass_kg: ArrayLike, cda_value: ArrayLike, wind_ms: ArrayLike = 0.0,
+                          v_max: float = 30.0, max_newton_steps: int = 20) -> np.ndarray:
+    """
+    Gleichgewichtsgeschwindigkeit (m/s) bei konstanter Leistung für alle Punkte auf einmal.
+
+    Die Leistungsbilanz ohne Wind ist ein Kubik-Polynom
+        a*v^3 + b*v - P = 0   mit a = 0.5*RHO*CdA, b = m*G*(Crr*cos + sin)
+    und wird analytisch (Cardano bzw. trigonometrisch) gelöst; genommen wird die
+    größte reelle Wurzel. Newton-Schritte auf der vollständigen Bilanz
+    (inkl. Wind) polieren das Ergebnis; ohne Wind reicht meist einer. Bergab mit P <= 0 ergibt sich so die
+    Rollgeschwindigkeit; gibt es keine positive Lösung (P <= 0 in der Ebene
+    oder bergauf), ist die Geschwindigkeit 0. Ergebnis ist auf [0, v_max] begrenzt.
+    """
+    target = np.asarray(target_power_w, dtype=float)
+    slope_angle = np.arctan(np.asarray(gradient, dtype=float))
+    a = 0.5 * RHO * np.asarray(cda_value, dtype=float)
+    b = mass_kg * G * (crr * np.cos(slope_angle) + np.sin(slope_angle))
+    a, b, target, wind = np.broadcast_arrays(a, b, target, np.asarray(wind_ms, dtype=float))
+
+    # Reduzierte Kubik v^3 + p*v + q = 0
+    p = b / a
+    q = -target / a
+    half_q = -q / 2.0
+    disc = half_q**2 + (p / 3.0)**3
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Eine reelle Wurzel: u - p/(3u) mit vorzeichenrichtigem u (keine Auslöschung in u)
+        u = np.cbrt(half_q + np.copysign(np.sqrt(np.maximum(disc, 0.0)), half_q))
+        one_root = np.where(u != 0, u - p / (3.0 * u), 0.0)
+        # Drei reelle Wurzeln (nur für p < 0): größte über die trigonometrische Form
+        r = np.sqrt(np.maximum(-p / 3.0, 0.0))
+        cos_arg = np.clip(np.where(r > 0, half_q / r**3, 0.0), -1.0, 1.0)
+        three_roots = 2.0 * r * np.cos(np.arccos(cos_arg) / 3.0)
+    v = np.where(disc >= 0, one_root, three_roots)
+    v = np.clip(np.nan_to_num(v, nan=0.0), 0.0, v_max)
+
+    # Newton-Politur auf der vollständigen Bilanz (Wind verändert die Kubik)
+    for _ in range(max_newton_steps):
+        v_air = v + wind
+        residual = (a * v_air * np.abs(v_air) + b) * v - target
+        slope = a * v_air * np.abs(v_air) + b + 2.0 * a * np.abs(v_air) * v
+        with np.errstate(invalid='ignore', divide='ignore'):
+            step = np.where(slope > 0, residual / slope, 0.0)
+        v_new = np.clip(v - step, 0.0, v_max)
+        converged = np.all(np.abs(v_new - v) < 1e-12)
+        v = v_new
+        if converged:
+            break
+
+    return v
+
+
+def sweep_pacing(segment_length_m: ArrayLike, gradient: ArrayLike, crr: ArrayLike,
+                 target_powers: ArrayLike, masses_kg: ArrayLike, cda_values: ArrayLike,
+                 crr_scales: ArrayLike, climb_bounds: Sequence[Tuple[int, int]] = (),
+                 max_cells: int = 2_000_000) -> Dict[str, np.ndarray]:
+    """
+    Fahrzeiten für viele Pacing-Szenarien auf demselben Track in einem Durchlauf.
+
+    Die Szenario-Parameter sind gleich lange 1D-Arrays (ein Eintrag pro Kombination,
+    z. B. aus itertools.product). Physik wird per Broadcasting als Matrix
+    Szenarien x Trackpunkte gerechnet; max_cells begrenzt die Matrixgröße pro Block.
+    Segment i (Punkt i-1 -> i) wird mit der Geschwindigkeit an Punkt i gefahren,
+    wie in der Simulation von 10b.
+
+    Args:
+        climb_bounds: (start_idx, end_idx)-Paare der Anstiege im Track
+    Returns:
+        Dict mit 'finish_time_s' (K,), 'avg_speed_kmh' (K,), 'climb_time_s' (K, Anzahl Anstiege)
+    """
+    seg_len = np.asarray(segment_length_m, dtype=float)
+    gradient = np.asarray(gradient, dtype=float)
+    crr = np.asarray(crr, dtype=float)
+    powers, masses, cdas, scales = (
+        np.asarray(x, dtype=float).ravel() for x in (target_powers, masses_kg, cda_values, crr_scales)
+    )
+    n_scenarios, n_points = len(powers), len(seg_len)
+    climbs = np.asarray(climb_bounds, dtype=int).reshape(-1, 2)
+
+    finish_time = np.empty(n_scenarios)
+    climb_time = np.empty((n_scenarios, len(climbs)))
+    block = max(1, max_cells // max(n_points, 1))
+    for start in range(0, n_scenarios, block):
+        rows = slice(start, min(start + block, n_scenarios))
+        speeds = solve_speed_for_power(
+            powers[rows, None], gradient[None, :], crr[None, :] * scales[rows, None],
+            masses[rows, None], cdas[rows, None]
+        )
+        with np.errstate(divide='ignore', invalid='ignore'):
+            seg_time = np.where(speeds > 0, seg_len[None, :] / speeds, 0.0)
+        cum_time = np.cumsum(seg_time, axis=1)
+        finish_time[rows] = cum_time[:, -1] if n_points else 0.0
+        if len(climbs):
+            climb_time[rows] = cum_time[:, climbs[:, 1]] - cum_time[:, climbs[:, 0]]
+
+    total_distance_m = seg_len.sum()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_speed_kmh = np.where(finish_time > 0, total_distance_m / finish_time * 3.6, 0.0)
+
+    return {
+        'finish_time_s': finish_time,
+        'avg_speed_kmh': avg_speed_kmh,
+        'climb_time_s': climb_time
+    }
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+ReportAssets.py - Bilder des Etappenberichts als externe, deduplizierte Assets (Schritt 11)
+
+Statt jedes PNG base64 ins HTML zu schreiben, wird es einmal (verkleinert,
+als WebP oder optimiertes PNG) in ein gemeinsames Asset-Verzeichnis
+geschrieben. Der Dateiname ist ein Hash aus Bildinhalt und Kodierung, daher
+teilen sich Berichte identische Bilder und unveränderte Bilder werden nicht
+neu kodiert. Das HTML referenziert die Dateien mit loading="lazy"; nur der
+PDF-Weg (wkhtmltopdf) bekommt die Originale als data:-URI.
+"""
+
+import base64
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from PIL import Image
+
+ASSET_FORMATS = ('webp', 'png')
+DEFAULT_ASSET_FORMAT = 'webp'
+DEFAULT_QUALITY = 90
+DEFAULT_MAX_WIDTH = 2000  # Browser: reicht für HiDPI, 250-dpi-Plots sind deutlich breiter
+HASH_LENGTH = 16
+MIME_TYPES = {'png': 'image/png', 'jpg': 'image/jpeg', 'jpeg': 'image/jpeg',
+              'webp': 'image/webp', 'svg': 'image/svg+xml', 'gif': 'image/gif'}
+
+# Platzhalter im Template, ersetzt durch Asset-Pfad (HTML) bzw. data:-URI (PDF)
+ASSET_TOKEN = "@@asset:{key}@@"
+
+
+@dataclass
+class PublishedAsset:
+    path: str          # absoluter Pfad der Asset-Datei
+    source_bytes: int
+    asset_bytes: int
+    reused: bool       # True: Datei existierte bereits (gleicher Inhalt, andere/vorige Berichte)
+
+
+def asset_name(data: bytes, fmt: str, quality: int, max_width: Optional[int]) -> str:
+    """Inhalts-Hash inkl. Kodierparametern, damit geänderte Einstellungen neue Dateien erzeugen."""
+    digest = hashlib.sha256(data)
+    digest.update(f"|{fmt}|{quality}|{max_width or 0}".encode('ascii'))
+    return f"{digest.hexdigest()[:HASH_LENGTH]}.{fmt}"
+
+
+def publish_image(image_path: str, asset_dir: str, fmt: str = DEFAULT_ASSET_FORMAT,
+                  quality: int = DEFAULT_QUALITY, max_width: Optional[int] = DEFAULT_MAX_WIDTH) -> Optional[PublishedAsset]:
+    """
+    Schreibt image_path kodiert nach asset_dir (falls noch nicht vorhanden).
+    Returns: PublishedAsset oder None, wenn die Quelle fehlt.
+    """
+    if fmt not in ASSET_FORMATS:
+        raise ValueError(f"Unknown asset format '{fmt}', expected one of {ASSET_FORMATS}")
+    if not image_path or not os.path.exists(image_path):
+        return None
+    with open(image_path, 'rb') as f:
+        data = f.read()
+
+    os.makedirs(asset_dir, exist_ok=True)
+    target = os.path.join(os.path.abspath(asset_dir), asset_name(data, fmt, quality, max_width))
+    if os.path.exists(target):
+        return PublishedAsset(target, len(data), os.path.getsize(target), True)
+
+    with Image.open(image_path) as image:
+        image.load()
+        if max_width and image.width > max_width:
+            height = max(int(round(image.height * max_width / image.width)), 1)
+            image = image.resize((max_width, height), Image.LANCZOS)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+        # Schreiben über temporäre Datei: parallele Berichte sehen nie halbe Assets
+        tmp_path = f"{target}.{os.getpid()}.tmp"
+        if fmt == 'webp':
+            image.save(tmp_path, 'WEBP', quality=quality, method=4)
+        else:
+            image.save(tmp_path, 'PNG', optimize=True)
+    os.replace(tmp_path, target)
+    return PublishedAsset(target, len(data), os.path.getsize(target), False)
+
+
+def data_uri(image_path: str, cache: Optional[Dict[str, str]] = None) -> Optional[str]:
+    """Bild als data:-URI; cache vermeidet mehrfaches Kodieren desselben Pfads."""
+    if cache is not None and image_path in cache:
+        return cache[image_path]
+    uri = None
+    if image_path and os.path.exists(image_path):
+        ext = os.path.splitext(image_path)[1].lower().strip('.')
+        with open(image_path, 'rb') as f:
+            uri = f"data:{MIME_TYPES.get(ext, f'image/{ext}')};base64,{base64.b64encode(f.read()).decode('ascii')}"
+    if cache is not None:
+        cache[image_path] = uri
+    return uri
+
+
+def relative_src(asset_path: str, html_path: str) -> str:
+    """URL-Pfad des Assets relativ zur HTML-Datei (immer mit '/')."""
+    html_dir = os.path.dirname(os.path.abspath(html_path))
+    return os.path.relpath(asset_path, html_dir).replace(os.sep, '/')
+
+
+def resolve_tokens(html: str, sources: Dict[str, str]) -> str:
+    """Ersetzt ASSET_TOKEN-Platzhalter durch die übergebenen Quellen."""
+    for key, src in sources.items():
+        html = html.replace(ASSET_TOKEN.format(key=key), src)
+    return html
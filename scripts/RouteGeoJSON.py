@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+RouteGeoJSON.py - Route und Punkte als kompakte GeoJSON-FeatureCollections (Schritte 6, 10)
+
+Statt einer Leaflet-Ebene pro Oberflächenblock bzw. pro Punkt entsteht je
+Oberflächentyp ein einziges MultiLineString-Feature und für Punktmengen eine
+einzige FeatureCollection. Koordinaten werden auf 6 Nachkommastellen
+(~0,1 m) gerundet, das hält das HTML klein.
+"""
+
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+COORD_PRECISION = 6
+
+# Farbschema für Oberflächen (Karte Schritt 6 und statische Karte Schritt 10)
+SURFACE_COLOR_MAP = {
+    "asphalt": "black",
+    "paved": "#555555", # Dunkelgrau für generisches Paved
+    "concrete": "dimgray",
+    "compacted": "#A0522D",  # Sienna (Verdichtet)
+    "fine_gravel": "#D2B48C",  # Tan (Feiner Schotter)
+    "gravel": "#BC8F8F",  # RosyBrown (Schotter)
+    "unpaved": "#8B4513",  # SaddleBrown (Unbefestigt)
+    "ground": "#556B2F",  # DarkOliveGreen (Erdboden)
+    "dirt": "#9B7653", # Helleres Braun für Dirt
+    "sand": "#F4A460",  # SandyBrown
+    "grass": "#228B22",  # ForestGreen
+    "wood": "#DEB887",  # BurlyWood
+    "paving_stones": "#483D8B", # DarkSlateBlue
+    "sett": "#6A5ACD", # SlateBlue
+    "cobblestone": "#708090", # SlateGray
+    "unknown": "lightgray", # Fallback für Unbekannt
+    "default": "red" # Fallback für nicht gemappte Oberflächen
+}
+
+
+def surface_runs(surfaces: Iterable) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Start- und Endindex (inklusiv) zusammenhängender Oberflächenblöcke.
+
+    Jeder Block endet am ersten Punkt des nächsten Blocks, damit die Linie
+    lückenlos ist; Blöcke mit nur einem Punkt (Trackende) entfallen.
+    """
+    surfaces = np.asarray(surfaces, dtype=object)
+    if len(surfaces) == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+    starts = np.flatnonzero(np.r_[True, surfaces[1:] != surfaces[:-1]])
+    ends = np.r_[starts[1:], len(surfaces) - 1]
+    keep = ends > starts
+    return starts[keep], ends[keep]
+
+
+def normalize_surfaces(surfaces: Iterable) -> np.ndarray:
+    """Oberflächen als Kleinbuchstaben, fehlende Werte als 'unknown'."""
+    return pd.Series(surfaces, dtype=object).fillna('unknown').astype(str).str.lower().to_numpy(dtype=object)
+
+
+def _lon_lat_list(lat: Iterable[float], lon: Iterable[float], precision: int) -> list:
+    return np.column_stack((np.asarray(lon, dtype=float), np.asarray(lat, dtype=float))).round(precision).tolist()
+
+
+def surface_route_geojson(lat: Iterable[float], lon: Iterable[float], surfaces: Iterable,
+                          colors: Mapping[str, str], default_color: str,
+                          precision: int = COORD_PRECISION) -> Dict:
+    """
+    FeatureCollection mit einem MultiLineString je Oberflächentyp.
+
+    properties: surface, color, segments (Anzahl Blöcke), points (Punkte inkl. Übergänge).
+    """
+    surfaces = normalize_surfaces(surfaces)
+    coords = _lon_lat_list(lat, lon, precision)
+    starts, ends = surface_runs(surfaces)
+
+    lines_by_surface: Dict[str, list] = {}
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        lines_by_surface.setdefault(surfaces[start], []).append(coords[start:end + 1])
+
+    features = [
+        {
+            'type': 'Feature',
+            'geometry': {'type': 'MultiLineString', 'coordinates': lines},
+            'properties': {
+                'surface': surface,
+                'color': colors.get(surface, default_color),
+                'segments': len(lines),
+                'points': sum(len(line) for line in lines)
+            }
+        }
+        for surface, lines in lines_by_surface.items()
+    ]
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def points_geojson(lat: Iterable[float], lon: Iterable[float],
+                   properties: Optional[Mapping[str, Iterable]] = None,
+                   precision: int = COORD_PRECISION) -> Dict:
+    """FeatureCollection mit einem Point-Feature je Koordinate (properties spaltenweise)."""
+    coords = _lon_lat_list(lat, lon, precision)
+    columns = {key: pd.Series(values).tolist() for key, values in (properties or {}).items()}
+    features = [
+        {
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': coord},
+            'properties': {key: values[i] for key, values in columns.items()}
+        }
+        for i, coord in enumerate(coords)
+    ]
+    return {'type': 'FeatureCollection', 'features': features}
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+SQLiteDescriptionCache.py - Cache für Wikipedia-Auszüge und Gemini-Antworten (Schritt 9)
+
+Wiki-Auszüge werden je Ort + Sprache gespeichert (auch "kein Artikel"),
+LLM-Antworten je Ort + Sprache + Hash des vollständigen Prompts inkl. Modellname.
+Ändert sich Prompt, Wiki-Text oder Modell, entsteht automatisch ein neuer Schlüssel.
+"""
+
+import sqlite3
+import hashlib
+import logging
+from pathlib import Path
+from datetime import datetime
+from typing import Optional, Dict, Any, Tuple
+
+from SQLitePlaceCache import normalize_place_name
+
+
+def prompt_hash(prompt: str, model_name: str = "") -> str:
+    """SHA-256 über Modellname + Prompt (Cache-Schlüssel für LLM-Antworten)."""
+    return hashlib.sha256(f"{model_name}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+class SQLiteDescriptionCache:
+    """SQLite-basierter Cache für Wikipedia-Auszüge und LLM-Beschreibungen"""
+
+    def __init__(self, db_path: str = "description_cache.db"):
+        """
+        Initialisiert den SQLite Description-Cache
+
+        Args:
+            db_path: Pfad zur SQLite-Datenbankdatei
+        """
+        self.db_path = Path(db_path)
+        self.connection = None
+        self.stats = {
+            'wiki_cache_hits': 0,
+            'wiki_cache_misses': 0,
+            'llm_cache_hits': 0,
+            'llm_cache_misses': 0
+        }
+        self._setup_database()
+
+    def _setup_database(self):
+        """Erstellt die Datenbankstruktur"""
+        # Verzeichnis erstellen falls es nicht existiert
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+
+        # Wikipedia-Auszüge (extract NULL = kein Artikel vorhanden)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS wiki_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                place_key TEXT NOT NULL,
+                lang TEXT NOT NULL,
+                place_name TEXT NOT NULL,
+                extract TEXT,
+                query_date TEXT NOT NULL,
+                UNIQUE(place_key, lang)
+            )
+        """)
+
+        # LLM-Antworten
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                place_key TEXT NOT NULL,
+                lang TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                place_name TEXT NOT NULL,
+                model_name TEXT,
+                response TEXT NOT NULL,
+                query_date TEXT NOT NULL,
+                UNIQUE(place_key, lang, prompt_hash)
+            )
+        """)
+
+        self.connection.commit()
+
+    def get_wiki_extract(self, place: str, lang: str) -> Tuple[bool, Optional[str]]:
+        """
+        Sucht einen Wiki-Auszug im Cache.
+
+        Returns:
+            (gefunden, extract) - extract ist None, wenn früher kein Artikel existierte
+        """
+        row = self.connection.execute(
+            "SELECT extract FROM wiki_cache WHERE place_key = ? AND lang = ?",
+            (normalize_place_name(place), lang)
+        ).fetchone()
+        if row is None:
+            self.stats['wiki_cache_misses'] += 1
+            return False, None
+        self.stats['wiki_cache_hits'] += 1
+        return True, row[0]
+
+    def cache_wiki_extract(self, place: str, lang: str, extract: Optional[str]) -> None:
+        """Speichert einen (ungekürzten) Wiki-Auszug oder 'kein Artikel' (None)."""
+        try:
+            self.connection.execute("""
+                INSERT OR REPLACE INTO wiki_cache (place_key, lang, place_name, extract, query_date)
+                VALUES (?, ?, ?, ?, ?)
+            """, (normalize_place_name(place), lang, place, extract, datetime.now().isoformat()))
+            self.connection.commit()
+        except sqlite3.Error as e:
+            logging.getLogger(__name__).error(f"Error caching wiki extract: {e}")
+
+    def get_llm_response(self, place: str, lang: str, prompt: str, model_name: str = "") -> Optional[str]:
+        """Sucht eine LLM-Antwort für exakt diesen Prompt im Cache."""
+        row = self.connection.execute(
+            "SELECT response FROM llm_cache WHERE place_key = ? AND lang = ? AND prompt_hash = ?",
+            (normalize_place_name(place), lang, prompt_hash(prompt, model_name))
+        ).fetchone()
+        if row is None:
+            self.stats['llm_cache_misses'] += 1
+            return None
+        self.stats['llm_cache_hits'] += 1
+        return row[0]
+
+    def cache_llm_response(self, place: str, lang: str, prompt: str, response: str,
+                           model_name: str = "") -> None:
+        """Speichert eine erfolgreiche LLM-Antwort."""
+        try:
+            self.connection.execute("""
+                INSERT OR REPLACE INTO llm_cache
+                (place_key, lang, prompt_hash, place_name, model_name, response, query_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (
+                normalize_place_name(place), lang, prompt_hash(prompt, model_name),
+                place, model_name, response, datetime.now().isoformat()
+            ))
+            self.connection.commit()
+        except sqlite3.Error as e:
+            logging.getLogger(__name__).error(f"Error caching LLM response: {e}")
+
+    def get_cache_statistics(self) -> Dict[str, Any]:
+        """Gibt Cache-Statistiken zurück"""
+        stats = {}
+
+        cursor = self.connection.execute("SELECT COUNT(*) FROM wiki_cache")
+        stats['total_wiki_entries'] = cursor.fetchone()[0]
+
+        cursor = self.connection.execute("SELECT COUNT(*) FROM llm_cache")
+        stats['total_llm_entries'] = cursor.fetchone()[0]
+
+        # Ergänze Runtime-Statistiken
+        stats.update(self.stats)
+
+        return stats
+
+    def close(self):
+        """Schließt die Datenbankverbindung"""
+        if self.connection:
+            self.connection.close()
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+SQLitePlaceCache.py - Ortsnamen-Cache für Forward Geocoding (Schritt 8b)
+
+Liegt in derselben Datenbank wie der Reverse-Geocoding-Cache aus Schritt 4
+und wird aus dessen Treffern vorbefüllt (Schwerpunkt aller Cache-Punkte
+je Ort). Nominatim wird nur noch für unbekannte Ortsnamen abgefragt.
+Gleichnamige Orte in verschiedenen Regionen eines Landes (z.B. mehrere
+"Neustadt") werden nicht vorbefüllt, sondern bei Bedarf per Nominatim gesucht.
+"""
+
+import sqlite3
+import json
+import logging
+import re
+import unicodedata
+from pathlib import Path
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+try:
+    from dataclasses import dataclass
+
+    @dataclass
+    class PlaceResult:
+        """Datenklasse für Forward-Geocoding-Ergebnisse"""
+        place_name: str
+        latitude: Optional[float]
+        longitude: Optional[float]
+        country: Optional[str] = None
+        source: str = "Nominatim"
+        sample_count: int = 0
+        query_date: Optional[str] = None
+
+        @property
+        def found(self) -> bool:
+            return self.latitude is not None and self.longitude is not None
+
+except ImportError:
+    # Fallback wenn dataclasses nicht verfügbar
+    class PlaceResult:
+        def __init__(self, place_name, latitude, longitude, country=None,
+                     source="Nominatim", sample_count=0, query_date=None):
+            self.place_name = place_name
+            self.latitude = latitude
+            self.longitude = longitude
+            self.country = country
+            self.source = source
+            self.sample_count = sample_count
+            self.query_date = query_date
+
+        @property
+        def found(self) -> bool:
+            return self.latitude is not None and self.longitude is not None
+
+
+# Platzhalter aus Schritt 4, die nie als Ortsname gecacht werden
+INVALID_PLACE_NAMES = {"unbekannter ort", "fehler", "nan", "none", ""}
+
+SOURCE_REVERSE_CENTROID = "reverse_geocode_centroid"
+
+# Nominatim-Adressfelder, die gleichnamige Orte innerhalb eines Landes unterscheiden
+REGION_ADDRESS_KEYS = ("state", "county")
+
+
+def normalize_place_name(name: Optional[str]) -> str:
+    """
+    Normalisiert einen Orts- oder Ländernamen für den Cache-Schlüssel.
+
+    Unicode-NFKC, casefold, Kommas/Mehrfach-Leerzeichen entfernt.
+    "  Siena, " und "siena" ergeben denselben Schlüssel.
+    """
+    if name is None:
+        return ""
+    text = unicodedata.normalize("NFKC", str(name)).casefold()
+    text = text.replace(",", " ")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _region_key(raw_address: Optional[str]) -> tuple:
+    """Bundesland/Landkreis aus der gespeicherten Nominatim-Adresse; leeres Tupel, wenn unbekannt."""
+    try:
+        address = json.loads(raw_address) if raw_address else {}
+    except (TypeError, ValueError):
+        return ()
+    if not isinstance(address, dict):
+        return ()
+    region = tuple(normalize_place_name(address.get(key)) for key in REGION_ADDRESS_KEYS)
+    return region if any(region) else ()
+
+
+class SQLitePlaceCache:
+    """SQLite-basierter Cache für Forward-Geocoding von Ortsnamen"""
+
+    def __init__(self, db_path: str = "geocoding_cache.db"):
+        """
+        Initialisiert den SQLite Place-Cache
+
+        Args:
+            db_path: Pfad zur SQLite-Datenbankdatei (i.d.R. der Geocoding-Cache aus Schritt 4)
+        """
+        self.db_path = Path(db_path)
+        self.connection = None
+        self.stats = {
+            'cache_hits': 0,
+            'cache_misses': 0,
+            'total_queries': 0
+        }
+        self._setup_database()
+
+    def _setup_database(self):
+        """Erstellt die Datenbankstruktur"""
+        # Verzeichnis erstellen falls es nicht existiert
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+
+        # Place Cache Tabelle (Schlüssel: normalisierter Name + Länderkontext)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS place_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name_key TEXT NOT NULL,
+                context_key TEXT NOT NULL,
+                place_name TEXT NOT NULL,
+                latitude REAL,
+                longitude REAL,
+                country TEXT,
+                source TEXT NOT NULL,
+                sample_count INTEGER DEFAULT 0,
+                query_date TEXT NOT NULL,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(name_key, context_key)
+            )
+        """)
+
+        self.connection.execute("""
+            CREATE INDEX IF NOT EXISTS idx_place_cache_name
+            ON place_cache(name_key)
+        """)
+
+        self.connection.commit()
+
+    def seed_from_reverse_geocoding(self) -> int:
+        """
+        Befüllt den Cache mit dem Schwerpunkt aller Reverse-Geocoding-Treffer je Ort.
+
+        Vorhandene Nominatim-Einträge bleiben unangetastet, bereits
+        gesetzte Schwerpunkte werden mit dem aktuellen Cache-Stand aktualisiert.
+        Liegen Treffer eines Namens im selben Land in mehreren Regionen
+        (state/county der Nominatim-Adresse), wäre ihr Schwerpunkt ein Punkt
+        zwischen verschiedenen Orten: solche Namen werden übersprungen und
+        ein früher gesetzter Schwerpunkt entfernt.
+
+        Returns:
+            Anzahl der Orte, die aus dem Reverse-Geocoding-Cache übernommen wurden
+        """
+        has_table = self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'geocoding_cache'"
+        ).fetchone()
+        if not has_table:
+            return 0
+
+        try:
+            rows = self.connection.execute("""
+                SELECT city, country, latitude, longitude, raw_address
+                FROM geocoding_cache
+                WHERE city IS NOT NULL
+            """).fetchall()
+        except sqlite3.Error as e:
+            logging.getLogger(__name__).error(f"Error reading geocoding cache for seeding: {e}")
+            return 0
+
+        groups: Dict[tuple, Dict[str, Any]] = {}
+        for city, country, lat, lon, raw_address in rows:
+            group = groups.setdefault((city, country), {'lat': 0.0, 'lon': 0.0, 'count': 0, 'regions': set()})
+            group['lat'] += lat
+            group['lon'] += lon
+            group['count'] += 1
+            region = _region_key(raw_address)
+            if region:
+                group['regions'].add(region)
+
+        # Mehrdeutigkeit je Cache-Schlüssel (normalisierter Name + Land), nicht je Schreibweise
+        regions_per_key: Dict[tuple, set] = {}
+        for (city, country), group in groups.items():
+            key = (normalize_place_name(city), normalize_place_name(country))
+            regions_per_key.setdefault(key, set()).update(group['regions'])
+
+        now = datetime.now().isoformat()
+        seeded = 0
+        for (city, country), group in groups.items():
+            name_key = normalize_place_name(city)
+            context_key = normalize_place_name(country)
+            if name_key in INVALID_PLACE_NAMES:
+                continue
+            if len(regions_per_key[(name_key, context_key)]) > 1:
+                self.connection.execute(
+                    "DELETE FROM place_cache WHERE name_key = ? AND context_key = ? AND source = ?",
+                    (name_key, context_key, SOURCE_REVERSE_CENTROID)
+                )
+                continue
+            count = group['count']
+            lat, lon = group['lat'] / count, group['lon'] / count
+            self.connection.execute("""
+                INSERT INTO place_cache
+                (name_key, context_key, place_name, latitude, longitude,
+                 country, source, sample_count, query_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(name_key, context_key) DO UPDATE SET
+                    latitude = excluded.latitude,
+                    longitude = excluded.longitude,
+                    sample_count = excluded.sample_count,
+                    query_date = excluded.query_date
+                WHERE place_cache.source = excluded.source
+            """, (
+                name_key, context_key, city, lat, lon,
+                country, SOURCE_REVERSE_CENTROID, count, now
+            ))
+            seeded += 1
+
+        self.connection.commit()
+        return seeded
+
+    def find_place(self, place_name: str, context: Optional[str] = None) -> Optional[PlaceResult]:
+        """
+        Sucht einen Ortsnamen im Cache.
+
+        Zuerst wird exakt nach Name + Kontext gesucht. Ohne exakten Treffer
+        wird ein Eintrag mit anderem Länderkontext nur übernommen, wenn der
+        Name im Cache eindeutig einem einzigen Land zugeordnet ist.
+
+        Args:
+            place_name: Ortsname wie in Schritt 8 ausgegeben
+            context: Optionaler Länderkontext (z.B. ", Italia")
+
+        Returns:
+            PlaceResult (ggf. mit latitude=None für gecachte Fehlschläge) oder None
+        """
+        self.stats['total_queries'] += 1
+        name_key = normalize_place_name(place_name)
+        context_key = normalize_place_name(context)
+
+        try:
+            rows = self.connection.execute("""
+                SELECT context_key, place_name, latitude, longitude, country,
+                       source, sample_count, query_date
+                FROM place_cache
+                WHERE name_key = ?
+            """, (name_key,)).fetchall()
+        except sqlite3.Error as e:
+            logging.getLogger(__name__).error(f"Error searching place cache: {e}")
+            self.stats['cache_misses'] += 1
+            return None
+
+        row = next((r for r in rows if r[0] == context_key), None)
+        if row is None and len({r[0] for r in rows}) == 1:
+            row = rows[0]
+
+        if row is None:
+            self.stats['cache_misses'] += 1
+            return None
+
+        self.stats['cache_hits'] += 1
+        return PlaceResult(
+            place_name=row[1],
+            latitude=row[2],
+            longitude=row[3],
+            country=row[4],
+            source=row[5],
+            sample_count=row[6] or 0,
+            query_date=row[7]
+        )
+
+    def cache_place(self, place_name: str, latitude: Optional[float], longitude: Optional[float],
+                    context: Optional[str] = None, source: str = "Nominatim") -> Optional[int]:
+        """
+        Speichert ein Forward-Geocoding-Ergebnis (auch Fehlschläge mit None-Koordinaten).
+
+        Returns:
+            ID des gespeicherten Eintrags
+        """
+        try:
+            cursor = self.connection.execute("""
+                INSERT OR REPLACE INTO place_cache
+                (name_key, context_key, place_name, latitude, longitude,
+                 country, source, sample_count, query_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                normalize_place_name(place_name), normalize_place_name(context),
+                place_name, latitude, longitude, (context or "").strip(", ") or None,
+                source, 0, datetime.now().isoformat()
+            ))
+            self.connection.commit()
+            return cursor.lastrowid
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Error caching place result: {e}")
+            return None
+
+    def get_cache_statistics(self) -> Dict[str, Any]:
+        """Gibt Cache-Statistiken zurück"""
+        stats = {}
+
+        cursor = self.connection.execute("SELECT COUNT(*) FROM place_cache")
+        stats['total_place_entries'] = cursor.fetchone()[0]
+
+        cursor = self.connection.execute(
+            "SELECT COUNT(*) FROM place_cache WHERE source = ?", (SOURCE_REVERSE_CENTROID,)
+        )
+        stats['seeded_place_entries'] = cursor.fetchone()[0]
+
+        # Ergänze Runtime-Statistiken
+        stats.update(self.stats)
+
+        return stats
+
+    def close(self):
+        """Schließt die Datenbankverbindung"""
+        if self.connection:
+            self.connection.close()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+StageMetadataIndex.py - SQLite-Index der Verarbeitungs-Metadaten aller Schritte
+
+Jeder Producer trägt beim Schreiben seiner Ausgabe das Metadaten-Dict
+(bisher nur als #-Header bzw. _metadata.txt vorhanden) zusätzlich in eine
+kleine SQLite-Tabelle ein. Schritt 11 holt die Metadaten aller Eingaben
+dann mit einer einzigen Abfrage statt jede Datei zu öffnen und zu scannen.
+Ein Eintrag gilt nur, solange Größe und mtime der Datei übereinstimmen;
+sonst liest Schritt 11 wie bisher den Header. Die letzten Einträge je
+Ausgabe bleiben erhalten (Vergleich zwischen Läufen).
+
+Pfad: Umgebungsvariable GPX_METADATA_INDEX (setzt der Snakefile; nicht gesetzt oder leer = aus),
+Skripte von Hand oder in Tests schreiben also keinen Index.
+Fehler im Index brechen nie den Producer ab.
+"""
+
+import json
+import os
+import sqlite3
+from datetime import datetime
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+INDEX_PATH_ENV = "GPX_METADATA_INDEX"
+MAX_HISTORY_PER_OUTPUT = 50
+SQLITE_TIMEOUT_S = 30  # parallele Snakemake-Jobs schreiben gleichzeitig
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stage_metadata (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    output_path TEXT NOT NULL,
+    script TEXT,
+    recorded_at TEXT NOT NULL,
+    file_size INTEGER,
+    file_mtime_ns INTEGER,
+    metadata_json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_stage_metadata_path ON stage_metadata (output_path, id);
+"""
+
+
+def index_path() -> Optional[str]:
+    """Aktiver Index-Pfad; None außerhalb der Pipeline oder wenn per GPX_METADATA_INDEX="" abgeschaltet."""
+    return os.environ.get(INDEX_PATH_ENV) or None
+
+
+def output_key(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+def parse_header_lines(lines: Iterable[str]) -> Dict[str, str]:
+    """'# Key: Wert'-Zeilen als Dict (gleiche Regeln wie der Header-Parser in Schritt 11)."""
+    metadata = {}
+    for line in lines:
+        if not line.startswith("#"):
+            continue
+        line_content = line.lstrip('# ').strip()
+        if ':' in line_content:
+            key, value = line_content.split(':', 1)
+            metadata[key.strip()] = value.strip()
+    return metadata
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(db_path, timeout=SQLITE_TIMEOUT_S)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(_SCHEMA)
+    return connection
+
+
+def record_output_metadata(output_path: str, metadata: Mapping[str, object], script: Optional[str] = None,
+                           db_path: Optional[str] = None) -> bool:
+    """
+    Metadaten einer gerade geschriebenen Ausgabedatei eintragen.
+    Returns: True bei Erfolg; False (mit Warnung), wenn Datei oder Index nicht verfügbar.
+    """
+    db_path = db_path or index_path()
+    if not db_path or not output_path or not os.path.exists(output_path):
+        return False
+    try:
+        stat = os.stat(output_path)
+        key = output_key(output_path)
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = _connect(db_path)
+        try:
+            with connection:
+                connection.execute(
+                    "INSERT INTO stage_metadata (output_path, script, recorded_at, file_size, file_mtime_ns, metadata_json) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, script, datetime.now().isoformat(), stat.st_size, stat.st_mtime_ns,
+                     json.dumps(dict(metadata), ensure_ascii=False, default=str)))
+                connection.execute(
+                    "DELETE FROM stage_metadata WHERE output_path = ? AND id NOT IN "
+                    "(SELECT id FROM stage_metadata WHERE output_path = ? ORDER BY id DESC LIMIT ?)",
+                    (key, key, MAX_HISTORY_PER_OUTPUT))
+        finally:
+            connection.close()
+        return True
+    except (sqlite3.Error, OSError, TypeError, ValueError) as e:
+        print(f"[Warnung] Metadaten-Index nicht aktualisiert ({output_path}): {e}")
+        return False
+
+
+def record_header_lines(output_path: str, header_lines: Iterable[str], script: Optional[str] = None,
+                        db_path: Optional[str] = None) -> bool:
+    """Wie record_output_metadata, aber direkt aus den geschriebenen #-Headerzeilen."""
+    return record_output_metadata(output_path, parse_header_lines(header_lines), script, db_path)
+
+
+def load_latest_metadata(paths: Iterable[str], db_path: Optional[str] = None) -> Dict[str, Dict[str, object]]:
+    """
+    Neueste Metadaten für alle paths mit einer Abfrage.
+    Returns: {path: metadata} nur für Dateien, deren Größe/mtime noch zum Eintrag passen.
+    """
+    db_path = db_path or index_path()
+    existing = {output_key(p): p for p in paths if p and os.path.exists(p)}
+    if not db_path or not existing or not os.path.exists(db_path):
+        return {}
+    placeholders = ",".join("?" * len(existing))
+    try:
+        connection = sqlite3.connect(db_path, timeout=SQLITE_TIMEOUT_S)
+        try:
+            rows = connection.execute(
+                "SELECT output_path, file_size, file_mtime_ns, metadata_json FROM stage_metadata WHERE id IN "
+                f"(SELECT MAX(id) FROM stage_metadata WHERE output_path IN ({placeholders}) GROUP BY output_path)",
+                list(existing)).fetchall()
+        finally:
+            connection.close()
+    except sqlite3.Error as e:
+        print(f"[Warnung] Metadaten-Index nicht lesbar ({db_path}): {e}")
+        return {}
+
+    result = {}
+    for key, file_size, file_mtime_ns, metadata_json in rows:
+        path = existing[key]
+        stat = os.stat(path)
+        if stat.st_size == file_size and stat.st_mtime_ns == file_mtime_ns:
+            result[path] = json.loads(metadata_json)
+    return result
+
+
+def metadata_history(path: str, db_path: Optional[str] = None,
+                     limit: int = MAX_HISTORY_PER_OUTPUT) -> List[Tuple[str, Optional[str], Dict[str, object]]]:
+    """Frühere Einträge einer Ausgabe, neueste zuerst: [(recorded_at, script, metadata), ...]."""
+    db_path = db_path or index_path()
+    if not db_path or not os.path.exists(db_path):
+        return []
+    connection = sqlite3.connect(db_path, timeout=SQLITE_TIMEOUT_S)
+    try:
+        rows = connection.execute(
+            "SELECT recorded_at, script, metadata_json FROM stage_metadata WHERE output_path = ? ORDER BY id DESC LIMIT ?",
+            (output_key(path), limit)).fetchall()
+    finally:
+        connection.close()
+    return [(recorded_at, script, json.loads(metadata_json)) for recorded_at, script, metadata_json in rows]
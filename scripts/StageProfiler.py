@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+StageProfiler.py - Opt-in Profiling einzelner Pipeline-Schritte (pipeline_monitoring.profiling)
+
+Statt Timing-Prints von Hand einzubauen, umschließt der Runner
+(PipelineMetrics.py run) das Skript mit einem Profiler, sobald
+GPX_PROFILE gesetzt ist. Die Artefakte landen unter
+output/profiles/<schritt>_<basename>.*:
+
+- sample: Stack-Sampling des Hauptthreads alle GPX_PROFILE_INTERVAL_MS ms
+          -> .collapsed (flamegraph.pl / speedscope) + .txt (Top-N self/inklusiv)
+- cpu:    deterministisch mit cProfile
+          -> .prof (pstats, snakeviz) + .txt (Top-N nach cumtime/tottime)
+- memory: tracemalloc, Schnappschuss am Speicher-Peak; die Top-Level-Pakete des
+          Skripts werden vorab importiert, damit Import-Allokationen (und der
+          sehr langsame Import unter tracemalloc) das Profil nicht überdecken
+          -> .collapsed (Bytes je Allokations-Stack) + .txt (Top-N Allokationsstellen)
+
+Umgebungsvariablen (setzt das Snakefile aus config.yaml, von Hand überschreibbar):
+  GPX_PROFILE             off | sample | cpu | memory
+  GPX_PROFILE_STAGES      Komma-Liste ('4b' oder '4b_fetch_surface'), leer = alle Schritte
+  GPX_PROFILE_DIR         Zielordner (Standard output/profiles)
+  GPX_PROFILE_TOP_N       Zeilen in der Zusammenfassung
+  GPX_PROFILE_INTERVAL_MS Sampling-Intervall
+  GPX_PROFILE_MEMORY_FRAMES Stacktiefe im Modus memory
+
+Profiliert wird nur der Prozess des Runners; Worker-Prozesse (Batch-Modus,
+Plot-Worker) erscheinen nur mit ihrer Wartezeit.
+"""
+
+import ast
+import cProfile
+import contextlib
+import importlib
+import io
+import os
+import pstats
+import re
+import runpy
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+PROFILE_MODES = ('sample', 'cpu', 'memory')
+DEFAULT_PROFILE_DIR = "output/profiles"
+DEFAULT_TOP_N = 30
+DEFAULT_INTERVAL_MS = 5.0
+DEFAULT_MEMORY_FRAMES = 5   # Stacktiefe je Allokation; tracemalloc wird mit jeder Ebene deutlich langsamer
+PEAK_SNAPSHOT_GROWTH = 1.25  # neuer Peak-Schnappschuss erst ab +25 % gegenüber dem letzten
+
+# Runner-Frames gehören nicht zum Profil des Schritts
+_SKIP_FILES = {os.path.abspath(__file__), os.path.abspath(runpy.__file__), "<frozen runpy>"}
+
+
+def _file_key(filename: str) -> str:
+    return filename if filename.startswith('<') else os.path.abspath(filename)
+
+
+def profile_mode() -> Optional[str]:
+    mode = os.environ.get("GPX_PROFILE", "").strip().lower()
+    if mode in ('', 'off', 'false', '0', 'none'):
+        return None
+    if mode not in PROFILE_MODES:
+        print(f"[Warnung] Unbekannter Profiling-Modus '{mode}' (erlaubt: {', '.join(PROFILE_MODES)})",
+              file=sys.stderr)
+        return None
+    return mode
+
+
+def stage_selected(stage_name: str) -> bool:
+    """Leere GPX_PROFILE_STAGES = alle; sonst voller Name oder Präfix vor dem ersten '_' ('4b')."""
+    selected = [s.strip() for s in os.environ.get("GPX_PROFILE_STAGES", "").split(",") if s.strip()]
+    return not selected or stage_name in selected or stage_name.split('_', 1)[0] in selected
+
+
+def artifact_base(stage_name: str, track: Optional[str] = None, output_dir: Optional[str] = None) -> str:
+    output_dir = output_dir or os.environ.get("GPX_PROFILE_DIR") or DEFAULT_PROFILE_DIR
+    name = f"{stage_name}_{track}" if track else stage_name
+    return os.path.join(output_dir, re.sub(r'[^\w.-]+', '_', name))
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name) or default)
+    except ValueError:
+        return default
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+# === SAMPLING ===
+
+class StackSampler:
+    """Tastet den Stack eines Threads periodisch ab; Ergebnis als collapsed stacks {'a;b;c': n}."""
+
+    def __init__(self, interval_s: float, thread_id: Optional[int] = None, root_frame=None):
+        self.interval_s = interval_s
+        self.thread_id = thread_id or threading.get_ident()
+        self.root_frame = root_frame  # Frames ab hier (Aufrufer des Profilers) nicht mitzählen
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="StageProfiler-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None and frame is not self.root_frame:
+                if _file_key(frame.f_code.co_filename) not in _SKIP_FILES:
+                    labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if labels:
+                self.stacks[";".join(reversed(labels))] += 1
+                self.samples += 1
+
+
+def collapsed_totals(stacks: Dict[str, float]) -> Tuple[Counter, Counter]:
+    """(self, inklusiv) je Frame aus collapsed stacks; Rekursion zählt inklusiv nur einmal."""
+    self_totals, inclusive = Counter(), Counter()
+    for stack, weight in stacks.items():
+        frames = stack.split(";")
+        self_totals[frames[-1]] += weight
+        for frame in set(frames):
+            inclusive[frame] += weight
+    return self_totals, inclusive
+
+
+def write_collapsed(stacks: Dict[str, float], path: str) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, weight in sorted(stacks.items(), key=lambda item: -item[1]):
+            f.write(f"{stack} {int(weight)}\n")
+
+
+def _top_table(title: str, totals: Counter, grand_total: float, top_n: int, unit: str) -> List[str]:
+    lines = [title, f"{'Anteil':>7} {unit:>12}  Frame"]
+    for frame, weight in totals.most_common(top_n):
+        share = 100.0 * weight / grand_total if grand_total else 0.0
+        lines.append(f"{share:>6.1f}% {weight:>12,.0f}  {frame}")
+    return lines + [""]
+
+
+# === PROFILER ===
+
+@contextlib.contextmanager
+def profiled(stage_name: str, track: Optional[str] = None, mode: Optional[str] = None,
+             output_dir: Optional[str] = None, script: Optional[str] = None) -> Iterator[Optional[str]]:
+    """
+    Profiliert den Block, wenn ein Modus aktiv und der Schritt ausgewählt ist.
+    script: im Modus memory werden dessen Top-Level-Pakete vor dem Tracing importiert.
+    Yields: Artefakt-Basispfad (ohne Endung) oder None, wenn nicht profiliert wird.
+    Artefakte werden auch bei Fehlern/sys.exit im Block geschrieben.
+    """
+    mode = mode or profile_mode()
+    if mode is None or not stage_selected(stage_name):
+        yield None
+        return
+
+    base = artifact_base(stage_name, track, output_dir)
+    os.makedirs(os.path.dirname(base) or ".", exist_ok=True)
+    top_n = int(_env_number("GPX_PROFILE_TOP_N", DEFAULT_TOP_N))
+    header = [f"Profil {stage_name}" + (f" ({track})" if track else "") + f" - Modus {mode}"]
+    start = time.perf_counter()
+    caller = sys._getframe(2)  # 0: profiled, 1: contextlib.__enter__, 2: with-Anweisung
+
+    try:
+        if mode == 'cpu':
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield base
+            finally:
+                profiler.disable()
+                header.append(f"Dauer: {time.perf_counter() - start:.2f} s")
+                _write_cpu_profile(profiler, base, header, top_n)
+        elif mode == 'sample':
+            sampler = StackSampler(_env_number("GPX_PROFILE_INTERVAL_MS", DEFAULT_INTERVAL_MS) / 1000.0,
+                                   root_frame=caller)
+            sampler.start()
+            try:
+                yield base
+            finally:
+                sampler.stop()
+                header.append(f"Dauer: {time.perf_counter() - start:.2f} s, {sampler.samples} Samples "
+                              f"à {sampler.interval_s * 1000:.1f} ms")
+                _write_sample_profile(sampler.stacks, base, header, top_n)
+        else:
+            preloaded = preload_imports(script) if script else []
+            if preloaded:
+                header.append(f"Vorab importiert (nicht im Profil): {', '.join(preloaded)}")
+            monitor = PeakSnapshotMonitor(_env_number("GPX_PROFILE_INTERVAL_MS", DEFAULT_INTERVAL_MS) / 1000.0)
+            monitor.start()
+            try:
+                yield base
+            finally:
+                snapshot, peak = monitor.stop()
+                header.append(f"Dauer: {time.perf_counter() - start:.2f} s, Peak: {peak / 1024 ** 2:.1f} MB "
+                              f"(Schnappschuss bei {monitor.snapshot_size / 1024 ** 2:.1f} MB)")
+                _write_memory_profile(snapshot, base, header, top_n, caller.f_code.co_filename)
+    finally:
+        print(f"[Info] Profil geschrieben: {base}.*", file=sys.stderr)
+
+
+def _write_cpu_profile(profiler: cProfile.Profile, base: str, header: List[str], top_n: int) -> None:
+    profiler.dump_stats(f"{base}.prof")
+    report = io.StringIO()
+    stats = pstats.Stats(profiler, stream=report)
+    stats.sort_stats('cumulative').print_stats(top_n)
+    stats.sort_stats('tottime').print_stats(top_n)
+    with open(f"{base}.txt", 'w', encoding='utf-8') as f:
+        f.write("\n".join(header) + "\n\n" + report.getvalue())
+
+
+def _write_sample_profile(stacks: Counter, base: str, header: List[str], top_n: int) -> None:
+    write_collapsed(stacks, f"{base}.collapsed")
+    self_totals, inclusive = collapsed_totals(stacks)
+    total = sum(stacks.values())
+    lines = header + [""]
+    lines += _top_table(f"Top {top_n} nach Eigenzeit (self)", self_totals, total, top_n, "Samples")
+    lines += _top_table(f"Top {top_n} inklusiv (Frame auf dem Stack)", inclusive, total, top_n, "Samples")
+    with open(f"{base}.txt", 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines))
+
+
+# === SPEICHER ===
+
+def preload_imports(script: str) -> List[str]:
+    """Top-Level-Pakete der Modul-Imports von script importieren (Fehler ignoriert). Returns: geladene Pakete."""
+    try:
+        with open(script, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read(), filename=script)
+    except (OSError, SyntaxError, ValueError):
+        return []
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names += [alias.name.split('.')[0] for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.append(node.module.split('.')[0])
+    loaded = []
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+    try:
+        for name in dict.fromkeys(names):
+            try:
+                importlib.import_module(name)
+                loaded.append(name)
+            except Exception:
+                pass
+    finally:
+        sys.path.pop(0)
+    return loaded
+
+
+class PeakSnapshotMonitor:
+    """tracemalloc mit Schnappschuss am Peak: ein Hintergrundthread nimmt neu auf, sobald der Verbrauch wächst."""
+
+    def __init__(self, interval_s: float):
+        self.interval_s = interval_s
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+        self.snapshot_size = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="StageProfiler-memory", daemon=True)
+        self._started_tracing = False
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(int(_env_number("GPX_PROFILE_MEMORY_FRAMES", DEFAULT_MEMORY_FRAMES)))
+            self._started_tracing = True
+        self._thread.start()
+
+    def _take(self, current: int) -> None:
+        self.snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)])
+        self.snapshot_size = current
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            current, _ = tracemalloc.get_traced_memory()
+            if current > self.snapshot_size * PEAK_SNAPSHOT_GROWTH:
+                self._take(current)
+
+    def stop(self) -> Tuple[tracemalloc.Snapshot, int]:
+        self._stop.set()
+        self._thread.join()
+        current, peak = tracemalloc.get_traced_memory()
+        if self.snapshot is None or current > self.snapshot_size:
+            self._take(current)
+        if self._started_tracing:
+            tracemalloc.stop()
+        return self.snapshot, peak
+
+
+def _write_memory_profile(snapshot: tracemalloc.Snapshot, base: str, header: List[str], top_n: int,
+                          caller_file: str) -> None:
+    root_files = _SKIP_FILES | {_file_key(caller_file)}
+    stacks = Counter()
+    for stat in snapshot.statistics('traceback'):
+        frames = list(stat.traceback)
+        while len(frames) > 1 and _file_key(frames[0].filename) in root_files:
+            frames.pop(0)  # Runner-Präfix (älteste Frames) abschneiden
+        stacks[";".join(f"{os.path.basename(frame.filename)}:{frame.lineno}" for frame in frames)] += stat.size
+    write_collapsed(stacks, f"{base}.collapsed")
+
+    by_line = snapshot.statistics('lineno')
+    total = sum(stat.size for stat in by_line)
+    lines = header + ["", f"Top {top_n} Allokationsstellen (lebende Objekte im Schnappschuss)",
+                      f"{'Anteil':>7} {'KB':>12} {'Blöcke':>9}  Stelle"]
+    for stat in by_line[:top_n]:
+        frame = stat.traceback[0]
+        share = 100.0 * stat.size / total if total else 0.0
+        lines.append(f"{share:>6.1f}% {stat.size / 1024:>12,.1f} {stat.count:>9}  {frame.filename}:{frame.lineno}")
+    with open(f"{base}.txt", 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
@@ -0,0 +1,594 @@
+#!/usr/bin/env python3
+"""
+StageSummaryTemplate.py - Vorkompiliertes HTML-Template der Etappenübersicht (Schritt 11)
+
+Das Template ist reiner Text mit {{name}}-Platzhaltern (CSS-Klammern
+brauchen kein Escaping). Es wird beim Import einmal in Literal- und
+Feldteile zerlegt; feste Werte (Emojis) werden dabei schon eingesetzt.
+render() fügt dann nur noch die Abschnitte eines Tracks zusammen.
+Die Abschnitte selbst erzeugt 11_generate_stage_summary.py.
+"""
+
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Mapping, Optional, Tuple
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+SECTION_EMOJIS = {
+    'world_map_emoji': "\N{WORLD MAP}",  # 🗺️
+    'stats_emoji': "\N{BAR CHART}",  # 📊
+    'surface_dist_emoji': "\N{RAILWAY TRACK}",  # 🛤️
+    'profile_emoji': "\N{CHART WITH UPWARDS TREND}",  # 📈
+    'speed_emoji': "\N{STOPWATCH}",  # ⏱️
+    'peak_emoji': "\N{MOUNTAIN}",  # ⛰️
+    'street_list_emoji': "\N{MOTORWAY}",  # 🛣️
+    'description_emoji': "\N{MEMO}",  # 📝
+    'power_emoji': "\N{HIGH VOLTAGE SIGN}",  # ⚡
+    'metadata_emoji': "\N{SCROLL}"  # 📜
+}
+
+
+class CompiledTemplate:
+    """Template mit {{name}}-Feldern, beim Erzeugen in Literale und Felder zerlegt."""
+
+    def __init__(self, text: str, static: Optional[Mapping[str, str]] = None):
+        static = static or {}
+        literals = ['']
+        fields = []
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(text):
+            literals[-1] += text[position:match.start()]
+            name = match.group(1)
+            if name in static:
+                literals[-1] += static[name]
+            else:
+                fields.append(name)
+                literals.append('')
+            position = match.end()
+        literals[-1] += text[position:]
+        self._literals: Tuple[str, ...] = tuple(literals)
+        self._fields: Tuple[str, ...] = tuple(fields)
+
+    @property
+    def fields(self) -> frozenset:
+        return frozenset(self._fields)
+
+    def render(self, values: Mapping[str, object]) -> str:
+        missing = self.fields - set(values)
+        if missing:
+            raise KeyError(f"Missing template values: {', '.join(sorted(missing))}")
+        parts = [self._literals[0]]
+        for name, literal in zip(self._fields, self._literals[1:]):
+            parts.append(str(values[name]))
+            parts.append(literal)
+        return ''.join(parts)
+
+
+def surface_css(surface_colors: Mapping[str, str]) -> str:
+    """Hintergrundklassen .surface-<typ> für die Straßenliste."""
+    return "".join(f".surface-{key.replace(' ', '_').replace('/', '_')} {{ background-color: {val}; }}"
+                   for key, val in surface_colors.items() if key != "default")
+
+
+@lru_cache(maxsize=None)
+def load_bootstrap_css(path: str) -> str:
+    """bootstrap.min.css einmal je Prozess lesen (Batch-Läufe teilen den Inhalt)."""
+    css_path = Path(path)
+    if not css_path.exists():
+        return "/* BOOTSTRAP CSS NICHT GEFUNDEN */"
+    try:
+        css = css_path.read_text(encoding="utf-8")
+        return css if css.strip() else "/* BOOTSTRAP CSS WAR LEER */"
+    except Exception as e:
+        return f"/* FEHLER LADEN BOOTSTRAP: {e} */"
+
+
+STAGE_SUMMARY_HTML = """
+<!DOCTYPE html><html lang='de'><head><meta charset='UTF-8'><meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>Etappenübersicht – {{basename}}</title>
+    <style>
+        {{bootstrap_css}}
+    /* Custom Styles */
+    :root {# CSS Variablen Definition #
+        --font-family-sans-serif: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, "Helvetica Neue", Arial, sans-serif;
+        
+        /* Farbpalette inspiriert vom Fahrradrahmen & Natur */
+        --frame-base-gray: #7A8B8B;  /* Ein neutraleres Grau, basierend auf deinem Rahmen */
+        --accent-green: #689F38;   /* Ein sattes, natürliches Grün */
+        --accent-orange: #FFA000;  /* Ein warmes Orange für Highlights */
+
+        --dark-text: #2c3e50;      /* Dunkles Blau/Grau für Text, gute Lesbarkeit */
+        --medium-gray-border: #bdc3c7; /* Helles Grau für Ränder */
+        --light-green-bg: #e8f5e9; /* Sehr helles, gedämpftes Grün für Seitenhintergrund */
+        --card-bg: #ffffff;
+        
+        --heading-color: var(--dark-text);
+        --text-color: var(--dark-text);
+        --link-color: var(--accent-green);
+        --link-hover-color: #558B2F; /* Dunkleres Grün für Hover */
+        --border-color: var(--medium-gray-border);
+        --table-header-bg: #f0f3f4; /* Sehr helles Grau für Tabellenköpfe */
+    }
+
+    * {
+        box-sizing: border-box;
+        margin: 0;
+        padding: 0;
+    }
+
+    body {
+        font-family: var(--font-family-sans-serif);
+        line-height: 1.6;
+        color: var(--text-color);
+        background-color: var(--light-green-bg); 
+        padding: 1rem 0;
+    }
+
+    .container {
+        max-width: 960px;
+        margin: 0 auto;
+        padding: 20px;
+        background-color: var(--card-bg);
+        border-radius: 8px;
+        box-shadow: 0 2px 10px rgba(0, 0, 0, 0.08);
+    }
+
+    h1, h2, h3 {
+        color: var(--heading-color);
+        margin-bottom: 0.75em;
+        margin-top: 1.5em;
+        padding-bottom: 0.3em;
+        border-bottom: 2px solid var(--border-color);
+    }
+    h1:first-child, h2:first-child, h3:first-child { /* Beachte: CSS-Regeln ohne Deklarationen brauchen trotzdem die Klammern */
+        margin-top: 0;
+    }
+
+    h1 {
+        text-align: center;
+        font-size: 2rem;
+        margin-bottom: 1em;
+        color: var(--frame-base-gray); 
+    }
+    h2 { font-size: 1.6rem; color: var(--accent-green); }
+    h3 { font-size: 1.3rem; color: var(--heading-color); border-bottom-width: 1px; }
+
+    img.overview-map-image {
+        max-width: 100%;
+        height: auto;
+        display: block;
+        margin: 1em auto;
+        border: 1px solid var(--border-color);
+        border-radius: 4px;
+    }
+
+    .interactive-map-container {# CSS-Regeln ohne Deklarationen brauchen trotzdem die Klammern #
+        margin-top: 1em;
+        margin-bottom: 2em;
+    }
+    
+    .interactive-map-iframe {
+        width: 100%;
+        height: 500px;
+        border: 1px solid var(--border-color);
+        border-radius: 4px;
+    }
+
+    .desktop-only { display: none; }
+    .mobile-only { display: block; }
+
+    .toggle-map-button {
+        display: block;
+        width: 100%;
+        padding: 0.75em;
+        margin-bottom: 1em;
+        background-color: var(--accent-green);
+        color: white;
+        border: none;
+        border-radius: 4px;
+        cursor: pointer;
+        text-align: center;
+        font-size: 1em;
+        font-weight: bold;
+    }
+    .toggle-map-button:hover {
+        background-color: var(--link-hover-color);
+    }
+
+    table {
+        width: 100%;
+        border-collapse: collapse;
+        margin-bottom: 1.5em;
+        font-size: 0.9rem;
+    }
+    th, td {
+        padding: 0.6em 0.5em;
+        text-align: left;
+        border: 1px solid var(--border-color);
+    }
+    th {
+        background-color: var(--table-header-bg);
+        font-weight: bold;
+        color: var(--heading-color);
+    }
+    tr:nth-child(even) {
+        background-color: #f9f9f9; 
+    }
+    .stats-table td:first-child {
+        font-weight: bold;
+        width: 40%;
+        color: var(--heading-color); 
+    }
+    .segment-summary table {
+        font-size: 0.85em;
+    }
+    .table-responsive-container {
+        overflow-x: auto; 
+    }
+
+    .surface-legend-box {
+        padding: 15px;
+        border: 1px solid var(--border-color);
+        border-radius: 5px;
+        margin-top: 20px;
+        margin-bottom: 20px;
+        background-color: #fdfdfd; 
+    }
+    .surface-legend-box h3 {
+        margin-top: 0;
+        margin-bottom: 12px;
+        font-size: 1.2em;
+        color: var(--heading-color);
+        border-bottom: 1px solid var(--border-color);
+        padding-bottom: 8px;
+        text-align: left;
+    }
+    .surface-legend-box ul {
+        list-style-type: none;
+        padding-left: 0;
+        margin-bottom: 0;
+        display: flex;
+        flex-wrap: wrap;
+        gap: 10px;
+    }
+    .surface-legend-box li {
+        font-size: 0.85em;
+        display: flex;
+        align-items: center;
+        flex-basis: calc(33.333% - 10px);
+    }
+    .surface-legend-box li span:first-child {
+        display: inline-block;
+        width: 16px;
+        height: 16px;
+        border: 1px solid #888;
+        margin-right: 6px;
+        vertical-align: middle;
+    }
+    /* Die folgenden :nth-child Regeln sind spezifisch für die Anzahl der Legenden-Items. */
+    /* Wenn die Anzahl dynamisch ist, ist es besser, Klassen zu verwenden oder die Styles inline zu setzen, */
+    /* wie du es im Python-Code für die Legende bereits tust. */
+    /* Ich lasse sie hier aus, da dein Python-Code die background-color inline setzt. */
+    /* .surface-legend-box li:nth-child(1) span:first-child { background-color: #5D4037; } */
+    /* ... etc ... */
+
+
+    .street-list details {
+        margin-bottom: 0.5em;
+        border: 1px solid var(--border-color);
+        border-radius: 4px;
+        background-color: #fdfdfd;
+    }
+    .street-list summary {
+        padding: 0.6em 0.85em;
+        background-color: var(--table-header-bg);
+        cursor: pointer;
+        font-weight: bold;
+        color: var(--heading-color);
+        list-style-type: "► "; 
+    }
+    .street-list details[open] > summary {
+        list-style-type: "▼ "; 
+        background-color: #dde3e7; 
+    }
+    .street-list summary:hover {
+        background-color: #d8dcdf;
+    }
+    
+    .street-list ul {
+        list-style-type: none;
+        padding: 0.5em 0.85em 0.85em 0.85em ;
+    }
+    .street-list li {
+        display: flex; 
+        justify-content: space-between; 
+        align-items: flex-start; 
+        border-bottom: 1px dotted #eee;
+        padding: 0.5em 0; 
+        font-size: 0.9em;
+        gap: 10px; 
+    }
+    .street-list li:last-child {
+        border-bottom: none;
+    }
+
+    .street-name-km {
+        flex-grow: 1; 
+    }
+    .street-name-km .street-name {
+        display: block; 
+    }
+    .street-name-km .street-km {
+        color: #555;
+        font-size: 0.9em;
+    }
+
+    .surface-details {
+        flex-shrink: 0; 
+        width: 220px;  
+        text-align: right;
+        font-size: 0.85em;
+        color: #444;
+    }
+    .surface-details .main-surface {
+        font-weight: bold;
+        padding: 0.1em 0.4em; 
+        border-radius: 3px; 
+        color: var(--card-bg); 
+    }
+    .surface-details .extra-info {
+        display: block; 
+        font-size: 0.9em;
+        color: #666;
+        margin-top: 0.2em;
+    }
+    .surface-details small { 
+        color: #777;
+    }
+
+    /* Klassen für Oberflächenfarben in der Straßenliste (dynamisch aus surface_color_config) */
+    /* Diese werden im Python-Code generiert und hier eingefügt, wenn du sie nicht inline setzt */
+    /* Beispiel: .surface-asphalt { background-color: #5D4037; } */
+    {{surface_css}}
+    /* Spezifische Textfarben für helle Hintergründe, falls nötig */
+    .surface-fine_gravel { color: var(--dark-text) !important; }
+    .surface-unknown { color: var(--dark-text) !important; }
+    .surface-unpaved { color: var(--dark-text) !important; } /* Wenn Orange als Hintergrund für Unpaved verwendet wird */
+    .surface-sand { color: var(--dark-text) !important; } /* Wenn Sand sehr hell ist */
+
+
+    .markdown-content {
+        line-height: 1.7;
+        margin-top: 1.5em;
+    }
+    .markdown-content article {
+        margin-bottom: 2em;
+        padding: 1em;
+        border-left: 3px solid var(--accent-green);
+        background-color: #fdfdfd;
+        border-radius: 0 4px 4px 0; 
+    }
+    .markdown-content h2 { 
+        font-size: 1.4em; 
+        margin-top: 0;
+        color: var(--frame-base-gray);
+        border-bottom-width: 1px;
+    }
+    .markdown-content h3 {
+        font-size: 1.15em;
+        color: var(--dark-text);
+        border-bottom: none;
+        margin-top: 1em;
+    }
+    .markdown-content p {
+        margin-bottom: 1em;
+    }
+    .markdown-content strong {
+        color: var(--accent-green); 
+    }
+    .markdown-content em, .markdown-content i {
+        color: var(--accent-orange); 
+    }
+    .markdown-content p > strong:first-child { 
+        font-size: 1.5em;
+        margin-right: 0.2em;
+    }
+
+    hr {
+        border: 0;
+        height: 1px;
+        background-color: var(--border-color);
+        margin: 2em 0;
+    }
+
+    /* HTML/PDF spezifische Anzeige */
+    .pdf-only {
+        display: none; /* Im Browser ausblenden */
+    }
+    .html-only {
+        display: block; /* Im Browser anzeigen (Standard, aber explizit) */
+    }
+
+    @media print {
+        .html-only {
+            display: none !important; /* Im Druck/PDF ausblenden */
+        }
+        .pdf-only {
+            display: block !important; /* Im Druck/PDF anzeigen */
+        }
+        /* Optional: Button für interaktive Karte im Druck ausblenden */
+        .toggle-map-button {
+            display: none !important;
+        }
+        /* Optional: Den interaktiven Karten-Container im Druck ausblenden */
+        #interactiveMapContainer.interactive-map-container {
+            display: none !important;
+        }
+        
+        /* NEUE REGELN FÜR <details> IM DRUCK/PDF */
+        .street-list details {  /* CSS-Regel Block beginnt */
+            page-break-inside: avoid; /* Versucht, Umbrüche innerhalb eines Details-Blocks zu vermeiden */
+        } /* CSS-Regel Block endet */
+        .street-list details[open] summary ~ * { /* CSS-Regel Block beginnt */
+            display: block; /* Inhalt anzeigen */
+        } /* CSS-Regel Block endet */
+        .street-list details summary::before, /* Pfeile entfernen/ändern, falls sie stören */
+        .street-list details summary::-webkit-details-marker { /* CSS-Regel Block beginnt */
+            display: none !important; /* Standard-Pfeil ausblenden */
+        } /* CSS-Regel Block endet */
+        .street-list details summary { /* CSS-Regel Block beginnt */
+            list-style-type: none !important; /* Standard-Pfeil auch hier entfernen */
+            cursor: default; /* Cursor im PDF nicht als klickbar anzeigen */
+            /* Optional: Füge einen statischen Indikator hinzu, wenn du möchtest */
+            /* content: "▼ "; /* oder einfach nichts */
+        } /* CSS-Regel Block endet */
+        /* WICHTIGSTE REGEL: Alle <details> im Druck standardmäßig öffnen */
+        .street-list details { /* CSS-Regel Block beginnt */
+            display: block !important; /* Stellt sicher, dass der Block existiert */
+        } /* CSS-Regel Block endet */
+        .street-list details > summary { /* CSS-Regel Block beginnt */
+            /* Optional: Aussehen der Zusammenfassung im PDF anpassen */
+            /* background-color: #f0f0f0 !important; */ /* Beispiel */
+        } /* CSS-Regel Block endet */
+        .street-list details > *:not(summary) { /* CSS-Regel Block beginnt */
+            display: block !important; /* Macht den Inhalt sichtbar */
+        } /* CSS-Regel Block endet */
+        /* Ende NEUE REGELN */
+        
+    }
+
+    /* Desktop-spezifische Stile */
+    @media (min-width: 768px) {
+        body {
+            padding: 2rem;
+        }
+        .container {
+            padding: 30px;
+        }
+        h1 {font-size: 2.5rem; }
+        h2 {font-size: 1.8rem; }
+        h3 {font-size: 1.4rem; }
+
+        .interactive-map-container {
+            display: block !important; 
+        }
+        .mobile-only { display: none; }
+        .desktop-only { display: block; }
+
+        .surface-legend-box ul {
+            display: grid; /* Grid für Desktop ist eine gute Alternative zu column-count */
+            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); /* Spaltenbreite anpassen */
+            gap: 5px 15px;
+            column-count: auto; /* Deaktiviere column-count, wenn Grid verwendet wird */
+        }
+         .surface-legend-box li {
+            flex-basis: auto; /* Nicht mehr nötig bei Grid-Layout für ul */
+            /* display: flex; align-items: center; <-- bleibt gut für Inhalt des li */
+        }
+    }
+</style>
+</head>
+<body>
+    <div class="container">
+        <header>
+            <h1>Etappenübersicht: {{basename}}</h1>
+        </header>
+        <main>
+            <section>
+                <h2>{{world_map_emoji}} Karte</h2>
+                {{map_html_only}}
+                {{map_pdf_only}}
+                {{surface_legend}}
+            </section>
+            <hr>
+            <section>
+                <h2>{{stats_emoji}} Statistiken</h2>
+                <div class="table-responsive-container">
+                    <table class="stats-table">
+                        <thead><tr><th>Merkmal</th><th>Wert</th></tr></thead>
+                        <tbody>{{stats_rows}}</tbody>
+                    </table>
+                </div>
+            </section>
+            <hr>
+            <section>
+                <h2>{{surface_dist_emoji}} Oberflächenverteilung</h2>
+                <div class="table-responsive-container">
+                    {{surface_distribution}}
+                </div>
+            </section>
+            <hr>
+            <section>
+                <h2>{{profile_emoji}} Höhenprofil & 3D-Ansicht </h2>
+                {{profile_image}}
+                {{plotly_3d_heading}}
+                <div class="html-only interactive-map-container">
+                    {{plotly_3d_iframe}}
+                </div>                
+            </section>
+            
+             <!-- NEUER ABSCHNITT FÜR GESCHWINDIGKEITSPROFIL -->
+            <hr>
+            <section>
+                <h2>{{speed_emoji}} Geschwindigkeitsprofil</h2>
+                {{speed_profile_image}}
+            </section>
+            <!-- ENDE NEUER ABSCHNITT -->
+            
+             <!-- NEUER ABSCHNITT FÜR POWER VISUALISIERUNG -->
+            <hr>
+            <section>
+                <h2>{{power_emoji}} Power Performance</h2>
+                {{power_image}}
+            </section>
+            <!-- ENDE NEUER ABSCHNITT -->
+            
+            <hr>
+            <section class="segment-summary">
+                <h2>{{peak_emoji}} Peak & Anstiegs-Analyse</h2>
+                {{peak_segments}}
+            </section>
+            <hr>
+            <section class="street-list">
+                <h2>{{street_list_emoji}} Straßenverlauf mit Oberflächen</h2>
+                {{street_list}}
+            </section>
+            <hr>
+            <section>
+                <h2>{{description_emoji}} Beschreibungen & Highlights</h2>
+                <div class="markdown-content">{{descriptions}}</div>
+            </section>
+            <section id="processing-metadata">
+                <h2>{{metadata_emoji}} Verarbeitungsdetails & Datenquellen</h2>
+                {{metadata}}
+            </section>      
+        </main>
+    </div>
+    <script>
+        function toggleInteractiveMap() {
+            const container = document.getElementById('interactiveMapContainer');
+            if (container.style.display === 'none' || container.style.display === '') {
+                container.style.display = 'block';
+            } else {
+                container.style.display = 'none';
+            }
+        }
+        document.addEventListener('DOMContentLoaded', function() {
+            const interactiveMapContainer = document.getElementById('interactiveMapContainer');
+            const toggleButton = document.querySelector('.toggle-map-button');
+            if (window.innerWidth < 768) { // Mobile Ansicht
+                 if(interactiveMapContainer) interactiveMapContainer.style.display = 'none';
+                 if(toggleButton) toggleButton.style.display = 'block';
+            } else { // Desktop Ansicht
+                if(interactiveMapContainer) interactiveMapContainer.style.display = 'block';
+                if(toggleButton) toggleButton.style.display = 'none';
+            }
+        });
+    </script>
+</body>
+</html>
+"""
+
+STAGE_SUMMARY = CompiledTemplate(STAGE_SUMMARY_HTML, static=SECTION_EMOJIS)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+StaticMapRenderer.py - Statische Routenkarte ohne Browser (Schritt 10)
+
+Setzt Basiskarten-Kacheln aus einem lokalen Kachel-Cache ({z}/{x}/{y}.png,
+Web-Mercator/Slippy-Map-Schema) zu einem Bild zusammen und zeichnet Track,
+oberflächengefärbte Route und POI-Symbole vektorisiert darüber
+(eine LineCollection für die Route, ein Scatter je POI-Stil). Fehlende
+Kacheln werden als neutrale Fläche gefüllt; es gibt keinen Netzwerkzugriff.
+Fehlt die passende Zoomstufe im Cache, wird eine benachbarte skaliert.
+"""
+
+import math
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+from PIL import Image
+
+from RouteGeoJSON import SURFACE_COLOR_MAP, normalize_surfaces, surface_runs
+
+TILE_SIZE = 256
+MAX_LATITUDE = 85.0511287798
+DEFAULT_MAX_ZOOM = 16
+MAX_ZOOM_OFFSET = 3  # feinere Cache-Stufe höchstens 8x verkleinern
+TILE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+BACKGROUND_RGB = (242, 239, 233)  # OSM-Landfarbe als Ersatz für fehlende Kacheln
+DEFAULT_ATTRIBUTION = "© OpenStreetMap contributors"
+
+
+def lonlat_to_world_px(lon: Iterable[float], lat: Iterable[float], zoom: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Web-Mercator-Pixelkoordinaten auf Zoomstufe zoom (Ursprung oben links)."""
+    scale = TILE_SIZE * 2 ** zoom
+    lon = np.asarray(lon, dtype=float)
+    lat = np.radians(np.clip(np.asarray(lat, dtype=float), -MAX_LATITUDE, MAX_LATITUDE))
+    x = (lon + 180.0) / 360.0 * scale
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / math.pi) / 2.0 * scale
+    return x, y
+
+
+@dataclass
+class MapView:
+    """Bildausschnitt in Welt-Pixeln einer Zoomstufe"""
+    zoom: int
+    left_px: float
+    top_px: float
+    width: int
+    height: int
+
+    def to_image_px(self, lon: Iterable[float], lat: Iterable[float]) -> Tuple[np.ndarray, np.ndarray]:
+        x, y = lonlat_to_world_px(lon, lat, self.zoom)
+        return x - self.left_px, y - self.top_px
+
+
+def available_zooms(tile_dir: Optional[str]) -> Sequence[int]:
+    """Zoomstufen, für die der Kachel-Cache ein Verzeichnis hat."""
+    if not tile_dir or not os.path.isdir(tile_dir):
+        return []
+    return sorted(int(name) for name in os.listdir(tile_dir)
+                  if name.isdigit() and os.path.isdir(os.path.join(tile_dir, name)))
+
+
+def view_for_track(lon: Iterable[float], lat: Iterable[float], width: int, height: int,
+                   padding_px: int = 40, max_zoom: int = DEFAULT_MAX_ZOOM) -> MapView:
+    """Höchste Zoomstufe, auf der der Track (plus Rand) ins Bild passt, zentriert."""
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    zoom = 0
+    for z in range(max_zoom, -1, -1):
+        x, y = lonlat_to_world_px(lon, lat, z)
+        if np.ptp(x) <= width - 2 * padding_px and np.ptp(y) <= height - 2 * padding_px:
+            zoom = z
+            break
+
+    x, y = lonlat_to_world_px(lon, lat, zoom)
+    centre_x, centre_y = (x.min() + x.max()) / 2, (y.min() + y.max()) / 2
+    return MapView(zoom, centre_x - width / 2, centre_y - height / 2, width, height)
+
+
+def _tile_path(tile_dir: str, zoom: int, x: int, y: int) -> Optional[str]:
+    for extension in TILE_EXTENSIONS:
+        path = os.path.join(tile_dir, str(zoom), str(x), f"{y}{extension}")
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def source_zoom(view_zoom: int, zooms: Sequence[int], max_zoom_offset: int = MAX_ZOOM_OFFSET) -> int:
+    """
+    Zoomstufe, aus der die Kacheln gelesen werden: bevorzugt die passende,
+    sonst die nächstfeinere (wird verkleinert, bis max_zoom_offset Stufen),
+    sonst die nächstgröbere (wird vergrößert). Ohne Cache: view_zoom.
+    """
+    finer = [z for z in zooms if view_zoom <= z <= view_zoom + max_zoom_offset]
+    if finer:
+        return min(finer)
+    coarser = [z for z in zooms if z < view_zoom]
+    return max(coarser) if coarser else view_zoom
+
+
+def compose_basemap(tile_dir: Optional[str], view: MapView) -> Tuple[np.ndarray, Dict[str, int]]:
+    """
+    Basiskarte als RGB-Array (height x width x 3) plus Kachelstatistik.
+    Liegt die Zoomstufe der Ansicht nicht im Cache, wird eine benachbarte
+    Stufe zusammengesetzt und auf die Bildgröße skaliert.
+    """
+    zoom = source_zoom(view.zoom, available_zooms(tile_dir))
+    factor = 2.0 ** (zoom - view.zoom)
+    source = MapView(zoom, view.left_px * factor, view.top_px * factor,
+                     max(int(round(view.width * factor)), 1), max(int(round(view.height * factor)), 1))
+    canvas, stats = _compose_tiles(tile_dir, source)
+    if source.width != view.width or source.height != view.height:
+        resample = Image.LANCZOS if factor > 1 else Image.BILINEAR
+        canvas = canvas.resize((view.width, view.height), resample)
+    stats['tile_zoom'] = zoom
+    return np.asarray(canvas), stats
+
+
+def _compose_tiles(tile_dir: Optional[str], view: MapView) -> Tuple[Image.Image, Dict[str, int]]:
+    canvas = Image.new('RGB', (view.width, view.height), BACKGROUND_RGB)
+    n_tiles = 2 ** view.zoom
+    first_x, first_y = int(view.left_px // TILE_SIZE), int(view.top_px // TILE_SIZE)
+    last_x = int((view.left_px + view.width - 1) // TILE_SIZE)
+    last_y = int((view.top_px + view.height - 1) // TILE_SIZE)
+
+    stats = {'tiles_found': 0, 'tiles_missing': 0}
+    for tile_y in range(first_y, last_y + 1):
+        if not 0 <= tile_y < n_tiles:
+            continue
+        for tile_x in range(first_x, last_x + 1):
+            path = _tile_path(tile_dir, view.zoom, tile_x % n_tiles, tile_y) if tile_dir else None
+            if path is None:
+                stats['tiles_missing'] += 1
+                continue
+            with Image.open(path) as tile:
+                offset = (int(round(tile_x * TILE_SIZE - view.left_px)), int(round(tile_y * TILE_SIZE - view.top_px)))
+                canvas.paste(tile.convert('RGB'), offset)
+            stats['tiles_found'] += 1
+    return canvas, stats
+
+
+def render_static_map(output_png: str, tile_dir: Optional[str],
+                      track_lon: Iterable[float], track_lat: Iterable[float],
+                      width: int = 1200, height: int = 800,
+                      surface_route: Optional[Tuple[Iterable[float], Iterable[float], Iterable]] = None,
+                      surface_colors: Mapping[str, str] = SURFACE_COLOR_MAP,
+                      poi_layers: Sequence[Mapping] = (), max_zoom: int = DEFAULT_MAX_ZOOM,
+                      padding_px: int = 40, attribution: str = DEFAULT_ATTRIBUTION) -> Dict:
+    """
+    Rendert die Karte als PNG mit exakt width x height Pixeln.
+
+    surface_route: (lon, lat, surfaces) der oberflächenkodierten Route (4b).
+    poi_layers: je Stil ein Mapping mit lon, lat, color, marker, size.
+    Returns: Metadaten (Zoom, Kachelstatistik, Anzahl Routenblöcke/POIs).
+    """
+    track_lon = np.asarray(track_lon, dtype=float)
+    track_lat = np.asarray(track_lat, dtype=float)
+    view = view_for_track(track_lon, track_lat, width, height, padding_px, max_zoom)
+    basemap, stats = compose_basemap(tile_dir, view)
+
+    dpi = 100
+    fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.imshow(basemap, extent=(0, width, height, 0), interpolation='nearest', zorder=0)
+
+    x, y = view.to_image_px(track_lon, track_lat)
+    ax.plot(x, y, color='blue', linewidth=2, alpha=0.7, solid_capstyle='round', zorder=1)
+
+    route_blocks = 0
+    if surface_route is not None:
+        route_lon, route_lat, surfaces = surface_route
+        surfaces = normalize_surfaces(surfaces)
+        route_x, route_y = view.to_image_px(route_lon, route_lat)
+        points = np.column_stack((route_x, route_y))
+        starts, ends = surface_runs(surfaces)
+        default_color = surface_colors.get('default', 'red')
+        ax.add_collection(LineCollection(
+            [points[start:end + 1] for start, end in zip(starts, ends)],
+            colors=[surface_colors.get(surfaces[start], default_color) for start in starts],
+            linewidths=3.5, alpha=0.9, capstyle='round', joinstyle='round', zorder=2
+        ))
+        route_blocks = len(starts)
+
+    poi_count = 0
+    for layer in poi_layers:
+        poi_x, poi_y = view.to_image_px(layer['lon'], layer['lat'])
+        ax.scatter(poi_x, poi_y, c=layer.get('color', 'gray'), marker=layer.get('marker', 'o'),
+                   s=layer.get('size', 40), edgecolors='white', linewidths=0.8, zorder=3)
+        poi_count += len(poi_x)
+
+    if attribution:
+        ax.text(width - 4, height - 4, attribution, ha='right', va='bottom', fontsize=7,
+                bbox=dict(boxstyle='square,pad=0.2', fc='white', ec='none', alpha=0.7), zorder=4)
+
+    ax.set_xlim(0, width)
+    ax.set_ylim(height, 0)
+    ax.axis('off')
+    output_dir = os.path.dirname(output_png)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    fig.savefig(output_png, dpi=dpi)
+
+    stats.update({'zoom': view.zoom, 'route_blocks': route_blocks, 'pois_drawn': poi_count})
+    return stats
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+TrackRunner.py - Alle Schritte eines Tracks in vorgewärmten Worker-Prozessen (stage_worker)
+
+Ohne Worker startet jede Snakemake-Regel einen eigenen Python-Prozess, der
+pandas/numpy/scipy/matplotlib/geopy importiert und die CSV seines
+Vorgängers neu parst. Bei kleinen Tracks ist das der Großteil der Laufzeit.
+Der Stage-Worker erweitert den Plot-Worker (PlotRenderWorker.py, gleiches
+Spool-Protokoll, gleicher runpy-Job) auf alle Schritte:
+
+- Jeder Track bekommt einen festen Worker-Prozess; seine Schritte laufen
+  nacheinander darin, Importe sind nach dem ersten Schritt warm.
+- pandas.read_csv ist im Worker gecacht: liest ein späterer Schritt eine
+  unveränderte Datei (gleicher Pfad, Größe, mtime, gleiche Argumente),
+  bekommt er eine Kopie des bereits geparsten DataFrames. Die Dateien
+  bleiben Checkpoints (Snakemake, Fortsetzen nach Abbruch).
+- Die Skripte bleiben unverändert und über ihre CLI aufrufbar.
+
+Modi:
+- serve:  Worker starten (Snakefile onstart bei stage_worker.enabled)
+- submit: Schritt einreichen und warten (Snakefile: {params.runner}); ohne Worker lokal
+- stop:   Worker nach laufenden Jobs beenden
+- run:    Worker im eigenen Prozess starten, Snakemake für die gewählten Tracks
+          dagegen laufen lassen, danach beenden:
+            python scripts/TrackRunner.py run --tracks day1 day2 --workers 2 -- --cores 4
+
+Snakemake bleibt der Orchestrator (DAG, Zeitstempel, Logs); nur die
+Ausführung der Schritte wandert in den Worker.
+"""
+
+import argparse
+import functools
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional
+
+import PlotRenderWorker
+from PlotRenderWorker import make_job, request_stop, submit, worker_alive
+
+DEFAULT_SPOOL_DIR = ".stage_worker"
+DEFAULT_WORKERS = 2
+DEFAULT_FRAME_CACHE_MB = 512
+FRAME_CACHE_ENV = "GPX_FRAME_CACHE_MB"
+SPOOL_ENV = "GPX_STAGE_WORKER_SPOOL"   # liest das Snakefile: Worker läuft bereits (Modus run)
+TRACKS_ENV = "GPX_TRACKS"              # liest das Snakefile: nur diese Tracks (Komma-Liste)
+WORKER_START_TIMEOUT_S = 120.0
+
+# Zusätzlich zum Plot-Warm-up (pandas, scipy, matplotlib); fehlende Pakete werden übersprungen
+WARM_MODULES = ('geopy.distance', 'geographiclib.geodesic', 'requests', 'yaml', 'folium', 'plotly.graph_objects')
+
+
+# === CSV-CACHE ===
+
+class FrameCache:
+    """
+    Geparste read_csv-Ergebnisse je (Datei, Größe, mtime, Argumente), LRU bis max_bytes.
+    Treffer liefern eine Kopie, damit Änderungen eines Schritts den Cache nicht verfälschen.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.frames: "OrderedDict[tuple, object]" = OrderedDict()
+        self.sizes: Dict[tuple, int] = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(source, args: tuple, kwargs: Dict) -> Optional[tuple]:
+        """Cache-Schlüssel oder None (Puffer, Chunks, Callables - dann immer direkt lesen)."""
+        if args or not isinstance(source, (str, os.PathLike)) or kwargs.get('chunksize') or kwargs.get('iterator'):
+            return None
+        options = repr(sorted(kwargs.items()))
+        if ' at 0x' in options:
+            return None
+        try:
+            stat = os.stat(source)
+        except OSError:
+            return None
+        return os.path.abspath(source), stat.st_size, stat.st_mtime_ns, options
+
+    def read_csv(self, reader: Callable, source, *args, **kwargs):
+        key = self.key(source, args, kwargs)
+        if key is None:
+            return reader(source, *args, **kwargs)
+        if key in self.frames:
+            self.frames.move_to_end(key)
+            self.hits += 1
+            return self.frames[key].copy()
+        self.misses += 1
+        frame = reader(source, *args, **kwargs)
+        self._store(key, frame)
+        return frame
+
+    def _store(self, key: tuple, frame) -> None:
+        if not hasattr(frame, 'memory_usage'):
+            return
+        size = int(frame.memory_usage(index=True, deep=True).sum())
+        if size > self.max_bytes:
+            return
+        self.frames[key] = frame.copy()
+        self.sizes[key] = size
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes:
+            old_key, _ = self.frames.popitem(last=False)
+            self.total_bytes -= self.sizes.pop(old_key)
+
+
+_FRAME_CACHE: Optional[FrameCache] = None
+
+
+def install_frame_cache(max_mb: Optional[float] = None) -> Optional[FrameCache]:
+    """pandas.read_csv in diesem Prozess durch die gecachte Variante ersetzen (0 MB = aus)."""
+    global _FRAME_CACHE
+    if max_mb is None:
+        max_mb = float(os.environ.get(FRAME_CACHE_ENV) or DEFAULT_FRAME_CACHE_MB)
+    if max_mb <= 0 or _FRAME_CACHE is not None:
+        return _FRAME_CACHE
+    import pandas
+    cache = FrameCache(int(max_mb * 1024 ** 2))
+    original = pandas.read_csv
+
+    @functools.wraps(original)
+    def read_csv(filepath_or_buffer, *args, **kwargs):
+        return cache.read_csv(original, filepath_or_buffer, *args, **kwargs)
+
+    pandas.read_csv = read_csv
+    _FRAME_CACHE = cache
+    return cache
+
+
+# === WORKER ===
+
+def warm_up() -> None:
+    """Initializer der Track-Prozesse: Plot-Warm-up, weitere Schritt-Module, CSV-Cache."""
+    PlotRenderWorker.warm_up()
+    for module in WARM_MODULES:
+        try:
+            __import__(module)
+        except Exception:
+            pass
+    try:
+        install_frame_cache()
+    except Exception as e:
+        print(f"[StageWorker] CSV cache disabled: {e}", file=sys.stderr)
+
+
+class TrackPool:
+    """
+    Executor mit einem Prozess je Worker; jeder Track bleibt bei seinem Prozess
+    (neue Tracks gehen an den Prozess mit den wenigsten Tracks), damit seine
+    Schritte den CSV-Cache teilen. Abgestürzte Prozesse werden ersetzt.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, initializer: Optional[Callable] = warm_up):
+        self.initializer = initializer
+        self.pools = [self._new_pool() for _ in range(max(1, workers))]
+        self.assigned: Dict[str, int] = {}
+        self._next = 0
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=1, initializer=self.initializer)
+
+    def index_for(self, track: Optional[str]) -> int:
+        if not track:
+            self._next = (self._next + 1) % len(self.pools)
+            return self._next
+        if track not in self.assigned:
+            load = [0] * len(self.pools)
+            for index in self.assigned.values():
+                load[index] += 1
+            self.assigned[track] = load.index(min(load))
+        return self.assigned[track]
+
+    def submit(self, fn: Callable, *args):
+        job = args[0] if args and isinstance(args[0], dict) else {}
+        index = self.index_for(job.get('track'))
+        try:
+            return self.pools[index].submit(fn, *args)
+        except BrokenProcessPool:
+            self.pools[index] = self._new_pool()
+            return self.pools[index].submit(fn, *args)
+
+    def map(self, fn: Callable, iterable):
+        futures = [self.submit(fn, item) for item in iterable]
+        return (future.result() for future in futures)
+
+    def shutdown(self, wait: bool = True) -> None:
+        for pool in self.pools:
+            pool.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        return False
+
+
+def serve(spool_dir: str = DEFAULT_SPOOL_DIR, workers: int = DEFAULT_WORKERS,
+          idle_timeout_s: Optional[float] = PlotRenderWorker.IDLE_TIMEOUT_S) -> None:
+    PlotRenderWorker.serve(spool_dir, workers, idle_timeout_s, pool=TrackPool(workers))
+
+
+def run_pipeline(snakemake_args: List[str], tracks: Optional[List[str]] = None, workers: int = DEFAULT_WORKERS,
+                 spool_dir: Optional[str] = None) -> int:
+    """Worker in diesem Prozess starten, Snakemake dagegen laufen lassen. Returns: Exit-Code von Snakemake."""
+    temporary_spool = spool_dir is None
+    spool_dir = spool_dir or tempfile.mkdtemp(prefix="stage_worker_")
+    server = threading.Thread(target=serve, args=(spool_dir, workers, None), daemon=True)
+    server.start()
+    deadline = time.time() + WORKER_START_TIMEOUT_S
+    while not worker_alive(spool_dir) and server.is_alive() and time.time() < deadline:
+        time.sleep(PlotRenderWorker.POLL_INTERVAL_S)
+    if not worker_alive(spool_dir):
+        print("[StageWorker] Worker not ready, steps run in separate processes", file=sys.stderr)
+
+    env = dict(os.environ, **{SPOOL_ENV: os.path.abspath(spool_dir)})
+    if tracks:
+        env[TRACKS_ENV] = ",".join(tracks)
+    try:
+        return subprocess.run([sys.executable, "-m", "snakemake", *snakemake_args], env=env).returncode
+    finally:
+        request_stop(spool_dir)
+        server.join()
+        if temporary_spool:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+
+
+# === CLI ===
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run all pipeline stages of a track in warm worker processes.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_serve = sub.add_parser('serve', help="Run the stage worker (blocks).")
+    p_serve.add_argument('--spool', default=DEFAULT_SPOOL_DIR)
+    p_serve.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    p_serve.add_argument('--idle-timeout', type=float, default=PlotRenderWorker.IDLE_TIMEOUT_S)
+
+    p_submit = sub.add_parser('submit', help="Run one stage script on the worker and wait for it.")
+    p_submit.add_argument('--spool', default=DEFAULT_SPOOL_DIR)
+    p_submit.add_argument('--track', default=None, help="Track basename (selects the worker process).")
+    p_submit.add_argument('script')
+    p_submit.add_argument('script_args', nargs=argparse.REMAINDER)
+
+    p_stop = sub.add_parser('stop', help="Stop a running stage worker after pending jobs.")
+    p_stop.add_argument('--spool', default=DEFAULT_SPOOL_DIR)
+
+    p_run = sub.add_parser('run', help="Run Snakemake for the given tracks against an in-process worker.")
+    p_run.add_argument('--tracks', nargs='+', default=None, help="Track basenames (default: all in data/).")
+    p_run.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    p_run.add_argument('--spool', default=None, help="Spool directory (default: temporary).")
+    p_run.add_argument('snakemake_args', nargs=argparse.REMAINDER, help="Arguments for snakemake after '--'.")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        serve(args.spool, args.workers, args.idle_timeout)
+        return 0
+    if args.command == 'stop':
+        request_stop(args.spool)
+        return 0
+    if args.command == 'submit':
+        script_args = args.script_args[1:] if args.script_args[:1] == ['--'] else args.script_args
+        result = submit(make_job(args.script, script_args, track=args.track), args.spool)
+        sys.stdout.write(result.get('output', ''))
+        return int(result['returncode'])
+
+    snakemake_args = args.snakemake_args[1:] if args.snakemake_args[:1] == ['--'] else args.snakemake_args
+    return run_pipeline(snakemake_args or ['--cores', str(max(1, args.workers))], args.tracks, args.workers,
+                        args.spool)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
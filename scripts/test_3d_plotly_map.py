@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_3d_plotly_map.py - Testet Detailstufe und Vertex-Farben der 3D-Karte (Schritt 06b).
+"""
+
+import importlib.util
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture(scope="module")
+def map3d():
+    spec = importlib.util.spec_from_file_location(
+        "generate_3d_plotly_map", os.path.join(SCRIPTS_DIR, "06b_generate_3d_plotly_map.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_track(n, block_len):
+    t = np.linspace(0, 1, n)
+    surfaces = np.array(["asphalt", "gravel", "compacted"])
+    return pd.DataFrame({
+        'Latitude': 47.0 + 0.5 * t,
+        'Longitude': 11.0 + 0.3 * np.sin(6 * t),
+        'Elevation (m)': 600 + 900 * np.sin(9 * t) ** 2,
+        'Surface': surfaces[(np.arange(n) // block_len) % len(surfaces)],
+    })
+
+
+def test_track_distance_km(map3d):
+    # 1° Breite entlang eines Meridians ~ 111,19 km
+    dist = map3d.track_distance_km([47.0, 47.5, 48.0], [11.0, 11.0, 11.0])
+    assert dist[0] == 0.0
+    assert dist[-1] == pytest.approx(111.19, abs=0.01)
+    assert np.all(np.diff(dist) > 0)
+
+
+def test_lod_keeps_budget_endpoints_and_surface_changes(map3d):
+    df = make_track(50_000, block_len=2_500)
+    lod = map3d.build_lod_track(df, 2_000)
+    assert len(lod) <= 2_000
+    assert lod.index[0] == 0 and lod.index[-1] == len(df) - 1
+    assert lod.index.is_monotonic_increasing
+    block_starts = set(range(0, len(df), 2_500))
+    assert block_starts.issubset(set(lod.index))
+
+
+def test_lod_respects_budget_when_surface_changes_exceed_it(map3d):
+    df = make_track(20_000, block_len=5)  # 4000 Wechsel > 1000 Vertices
+    lod = map3d.build_lod_track(df, 1_000)
+    assert len(lod) <= 1_000
+    assert lod.index[0] == 0 and lod.index[-1] == len(df) - 1
+
+
+def test_short_track_is_returned_unchanged(map3d):
+    df = make_track(100, block_len=10)
+    assert map3d.build_lod_track(df, 1_000) is df
+
+
+def test_surface_vertex_arrays_duplicates_block_starts(map3d):
+    surfaces = ["asphalt", "asphalt", "gravel", "gravel", "gravel", "asphalt"]
+    df = pd.DataFrame({'Surface': surfaces})
+    order = ["asphalt", "gravel"]
+    vertex_idx, vertex_codes = map3d.surface_vertex_arrays(df, order)
+
+    # Ein Farbcode je Vertex
+    assert len(vertex_idx) == len(vertex_codes) == len(surfaces) + 2
+    assert vertex_idx.tolist() == [0, 1, 2, 2, 3, 4, 5, 5]
+    assert vertex_codes.tolist() == [0, 0, 0, 1, 1, 1, 1, 0]
+    # Abseits der Blockgrenzen passt der Code zur Oberfläche des Punkts
+    for pos, (idx, code) in enumerate(zip(vertex_idx, vertex_codes)):
+        if pos + 1 < len(vertex_idx) and vertex_idx[pos + 1] == idx:
+            continue  # erste Kopie trägt die alte Farbe
+        assert order[code] == surfaces[idx]
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_api_rate_broker.py - Testet den prozessübergreifenden API-Takt gegen einen lokalen Stub-Server.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ApiRateBroker import api_request, claim, release_claim, throttled
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+STUB_INTERVAL_S = 0.15
+
+CLIENT = """
+import sys, urllib.request
+from ApiRateBroker import api_request
+for _ in range(int(sys.argv[2])):
+    with api_request("stub"):
+        urllib.request.urlopen(sys.argv[1]).read()
+"""
+
+
+class RateLimitedStub(ThreadingHTTPServer):
+    """Antwortet mit 429, wenn Anfragen zu dicht folgen oder mehr als max_concurrent gleichzeitig laufen."""
+
+    def __init__(self, min_interval_s, max_concurrent):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.min_interval_s = min_interval_s
+        self.max_concurrent = max_concurrent
+        self.lock = threading.Lock()
+        self.arrivals = []
+        self.rejected = 0
+        self.running = 0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            now = time.time()
+            too_fast = bool(server.arrivals) and now - server.arrivals[-1] < server.min_interval_s * 0.9
+            too_many = server.running >= server.max_concurrent
+            server.arrivals.append(now)
+            server.rejected += bool(too_fast or too_many)
+            server.running += 1
+        time.sleep(0.03)
+        with server.lock:
+            server.running -= 1
+        self.send_response(429 if too_fast or too_many else 200)
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def broker_env(tmp_path, monkeypatch):
+    services = {"stub": {"min_interval_s": STUB_INTERVAL_S, "max_concurrent": 1}}
+    monkeypatch.setenv("GPX_API_BROKER", str(tmp_path / "broker.db"))
+    monkeypatch.setenv("GPX_API_BROKER_SERVICES", json.dumps(services))
+    return services
+
+
+def test_parallel_jobs_share_one_rate_limit(broker_env):
+    stub = RateLimitedStub(STUB_INTERVAL_S, max_concurrent=1)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{stub.server_address[1]}/"
+    env = dict(os.environ, PYTHONPATH=SCRIPTS_DIR)
+    try:
+        clients = [subprocess.Popen([sys.executable, "-c", CLIENT, url, "5"], env=env) for _ in range(3)]
+        assert [client.wait(timeout=60) for client in clients] == [0, 0, 0]
+    finally:
+        stub.shutdown()
+        stub.server_close()
+
+    assert len(stub.arrivals) == 15 and stub.rejected == 0
+    # Kein Leerlauf: die Anfragen folgen im Takt des Limits aufeinander
+    assert stub.arrivals[-1] - stub.arrivals[0] < 14 * STUB_INTERVAL_S + 0.5
+
+
+def test_waiting_jobs_are_served_in_turn(broker_env):
+    granted = []
+
+    def job(name, count):
+        for _ in range(count):
+            with api_request("stub"):
+                granted.append(name)
+
+    threads = [threading.Thread(target=job, args=("long", 6)), threading.Thread(target=job, args=("short", 3))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(granted) == ["long"] * 6 + ["short"] * 3
+    # Der kurze Job wartet nicht, bis der lange fertig ist
+    assert max(i for i, name in enumerate(granted) if name == "short") <= 6
+
+
+def test_throttled_pauses_every_caller(broker_env):
+    throttled("stub", 0.4)
+    start = time.time()
+    with api_request("stub") as waited:
+        pass
+    assert time.time() - start >= 0.35 and waited >= 0.35
+
+
+def test_claim_across_processes_reports_finished_request(broker_env):
+    holder = subprocess.Popen(
+        [sys.executable, "-c", "import time\nfrom ApiRateBroker import claim, release_claim\n"
+                               "assert claim('stub', 'geocode:Innsbruck')\nprint('claimed', flush=True)\n"
+                               "time.sleep(0.4)\nrelease_claim('stub', 'geocode:Innsbruck')\n"],
+        env=dict(os.environ, PYTHONPATH=SCRIPTS_DIR), stdout=subprocess.PIPE, text=True)
+    assert holder.stdout.readline().strip() == "claimed"
+    start = time.time()
+    assert claim("stub", "geocode:Innsbruck") is False  # Ergebnis liegt jetzt im Cache des anderen Jobs
+    assert time.time() - start >= 0.2
+    assert holder.wait(timeout=30) == 0
+    assert claim("stub", "geocode:Innsbruck") is True
+    release_claim("stub", "geocode:Innsbruck")
+
+
+def test_disabled_broker_paces_within_process(monkeypatch):
+    monkeypatch.setenv("GPX_API_BROKER", "")
+    monkeypatch.setenv("GPX_API_BROKER_SERVICES", json.dumps({"local_stub": {"min_interval_s": 0.2}}))
+    start = time.time()
+    for _ in range(3):
+        with api_request("local_stub"):
+            pass
+    assert time.time() - start >= 0.35
+    assert claim("local_stub", "any") is True
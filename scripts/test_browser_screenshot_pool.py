@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_browser_screenshot_pool.py - Testet Verteilung und Readiness-Warten des Browser-Pools (Schritt 10).
+
+FakeDriver bildet nur die genutzte WebDriver-Schnittstelle nach; Selenium wird nicht benötigt.
+"""
+
+import threading
+
+from BrowserScreenshotPool import READY_SCRIPT, ScreenshotJob, ScreenshotPool, wait_until_ready
+
+
+class FakeDriver:
+    created = 0
+    lock = threading.Lock()
+
+    def __init__(self, ready_after_polls=2):
+        with FakeDriver.lock:
+            FakeDriver.created += 1
+        self.ready_after_polls = ready_after_polls
+        self.polls = 0
+        self.pages = []
+        self.quit_called = False
+
+    def set_window_size(self, width, height):
+        self.size = (width, height)
+
+    def get(self, url):
+        self.pages.append(url)
+        self.polls = 0
+
+    def execute_script(self, script):
+        assert script == READY_SCRIPT
+        self.polls += 1
+        return self.polls > self.ready_after_polls
+
+    def save_screenshot(self, path):
+        with open(path, 'wb') as f:
+            f.write(b'png')
+        return True
+
+    def quit(self):
+        self.quit_called = True
+
+
+def test_wait_returns_on_ready_signal_before_max_wait():
+    ready, waited = wait_until_ready(FakeDriver(ready_after_polls=2), max_wait_s=5, poll_s=0.01, settle_s=0)
+    assert ready and waited < 1
+
+
+def test_wait_falls_back_to_max_wait():
+    ready, waited = wait_until_ready(FakeDriver(ready_after_polls=10 ** 6), max_wait_s=0.1, poll_s=0.01, settle_s=0)
+    assert not ready and 0.1 <= waited < 1
+
+
+def test_pool_reuses_warm_browsers_for_all_jobs(tmp_path):
+    FakeDriver.created = 0
+    jobs = []
+    for i in range(5):
+        html = tmp_path / f"map_{i}.html"
+        html.write_text("<html></html>")
+        jobs.append(ScreenshotJob(str(html), str(tmp_path / "png" / f"map_{i}.png"), 300, 200))
+
+    with ScreenshotPool(FakeDriver, size=2) as pool:
+        drivers = list(pool.drivers)
+        results = pool.capture_all(jobs, max_wait_s=2)
+
+    assert FakeDriver.created == 2
+    assert [r.job for r in results] == jobs
+    assert all(r.success and r.ready_signal for r in results)
+    assert all((tmp_path / "png" / f"map_{i}.png").exists() for i in range(5))
+    assert sum(len([p for p in d.pages if p.startswith('file://')]) for d in drivers) == 5
+    assert all(d.quit_called for d in drivers)
+
+
+def test_pool_reports_failed_capture_without_stopping(tmp_path):
+    class BrokenDriver(FakeDriver):
+        def save_screenshot(self, path):
+            raise RuntimeError("renderer crashed")
+
+    with ScreenshotPool(BrokenDriver, size=1) as pool:
+        results = pool.capture_all([ScreenshotJob(str(tmp_path / "a.html"), str(tmp_path / "a.png")),
+                                    ScreenshotJob(str(tmp_path / "b.html"), str(tmp_path / "b.png"))], max_wait_s=1)
+    assert [r.success for r in results] == [False, False]
+    assert results[0].error == "renderer crashed"
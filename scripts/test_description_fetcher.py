@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_description_fetcher.py - Testet den nebenläufigen Wiki-/LLM-Abruf (Schritt 9)
+gegen einen lokalen Wikipedia-Stub-Server und ein Fake-LLM.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+import pytest
+
+from AsyncDescriptionFetcher import (
+    AsyncDescriptionFetcher, TokenBucket, parse_batch_response, plan_batches
+)
+from SQLiteDescriptionCache import SQLiteDescriptionCache
+
+WIKI_PAGES = {
+    "Siena": "Siena ist eine Stadt in der Toskana.",
+    "Pienza": "Pienza liegt im Val d'Orcia.",
+}
+
+
+class _WikiStub(BaseHTTPRequestHandler):
+    requests_seen = []
+    fail_first = set()
+
+    def do_GET(self):
+        title = unquote(self.path.rsplit("/", 1)[-1])
+        type(self).requests_seen.append(title)
+        if title in type(self).fail_first:
+            type(self).fail_first.discard(title)
+            self.send_response(429)
+            self.end_headers()
+            return
+        if title not in WIKI_PAGES:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = json.dumps({"extract": WIKI_PAGES[title]}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def wiki_server():
+    _WikiStub.requests_seen = []
+    _WikiStub.fail_first = set()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _WikiStub)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/{{lang}}/summary/{{title}}"
+    server.shutdown()
+
+
+def _build_prompt(wiki, place):
+    return f"{place}|{wiki or '-'}"
+
+
+def _make_fetcher(cache, wiki_api, llm_calls, **kwargs):
+    def fake_llm(prompt):
+        llm_calls.append(prompt)
+        time.sleep(0.05)
+        return f"Beschreibung: {prompt}"
+
+    return AsyncDescriptionFetcher(
+        generate_fn=fake_llm, build_prompt_fn=_build_prompt, cache=cache, lang="de",
+        max_wiki_chars=10, model_name="fake", wiki_api=wiki_api,
+        concurrency=4, wiki_rate=100.0, llm_rate=100.0, backoff_base=0.01, **kwargs
+    )
+
+
+def test_fetch_in_order_and_rerun_from_cache(tmp_path, wiki_server):
+    cache = SQLiteDescriptionCache(str(tmp_path / "description_cache.db"))
+    llm_calls = []
+    places = ["Siena", "Pienza", "Nirgendwo"]
+
+    results = _make_fetcher(cache, wiki_server, llm_calls).run(places)
+    assert [r.place for r in results] == places
+    assert all(r.success and not r.from_cache for r in results)
+    # Wiki-Auszug wird auf max_wiki_chars gekürzt, 404 -> kein Auszug
+    assert results[0].wiki_extract == WIKI_PAGES["Siena"][:10]
+    assert results[2].wiki_extract is None
+    assert len(llm_calls) == 3
+
+    # Rerun: weder Wikipedia noch LLM werden erneut angefragt
+    seen_before = len(_WikiStub.requests_seen)
+    metadata = {}
+    rerun = _make_fetcher(cache, wiki_server, llm_calls, api_metadata=metadata).run(places)
+    assert [r.markdown for r in rerun] == [r.markdown for r in results]
+    assert all(r.from_cache for r in rerun)
+    assert len(_WikiStub.requests_seen) == seen_before
+    assert len(llm_calls) == 3
+    assert metadata["ai_cache_hits"] == 3 and metadata["wikipedia_cache_hits"] == 3
+    cache.close()
+
+
+def test_backoff_on_rate_limit_and_failed_llm(tmp_path, wiki_server):
+    cache = SQLiteDescriptionCache(str(tmp_path / "description_cache.db"))
+    _WikiStub.fail_first = {"Siena"}
+
+    fetcher = AsyncDescriptionFetcher(
+        generate_fn=lambda prompt: None, build_prompt_fn=_build_prompt, cache=cache,
+        lang="de", wiki_api=wiki_server, wiki_rate=100.0, llm_rate=100.0,
+        max_retries=2, backoff_base=0.01
+    )
+    result, = fetcher.run(["Siena"])
+    assert _WikiStub.requests_seen.count("Siena") == 2
+    assert result.wiki_extract == WIKI_PAGES["Siena"]
+    assert not result.success
+    assert fetcher.api_metadata["failed_ai_requests"] == 1
+    # Fehlgeschlagene LLM-Antworten werden nicht gecacht
+    assert cache.get_cache_statistics()["total_llm_entries"] == 0
+    cache.close()
+
+
+def test_token_bucket_limits_rate():
+    import asyncio
+
+    async def take(bucket, n):
+        for _ in range(n):
+            await bucket.acquire()
+
+    bucket = TokenBucket(rate=20.0, capacity=1)
+    start = time.monotonic()
+    asyncio.run(take(bucket, 5))
+    # Erstes Token sofort, danach 4 x 50 ms
+    assert time.monotonic() - start >= 0.18
+
+
+def test_plan_batches_respects_size_and_budget():
+    assert plan_batches([100] * 5, max_batch_size=2, char_budget=10_000) == [[0, 1], [2, 3], [4]]
+    # Lange Auszüge füllen das Budget früher, ein Ort über Budget bleibt allein
+    assert plan_batches([700, 700, 200, 2000, 100], max_batch_size=8, char_budget=1600) == [[0, 1, 2], [3], [4]]
+    assert plan_batches([], max_batch_size=4, char_budget=100) == []
+
+
+def test_parse_batch_response():
+    text = '```json\n{"1": "Siena!", "2": "", "3": 5, "9": "fremd"}\n```'
+    assert parse_batch_response(text, ["1", "2", "3"]) == {"1": "Siena!"}
+    assert parse_batch_response("kein JSON", ["1"]) == {}
+    assert parse_batch_response('["1"]', ["1"]) == {}
+
+
+def test_batched_run_with_individual_fallback(tmp_path, wiki_server):
+    cache = SQLiteDescriptionCache(str(tmp_path / "description_cache.db"))
+    prompts = []
+
+    def fake_llm(prompt):
+        prompts.append(prompt)
+        if prompt.startswith("BATCH"):
+            # Modell lässt den zweiten Ort aus
+            return json.dumps({"1": "Batch-Text 1", "3": "Batch-Text 3"})
+        return f"Einzel: {prompt}"
+
+    def build_batch(items):
+        return "BATCH " + ";".join(f"{place_id}={place}" for place_id, place, _ in items)
+
+    fetcher = AsyncDescriptionFetcher(
+        generate_fn=fake_llm, build_prompt_fn=_build_prompt, cache=cache, lang="de",
+        wiki_api=wiki_server, wiki_rate=100.0, llm_rate=100.0, backoff_base=0.01,
+        build_batch_prompt_fn=build_batch, batch_size=3, batch_char_budget=10_000
+    )
+    results = fetcher.run(["Siena", "Pienza", "Nirgendwo"])
+    assert [r.markdown for r in results] == [
+        "Batch-Text 1", "Einzel: " + _build_prompt(WIKI_PAGES["Pienza"], "Pienza"), "Batch-Text 3"
+    ]
+    assert all(r.success for r in results)
+    assert len(prompts) == 2
+    assert fetcher.api_metadata["batch_fallback_places"] == 1
+
+    # Batch-Ergebnisse landen unter dem Einzel-Prompt im Cache
+    single = AsyncDescriptionFetcher(
+        generate_fn=fake_llm, build_prompt_fn=_build_prompt, cache=cache, lang="de",
+        wiki_api=wiki_server, wiki_rate=100.0, llm_rate=100.0
+    )
+    rerun = single.run(["Siena", "Pienza", "Nirgendwo"])
+    assert all(r.from_cache for r in rerun)
+    assert len(prompts) == 2
+    cache.close()
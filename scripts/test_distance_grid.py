@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_distance_grid.py - Testet das einheitliche Distanzraster für Steigungen.
+"""
+
+import numpy as np
+
+from DistanceGrid import gradient_via_grid, resample_to_grid
+
+
+def test_grid_spacing_and_end_point():
+    distance = np.array([0.0, 3.0, 3.0, 27.0, 41.5, 55.0])
+    grid = resample_to_grid(distance, {'Elevation (m)': distance * 0.05}, spacing_m=10.0)
+    assert np.allclose(grid.distance_m, [0, 10, 20, 30, 40, 50, 55])
+    assert np.allclose(grid.segment_length_m, [0, 10, 10, 10, 10, 10, 5])
+    assert np.allclose(grid.gradient(), 0.05)
+    assert len(grid.cell_of_source()) == len(distance)
+
+
+def test_gradient_via_grid_removes_gps_spikes():
+    rng = np.random.default_rng(5)
+    steps = rng.uniform(0.0, 8.0, 5000)  # 1-Hz-GPS mit Stillstand und Jitter
+    distance = np.cumsum(steps)
+    elevation = distance * 0.06 + rng.normal(0, 0.3, len(distance))
+
+    point_to_point = np.diff(elevation) / np.where(np.diff(distance) > 0, np.diff(distance), np.nan)
+    gridded = gradient_via_grid(distance, elevation, spacing_m=10.0)
+
+    assert len(gridded) == len(distance)
+    assert np.nanstd(point_to_point) > 5 * np.std(gridded)
+    assert abs(np.median(gridded) - 0.06) < 0.01
+
+
+def test_labels_follow_nearest_source_point():
+    distance = np.array([0.0, 4.0, 16.0, 30.0])
+    grid = resample_to_grid(distance, spacing_m=10.0)
+    labels = grid.take_labels(['asphalt', 'asphalt', 'gravel', 'gravel'])
+    assert list(labels) == ['asphalt', 'asphalt', 'gravel', 'gravel']
+    assert np.allclose(grid.to_source(grid.distance_m), distance)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_label_placement.py - Testet die Sweep-Line-Platzierung der Profil-Labels (Schritt 3).
+"""
+
+import numpy as np
+
+from LabelPlacement import place_labels, text_box_points
+
+
+def _boxes_overlap(layout, width, height):
+    placed = np.flatnonzero(layout.placed)
+    for a_pos, a in enumerate(placed):
+        for b in placed[a_pos + 1:]:
+            x_overlap = abs(layout.x[a] - layout.x[b]) < (width[a] + width[b]) / 2
+            y_overlap = abs(layout.y[a] - layout.y[b]) < height
+            if x_overlap and y_overlap:
+                return True
+    return False
+
+
+def test_separate_labels_stay_on_first_tier():
+    layout = place_labels([0, 10, 20], [2, 2, 2], [100, 200, 300], tier_height=5, base_offset=1)
+    assert layout.tier.tolist() == [0, 0, 0]
+    assert layout.y.tolist() == [101, 201, 301]
+    assert layout.hidden_count == 0
+
+
+def test_overlapping_labels_stack_and_overflow_is_hidden():
+    layout = place_labels([5, 5.5, 6, 6.5], [2, 2, 2, 2], [0, 0, 0, 0], tier_height=5, max_tiers=3)
+    assert layout.tier.tolist() == [0, 1, 2, -1]
+    assert np.isnan(layout.y[3]) and layout.hidden_count == 1
+    assert layout.top == 10
+
+
+def test_different_anchor_heights_do_not_collide():
+    # Gleiches x, aber Anker 50 m auseinander: beide bleiben auf Ebene 0
+    layout = place_labels([5, 5], [2, 2], [0, 50], tier_height=5)
+    assert layout.tier.tolist() == [0, 0]
+
+
+def test_labels_are_pushed_inside_x_limits():
+    layout = place_labels([0.2, 9.9], [2, 2], [0, 0], tier_height=5, x_min=0, x_max=10)
+    assert layout.x.tolist() == [1.0, 9.0]
+
+
+def test_many_labels_without_overlap():
+    rng = np.random.default_rng(1)
+    n = 500
+    x = np.sort(rng.uniform(0, 150, n))
+    names = [f"Ort {i}" for i in range(n)]
+    widths_pt, height_pt = text_box_points(names, 7)
+    width = widths_pt * 0.02
+    anchor = 500 + 300 * np.sin(x / 150 * 2 * np.pi)
+
+    layout = place_labels(x, width, anchor, tier_height=height_pt, max_tiers=4, x_min=0, x_max=150)
+    assert layout.placed.sum() > 100
+    assert layout.placed.sum() + layout.hidden_count == n
+    assert not _boxes_overlap(layout, width, height_pt)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_pause_detection.py - Testet die gemeinsame Pausenerkennung der Schritte 3 und 3b.
+"""
+
+import numpy as np
+import pandas as pd
+
+from PauseDetection import (
+    PAUSE_TYPE_GAP, PAUSE_TYPE_SPEED, elapsed_seconds, run_bounds, speed_pauses, time_gap_pauses
+)
+
+
+def test_run_bounds_including_edges():
+    starts, ends = run_bounds([True, True, False, True, False, False, True])
+    assert starts.tolist() == [0, 3, 6]
+    assert ends.tolist() == [1, 3, 6]
+
+
+def test_speed_pauses_use_time_or_fallback_interval():
+    speed = np.array([20, 1, 1, 1, 1, 20, 0, 0, 20, 1, 1, 1], dtype=float)
+    distance = np.arange(len(speed)) / 10
+    elapsed = np.arange(len(speed)) * 10.0
+    elapsed[10] = np.nan  # unvollständige Zeit im letzten Block -> geschätzte Dauer
+
+    pauses = speed_pauses(speed, distance, elapsed, min_points=3, min_duration_s=10, fallback_interval_s=5)
+    assert pauses.start_idx.tolist() == [1, 9]
+    assert pauses.end_idx.tolist() == [4, 11]
+    assert pauses.duration_s.tolist() == [30.0, 15.0]
+    assert set(pauses.pause_type) == {PAUSE_TYPE_SPEED}
+
+
+def test_time_gaps_with_median_and_distance_filter():
+    times = pd.Series(pd.date_range('2025-06-01 08:00', periods=6, freq='1s'))
+    times.iloc[3:] += pd.Timedelta(seconds=300)
+    times.iloc[5:] += pd.Timedelta(seconds=90)
+    elapsed = elapsed_seconds(times)
+    distance = np.array([0.0, 0.01, 0.02, 0.5, 0.51, 0.5101])
+
+    gaps = time_gap_pauses(elapsed, distance, min_gap_s=60, median_multiplier=5)
+    assert gaps.start_idx.tolist() == [2, 4]
+    assert gaps.duration_s.tolist() == [301.0, 91.0]
+
+    # Schritt 3: nur Lücken ohne Bewegung zählen
+    standstill = time_gap_pauses(elapsed, distance, min_gap_s=60, max_distance_m=5)
+    assert standstill.start_idx.tolist() == [4]
+
+    combined = gaps.combine(speed_pauses(np.zeros(6), distance, elapsed, min_points=6))
+    assert combined.count(PAUSE_TYPE_GAP) == 2 and combined.count(PAUSE_TYPE_SPEED) == 1
+    assert [record[2] for record in combined.to_records()] == sorted(combined.start_km.tolist())
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_pipeline_metrics.py - Testet die zentralen Pipeline-Metriken und die Bottleneck-Erkennung.
+"""
+
+import pytest
+
+import PipelineMetrics
+from PipelineMetrics import (analyze_run, export_metrics_csv, load_metrics, record_stage, run_script, stage,
+                             stage_name_for)
+
+
+def test_stage_records_spans_and_counters(tmp_path):
+    db = str(tmp_path / "metrics.db")
+    with stage("11_generate_stage_summary", "day1", db_path=db):
+        with PipelineMetrics.span("render"):
+            pass
+        PipelineMetrics.add_spans({"data_loading_time": 0.5, "note": "x"})
+        PipelineMetrics.count("input_files", 3)
+    assert PipelineMetrics.active() is None
+
+    [row] = load_metrics(db)
+    assert (row['stage'], row['track'], row['status']) == ("11_generate_stage_summary", "day1", "ok")
+    assert '"render"' in row['spans_json'] and '"data_loading_time": 0.5' in row['spans_json']
+    assert row['counters_json'] == '{"input_files": 3}'
+
+
+def test_nested_stage_merges_into_active_one(tmp_path):
+    db = str(tmp_path / "metrics.db")
+    with stage("outer", "day1", db_path=db) as outer:
+        with stage("inner", "day1", db_path=db) as inner:
+            inner.count("rows", 10)
+        assert inner is outer
+    [row] = load_metrics(db)
+    assert row['stage'] == "outer" and row['counters_json'] == '{"rows": 10}'
+
+
+def test_failing_stage_is_recorded_as_error(tmp_path):
+    db = str(tmp_path / "metrics.db")
+    with pytest.raises(SystemExit):
+        with stage("broken", db_path=db):
+            raise SystemExit(2)
+    assert load_metrics(db)[0]['status'] == "error"
+
+
+def test_stage_outside_pipeline_records_nothing(tmp_path, monkeypatch):
+    monkeypatch.delenv("GPX_PIPELINE_METRICS", raising=False)
+    monkeypatch.chdir(tmp_path)
+    with stage("by_hand", "day1") as metrics:
+        metrics.count("rows", 1)
+    assert not record_stage("by_hand", "day1", "2026-10-19T00:00:00", 1.0, None, None, "ok")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_run_script_measures_script_and_returns_exit_code(tmp_path):
+    db = str(tmp_path / "metrics.db")
+    script = tmp_path / "2_extract.py"
+    script.write_text("import sys\n"
+                      "import PipelineMetrics\n"
+                      "PipelineMetrics.count('args', len(sys.argv) - 1)\n"
+                      "sys.exit(int(sys.argv[1]))\n", encoding="utf-8")
+    assert run_script(str(script), ["0"], track="day1", db_path=db) == 0
+    assert run_script(str(script), ["3"], track="day1", db_path=db) == 3
+    rows = load_metrics(db)
+    assert [(r['stage'], r['status'], r['counters_json']) for r in rows] == [
+        ("2_extract", "ok", '{"args": 1}'), ("2_extract", "error", '{"args": 1}')]
+
+
+def test_stage_name_of_wrapped_script():
+    assert stage_name_for("scripts/PlotRenderWorker.py",
+                          ["submit", "--", "scripts/10c_plot.py", "--basename", "day1"]) == "10c_plot"
+    assert stage_name_for("scripts/4b_fetch_surface.py", ["--input", "a.csv"]) == "4b_fetch_surface"
+
+
+def test_analyze_run_flags_against_median_of_same_track(tmp_path):
+    db = str(tmp_path / "metrics.db")
+    for run_id, day1, day2 in [("r1", 1.0, 5.0), ("r2", 1.2, 5.0), ("r3", 0.8, 5.0), ("r4", 3.0, 5.5)]:
+        record_stage("4b", "day1", "t", day1, None, None, "ok", run_id=run_id, db_path=db)
+        record_stage("4b", "day2", "t", day2, None, None, "ok", run_id=run_id, db_path=db)
+    record_stage("5b", "day1", "t", 0.1, None, None, "error", run_id="r4", db_path=db)
+
+    reports = {(r.stage, r.track): r for r in analyze_run(load_metrics(db), threshold_factor=2.0)}
+    assert reports[("4b", "day1")].median_s == 1.0 and reports[("4b", "day1")].flags == ['BOTTLENECK']
+    assert reports[("4b", "day2")].flags == []
+    assert reports[("5b", "day1")].flags == ['FAILED'] and reports[("5b", "day1")].median_s is None
+
+    reports = analyze_run(load_metrics(db), run_id="r4", window=1, slow_threshold_s=4.0)
+    assert {(r.track, tuple(r.flags)) for r in reports if r.stage == "4b"} == {("day1", ('BOTTLENECK',)),
+                                                                             ("day2", ('SLOW',))}
+
+    csv_path = tmp_path / "export" / "metrics.csv"
+    export_metrics_csv(load_metrics(db), str(csv_path))
+    assert len(csv_path.read_text(encoding="utf-8").splitlines()) == 10
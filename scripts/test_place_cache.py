@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_place_cache.py - Testet den Ortsnamen-Cache für Schritt 8b isoliert
+"""
+
+from SQLiteGeocodingCache import SQLiteGeocodingCache, GeocodingResult
+from SQLitePlaceCache import SQLitePlaceCache, normalize_place_name
+
+
+def _fill_reverse_cache(db_path):
+    """Legt einige Reverse-Geocoding-Treffer wie aus Schritt 4 an."""
+    cache = SQLiteGeocodingCache(str(db_path))
+    for lat, lon, city, country in [
+        (43.30, 11.30, "Siena", "Italien"),
+        (43.32, 11.34, "Siena", "Italien"),
+        (43.08, 11.68, "Pienza", "Italien"),
+        (53.55, 10.00, "Unbekannter Ort", "Deutschland"),
+    ]:
+        cache.cache_geocoding_result(GeocodingResult(
+            latitude=lat, longitude=lon, street="", city=city,
+            postal_code="", country=country, query_date="2025-05-15T10:00:00"
+        ))
+    cache.close()
+
+
+def test_normalize_place_name():
+    assert normalize_place_name("  Siena, ") == "siena"
+    assert normalize_place_name("San   Gimignano") == "san gimignano"
+    assert normalize_place_name(None) == ""
+
+
+def test_seed_uses_centroid_per_city(tmp_path):
+    db_path = tmp_path / "geocoding_cache.db"
+    _fill_reverse_cache(db_path)
+
+    cache = SQLitePlaceCache(str(db_path))
+    assert cache.seed_from_reverse_geocoding() == 2
+
+    siena = cache.find_place("siena")
+    assert siena is not None and siena.found
+    assert abs(siena.latitude - 43.31) < 1e-9
+    assert abs(siena.longitude - 11.32) < 1e-9
+    assert siena.sample_count == 2
+    assert cache.find_place("Unbekannter Ort") is None
+
+    # Erneutes Seeding erzeugt keine Duplikate
+    assert cache.seed_from_reverse_geocoding() == 2
+    assert cache.get_cache_statistics()['seeded_place_entries'] == 2
+    cache.close()
+
+
+def test_context_and_nominatim_results(tmp_path):
+    cache = SQLitePlaceCache(str(tmp_path / "geocoding_cache.db"))
+    assert cache.seed_from_reverse_geocoding() == 0
+
+    cache.cache_place("Paris", 48.85, 2.35, context=", France")
+    cache.cache_place("Paris", 33.66, -95.55, context=", USA")
+    cache.cache_place("Nirgendwo", None, None, context=", France")
+
+    assert cache.find_place("Paris", ", USA").latitude == 33.66
+    # Mehrdeutig über Länder hinweg -> kein Treffer ohne passenden Kontext
+    assert cache.find_place("Paris") is None
+    # Eindeutiger Name wird auch ohne Kontext gefunden, Fehlschläge bleiben gecacht
+    nowhere = cache.find_place("nirgendwo")
+    assert nowhere is not None and not nowhere.found
+    cache.close()
+
+
+def test_seed_skips_names_shared_by_several_regions(tmp_path):
+    db_path = tmp_path / "geocoding_cache.db"
+    cache = SQLiteGeocodingCache(str(db_path))
+    for lat, lon, state, county in [
+        (49.35, 8.14, "Rheinland-Pfalz", "Neustadt an der Weinstraße"),
+        (49.36, 8.15, "Rheinland-Pfalz", "Neustadt an der Weinstraße"),
+        (50.73, 11.75, "Thüringen", "Saale-Orla-Kreis"),
+        (47.80, 13.05, "Salzburg", "Salzburg"),
+    ]:
+        city = "Salzburg" if state == "Salzburg" else "Neustadt"
+        country = "Österreich" if state == "Salzburg" else "Deutschland"
+        cache.cache_geocoding_result(GeocodingResult(
+            latitude=lat, longitude=lon, street="", city=city, postal_code="", country=country,
+            raw_address={"state": state, "county": county, "country": country},
+            query_date="2025-05-15T10:00:00"
+        ))
+    cache.close()
+
+    places = SQLitePlaceCache(str(db_path))
+    places.cache_place("Neustadt", 49.35, 8.14, context="Deutschland", source="reverse_geocode_centroid")
+    assert places.seed_from_reverse_geocoding() == 1
+    # Kein gemittelter Punkt zwischen Pfalz und Thüringen, auch kein alter Schwerpunkt
+    assert places.find_place("Neustadt", ", Deutschland") is None
+    assert places.find_place("Salzburg").sample_count == 1
+    places.close()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_plot_downsampling.py - Testet die LTTB-Punktreduktion für Profil-Plots.
+"""
+
+import numpy as np
+import pandas as pd
+
+from PlotDownsampling import downsample_for_plot, lttb_indices, select_plot_indices
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    x = np.arange(10_000, dtype=float)
+    y = np.zeros_like(x)
+    y[[1234, 7777]] = [50.0, -80.0]
+    idx = lttb_indices(x, y, 100)
+    assert len(idx) <= 100
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+    assert np.all(np.diff(idx) > 0)
+    assert {1234, 7777}.issubset(set(idx.tolist()))
+
+
+def test_forced_points_and_strict_budget():
+    rng = np.random.default_rng(2)
+    x = np.cumsum(rng.uniform(0.5, 1.5, 50_000))
+    y = np.column_stack((rng.normal(200, 50, len(x)), np.sin(x / 500) * 100))
+    keep = np.zeros(len(x), dtype=bool)
+    keep[::1000] = True
+
+    selected, info = select_plot_indices(x, y, 2000, keep)
+    assert len(selected) <= 2000
+    assert set(np.flatnonzero(keep)).issubset(set(selected.tolist()))
+    assert info['forced_points_dropped'] == 0
+
+    # Mehr Pflichtpunkte als Budget: Budget gilt trotzdem
+    keep[::10] = True
+    selected, info = select_plot_indices(x, y, 2000, keep)
+    assert len(selected) <= 2000 and info['forced_points_dropped'] > 0
+
+
+def test_downsample_for_plot_dataframe():
+    df = pd.DataFrame({'Distanz (km)': np.linspace(0, 100, 5000), 'Power_W': np.arange(5000.0)})
+    small, meta = downsample_for_plot(df, 'Distanz (km)', 'Power_W', 10_000)
+    assert small is df and not meta['reduction_performed']
+
+    reduced, meta = downsample_for_plot(df, 'Distanz (km)', 'Power_W', 500)
+    assert len(reduced) == meta['final_points'] <= 500
+    assert reduced.index.is_monotonic_increasing
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_plot_worker.py - Testet den Plot-Worker mit kleinen Dummy-Skripten statt echter Plots.
+"""
+
+import logging
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from PlotRenderWorker import make_job, run_job, submit, worker_alive
+
+WORKER = Path(__file__).resolve().parent / "PlotRenderWorker.py"
+
+DUMMY_SCRIPT = '''
+import sys
+from dummy_helper import GREETING
+print(GREETING, sys.argv[1:])
+open(sys.argv[1], "w").write("ok")
+if len(sys.argv) > 2:
+    sys.exit(int(sys.argv[2]))
+'''
+
+
+def _write_dummy(tmp_path):
+    (tmp_path / "dummy_helper.py").write_text('GREETING = "hallo"\n')
+    script = tmp_path / "dummy_plot.py"
+    script.write_text(DUMMY_SCRIPT)
+    return script
+
+
+def test_run_job_behaves_like_direct_call(tmp_path):
+    script = _write_dummy(tmp_path)
+    result = run_job(make_job(str(script), ["out.txt"], track="tour_1", cwd=str(tmp_path)))
+    assert result['returncode'] == 0
+    assert "hallo ['out.txt']" in result['output']
+    assert (tmp_path / "out.txt").read_text() == "ok"
+
+    failed = run_job(make_job(str(script), ["out2.txt", "3"], cwd=str(tmp_path)))
+    assert failed['returncode'] == 3
+
+
+def test_logging_setup_of_a_job_does_not_leak_into_the_next(tmp_path, monkeypatch):
+    monkeypatch.setattr(logging.root, "handlers", [])  # wie im Worker-Prozess, ohne pytest-Handler
+    script = tmp_path / "logging_step.py"
+    script.write_text("import logging, sys\n"
+                      "logging.basicConfig(level=logging.INFO, handlers=[logging.StreamHandler()])\n"
+                      "logging.info('schritt %s', sys.argv[1])\n")
+    first = run_job(make_job(str(script), ["A"], cwd=str(tmp_path)))
+    second = run_job(make_job(str(script), ["B"], cwd=str(tmp_path)))
+    assert "schritt A" in first['output'] and "schritt B" in second['output']
+    assert logging.root.handlers == []
+
+
+def test_submit_without_worker_runs_locally(tmp_path):
+    script = _write_dummy(tmp_path)
+    spool = tmp_path / "spool"
+    assert not worker_alive(str(spool))
+    result = submit(make_job(str(script), ["local.txt"], cwd=str(tmp_path)), str(spool))
+    assert result['returncode'] == 0 and (tmp_path / "local.txt").exists()
+
+
+def test_serve_submit_and_stop(tmp_path):
+    script = _write_dummy(tmp_path)
+    spool = tmp_path / "spool"
+    server = subprocess.Popen([sys.executable, str(WORKER), "serve", "--spool", str(spool), "--workers", "1"],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.time() + 60
+        while not worker_alive(str(spool)) and time.time() < deadline:
+            time.sleep(0.1)
+        assert worker_alive(str(spool))
+
+        result = subprocess.run([sys.executable, str(WORKER), "submit", "--spool", str(spool), "--",
+                                 str(script), "served.txt", "0"],
+                                cwd=tmp_path, capture_output=True, text=True, timeout=60)
+        assert result.returncode == 0
+        assert "hallo" in result.stdout
+        assert (tmp_path / "served.txt").exists()
+        assert not list(spool.glob("*.job.json")) and not list(spool.glob("*.result.json"))
+    finally:
+        subprocess.run([sys.executable, str(WORKER), "stop", "--spool", str(spool)], check=True)
+        server.wait(timeout=30)
+    assert not worker_alive(str(spool))
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_power_curve.py - Testet das 1-Hz-Resampling und die daraus abgeleiteten
+Power-Kennzahlen (Schritt 10d).
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from PowerCurve import (
+    log_spaced_durations, mean_maximal_power, normalized_power, power_timeline,
+    resample_to_1hz, time_in_zones
+)
+
+
+def test_uniform_one_second_matches_rolling():
+    rng = np.random.default_rng(1)
+    power = pd.Series(rng.uniform(0, 400, 4000))
+    power_1hz = resample_to_1hz(power, np.ones(len(power)))
+    np.testing.assert_allclose(power_1hz, power)
+
+    curve = mean_maximal_power(power_1hz, [5, 60, 1200, 5000])
+    assert set(curve) == {5, 60, 1200}
+    for duration, best in curve.items():
+        assert best == pytest.approx(power.rolling(duration).mean().max())
+
+    legacy_np = (power.rolling(30, min_periods=30).mean() ** 4).mean() ** 0.25
+    assert normalized_power(power_1hz) == pytest.approx(legacy_np)
+
+
+def test_variable_intervals_are_weighted_by_time():
+    # 100 W für 1 s, 300 W für 3 s, 200 W für 0.5 s + 1.5 s
+    power_1hz = resample_to_1hz([100, 300, 200, 200], [1, 3, 0.5, 1.5])
+    assert power_1hz.tolist() == pytest.approx([100, 300, 300, 300, 200, 200])
+    assert mean_maximal_power(power_1hz, [3])[3] == pytest.approx(300)
+
+    # Lücken > max_gap_s zählen als Stillstand, Energie bleibt sonst erhalten
+    gap = resample_to_1hz([200, 250, 200], [10, 120, 10.5], max_gap_s=30)
+    assert len(gap) == 140
+    assert gap[10:130].max() == 0
+    assert gap.sum() == pytest.approx(200 * 10 + 200 * 10.5 - 200 * 0.5)
+
+
+def test_power_timeline_time_sources():
+    df = pd.DataFrame({'Power_W': [100.0, 200.0, np.nan, 300.0], 'TimeDelta (s)': [0, 2, 2, 1]})
+    assert power_timeline(df).tolist() == pytest.approx([200, 200, 0, 0, 300])
+
+    sim = pd.DataFrame({'Power_W': [150.0] * 3, 'Simulated_Time_s': [0.0, 4.0, 10.0]})
+    assert len(power_timeline(sim)) == 10
+
+    rows = pd.DataFrame({'Power_W': [1.0, 2.0, 3.0]})
+    assert power_timeline(rows).tolist() == [1.0, 2.0, 3.0]
+
+
+def test_time_in_zones_has_no_gaps():
+    power_1hz = np.array([0, 50, 137.5, 138, 300, 1000])
+    zones = time_in_zones(power_1hz, [0, 138, 250])
+    assert [z['seconds'] for z in zones] == [3, 1, 2]
+    assert zones[2]['avg_power'] == pytest.approx(650)
+    assert zones[2]['max_power'] == 1000
+
+
+def test_log_spaced_durations():
+    durations = log_spaced_durations(7200)
+    assert durations[0] == 1 and durations[-1] == 7200
+    assert {5, 60, 3600}.issubset(set(durations.tolist()))
+    assert np.all(np.diff(durations) > 0)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_power_physics.py - Vergleicht den vektorisierten Power-Kernel (Schritt 10b)
+mit dem bisherigen skalaren Zeilenmodell.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from PowerPhysics import (
+    G, RHO, ROLL_RESISTANCE_MAP, crr_for_surfaces, power_components, solve_speed_for_power, sweep_pacing
+)
+
+
+def _scalar_power(speed_ms, gradient, Cr, mass_kg, cda_value, wind_ms=0):
+    """Referenz: das ursprüngliche zeilenweise Modell aus 10b."""
+    v = speed_ms
+    v_wind = v + wind_ms
+    slope_angle = math.atan(gradient)
+    F_air = 0.5 * RHO * cda_value * v_wind**2 * np.sign(v_wind)
+    F_roll = Cr * mass_kg * G * math.cos(slope_angle)
+    F_climb = mass_kg * G * math.sin(slope_angle)
+    P_total = (F_air + F_roll + F_climb) * v
+    return {
+        'Power_W': P_total if P_total > 0 else 0,
+        'Power_Air_W': F_air * v,
+        'Power_Roll_W': F_roll * v,
+        'Power_Climb_W': F_climb * v
+    }
+
+
+def test_crr_lookup_matches_dict_get():
+    surfaces = pd.Series(['asphalt', 'Gravel', 'unknown', 'lava', None, np.nan, 'SETT'])
+    expected = [ROLL_RESISTANCE_MAP.get(str(s).lower(), ROLL_RESISTANCE_MAP['unknown']) for s in surfaces]
+    assert crr_for_surfaces(surfaces).tolist() == expected
+
+
+def test_vectorized_kernel_matches_scalar_model():
+    rng = np.random.default_rng(42)
+    n = 5000
+    speed_ms = rng.uniform(0.5, 18.0, n)
+    gradient = rng.uniform(-0.15, 0.15, n)
+    surfaces = rng.choice(list(ROLL_RESISTANCE_MAP.keys()) + ['cobbles?'], n)
+    crr = crr_for_surfaces(surfaces)
+
+    vectorized = pd.DataFrame(power_components(speed_ms, gradient, crr, 85.0, 0.42))
+    scalar = pd.DataFrame([
+        _scalar_power(v, g, ROLL_RESISTANCE_MAP.get(s, ROLL_RESISTANCE_MAP['unknown']), 85.0, 0.42)
+        for v, g, s in zip(speed_ms, gradient, surfaces)
+    ])
+
+    assert list(vectorized.columns) == list(scalar.columns)
+    for column in scalar.columns:
+        np.testing.assert_allclose(vectorized[column], scalar[column], rtol=1e-12, atol=1e-9)
+    # Bergab wird die Gesamtleistung auf 0 begrenzt
+    assert (vectorized['Power_W'] >= 0).all() and (vectorized['Power_W'] == 0).any()
+
+
+def _bisection_speed(target_power_w, gradient, Cr, mass_kg, cda_value):
+    """Referenz: der bisherige 30-Schritt-Bisektionslöser aus 10b."""
+    v_low, v_high = 0.0, 30.0
+    for _ in range(30):
+        v_mid = (v_low + v_high) / 2.0
+        power = -1 if v_mid < 1e-6 else _scalar_power(v_mid, gradient, Cr, mass_kg, cda_value)['Power_W']
+        if power < target_power_w:
+            v_low = v_mid
+        else:
+            v_high = v_mid
+    return (v_low + v_high) / 2.0
+
+
+def test_speed_solver_matches_bisection():
+    rng = np.random.default_rng(7)
+    n = 2000
+    gradient = rng.uniform(-0.2, 0.2, n)
+    crr = rng.choice(list(ROLL_RESISTANCE_MAP.values()), n)
+    target = rng.uniform(30, 600, n)
+
+    speeds = solve_speed_for_power(target, gradient, crr, 85.0, 0.42)
+    reference = np.array([_bisection_speed(t, g, c, 85.0, 0.42) for t, g, c in zip(target, gradient, crr)])
+    np.testing.assert_allclose(speeds, reference, atol=1e-6)
+
+    # Leistungsbilanz ist erfüllt (sofern nicht durch v_max begrenzt)
+    free = speeds < 30.0
+    power = power_components(speeds, gradient, crr, 85.0, 0.42)['Power_W']
+    np.testing.assert_allclose(power[free], target[free], rtol=1e-9)
+
+
+def test_speed_solver_downhill_and_zero_power():
+    gradient = np.array([-0.08, -0.08, 0.0, 0.05, -0.3])
+    speeds = solve_speed_for_power(np.array([0.0, -50.0, 0.0, -10.0, 200.0]), gradient, 0.005, 85.0, 0.42)
+
+    # Freilauf bergab: Luftwiderstand gleicht Hangabtrieb minus Rollwiderstand aus
+    a = 0.5 * RHO * 0.42
+    b = 85.0 * G * (0.005 * np.cos(np.arctan(-0.08)) + np.sin(np.arctan(-0.08)))
+    assert speeds[0] == pytest.approx(np.sqrt(-b / a))
+    # Bremsen bergab ist langsamer als Rollen, in Ebene/bergauf ohne Leistung kein Vortrieb
+    assert 0 < speeds[1] < speeds[0]
+    assert speeds[2] == 0.0 and speeds[3] == 0.0
+    # Obergrenze wie beim bisherigen Suchintervall
+    assert speeds[4] == 30.0
+
+
+def test_speed_solver_with_wind():
+    speeds = solve_speed_for_power(250.0, np.zeros(3), 0.004, 80.0, 0.32, wind_ms=np.array([-5.0, 0.0, 5.0]))
+    # wind_ms > 0 ist Gegenwind
+    assert speeds[0] > speeds[1] > speeds[2]
+    power = power_components(speeds, 0.0, 0.004, 80.0, 0.32, wind_ms=np.array([-5.0, 0.0, 5.0]))['Power_W']
+    np.testing.assert_allclose(power, 250.0, rtol=1e-9)
+
+
+def test_sweep_matches_individual_simulations():
+    rng = np.random.default_rng(3)
+    n = 800
+    seg_len = np.r_[0.0, rng.uniform(5, 25, n - 1)]
+    gradient = rng.uniform(-0.1, 0.12, n)
+    crr = rng.choice(list(ROLL_RESISTANCE_MAP.values()), n)
+    powers, masses, cdas, scales = [150, 250, 250], [80, 80, 95], [0.42, 0.30, 0.30], [1.0, 1.0, 1.3]
+    climbs = [(100, 300), (500, 799)]
+
+    # Kleiner Block erzwingt mehrere Teilmatrizen
+    result = sweep_pacing(seg_len, gradient, crr, powers, masses, cdas, scales, climbs, max_cells=2 * n)
+
+    for k in range(3):
+        cum_time = np.cumsum(seg_len / solve_speed_for_power(powers[k], gradient, crr * scales[k], masses[k], cdas[k]))
+        assert result['finish_time_s'][k] == pytest.approx(cum_time[-1])
+        assert result['climb_time_s'][k].tolist() == pytest.approx([cum_time[300] - cum_time[100], cum_time[799] - cum_time[500]])
+    assert result['avg_speed_kmh'] == pytest.approx(seg_len.sum() / result['finish_time_s'] * 3.6)
+    # Mehr Leistung ist schneller, mehr Masse und Rollwiderstand langsamer
+    assert result['finish_time_s'][1] < min(result['finish_time_s'][0], result['finish_time_s'][2])
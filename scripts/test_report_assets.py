@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_report_assets.py - Testet die externen, deduplizierten Bild-Assets der Stage Summary (Schritt 11).
+"""
+
+import os
+
+import numpy as np
+from PIL import Image
+
+from ReportAssets import ASSET_TOKEN, data_uri, publish_image, relative_src, resolve_tokens
+
+
+def _write_plot(path, width=800, height=300, value=0):
+    pixels = np.full((height, width, 3), 255, dtype=np.uint8)
+    pixels[height // 2, :, :] = value
+    Image.fromarray(pixels).save(path)
+
+
+def test_identical_images_share_one_asset(tmp_path):
+    _write_plot(tmp_path / "a.png")
+    _write_plot(tmp_path / "b.png")
+    first = publish_image(str(tmp_path / "a.png"), str(tmp_path / "assets"))
+    second = publish_image(str(tmp_path / "b.png"), str(tmp_path / "assets"))
+    assert first.path == second.path and not first.reused and second.reused
+    assert os.listdir(tmp_path / "assets") == [os.path.basename(first.path)]
+
+
+def test_changed_content_or_encoding_gives_new_asset(tmp_path):
+    _write_plot(tmp_path / "a.png")
+    _write_plot(tmp_path / "c.png", value=80)
+    webp = publish_image(str(tmp_path / "a.png"), str(tmp_path / "assets"))
+    other = publish_image(str(tmp_path / "c.png"), str(tmp_path / "assets"))
+    png = publish_image(str(tmp_path / "a.png"), str(tmp_path / "assets"), fmt='png')
+    assert len({webp.path, other.path, png.path}) == 3
+    assert png.path.endswith('.png') and webp.path.endswith('.webp')
+
+
+def test_wide_plots_are_downscaled(tmp_path):
+    _write_plot(tmp_path / "wide.png", width=4000, height=1000)
+    asset = publish_image(str(tmp_path / "wide.png"), str(tmp_path / "assets"), max_width=1000)
+    with Image.open(asset.path) as image:
+        assert image.size == (1000, 250)
+    assert publish_image(str(tmp_path / "missing.png"), str(tmp_path / "assets")) is None
+
+
+def test_tokens_resolve_to_relative_paths_and_data_uris(tmp_path):
+    _write_plot(tmp_path / "a.png")
+    asset = publish_image(str(tmp_path / "a.png"), str(tmp_path / "out" / "assets"))
+    src = relative_src(asset.path, str(tmp_path / "out" / "report.html"))
+    assert src == f"assets/{os.path.basename(asset.path)}"
+
+    template = f"<img src='{ASSET_TOKEN.format(key='profile')}' loading='lazy'>"
+    assert resolve_tokens(template, {'profile': src}) == f"<img src='{src}' loading='lazy'>"
+
+    cache = {}
+    uri = data_uri(str(tmp_path / "a.png"), cache)
+    assert uri.startswith("data:image/png;base64,") and cache[str(tmp_path / "a.png")] is uri
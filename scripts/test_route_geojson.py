@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_route_geojson.py - Testet die GeoJSON-Ebenen der Karte (Schritt 6).
+"""
+
+import json
+
+import numpy as np
+
+from RouteGeoJSON import points_geojson, surface_route_geojson, surface_runs
+
+
+def test_surface_runs_overlap_by_one_point():
+    starts, ends = surface_runs(['a', 'a', 'b', 'b', 'a', 'c'])
+    # Letzter Block 'c' hat nur einen Punkt und entfällt
+    assert starts.tolist() == [0, 2, 4]
+    assert ends.tolist() == [2, 4, 5]
+
+
+def test_surface_route_groups_runs_per_surface():
+    lat = np.array([48.0, 48.1, 48.2, 48.3, 48.4, 48.5])
+    lon = lat - 37
+    geojson = surface_route_geojson(lat, lon, ['Asphalt', 'asphalt', None, None, 'asphalt', 'asphalt'],
+                                    {'asphalt': 'black'}, 'red')
+    features = {f['properties']['surface']: f for f in geojson['features']}
+    assert set(features) == {'asphalt', 'unknown'}
+
+    asphalt = features['asphalt']
+    assert asphalt['geometry']['type'] == 'MultiLineString'
+    assert asphalt['properties']['color'] == 'black' and asphalt['properties']['segments'] == 2
+    assert asphalt['geometry']['coordinates'][0] == [[11.0, 48.0], [11.1, 48.1], [11.2, 48.2]]
+    assert features['unknown']['properties']['color'] == 'red'
+    json.dumps(geojson)
+
+
+def test_points_geojson_properties_are_serializable():
+    geojson = points_geojson([48.0, 48.1234567], [11.0, 11.7654321], {'punkt': np.array([3, 7])})
+    assert [f['properties']['punkt'] for f in geojson['features']] == [3, 7]
+    assert geojson['features'][1]['geometry']['coordinates'] == [11.765432, 48.123457]
+    json.dumps(geojson)
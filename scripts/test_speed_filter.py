@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_speed_filter.py - Vergleicht den GPS-Geschwindigkeitsfilter mit der
+bisherigen zeilenweisen Korrektur aus 10b_power_processing.py.
+"""
+
+import numpy as np
+import pandas as pd
+
+from GPSSpeedFilter import filter_speed_outliers, isolated_flags, limit_speed_jumps
+
+
+def _legacy_filter(speeds):
+    """Referenz: die ursprüngliche df.loc/iloc-Schleife aus run_power_analysis."""
+    df = pd.DataFrame({'speed': speeds})
+    original = df['speed'].copy()
+    df['speed_smoothed'] = df['speed'].copy()
+    df.loc[df['speed'] > 80, 'speed_smoothed'] = 65
+    for i in range(1, len(df)):
+        if abs(df['speed_smoothed'].iloc[i] - df['speed_smoothed'].iloc[i-1]) > 10:
+            prev_speed = df['speed_smoothed'].iloc[i-1]
+            if i < len(df) - 1:
+                df.loc[df.index[i], 'speed_smoothed'] = prev_speed * 0.7 + df['speed_smoothed'].iloc[i+1] * 0.3
+            else:
+                df.loc[df.index[i], 'speed_smoothed'] = prev_speed
+    df['speed_smoothed'] = df['speed_smoothed'].rolling(window=5, center=True, min_periods=1).median()
+    df['speed_smoothed'] = df['speed_smoothed'].rolling(window=3, center=True, min_periods=1).mean()
+    realistic_max = min(65, df['speed_smoothed'].quantile(0.95) * 1.1)
+    df.loc[df['speed_smoothed'] > realistic_max, 'speed_smoothed'] = realistic_max
+    df.loc[df['speed_smoothed'] < 2, 'speed_smoothed'] = 2
+    return df['speed_smoothed'], (df['speed_smoothed'] != original).sum()
+
+
+def test_filter_matches_legacy_loop():
+    rng = np.random.default_rng(11)
+    speeds = rng.uniform(5, 45, 1500)
+    speeds[rng.integers(0, 1500, 40)] = rng.uniform(60, 130, 40)
+    speeds[rng.integers(0, 1500, 10)] = np.nan
+    speeds[-1] = 95
+
+    expected, expected_changes = _legacy_filter(speeds)
+    result = filter_speed_outliers(speeds)
+
+    pd.testing.assert_series_equal(result.speed, expected, check_names=False)
+    assert result.corrections_made == expected_changes
+    assert result.stats['hard_limited'] == int(np.nansum(speeds > 80))
+    assert result.stats['jump_corrections'] > 0
+
+
+def test_limit_speed_jumps_recurrence():
+    filtered, mask = limit_speed_jumps([20, 50, 22, 21, 60], max_jump=10)
+    # 50 -> 0.7*20 + 0.3*22; letzter Sprung übernimmt den Vorgänger
+    assert filtered.tolist() == [20, 20 * 0.7 + 22 * 0.3, 22, 21, 21]
+    assert mask.tolist() == [False, True, False, False, True]
+
+
+def test_isolated_flags():
+    flags = [True, False, True, False, True, True, False, True]
+    assert isolated_flags(flags).tolist() == [False, False, True, False, False, False, False, False]
+
+
+def test_limit_speed_jumps_matches_sequential_scan():
+    rng = np.random.default_rng(7)
+    speeds = np.cumsum(rng.normal(0, 6, 20000)) % 90
+    speeds[rng.integers(0, 20000, 300)] = rng.uniform(0, 150, 300)  # einzelne Ausreißer und Ketten
+    speeds[rng.integers(0, 20000, 50)] = np.nan
+
+    values, expected_mask = speeds.tolist(), np.zeros(len(speeds), dtype=bool)
+    prev = values[0]
+    for i in range(1, len(values)):
+        current = values[i]
+        if abs(current - prev) > 10:
+            current = prev * 0.7 + values[i + 1] * (1.0 - 0.7) if i < len(values) - 1 else prev
+            values[i] = current
+            expected_mask[i] = True
+        prev = current
+
+    filtered, mask = limit_speed_jumps(speeds, max_jump=10)
+    np.testing.assert_array_equal(filtered, np.asarray(values))
+    np.testing.assert_array_equal(mask, expected_mask)
+    assert limit_speed_jumps([])[0].size == 0 and limit_speed_jumps([42.0])[0].tolist() == [42.0]
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_stage_metadata_index.py - Testet den SQLite-Metadaten-Index der Verarbeitungsschritte (Schritt 11).
+"""
+
+import os
+
+import pytest
+
+from StageMetadataIndex import (MAX_HISTORY_PER_OUTPUT, load_latest_metadata, metadata_history,
+                                parse_header_lines, record_header_lines, record_output_metadata)
+
+HEADER = ["# === GPX WORKFLOW PROCESSING METADATA ===",
+          "# Processed_By: 4b_fetch_surface.py v3.0.0",
+          "#   cache_hits: 12",
+          "# API_provider: Overpass: main"]
+
+
+def _write_output(path, header=HEADER, rows="a,b\n1,2\n"):
+    path.write_text("\n".join(header) + "\n" + rows, encoding="utf-8")
+    return str(path)
+
+
+def test_header_lines_parse_like_step_11():
+    assert parse_header_lines(HEADER + ["a,b"]) == {
+        "Processed_By": "4b_fetch_surface.py v3.0.0",
+        "cache_hits": "12",
+        "API_provider": "Overpass: main",
+    }
+
+
+def test_latest_entries_for_all_outputs_in_one_lookup(tmp_path):
+    db = str(tmp_path / "index.db")
+    csv_path = _write_output(tmp_path / "4b_day1_surface_data.csv")
+    png_path = str(tmp_path / "10c_day1_power_visualization.png")
+    open(png_path, "wb").write(b"png")
+
+    assert record_header_lines(csv_path, HEADER, "4b_fetch_surface.py", db_path=db)
+    assert record_output_metadata(png_path, {"peaks_found": 3, "bbox": [1.0, 2.0]}, db_path=db)
+    missing = str(tmp_path / "not_written.csv")
+    assert not record_output_metadata(missing, {"a": 1}, db_path=db)
+
+    result = load_latest_metadata([csv_path, png_path, missing, None], db_path=db)
+    assert result == {csv_path: parse_header_lines(HEADER), png_path: {"peaks_found": 3, "bbox": [1.0, 2.0]}}
+
+
+def test_rewritten_file_invalidates_entry(tmp_path):
+    db = str(tmp_path / "index.db")
+    csv_path = _write_output(tmp_path / "out.csv")
+    record_header_lines(csv_path, HEADER, db_path=db)
+    _write_output(tmp_path / "out.csv", rows="a,b\n1,2\n3,4\n")
+    assert load_latest_metadata([csv_path], db_path=db) == {}
+
+
+def test_history_keeps_previous_runs(tmp_path):
+    db = str(tmp_path / "index.db")
+    csv_path = _write_output(tmp_path / "out.csv")
+    for run in range(MAX_HISTORY_PER_OUTPUT + 2):
+        record_output_metadata(csv_path, {"run": run}, "3_analyze_peaks_plot.py", db_path=db)
+    history = metadata_history(csv_path, db_path=db)
+    assert len(history) == MAX_HISTORY_PER_OUTPUT
+    assert history[0][1:] == ("3_analyze_peaks_plot.py", {"run": MAX_HISTORY_PER_OUTPUT + 1})
+    assert load_latest_metadata([csv_path], db_path=db)[csv_path] == {"run": MAX_HISTORY_PER_OUTPUT + 1}
+
+
+@pytest.mark.parametrize("env_value", ["", None])
+def test_disabled_index_records_nothing(tmp_path, monkeypatch, env_value):
+    # "" = per config abgeschaltet, None = Skript außerhalb der Pipeline
+    if env_value is None:
+        monkeypatch.delenv("GPX_METADATA_INDEX", raising=False)
+    else:
+        monkeypatch.setenv("GPX_METADATA_INDEX", env_value)
+    monkeypatch.chdir(tmp_path)
+    csv_path = _write_output(tmp_path / "out.csv")
+    assert not record_header_lines(csv_path, HEADER)
+    assert load_latest_metadata([csv_path]) == {}
+    assert not os.path.exists(tmp_path / "output")
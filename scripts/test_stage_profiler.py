@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_stage_profiler.py - Testet die Opt-in Profiler-Hooks der Pipeline-Schritte.
+"""
+
+import pstats
+import time
+
+from StageProfiler import collapsed_totals, profiled, stage_selected
+
+
+def _busy_loop(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(200))
+
+
+def test_disabled_profiling_writes_nothing(tmp_path, monkeypatch):
+    monkeypatch.setenv("GPX_PROFILE", "off")
+    with profiled("4b_fetch_surface", "day1", output_dir=str(tmp_path)) as base:
+        assert base is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_stage_filter_accepts_full_name_or_step_prefix(monkeypatch):
+    monkeypatch.setenv("GPX_PROFILE_STAGES", "4b, 10c_power_visualization")
+    assert stage_selected("4b_fetch_surface")
+    assert stage_selected("10c_power_visualization")
+    assert not stage_selected("10b_power_processing")
+    monkeypatch.setenv("GPX_PROFILE_STAGES", "")
+    assert stage_selected("10b_power_processing")
+
+
+def test_sample_mode_writes_collapsed_stacks(tmp_path, monkeypatch):
+    monkeypatch.setenv("GPX_PROFILE_INTERVAL_MS", "1")
+    with profiled("2d_calculate_speed", "day 1", mode="sample", output_dir=str(tmp_path)) as base:
+        _busy_loop(0.2)
+    assert base == str(tmp_path / "2d_calculate_speed_day_1")
+
+    lines = (tmp_path / "2d_calculate_speed_day_1.collapsed").read_text(encoding="utf-8").splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("_busy_loop (test_stage_profiler.py:" in line for line in lines)
+    assert "profiled" not in lines[0]  # Frames des Aufrufers werden abgeschnitten
+    assert "_busy_loop" in (tmp_path / "2d_calculate_speed_day_1.txt").read_text(encoding="utf-8")
+
+
+def test_cpu_mode_writes_pstats_even_on_exit(tmp_path):
+    try:
+        with profiled("5b_fetch_peaks", mode="cpu", output_dir=str(tmp_path)):
+            _busy_loop(0.01)
+            raise SystemExit(1)
+    except SystemExit:
+        pass
+    stats = pstats.Stats(str(tmp_path / "5b_fetch_peaks.prof"))
+    assert any(func[2] == "_busy_loop" for func in stats.stats)
+    assert "Ordered by: cumulative time" in (tmp_path / "5b_fetch_peaks.txt").read_text(encoding="utf-8")
+
+
+def test_memory_mode_reports_allocation_site(tmp_path):
+    kept = []
+    with profiled("8b_geocode_places", "day1", mode="memory", output_dir=str(tmp_path)):
+        kept.append(bytearray(8 * 1024 * 1024))
+    summary = (tmp_path / "8b_geocode_places_day1.txt").read_text(encoding="utf-8")
+    top_site = summary.splitlines()[5]
+    assert "test_stage_profiler.py:" in top_site and " 8,192." in top_site
+    collapsed = (tmp_path / "8b_geocode_places_day1.collapsed").read_text(encoding="utf-8")
+    assert "test_stage_profiler.py:" in collapsed.splitlines()[0]
+
+
+def test_collapsed_totals_count_recursion_once():
+    self_totals, inclusive = collapsed_totals({"main;walk;walk": 3, "main;load": 2})
+    assert self_totals == {"walk": 3, "load": 2}
+    assert inclusive == {"main": 5, "walk": 3, "load": 2}
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_stage_summary_template.py - Testet das vorkompilierte HTML-Template der Stage Summary (Schritt 11).
+"""
+
+import pytest
+
+from StageSummaryTemplate import SECTION_EMOJIS, STAGE_SUMMARY, CompiledTemplate, surface_css
+
+
+def test_render_fills_fields_and_keeps_css_braces():
+    template = CompiledTemplate("<style>p { color: red; }</style><h1>{{ title }}</h1>{{body}}")
+    assert template.fields == {'title', 'body'}
+    assert template.render({'title': 'Tag 1', 'body': 42}) == "<style>p { color: red; }</style><h1>Tag 1</h1>42"
+
+
+def test_static_values_are_inlined_at_compile_time():
+    template = CompiledTemplate("<h2>{{icon}} {{name}}</h2>", static={'icon': '*'})
+    assert template.fields == {'name'}
+    assert template.render({'name': 'Profil'}) == "<h2>* Profil</h2>"
+
+
+def test_missing_value_raises_key_error():
+    with pytest.raises(KeyError, match="body"):
+        CompiledTemplate("{{title}}{{body}}").render({'title': 'x'})
+
+
+def test_stage_summary_template_renders_all_sections():
+    values = {name: f"<!--{name}-->" for name in STAGE_SUMMARY.fields}
+    html = STAGE_SUMMARY.render(values)
+    assert "{{" not in html
+    assert all(f"<!--{name}-->" in html for name in STAGE_SUMMARY.fields)
+    assert all(emoji in html for emoji in SECTION_EMOJIS.values())
+
+
+def test_surface_css_skips_default_and_normalises_class_names():
+    css = surface_css({'fine gravel': '#FFCA28', 'paved/asphalt': '#212529', 'default': '#D32F2F'})
+    assert ".surface-fine_gravel { background-color: #FFCA28; }" in css
+    assert ".surface-paved_asphalt { background-color: #212529; }" in css
+    assert "#D32F2F" not in css
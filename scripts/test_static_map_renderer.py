@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_static_map_renderer.py - Testet die Offline-Kartenerstellung (Schritt 10) mit synthetischen Kacheln.
+"""
+
+import os
+
+import numpy as np
+from PIL import Image
+
+from StaticMapRenderer import (
+    BACKGROUND_RGB, lonlat_to_world_px, render_static_map, source_zoom, view_for_track
+)
+
+TILE_RGB = (10, 200, 30)
+
+
+def _write_tiles(tile_dir, zoom, lon, lat, margin=4):
+    x, y = lonlat_to_world_px(lon, lat, zoom)
+    for tile_x in range(int(x.min() // 256) - margin, int(x.max() // 256) + margin + 1):
+        os.makedirs(os.path.join(tile_dir, str(zoom), str(tile_x)), exist_ok=True)
+        for tile_y in range(int(y.min() // 256) - margin, int(y.max() // 256) + margin + 1):
+            Image.new('RGB', (256, 256), TILE_RGB).save(os.path.join(tile_dir, str(zoom), str(tile_x), f"{tile_y}.png"))
+
+
+def test_web_mercator_reference_points():
+    x, y = lonlat_to_world_px([0.0, -180.0], [0.0, 0.0], 0)
+    assert np.allclose(x, [128.0, 0.0]) and np.allclose(y, [128.0, 128.0])
+
+
+def test_source_zoom_prefers_exact_then_finer_then_coarser():
+    assert source_zoom(12, [10, 12, 14]) == 12
+    assert source_zoom(11, [10, 13]) == 13
+    assert source_zoom(11, [8, 15]) == 8
+    assert source_zoom(11, []) == 11
+
+
+def test_view_fits_track_with_padding():
+    lon, lat = np.array([11.0, 11.3]), np.array([48.0, 48.2])
+    view = view_for_track(lon, lat, 600, 400, padding_px=20)
+    x, y = view.to_image_px(lon, lat)
+    assert x.min() >= 20 and x.max() <= 580 and y.min() >= 20 and y.max() <= 380
+
+
+def test_render_composites_tiles_and_draws_route(tmp_path):
+    lon = np.linspace(11.0, 11.2, 200)
+    lat = np.linspace(48.0, 48.1, 200)
+    tile_dir = str(tmp_path / "tiles")
+    view = view_for_track(lon, lat, 400, 300)
+    _write_tiles(tile_dir, view.zoom + 1, lon, lat)  # nur feinere Stufe im Cache -> wird verkleinert
+
+    output = str(tmp_path / "map.png")
+    stats = render_static_map(output, tile_dir, lon, lat, 400, 300,
+                              surface_route=(lon, lat, ['asphalt'] * 100 + ['grass'] * 100),
+                              surface_colors={'asphalt': '#ff0000', 'grass': '#0000ff', 'default': 'black'},
+                              poi_layers=[{'lon': [11.1], 'lat': [48.05], 'color': 'yellow', 'marker': 's'}],
+                              attribution='')
+    assert stats['tiles_missing'] == 0 and stats['tile_zoom'] == view.zoom + 1
+    assert stats['route_blocks'] == 2 and stats['pois_drawn'] == 1
+
+    image = np.asarray(Image.open(output).convert('RGB')).astype(int)
+    assert image.shape == (300, 400, 3)
+    assert np.abs(image[5, 5] - TILE_RGB).sum() < 10
+
+    x, y = view.to_image_px(lon, lat)
+    red_px = image[int(round(y[20])), int(round(x[20]))]
+    blue_px = image[int(round(y[180])), int(round(x[180]))]
+    assert red_px[0] > 150 and red_px[2] < 100
+    assert blue_px[2] > 150 and blue_px[0] < 100
+
+
+def test_render_without_tile_cache_uses_background(tmp_path):
+    output = str(tmp_path / "map.png")
+    stats = render_static_map(output, str(tmp_path / "missing"), [11.0, 11.1], [48.0, 48.1], 200, 100,
+                              attribution='')
+    assert stats['tiles_found'] == 0 and stats['tiles_missing'] > 0
+    image = np.asarray(Image.open(output).convert('RGB')).astype(int)
+    assert np.abs(image[2, 2] - BACKGROUND_RGB).sum() < 10
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+test_track_runner.py - Testet Stage-Worker: CSV-Cache und feste Zuordnung Track -> Worker-Prozess.
+"""
+
+import os
+
+import pandas as pd
+
+from TrackRunner import FrameCache, TrackPool
+
+
+def _write_csv(path, rows=3):
+    pd.DataFrame({'km': range(rows), 'name': [f"p{i}" for i in range(rows)]}).to_csv(path, index=False)
+    return str(path)
+
+
+def test_frame_cache_serves_copies_of_unchanged_files(tmp_path):
+    cache = FrameCache(max_bytes=10 * 1024 ** 2)
+    path = _write_csv(tmp_path / "2d_day1_track_data_full_with_speed.csv")
+
+    first = cache.read_csv(pd.read_csv, path)
+    first.loc[0, 'km'] = 99  # Änderungen eines Schritts dürfen den Cache nicht verfälschen
+    second = cache.read_csv(pd.read_csv, path)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert second['km'].tolist() == [0, 1, 2]
+
+    cache.read_csv(pd.read_csv, path, usecols=['km'])  # andere Argumente -> eigener Eintrag
+    assert cache.misses == 2
+
+    _write_csv(path, rows=4)
+    os.utime(path, ns=(1, 1))
+    assert len(cache.read_csv(pd.read_csv, path)) == 4 and cache.misses == 3
+
+
+def test_frame_cache_bypasses_buffers_and_evicts_oldest(tmp_path):
+    path_a, path_b = _write_csv(tmp_path / "a.csv", 200), _write_csv(tmp_path / "b.csv", 200)
+    size = int(pd.read_csv(path_a).memory_usage(index=True, deep=True).sum())
+    cache = FrameCache(max_bytes=int(size * 1.5))
+
+    with open(path_a, encoding="utf-8") as f:
+        cache.read_csv(pd.read_csv, f)
+    assert (cache.hits, cache.misses) == (0, 0)
+
+    cache.read_csv(pd.read_csv, path_a)
+    cache.read_csv(pd.read_csv, path_b)
+    assert len(cache.frames) == 1 and cache.total_bytes <= cache.max_bytes
+    cache.read_csv(pd.read_csv, path_b)
+    assert cache.hits == 1
+
+
+def test_tracks_stay_on_their_worker_process():
+    with TrackPool(workers=2, initializer=None) as pool:
+        pids = {track: {pool.submit(_pid_of, {'track': track}).result() for _ in range(3)}
+                for track in ("day1", "day2", "day3")}
+        assert all(len(track_pids) == 1 for track_pids in pids.values())
+        assert pids["day1"] != pids["day2"]
+        assert sorted(pool.assigned.values()) == [0, 0, 1]
+
+
+def _pid_of(job):
+    return os.getpid()